@@ -15,6 +15,7 @@ from app.config.settings import get_config, APP_METADATA
 # Import controllers
 from app.controllers.analysis_controller import AnalysisController
 from app.controllers.view_controller import ViewController
+from upload_archives import ARCHIVE_SUFFIXES, archive_format
 
 # Import utilities
 from app.utils.helpers import (
@@ -80,6 +81,29 @@ def register_error_handlers(app: Flask):
             413
         )), 413
 
+def findings_query_from_request():
+    """Cursor pagination and filter options of a findings request, None if malformed
+    
+    Accepts cursor, limit, severity and type (comma-separated) and the
+    line_from / line_to line range.
+    """
+    def split(name):
+        values = [value.strip() for value in request.args.get(name, '').split(',') if value.strip()]
+        return values or None
+    
+    try:
+        query = {
+            'cursor': request.args.get('cursor') or None,
+            'severity': split('severity'),
+            'type': split('type')
+        }
+        for name in ('limit', 'line_from', 'line_to'):
+            value = request.args.get(name)
+            query[name] = int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+    return query
+
 def register_routes(app: Flask, analysis_controller: AnalysisController, view_controller: ViewController):
     """Register application routes"""
     
@@ -184,6 +208,82 @@ def register_routes(app: Flask, analysis_controller: AnalysisController, view_co
                 500
             )), 500
     
+    @app.route('/api/analyze/stream', methods=['POST'])
+    def api_analyze_stream():
+        """API endpoint analyzing a large SQL upload statement batch by batch"""
+        try:
+            file = request.files.get('file')
+            if file is None or file.filename == '':
+                return jsonify(ResponseHelper.error_response(
+                    "No file provided",
+                    "NO_FILE",
+                    400
+                )), 400
+            
+            if not FileHelper.is_allowed_file(file.filename, app.config['ALLOWED_EXTENSIONS']):
+                return jsonify(ResponseHelper.error_response(
+                    f"File type not allowed. Allowed types: {', '.join(app.config['ALLOWED_EXTENSIONS'])}",
+                    "INVALID_FILE_TYPE",
+                    400
+                )), 400
+            
+            result = analysis_controller.analyze_sql_stream(file, file.filename)
+            
+            if result['success']:
+                return jsonify(ResponseHelper.success_response(result))
+            else:
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    result.get('error_code', 'ANALYSIS_ERROR'),
+                    400
+                )), 400
+            
+        except Exception as e:
+            app.logger.error(f"Stream analysis API error: {str(e)}")
+            return jsonify(ResponseHelper.error_response(
+                "Internal server error",
+                "INTERNAL_ERROR",
+                500
+            )), 500
+    
+    @app.route('/api/analyze/archive', methods=['POST'])
+    def api_analyze_archive():
+        """API endpoint analyzing every SQL file in a zip or tar upload"""
+        try:
+            file = request.files.get('file')
+            if file is None or file.filename == '':
+                return jsonify(ResponseHelper.error_response(
+                    "No file provided",
+                    "NO_FILE",
+                    400
+                )), 400
+            
+            if not archive_format(file.filename):
+                return jsonify(ResponseHelper.error_response(
+                    f"File type not allowed. Allowed types: {', '.join(ARCHIVE_SUFFIXES)}",
+                    "INVALID_FILE_TYPE",
+                    400
+                )), 400
+            
+            result = analysis_controller.analyze_archive(file, file.filename)
+            
+            if result['success']:
+                return jsonify(ResponseHelper.success_response(result))
+            else:
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    result.get('error_code', 'ANALYSIS_ERROR'),
+                    400
+                )), 400
+            
+        except Exception as e:
+            app.logger.error(f"Archive analysis API error: {str(e)}")
+            return jsonify(ResponseHelper.error_response(
+                "Internal server error",
+                "INTERNAL_ERROR",
+                500
+            )), 500
+    
     @app.route('/api/analysis/<analysis_id>')
     def api_get_analysis(analysis_id):
         """Get analysis details"""
@@ -228,7 +328,7 @@ def register_routes(app: Flask, analysis_controller: AnalysisController, view_co
             result = analysis_controller.get_analysis_summary(analysis_id)
             
             if result['success']:
-                return jsonify(ResponseHelper.success_response(result['summary']))
+                return jsonify(ResponseHelper.success_response(result['data']))
             else:
                 return jsonify(ResponseHelper.error_response(
                     result['error'],
@@ -255,10 +355,24 @@ def register_routes(app: Flask, analysis_controller: AnalysisController, view_co
                     400
                 )), 400
             
-            result = analysis_controller.get_security_analysis(analysis_id)
+            query = findings_query_from_request()
+            if query is None:
+                return jsonify(ResponseHelper.error_response(
+                    "Invalid pagination parameters",
+                    "INVALID_QUERY",
+                    400
+                )), 400
+            
+            result = analysis_controller.get_security_analysis(analysis_id, query)
             
             if result['success']:
-                return jsonify(ResponseHelper.success_response(result['security_analysis']))
+                return jsonify(ResponseHelper.success_response(result['data']))
+            elif result.get('error_code') == 'INVALID_QUERY':
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    "INVALID_QUERY",
+                    400
+                )), 400
             else:
                 return jsonify(ResponseHelper.error_response(
                     result['error'],
@@ -285,10 +399,24 @@ def register_routes(app: Flask, analysis_controller: AnalysisController, view_co
                     400
                 )), 400
             
-            result = analysis_controller.get_performance_analysis(analysis_id)
+            query = findings_query_from_request()
+            if query is None:
+                return jsonify(ResponseHelper.error_response(
+                    "Invalid pagination parameters",
+                    "INVALID_QUERY",
+                    400
+                )), 400
+            
+            result = analysis_controller.get_performance_analysis(analysis_id, query)
             
             if result['success']:
-                return jsonify(ResponseHelper.success_response(result['performance_analysis']))
+                return jsonify(ResponseHelper.success_response(result['data']))
+            elif result.get('error_code') == 'INVALID_QUERY':
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    "INVALID_QUERY",
+                    400
+                )), 400
             else:
                 return jsonify(ResponseHelper.error_response(
                     result['error'],
@@ -315,10 +443,24 @@ def register_routes(app: Flask, analysis_controller: AnalysisController, view_co
                     400
                 )), 400
             
-            result = analysis_controller.get_schema_analysis(analysis_id)
+            query = findings_query_from_request()
+            if query is None:
+                return jsonify(ResponseHelper.error_response(
+                    "Invalid pagination parameters",
+                    "INVALID_QUERY",
+                    400
+                )), 400
+            
+            result = analysis_controller.get_schema_analysis(analysis_id, query)
             
             if result['success']:
-                return jsonify(ResponseHelper.success_response(result['schema_analysis']))
+                return jsonify(ResponseHelper.success_response(result['data']))
+            elif result.get('error_code') == 'INVALID_QUERY':
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    "INVALID_QUERY",
+                    400
+                )), 400
             else:
                 return jsonify(ResponseHelper.error_response(
                     result['error'],
@@ -334,6 +476,120 @@ def register_routes(app: Flask, analysis_controller: AnalysisController, view_co
                 500
             )), 500
     
+    @app.route('/api/search')
+    def api_search_findings():
+        """Full-text search over the findings of all analyses"""
+        try:
+            query = findings_query_from_request()
+            if query is None or not request.args.get('q', '').strip():
+                return jsonify(ResponseHelper.error_response(
+                    "A search query 'q' and valid pagination parameters are required",
+                    "INVALID_QUERY",
+                    400
+                )), 400
+            
+            query.update({
+                'q': request.args.get('q'),
+                'kind': [value.strip() for value in request.args.get('kind', '').split(',') if value.strip()],
+                'analysis_id': request.args.get('analysis_id') or None
+            })
+            result = analysis_controller.search_findings(query)
+            
+            if result['success']:
+                return jsonify(ResponseHelper.success_response(result['data']))
+            elif result.get('error_code') in ('INVALID_QUERY', 'INVALID_ID'):
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    result['error_code'],
+                    400
+                )), 400
+            else:
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    "SEARCH_ERROR",
+                    500
+                )), 500
+            
+        except Exception as e:
+            app.logger.error(f"Search findings API error: {str(e)}")
+            return jsonify(ResponseHelper.error_response(
+                "Internal server error",
+                "INTERNAL_ERROR",
+                500
+            )), 500
+    
+    @app.route('/api/analyses')
+    def api_analysis_history():
+        """Stored analyses, newest first, with keyset pagination"""
+        try:
+            query = {name: request.args.get(name) or None
+                     for name in ('filename', 'database_type', 'date_from', 'date_to', 'cursor')}
+            try:
+                for name in ('min_quality', 'max_quality', 'limit'):
+                    value = request.args.get(name)
+                    query[name] = int(value) if value not in (None, '') else None
+            except ValueError:
+                return jsonify(ResponseHelper.error_response(
+                    "Quality bounds and limit must be integers",
+                    "INVALID_QUERY",
+                    400
+                )), 400
+            result = analysis_controller.get_analysis_history(query)
+            
+            if result['success']:
+                return jsonify(ResponseHelper.success_response(result['data']))
+            elif result.get('error_code') == 'INVALID_QUERY':
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    result['error_code'],
+                    400
+                )), 400
+            else:
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    "HISTORY_ERROR",
+                    500
+                )), 500
+            
+        except Exception as e:
+            app.logger.error(f"Analysis history API error: {str(e)}")
+            return jsonify(ResponseHelper.error_response(
+                "Internal server error",
+                "INTERNAL_ERROR",
+                500
+            )), 500
+    
+    @app.route('/api/trends')
+    def api_trends():
+        """Quality and security trends from the daily rollups"""
+        try:
+            query = {name: request.args.get(name) or None
+                     for name in ('date_from', 'date_to', 'days', 'database_type', 'top')}
+            result = analysis_controller.get_trends(query)
+            
+            if result['success']:
+                return jsonify(ResponseHelper.success_response(result['data']))
+            elif result.get('error_code') == 'INVALID_QUERY':
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    result['error_code'],
+                    400
+                )), 400
+            else:
+                return jsonify(ResponseHelper.error_response(
+                    result['error'],
+                    "TRENDS_ERROR",
+                    500
+                )), 500
+            
+        except Exception as e:
+            app.logger.error(f"Trends API error: {str(e)}")
+            return jsonify(ResponseHelper.error_response(
+                "Internal server error",
+                "INTERNAL_ERROR",
+                500
+            )), 500
+    
     @app.route('/api/export/<analysis_id>/<format_type>')
     def api_export_analysis(analysis_id, format_type):
         """Export analysis results"""
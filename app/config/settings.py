@@ -19,16 +19,90 @@ class Config:
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'.sql', '.txt', '.ddl', '.dml', '.psql', '.mysql', '.oracle'}
+    # Zip and tar uploads to /api/analyze/archive; members are analyzed
+    # concurrently on the 'analysis' pool
+    ARCHIVE_UPLOADS = {
+        'max_members': 1000,
+        'max_total_size': 1024 * 1024 * 1024,  # bytes read from all members
+        'max_in_flight': None  # members submitted and unfinished; None = pool workers
+    }
+    
+    # Uploads over the file processor's max_file_size (or decompressing past
+    # it) are analyzed statement batch by batch instead of as one string;
+    # /api/analyze/stream always does so. Streamed analyses are not stored
+    STREAMING_ANALYSIS = {
+        'enabled': True,
+        'max_size': int(os.environ.get('STREAMING_MAX_SIZE') or 5 * 1024 * 1024 * 1024),  # staged bytes
+        'max_findings': 1000  # located findings returned per kind
+    }
     
     # Analysis settings
     ANALYSIS_TIMEOUT = 300  # 5 minutes
     MAX_CONCURRENT_ANALYSES = 5
     CACHE_ENABLED = True
+    
+    # Shared executor pools (see app.utils.executors); the analyze and
+    # export endpoints run their work here, so these bound it process-wide.
+    # A full pool makes submit wait at most submit_timeout seconds, then
+    # raise queue.Full, so a saturated pool cannot hang its callers
+    EXECUTOR_POOLS = {
+        'analysis': {'max_workers': MAX_CONCURRENT_ANALYSES, 'max_queue': 50, 'submit_timeout': 30.0},
+        'export': {'max_workers': 2, 'max_queue': 20, 'submit_timeout': 30.0}
+    }
     CACHE_TIMEOUT = 3600  # 1 hour
     
     # Database settings
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///sql_analyzer.db'
     
+    # SQLite connection pools (see app.models.connection_pool)
+    DATABASE_POOL = {
+        'read_pool_size': 8,
+        'write_pool_size': 1,
+        'checkout_timeout': 30.0,
+        'idle_timeout': 300.0,
+        'busy_timeout': 5.0,
+        'busy_retries': 5
+    }
+    # 'rows' stores one row per finding, 'blob' one compressed blob per analysis
+    ANALYSIS_STORAGE_LAYOUT = os.environ.get('ANALYSIS_STORAGE_LAYOUT') or 'rows'
+    DATABASE_PRAGMAS = {
+        # Freed pages are returned to the OS by PRAGMA incremental_vacuum
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16384,  # 16MB per connection
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY'
+    }
+    
+    # Full-text index over findings, maintained on every save
+    SEARCH_INDEX_ENABLED = True
+    
+    # Write-behind persistence (see app.models.write_behind): analyses are
+    # cached at once and committed by a writer thread in coalesced batches
+    WRITE_BEHIND = {
+        'enabled': os.environ.get('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes'),
+        'max_batch': 32,
+        'max_delay': 0.05,      # seconds a batch waits for more writes
+        'max_queue': 1000,
+        'enqueue_timeout': 5.0,
+        'shutdown_timeout': 30.0
+    }
+    
+    # Retention of stored analyses (see app.services.maintenance_service).
+    # Limits left as None are not enforced; maintenance runs in the
+    # background every interval seconds once any limit is set.
+    DATABASE_RETENTION = {
+        'max_age_days': int(os.environ['RETENTION_MAX_AGE_DAYS']) if os.environ.get('RETENTION_MAX_AGE_DAYS') else None,
+        'max_analyses': int(os.environ['RETENTION_MAX_ANALYSES']) if os.environ.get('RETENTION_MAX_ANALYSES') else None,
+        'max_bytes': int(os.environ['RETENTION_MAX_BYTES']) if os.environ.get('RETENTION_MAX_BYTES') else None,
+        'interval': 3600.0,
+        'batch_size': 50,       # analyses deleted per write transaction
+        'batch_pause': 0.05,    # seconds the write lock is left free between batches
+        'vacuum_pages': 2048,   # pages released per incremental_vacuum step
+        'analysis_limit': 1000  # rows sampled per index by ANALYZE
+    }
+    
     # Security settings
     SECURITY_ENABLED = True
     OWASP_COMPLIANCE = True
@@ -6,8 +6,10 @@ Enterprise controller for SQL analysis operations with service layer integration
 
 import os
 import time
+import queue
 import logging
-from typing import Dict, Any, Optional, List
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Any, Optional, List
 from flask import request, jsonify, render_template, current_app
 from werkzeug.utils import secure_filename
 
@@ -19,6 +21,7 @@ from app.models.analysis_models import (
 
 # Import services
 from app.services.analysis_service import AnalysisService
+from app.config.settings import Config
 
 # Import utilities
 from app.utils.helpers import ValidationHelper, ResponseHelper, LoggingHelper
@@ -66,9 +69,9 @@ class AnalysisController:
                     'VALIDATION_ERROR'
                 )
 
-            # Use service layer for analysis
-            service_result = self.analysis_service.analyze_sql_file(
-                file_data, filename, options
+            # Analyses run on the shared analysis pool, not the request thread
+            service_result = self._run_pooled(
+                lambda: self.analysis_service.submit_analysis(file_data, filename, options)
             )
 
             # Update metrics
@@ -97,6 +100,88 @@ class AnalysisController:
                 'CONTROLLER_ERROR'
             )
     
+    def analyze_archive(self, file_data: Any, filename: str = None,
+                        options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Analyze every SQL file in an uploaded zip or tar archive"""
+        start_time = time.time()
+        self.request_metrics['total_requests'] += 1
+
+        try:
+            validation_result = self._validate_request(file_data, filename, options)
+            if not validation_result['valid']:
+                self.request_metrics['failed_requests'] += 1
+                return ResponseHelper.error_response(
+                    validation_result['error'],
+                    'VALIDATION_ERROR'
+                )
+
+            service_result = self.analysis_service.analyze_archive(file_data, filename, options)
+
+            response_time = time.time() - start_time
+            self._update_request_metrics(response_time, service_result['success'])
+            LoggingHelper.log_performance(
+                self.logger,
+                'sql_archive_analysis',
+                response_time,
+                {
+                    'filename': filename,
+                    'success': service_result['success'],
+                    'files': service_result.get('data', {}).get('summary', {}).get('total_files', 0)
+                }
+            )
+
+            return service_result
+
+        except Exception as e:
+            self.request_metrics['failed_requests'] += 1
+            self.logger.error(f"Controller archive analysis error: {str(e)}", exc_info=True)
+            return ResponseHelper.error_response(
+                f"Analysis controller error: {str(e)}",
+                'CONTROLLER_ERROR'
+            )
+    
+    def analyze_sql_stream(self, file_data: Any, filename: str = None,
+                           options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Analyze an uploaded SQL file statement batch by batch"""
+        start_time = time.time()
+        self.request_metrics['total_requests'] += 1
+
+        try:
+            validation_result = self._validate_request(file_data, filename, options)
+            if not validation_result['valid']:
+                self.request_metrics['failed_requests'] += 1
+                return ResponseHelper.error_response(
+                    validation_result['error'],
+                    'VALIDATION_ERROR'
+                )
+
+            service_result = self._run_pooled(
+                lambda: self.analysis_service.submit_stream_analysis(file_data, filename, options)
+            )
+
+            response_time = time.time() - start_time
+            self._update_request_metrics(response_time, service_result['success'])
+            LoggingHelper.log_performance(
+                self.logger,
+                'sql_stream_analysis',
+                response_time,
+                {
+                    'filename': filename,
+                    'success': service_result['success'],
+                    'file_size': service_result.get('data', {}).get('file_info', {}).get('size', 0)
+                }
+            )
+
+            return service_result
+
+        except Exception as e:
+            self.request_metrics['failed_requests'] += 1
+            self.logger.error(f"Controller stream analysis error: {str(e)}", exc_info=True)
+            return ResponseHelper.error_response(
+                f"Analysis controller error: {str(e)}",
+                'CONTROLLER_ERROR'
+            )
+    
     def get_analysis_summary(self, analysis_id: str) -> Dict[str, Any]:
         """Get analysis summary by ID with comprehensive validation"""
         try:
@@ -133,9 +218,9 @@ class AnalysisController:
                     'INVALID_ID'
                 )
 
-            # Use service layer
-            service_result = self.analysis_service.export_analysis(
-                analysis_id, format_type, options
+            # Exports run on the shared export pool, not the request thread
+            service_result = self._run_pooled(
+                lambda: self.analysis_service.submit_export(analysis_id, format_type, options)
             )
 
             # Log export request
@@ -172,6 +257,24 @@ class AnalysisController:
                 'CONTROLLER_ERROR'
             )
 
+    def get_analysis_history(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a page of the analysis history"""
+        try:
+            # Use service layer
+            service_result = self.analysis_service.get_analysis_history(query)
+
+            # Log request
+            self.logger.debug(f"Analysis history requested: {query}")
+
+            return service_result
+
+        except Exception as e:
+            self.logger.error(f"Controller analysis history error: {str(e)}", exc_info=True)
+            return ResponseHelper.error_response(
+                f"Failed to get analysis history: {str(e)}",
+                'CONTROLLER_ERROR'
+            )
+
     def delete_analysis(self, analysis_id: str) -> Dict[str, Any]:
         """Delete analysis result with validation"""
         try:
@@ -220,6 +323,26 @@ class AnalysisController:
                 'CONTROLLER_ERROR'
             )
 
+    def _run_pooled(self, submit: Callable[[], Future]) -> Dict[str, Any]:
+        """Service response of work submitted to a shared executor pool
+        
+        The request thread only waits, so the pool's worker count bounds
+        the analyses and exports running at once across all requests. A
+        full pool queue answers SERVICE_BUSY and a result not ready within
+        ANALYSIS_TIMEOUT answers TIMEOUT.
+        """
+        try:
+            future = submit()
+        except queue.Full as e:
+            return ResponseHelper.error_response(f"Service is busy: {str(e)}", 'SERVICE_BUSY', 503)
+        try:
+            return future.result(timeout=Config.ANALYSIS_TIMEOUT)
+        except FutureTimeout:
+            future.cancel()
+            return ResponseHelper.error_response(
+                f"Operation did not finish within {Config.ANALYSIS_TIMEOUT} seconds", 'TIMEOUT', 504
+            )
+
     def _validate_request(self, file_data: Any, filename: str,
                          options: Dict[str, Any]) -> Dict[str, Any]:
         """Validate request parameters comprehensively"""
@@ -315,7 +438,7 @@ class AnalysisController:
                 'CONTROLLER_ERROR'
             )
     
-    def get_security_analysis(self, analysis_id: str) -> Dict[str, Any]:
+    def get_security_analysis(self, analysis_id: str, query: Dict[str, Any] = None) -> Dict[str, Any]:
         """Get security analysis details with comprehensive assessment"""
         try:
             # Validate analysis ID
@@ -326,7 +449,7 @@ class AnalysisController:
                 )
 
             # Use service layer
-            service_result = self.analysis_service.get_security_analysis(analysis_id)
+            service_result = self.analysis_service.get_security_analysis(analysis_id, query)
 
             # Log request
             self.logger.debug(f"Security analysis requested: {analysis_id}")
@@ -340,7 +463,7 @@ class AnalysisController:
                 'CONTROLLER_ERROR'
             )
     
-    def get_performance_analysis(self, analysis_id: str) -> Dict[str, Any]:
+    def get_performance_analysis(self, analysis_id: str, query: Dict[str, Any] = None) -> Dict[str, Any]:
         """Get performance analysis details with comprehensive assessment"""
         try:
             # Validate analysis ID
@@ -351,7 +474,7 @@ class AnalysisController:
                 )
 
             # Use service layer
-            service_result = self.analysis_service.get_performance_analysis(analysis_id)
+            service_result = self.analysis_service.get_performance_analysis(analysis_id, query)
 
             # Log request
             self.logger.debug(f"Performance analysis requested: {analysis_id}")
@@ -365,7 +488,7 @@ class AnalysisController:
                 'CONTROLLER_ERROR'
             )
     
-    def get_schema_analysis(self, analysis_id: str) -> Dict[str, Any]:
+    def get_schema_analysis(self, analysis_id: str, query: Dict[str, Any] = None) -> Dict[str, Any]:
         """Get schema analysis details with comprehensive assessment"""
         try:
             # Validate analysis ID
@@ -376,7 +499,7 @@ class AnalysisController:
                 )
 
             # Use service layer
-            service_result = self.analysis_service.get_schema_analysis(analysis_id)
+            service_result = self.analysis_service.get_schema_analysis(analysis_id, query)
 
             # Log request
             self.logger.debug(f"Schema analysis requested: {analysis_id}")
@@ -390,6 +513,50 @@ class AnalysisController:
                 'CONTROLLER_ERROR'
             )
     
+    def search_findings(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Search the findings of all stored analyses"""
+        try:
+            # Validate analysis ID filter
+            analysis_id = query.get('analysis_id')
+            if analysis_id and not ValidationHelper.validate_analysis_id(analysis_id):
+                return ResponseHelper.error_response(
+                    'Invalid analysis ID format',
+                    'INVALID_ID'
+                )
+
+            # Use service layer
+            service_result = self.analysis_service.search_findings(query)
+
+            # Log request
+            self.logger.debug(f"Findings search requested: {query.get('q')}")
+
+            return service_result
+
+        except Exception as e:
+            self.logger.error(f"Controller findings search error: {str(e)}", exc_info=True)
+            return ResponseHelper.error_response(
+                f"Failed to search findings: {str(e)}",
+                'CONTROLLER_ERROR'
+            )
+    
+    def get_trends(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Get quality and security trends over a date range"""
+        try:
+            # Use service layer
+            service_result = self.analysis_service.get_trends(query)
+
+            # Log request
+            self.logger.debug(f"Trends requested: {query}")
+
+            return service_result
+
+        except Exception as e:
+            self.logger.error(f"Controller trends error: {str(e)}", exc_info=True)
+            return ResponseHelper.error_response(
+                f"Failed to get trends: {str(e)}",
+                'CONTROLLER_ERROR'
+            )
+    
     def _detect_database_type(self, filename: str, content: str) -> DatabaseType:
         """Detect database type from filename and content"""
         if filename:
@@ -38,6 +38,35 @@ class AnalysisType(Enum):
     SCHEMA = "schema"
     COMPREHENSIVE = "comprehensive"
 
+def quality_level(quality_score: int) -> str:
+    """Quality level description of a quality score"""
+    if quality_score >= 90:
+        return "Excellent"
+    elif quality_score >= 75:
+        return "Good"
+    elif quality_score >= 60:
+        return "Fair"
+    else:
+        return "Poor"
+
+def complexity_level(complexity_score: int) -> str:
+    """Complexity level description of a complexity score"""
+    if complexity_score <= 25:
+        return "Low"
+    elif complexity_score <= 50:
+        return "Moderate"
+    elif complexity_score <= 75:
+        return "High"
+    else:
+        return "Very High"
+
+def _count_values(values) -> Dict[str, int]:
+    """Occurrences of each value, in first-seen order"""
+    counts: Dict[str, int] = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    return counts
+
 @dataclass
 class SQLError:
     """SQL Error representation"""
@@ -177,6 +206,7 @@ class AnalysisResult:
     filename: str = ""
     processing_time: float = 0.0
     database_type: DatabaseType = DatabaseType.GENERIC
+    rule_version: str = ""
     total_lines: int = 0
     total_statements: int = 0
     syntax_errors: List[SQLError] = field(default_factory=list)
@@ -200,6 +230,7 @@ class AnalysisResult:
             'filename': self.filename,
             'processing_time': self.processing_time,
             'database_type': self.database_type.value,
+            'rule_version': self.rule_version,
             'total_lines': self.total_lines,
             'total_statements': self.total_statements,
             'syntax_errors': [error.to_dict() for error in self.syntax_errors],
@@ -237,25 +268,11 @@ class AnalysisResult:
     
     def get_quality_level(self) -> str:
         """Get quality level description"""
-        if self.quality_score >= 90:
-            return "Excellent"
-        elif self.quality_score >= 75:
-            return "Good"
-        elif self.quality_score >= 60:
-            return "Fair"
-        else:
-            return "Poor"
+        return quality_level(self.quality_score)
     
     def get_complexity_level(self) -> str:
         """Get complexity level description"""
-        if self.complexity_score <= 25:
-            return "Low"
-        elif self.complexity_score <= 50:
-            return "Moderate"
-        elif self.complexity_score <= 75:
-            return "High"
-        else:
-            return "Very High"
+        return complexity_level(self.complexity_score)
 
 @dataclass
 class FileInfo:
@@ -313,3 +330,179 @@ class ExportResult:
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat()
         }
+
+@dataclass
+class AnalysisSummary:
+    """Analysis result without its findings
+    
+    Facets hold the per-type counts and distinct values that the detail
+    views aggregate, so they can be answered without loading any finding.
+    """
+    id: str = ""
+    file_hash: str = ""
+    filename: str = ""
+    database_type: DatabaseType = DatabaseType.GENERIC
+    processing_time: float = 0.0
+    total_lines: int = 0
+    total_statements: int = 0
+    quality_score: int = 0
+    complexity_score: int = 0
+    error_count: int = 0
+    vulnerability_count: int = 0
+    performance_issue_count: int = 0
+    table_count: int = 0
+    relationship_count: int = 0
+    error_summary: Dict[str, int] = field(default_factory=dict)
+    security_summary: Dict[str, int] = field(default_factory=dict)
+    facets: Dict[str, Any] = field(default_factory=dict)
+    recommendations: List[str] = field(default_factory=list)
+    relationships: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: Optional[str] = None
+    
+    @classmethod
+    def from_result(cls, result: AnalysisResult) -> 'AnalysisSummary':
+        """Summarize a complete analysis result"""
+        tables = result.tables
+        vulnerabilities = result.security_vulnerabilities
+        return cls(
+            id=result.id,
+            file_hash=result.file_hash,
+            filename=result.filename,
+            database_type=result.database_type,
+            processing_time=result.processing_time,
+            total_lines=result.total_lines,
+            total_statements=result.total_statements,
+            quality_score=result.quality_score,
+            complexity_score=result.complexity_score,
+            error_count=len(result.syntax_errors) + len(result.semantic_errors),
+            vulnerability_count=len(vulnerabilities),
+            performance_issue_count=len(result.performance_issues),
+            table_count=len(tables),
+            relationship_count=len(result.relationships),
+            error_summary=result.get_error_summary(),
+            security_summary=result.get_security_summary(),
+            facets={
+                'error_types': _count_values(error.error_type for errors in
+                                             (result.syntax_errors, result.semantic_errors) for error in errors),
+                'vulnerability_types': _count_values(vuln.vulnerability_type for vuln in vulnerabilities),
+                'issue_types': _count_values(issue.issue_type for issue in result.performance_issues),
+                'impact_counts': _count_values(issue.impact for issue in result.performance_issues),
+                'cwe_ids': sorted(set(vuln.cwe_id for vuln in vulnerabilities if vuln.cwe_id)),
+                'owasp_categories': sorted(set(vuln.owasp_category for vuln in vulnerabilities if vuln.owasp_category)),
+                'relationship_types': _count_values(rel.get('type', 'unknown') for rel in result.relationships),
+                'table_stats': {
+                    'total_columns': sum(len(table.columns) for table in tables),
+                    'total_constraints': sum(len(table.constraints) for table in tables),
+                    'tables_with_primary_keys': sum(1 for table in tables if table.primary_keys),
+                    'tables_with_foreign_keys': sum(1 for table in tables if table.foreign_keys)
+                }
+            },
+            recommendations=list(result.recommendations),
+            relationships=list(result.relationships),
+            created_at=result.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        )
+    
+    def get_quality_level(self) -> str:
+        """Get quality level description"""
+        return quality_level(self.quality_score)
+    
+    def get_complexity_level(self) -> str:
+        """Get complexity level description"""
+        return complexity_level(self.complexity_score)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'file_hash': self.file_hash,
+            'filename': self.filename,
+            'database_type': self.database_type.value,
+            'processing_time': self.processing_time,
+            'total_lines': self.total_lines,
+            'total_statements': self.total_statements,
+            'quality_score': self.quality_score,
+            'complexity_score': self.complexity_score,
+            'error_count': self.error_count,
+            'vulnerability_count': self.vulnerability_count,
+            'performance_issue_count': self.performance_issue_count,
+            'table_count': self.table_count,
+            'relationship_count': self.relationship_count,
+            'error_summary': self.error_summary,
+            'security_summary': self.security_summary,
+            'facets': self.facets,
+            'recommendations': self.recommendations,
+            'relationships': self.relationships,
+            'created_at': self.created_at
+        }
+
+@dataclass
+class FindingsPage:
+    """One page of findings, search hits or history entries; next_cursor resumes after the last item"""
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    limit: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'items': [item.to_dict() for item in self.items],
+            'next_cursor': self.next_cursor,
+            'limit': self.limit,
+            'returned': len(self.items)
+        }
+
+@dataclass
+class SearchHit:
+    """A finding matching a full-text search"""
+    analysis_id: str
+    filename: str
+    kind: str
+    finding_id: str
+    line_number: Optional[int] = None
+    severity: Optional[str] = None
+    finding_type: Optional[str] = None
+    snippet: str = ""
+    score: float = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'analysis_id': self.analysis_id,
+            'filename': self.filename,
+            'kind': self.kind,
+            'finding_id': self.finding_id,
+            'line_number': self.line_number,
+            'severity': self.severity,
+            'type': self.finding_type,
+            'snippet': self.snippet,
+            'score': self.score
+        }
+
+@dataclass
+class AnalysisHistoryEntry:
+    """A stored analysis as listed in the analysis history"""
+    id: str
+    filename: str
+    database_type: str
+    quality_score: int = 0
+    complexity_score: int = 0
+    processing_time: float = 0.0
+    error_count: int = 0
+    vulnerability_count: int = 0
+    performance_issue_count: int = 0
+    created_at: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'database_type': self.database_type,
+            'quality_score': self.quality_score,
+            'complexity_score': self.complexity_score,
+            'processing_time': self.processing_time,
+            'error_count': self.error_count,
+            'vulnerability_count': self.vulnerability_count,
+            'performance_issue_count': self.performance_issue_count,
+            'created_at': self.created_at
+        }
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+CONNECTION POOL
+Bounded SQLite connection pool with checkout, health checks and idle reaping
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No connection became available within the checkout timeout"""
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by every thread
+
+    A thread that already holds a connection from the pool gets the same one
+    back on a nested checkout, so repository methods can call each other
+    without deadlocking a small pool. Idle connections are health checked
+    before reuse and closed once idle for longer than idle_timeout.
+    """
+
+    def __init__(self, name: str, connect: Callable[[], sqlite3.Connection], max_size: int = 4,
+                 checkout_timeout: float = 30.0, idle_timeout: float = 300.0,
+                 health_check_interval: float = 30.0):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.logger = logging.getLogger(__name__)
+        self._connect = connect
+        self._idle: List[Tuple[sqlite3.Connection, float]] = []
+        self._size = 0
+        self._closed = False
+        self._local = threading.local()
+        self._available = threading.Condition(threading.Lock())
+        self._stats = {'created': 0, 'checkouts': 0, 'waits': 0, 'timeouts': 0,
+                       'reaped': 0, 'discarded': 0}
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """Check out a connection, waiting up to timeout for one to be returned"""
+        held = getattr(self._local, 'held', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        conn = self._checkout(self.checkout_timeout if timeout is None else timeout)
+        self._local.held = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False) -> None:
+        """Return a connection; discarded connections are closed and replaced lazily"""
+        if getattr(self._local, 'held', None) is conn:
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.held = None
+
+        if not discard and conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                discard = True
+
+        with self._available:
+            if discard or self._closed:
+                self._size -= 1
+                if discard:
+                    self._stats['discarded'] += 1
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    def holds_connection(self) -> bool:
+        """Whether the current thread has a connection checked out"""
+        return getattr(self._local, 'held', None) is not None
+
+    def reap_idle(self) -> int:
+        """Close connections idle for longer than idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._available:
+            stale = [conn for conn, returned_at in self._idle if returned_at < cutoff]
+            self._idle = [(conn, returned_at) for conn, returned_at in self._idle if returned_at >= cutoff]
+            self._size -= len(stale)
+            self._stats['reaped'] += len(stale)
+        for conn in stale:
+            self._close(conn)
+        return len(stale)
+
+    def close(self) -> None:
+        """Close idle connections; checked-out ones are closed when returned"""
+        with self._available:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._available.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, idle connections and checkout counters"""
+        with self._available:
+            stats = dict(self._stats)
+            stats.update({
+                'name': self.name,
+                'max_size': self.max_size,
+                'open': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle)
+            })
+        return stats
+
+    def _checkout(self, timeout: float) -> sqlite3.Connection:
+        """Take an idle connection or open a new one within the pool bound"""
+        self.reap_idle()
+        deadline = time.monotonic() + timeout
+        with self._available:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError(f"Connection pool '{self.name}' is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._stats['checkouts'] += 1
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, returned_at = None, None
+                    self._stats['checkouts'] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No connection available in pool '{self.name}' "
+                                      f"after {timeout:.1f}s")
+                self._stats['waits'] += 1
+                self._available.wait(remaining)
+
+        # Opening and health checking happen outside the pool lock
+        if conn is not None and time.monotonic() - returned_at >= self.health_check_interval:
+            if not self._is_healthy(conn):
+                self.logger.warning(f"Replacing unhealthy connection in pool '{self.name}'")
+                self._close(conn)
+                conn = None
+                with self._available:
+                    self._stats['discarded'] += 1
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._available:
+                    self._size -= 1
+                    self._available.notify()
+                raise
+            with self._available:
+                self._stats['created'] += 1
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _close(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Failed to close connection in pool '{self.name}': {str(e)}")
@@ -5,42 +5,187 @@ Enterprise-grade data access with caching, validation, and persistence
 """
 
 import os
+import html
 import json
+import hashlib
+import base64
+import random
+import uuid
+import sys
 import sqlite3
 import threading
 import time
 import logging
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from contextlib import contextmanager
 from dataclasses import asdict
 
 from app.models.analysis_models import (
-    AnalysisResult, FileInfo, ExportResult, SQLError, 
-    SecurityVulnerability, PerformanceIssue, TableInfo
+    AnalysisResult, AnalysisSummary, FindingsPage, FileInfo, ExportResult, SQLError, 
+    SecurityVulnerability, PerformanceIssue, TableInfo, ErrorSeverity, SearchHit,
+    AnalysisHistoryEntry
 )
+from app.models.connection_pool import ConnectionPool
+from app.models.findings_codec import (
+    FORMAT_VERSION as FINDINGS_FORMAT_VERSION, count_findings, decode_findings, encode_findings
+)
+from app.config.settings import Config
 from app.utils.helpers import cache, FileHelper, TimeHelper
 
 class DatabaseManager:
-    """Enterprise database manager with connection pooling and transactions"""
+    """Enterprise database manager with connection pooling and transactions
+    
+    File databases run in WAL mode with separate pools: readers never wait
+    for the writer, and the single-connection write pool serializes writers
+    inside the process. An in-memory database is private to a connection,
+    so it is served by one shared connection instead.
+    """
     
-    def __init__(self, db_path: str = "sql_analyzer.db"):
+    def __init__(self, db_path: str = "sql_analyzer.db",
+                 pool_settings: Optional[Dict[str, Any]] = None,
+                 pragmas: Optional[Dict[str, Any]] = None):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
-        self._lock = threading.Lock()
-        self._connections = {}
+        self.pool_settings = dict(Config.DATABASE_POOL, **(pool_settings or {}))
+        self.pragmas = dict(Config.DATABASE_PRAGMAS, **(pragmas or {}))
+        self._create_pools()
         self._initialize_database()
     
+    def _create_pools(self):
+        """Create the read and write connection pools"""
+        settings = self.pool_settings
+        options = {
+            'checkout_timeout': settings['checkout_timeout'],
+            'idle_timeout': settings['idle_timeout']
+        }
+        if self.db_path == ':memory:':
+            self._write_pool = ConnectionPool('sqlite', lambda: self._connect(read_only=False),
+                                              max_size=1, idle_timeout=float('inf'),
+                                              checkout_timeout=settings['checkout_timeout'])
+            self._read_pool = self._write_pool
+        else:
+            self._write_pool = ConnectionPool('sqlite-write', lambda: self._connect(read_only=False),
+                                              max_size=settings['write_pool_size'], **options)
+            self._read_pool = ConnectionPool('sqlite-read', lambda: self._connect(read_only=True),
+                                             max_size=settings['read_pool_size'], **options)
+    
+    def _connect(self, read_only: bool) -> sqlite3.Connection:
+        """Open a connection configured with the tuned pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=self.pool_settings['busy_timeout']
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        for name, value in self.pragmas.items():
+            # Journal and vacuum modes are properties of the file, set by writers
+            if name in self.FILE_PRAGMAS and read_only:
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+    
+    # Pragmas stored in the database file rather than per connection
+    FILE_PRAGMAS = ('journal_mode', 'auto_vacuum')
+    AUTO_VACUUM_MODES = {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}
+    
+    # Summary columns added to analysis_results after its first release
+    SUMMARY_COLUMNS = (
+        ('error_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('vulnerability_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('performance_issue_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('table_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('summary', 'TEXT')
+    )
+    
+    @staticmethod
+    def _add_missing_columns(cursor, table: str, columns):
+        """Add columns missing from a table created by an older release"""
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+        for name, definition in columns:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    
+    def _migrate_content_addressing(self, conn: sqlite3.Connection):
+        """Rebuild a pre-content-addressing analysis_results table
+        
+        Older releases declared file_hash UNIQUE, which cannot be dropped in
+        place. The table is copied into the new layout following SQLite's
+        documented procedure, with foreign keys off so child rows are kept.
+        Copied rows get an empty rule version, so they are re-analyzed
+        under the current rules rather than reused.
+        """
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(analysis_results)").fetchall()}
+        if not existing or 'content_key' in existing:
+            return
+        
+        self.logger.info("Migrating analysis_results to content-addressed storage")
+        self._add_missing_columns(conn.cursor(), 'analysis_results', self.SUMMARY_COLUMNS)
+        columns = ', '.join(
+            ['id', 'file_hash', 'filename', 'database_type', 'processing_time', 'total_lines',
+             'total_statements', 'quality_score', 'complexity_score', 'corrected_sql',
+             'recommendations', 'created_at', 'updated_at'] +
+            [name for name, _ in self.SUMMARY_COLUMNS]
+        )
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                CREATE TABLE analysis_results_migrated (
+                    id TEXT PRIMARY KEY,
+                    content_key TEXT NOT NULL,
+                    rule_version TEXT NOT NULL DEFAULT '',
+                    file_hash TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    database_type TEXT NOT NULL,
+                    processing_time REAL NOT NULL,
+                    total_lines INTEGER NOT NULL,
+                    total_statements INTEGER NOT NULL,
+                    quality_score INTEGER NOT NULL,
+                    complexity_score INTEGER NOT NULL,
+                    corrected_sql TEXT,
+                    recommendations TEXT,
+                    error_count INTEGER NOT NULL DEFAULT 0,
+                    vulnerability_count INTEGER NOT NULL DEFAULT 0,
+                    performance_issue_count INTEGER NOT NULL DEFAULT 0,
+                    table_count INTEGER NOT NULL DEFAULT 0,
+                    summary TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute(f"""
+                INSERT INTO analysis_results_migrated (content_key, {columns})
+                SELECT file_hash || ':' || database_type || ':', {columns} FROM analysis_results
+            """)
+            conn.execute("DROP TABLE analysis_results")
+            conn.execute("ALTER TABLE analysis_results_migrated RENAME TO analysis_results")
+            violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+            if violations:
+                self.logger.warning(f"{len(violations)} orphaned rows reference missing analyses")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+    
     def _initialize_database(self):
         """Initialize database schema"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._migrate_content_addressing(conn)
             
-            # Analysis results table
+            # Analysis results table, one row per (content, dialect, rules)
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS analysis_results (
                     id TEXT PRIMARY KEY,
-                    file_hash TEXT UNIQUE NOT NULL,
+                    content_key TEXT NOT NULL,
+                    rule_version TEXT NOT NULL DEFAULT '',
+                    file_hash TEXT NOT NULL,
                     filename TEXT NOT NULL,
                     database_type TEXT NOT NULL,
                     processing_time REAL NOT NULL,
@@ -50,10 +195,27 @@ class DatabaseManager:
                     complexity_score INTEGER NOT NULL,
                     corrected_sql TEXT,
                     recommendations TEXT,
+                    error_count INTEGER NOT NULL DEFAULT 0,
+                    vulnerability_count INTEGER NOT NULL DEFAULT 0,
+                    performance_issue_count INTEGER NOT NULL DEFAULT 0,
+                    table_count INTEGER NOT NULL DEFAULT 0,
+                    summary TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            self._add_missing_columns(cursor, 'analysis_results', self.SUMMARY_COLUMNS)
+            
+            # Uploads referencing the analysis of their content
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_uploads (
+                    id TEXT PRIMARY KEY,
+                    analysis_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (analysis_id) REFERENCES analysis_results (id)
+                )
+            """)
             
             # File information table
             cursor.execute("""
@@ -158,148 +320,500 @@ class DatabaseManager:
                 )
             """)
             
+            # Compressed findings of analyses saved with the blob layout
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_findings (
+                    analysis_id TEXT PRIMARY KEY,
+                    format_version INTEGER NOT NULL,
+                    finding_count INTEGER NOT NULL,
+                    raw_size INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    FOREIGN KEY (analysis_id) REFERENCES analysis_results (id)
+                )
+            """)
+            
+            # Full-text index over findings. Findings repeat the same text
+            # across lines and analyses, so each distinct text is indexed once
+            # in findings_fts under the rowid of its search_texts entry, and
+            # finding_documents maps every finding to its text
+            self.search_index_created = not cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'findings_fts'").fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS search_texts (
+                    id INTEGER PRIMARY KEY,
+                    text_key BLOB UNIQUE NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS finding_documents (
+                    id INTEGER PRIMARY KEY,
+                    analysis_id TEXT NOT NULL,
+                    text_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    finding_id TEXT NOT NULL,
+                    line_number INTEGER,
+                    severity TEXT,
+                    finding_type TEXT,
+                    FOREIGN KEY (analysis_id) REFERENCES analysis_results (id),
+                    FOREIGN KEY (text_id) REFERENCES search_texts (id)
+                )
+            """)
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS findings_fts USING fts5(
+                    finding_type, message, detail, code_snippet,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+            
+            # Daily rollups per database type, maintained at save time so
+            # trend queries never read individual analyses
+            self.rollups_created = not cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'analysis_rollups'").fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_rollups (
+                    bucket_date TEXT NOT NULL,
+                    database_type TEXT NOT NULL,
+                    analysis_count INTEGER NOT NULL DEFAULT 0,
+                    quality_sum INTEGER NOT NULL DEFAULT 0,
+                    complexity_sum INTEGER NOT NULL DEFAULT 0,
+                    processing_time_sum REAL NOT NULL DEFAULT 0,
+                    line_count INTEGER NOT NULL DEFAULT 0,
+                    error_count INTEGER NOT NULL DEFAULT 0,
+                    vulnerability_count INTEGER NOT NULL DEFAULT 0,
+                    performance_issue_count INTEGER NOT NULL DEFAULT 0,
+                    critical_count INTEGER NOT NULL DEFAULT 0,
+                    high_count INTEGER NOT NULL DEFAULT 0,
+                    medium_count INTEGER NOT NULL DEFAULT 0,
+                    low_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (bucket_date, database_type)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_rollup_types (
+                    bucket_date TEXT NOT NULL,
+                    database_type TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (bucket_date, database_type, category, name)
+                ) WITHOUT ROWID
+            """)
+            
             # Create indexes for better performance
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_content_key ON analysis_results (content_key)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_file_hash ON analysis_results (file_hash)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_created_at ON analysis_results (created_at)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_errors_analysis_id ON sql_errors (analysis_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_vulnerabilities_analysis_id ON security_vulnerabilities (analysis_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_performance_analysis_id ON performance_issues (analysis_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_analysis_id ON analysis_uploads (analysis_id)")
+            # History pages seek on (created_at, id), within a database type
+            # when one is given; see get_analysis_history for range filters
+            cursor.execute("DROP INDEX IF EXISTS idx_analysis_created_at")
+            cursor.execute("DROP INDEX IF EXISTS idx_analysis_history_filename")
+            cursor.execute("DROP INDEX IF EXISTS idx_analysis_history_quality")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_history ON analysis_results (created_at, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_history_type "
+                           "ON analysis_results (database_type, created_at, id)")
+            
+            # Findings are paged in (line, id) order within an analysis; these
+            # indexes also serve plain analysis_id lookups, replacing the
+            # single-column ones
+            for table, index_name in (('sql_errors', 'idx_errors'),
+                                      ('security_vulnerabilities', 'idx_vulnerabilities'),
+                                      ('performance_issues', 'idx_performance')):
+                cursor.execute(f"DROP INDEX IF EXISTS {index_name}_analysis_id")
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name}_analysis_line "
+                               f"ON {table} (analysis_id, line_number, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tables_analysis_name ON table_info (analysis_id, table_name, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_analysis_id ON finding_documents (analysis_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_text ON finding_documents (text_id, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_rollups_database_type ON analysis_rollups (database_type, bucket_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_rollup_types_category "
+                           "ON analysis_rollup_types (category, bucket_date)")
             
             conn.commit()
             self.logger.info("Database schema initialized successfully")
     
     @contextmanager
-    def get_connection(self):
-        """Get database connection with automatic cleanup"""
-        thread_id = threading.get_ident()
-        
-        with self._lock:
-            if thread_id not in self._connections:
-                self._connections[thread_id] = sqlite3.connect(
-                    self.db_path,
-                    check_same_thread=False,
-                    timeout=30.0
-                )
-                self._connections[thread_id].row_factory = sqlite3.Row
-                self._connections[thread_id].execute("PRAGMA foreign_keys = ON")
+    def get_connection(self, read_only: bool = False):
+        """Check out a pooled connection, returning it to the pool afterwards
+        
+        Read-only checkouts use the read pool unless the thread already holds
+        the write connection, so a writer always sees its own changes.
+        """
+        pool = self._write_pool
+        if read_only and not self._write_pool.holds_connection():
+            pool = self._read_pool
         
-        conn = self._connections[thread_id]
+        conn = pool.acquire()
+        discard = False
         try:
             yield conn
         except Exception as e:
-            conn.rollback()
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                discard = True
             self.logger.error(f"Database error: {str(e)}")
             raise
         finally:
-            # Connection cleanup is handled by the connection pool
-            pass
+            pool.release(conn, discard=discard)
+    
+    @contextmanager
+    def transaction(self):
+        """Run a block in one explicit write transaction
+        
+        BEGIN IMMEDIATE takes the write lock up front, so a writer waits for
+        it once instead of failing midway when upgrading from a read lock.
+        Commits on success and rolls back on any error; a nested call joins
+        the enclosing transaction.
+        """
+        with self.get_connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            self._begin_immediate(conn)
+            yield conn
+            conn.commit()
+    
+    def _begin_immediate(self, conn: sqlite3.Connection):
+        """Start a write transaction, retrying with backoff while the file is locked"""
+        retries = self.pool_settings['busy_retries']
+        delay = 0.05
+        for attempt in range(retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                message = str(e).lower()
+                if attempt == retries or ('locked' not in message and 'busy' not in message):
+                    raise
+                self.logger.warning(f"Database busy, retrying in {delay:.2f}s ({attempt + 1}/{retries})")
+                time.sleep(delay + random.uniform(0, delay))
+                delay = min(delay * 2, 2.0)
+    
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """Page counts and sizes of the database file"""
+        with self.get_connection(read_only=True) as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        return {
+            'page_size': page_size,
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            'file_bytes': page_count * page_size,
+            'used_bytes': (page_count - freelist_count) * page_size,
+            'auto_vacuum': self.AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum))
+        }
+    
+    def incremental_vacuum(self, pages: int) -> int:
+        """Release up to pages free pages to the OS; returns how many were released
+        
+        Only effective when the file is in auto_vacuum INCREMENTAL mode.
+        """
+        with self.get_connection() as conn:
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # Every step of the statement frees one page; execute() would step
+            # it only once, executescript() runs it to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return before - after
+    
+    def analyze(self, analysis_limit: Optional[int] = None):
+        """Refresh the query planner statistics, sampling at most analysis_limit rows per index"""
+        with self.get_connection() as conn:
+            if analysis_limit:
+                conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+            conn.execute("ANALYZE")
+            conn.commit()
+    
+    def vacuum(self):
+        """Rebuild the whole file, applying the configured auto_vacuum mode
+        
+        Holds the write lock for the duration and needs free disk space for a
+        copy of the database, so it is meant for one-off maintenance windows.
+        """
+        with self.get_connection() as conn:
+            conn.execute("VACUUM")
+    
+    def reap_idle_connections(self) -> int:
+        """Close pooled connections idle for longer than the idle timeout"""
+        reaped = self._write_pool.reap_idle()
+        if self._read_pool is not self._write_pool:
+            reaped += self._read_pool.reap_idle()
+        return reaped
+    
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statistics of the read and write pools"""
+        pools = {'write': self._write_pool.stats()}
+        if self._read_pool is not self._write_pool:
+            pools['read'] = self._read_pool.stats()
+        return pools
     
     def close_all_connections(self):
-        """Close all database connections"""
-        with self._lock:
-            for conn in self._connections.values():
-                conn.close()
-            self._connections.clear()
+        """Close all database connections
+        
+        Fresh pools replace the closed ones, so the manager stays usable.
+        """
+        self._write_pool.close()
+        if self._read_pool is not self._write_pool:
+            self._read_pool.close()
+        self._create_pools()
 
 class AnalysisRepository:
     """Repository for analysis results with full CRUD operations"""
     
-    def __init__(self, db_manager: DatabaseManager):
+    # Tables holding per-finding rows of an analysis
+    CHILD_TABLES = ('sql_errors', 'security_vulnerabilities', 'performance_issues', 'table_info')
+    # Table holding the findings blob of an analysis
+    FINDINGS_TABLE = 'analysis_findings'
+    # Tables referencing an analysis that survive its re-analysis
+    REFERENCE_TABLES = ('analysis_uploads', 'file_info', 'export_history')
+    # Additive measures of analysis_rollups, and the summary facet counted
+    # per name in analysis_rollup_types for each category
+    ROLLUP_MEASURES = ('analysis_count', 'quality_sum', 'complexity_sum', 'processing_time_sum',
+                       'line_count', 'error_count', 'vulnerability_count', 'performance_issue_count',
+                       'critical_count', 'high_count', 'medium_count', 'low_count')
+    ROLLUP_CATEGORIES = {'error_type': 'error_types', 'vulnerability_type': 'vulnerability_types',
+                         'issue_type': 'issue_types'}
+    # Columns an analysis' rollup contribution is computed from
+    ROLLUP_SOURCE_COLUMNS = ('database_type', 'date(created_at) AS bucket_date', 'quality_score',
+                             'complexity_score', 'processing_time', 'total_lines', 'error_count',
+                             'vulnerability_count', 'performance_issue_count', 'summary')
+    # Kinds of finding in the full-text index and their markers in snippets
+    SEARCH_KINDS = ('errors', 'security', 'performance', 'tables')
+    SNIPPET_START, SNIPPET_END = '\x02', '\x03'
+    STORAGE_LAYOUTS = ('rows', 'blob')
+    
+    # Where each kind of finding lives and which columns / attributes its
+    # severity, type and sort key map to
+    FINDING_KINDS = {
+        'errors': {
+            'table': 'sql_errors', 'lists': ('syntax_errors', 'semantic_errors'),
+            'severity': 'severity', 'type': 'error_type',
+            'order': 'line_number', 'order_column': 'line_number', 'from_row': '_error_from_row'
+        },
+        'security': {
+            'table': 'security_vulnerabilities', 'lists': ('security_vulnerabilities',),
+            'severity': 'risk_level', 'type': 'vulnerability_type',
+            'order': 'line_number', 'order_column': 'line_number', 'from_row': '_vulnerability_from_row'
+        },
+        'performance': {
+            'table': 'performance_issues', 'lists': ('performance_issues',),
+            'severity': 'impact', 'type': 'issue_type',
+            'order': 'line_number', 'order_column': 'line_number', 'from_row': '_issue_from_row'
+        },
+        'tables': {
+            'table': 'table_info', 'lists': ('tables',),
+            'severity': None, 'type': None,
+            'order': 'name', 'order_column': 'table_name', 'from_row': '_table_from_row'
+        }
+    }
+    
+    def __init__(self, db_manager: DatabaseManager, storage_layout: Optional[str] = None,
+                 search_index: Optional[bool] = None):
         self.db_manager = db_manager
         self.logger = logging.getLogger(__name__)
+        self.storage_layout = storage_layout or Config.ANALYSIS_STORAGE_LAYOUT
+        if self.storage_layout not in self.STORAGE_LAYOUTS:
+            raise ValueError(f"Unknown storage layout: {self.storage_layout}")
+        self.search_index = Config.SEARCH_INDEX_ENABLED if search_index is None else search_index
+        
+        # Analyses saved before the search index existed are indexed once
+        if self.search_index and getattr(db_manager, 'search_index_created', False):
+            db_manager.search_index_created = False
+            self.rebuild_search_index()
+        # Likewise for the rollups of analyses saved before they existed
+        if getattr(db_manager, 'rollups_created', False):
+            db_manager.rollups_created = False
+            self.rebuild_rollups()
+    
+    @staticmethod
+    def content_key(file_hash: str, database_type: str, rule_version: str = '') -> str:
+        """Key of the analysis body shared by every upload of the same content"""
+        return f"{file_hash}:{database_type}:{rule_version}"
+    
+    @classmethod
+    def result_content_key(cls, result: AnalysisResult) -> str:
+        """Content key of an analysis result"""
+        return cls.content_key(result.file_hash, result.database_type.value, result.rule_version)
+    
+    # Operations accepted by save_batch
+    WRITE_ANALYSIS = 'analysis'
+    WRITE_UPLOAD = 'upload'
     
     def save_analysis_result(self, result: AnalysisResult) -> bool:
-        """Save complete analysis result to database"""
+        """Save complete analysis result to database
+
+        Child rows are built up front and written with executemany inside a
+        single write transaction, so the write lock is held only while SQLite
+        inserts them. With the blob layout the findings are written as one
+        compressed row of analysis_findings instead.
+        
+        The analysis body is stored once per content key; saving it again
+        replaces the earlier body and moves its uploads over to the new one.
+        result.filename is recorded as an upload of the body.
+        """
+        return self.save_batch([(self.WRITE_ANALYSIS, result)])
+    
+    def save_batch(self, operations: List[Tuple[str, Any]]) -> bool:
+        """Apply several writes in order in one write transaction
+        
+        Each operation is (WRITE_ANALYSIS, AnalysisResult), saved as by
+        save_analysis_result, or
+        (WRITE_UPLOAD, (analysis_id, filename, upload_id)), recorded as by
+        record_upload. Either every write commits or none.
+        """
         try:
-            with self.db_manager.get_connection() as conn:
+            prepared = [
+                (kind, payload, self._prepare_analysis(payload) if kind == self.WRITE_ANALYSIS else None)
+                for kind, payload in operations
+            ]
+            
+            with self.db_manager.transaction() as conn:
                 cursor = conn.cursor()
-                
-                # Save main analysis result
-                cursor.execute("""
-                    INSERT OR REPLACE INTO analysis_results 
-                    (id, file_hash, filename, database_type, processing_time, 
-                     total_lines, total_statements, quality_score, complexity_score,
-                     corrected_sql, recommendations, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (
-                    result.id, result.file_hash, result.filename, result.database_type.value,
-                    result.processing_time, result.total_lines, result.total_statements,
-                    result.quality_score, result.complexity_score, result.corrected_sql,
-                    json.dumps(result.recommendations)
-                ))
-                
-                # Delete existing related records
-                cursor.execute("DELETE FROM sql_errors WHERE analysis_id = ?", (result.id,))
-                cursor.execute("DELETE FROM security_vulnerabilities WHERE analysis_id = ?", (result.id,))
-                cursor.execute("DELETE FROM performance_issues WHERE analysis_id = ?", (result.id,))
-                cursor.execute("DELETE FROM table_info WHERE analysis_id = ?", (result.id,))
-                
-                # Save SQL errors
-                for error in result.syntax_errors + result.semantic_errors:
-                    cursor.execute("""
-                        INSERT INTO sql_errors 
-                        (id, analysis_id, line_number, column_number, error_type, 
-                         severity, message, suggestion, auto_fixable, fixed_code)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        error.id, result.id, error.line_number, error.column,
-                        error.error_type, error.severity.value, error.message,
-                        error.suggestion, error.auto_fixable, error.fixed_code
-                    ))
-                
-                # Save security vulnerabilities
-                for vuln in result.security_vulnerabilities:
-                    cursor.execute("""
-                        INSERT INTO security_vulnerabilities 
-                        (id, analysis_id, line_number, vulnerability_type, risk_level,
-                         description, mitigation, code_snippet, cwe_id, owasp_category)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        vuln.id, result.id, vuln.line_number, vuln.vulnerability_type,
-                        vuln.risk_level.value, vuln.description, vuln.mitigation,
-                        vuln.code_snippet, vuln.cwe_id, vuln.owasp_category
-                    ))
-                
-                # Save performance issues
-                for issue in result.performance_issues:
-                    cursor.execute("""
-                        INSERT INTO performance_issues 
-                        (id, analysis_id, line_number, issue_type, impact,
-                         description, recommendation, code_snippet, estimated_improvement)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        issue.id, result.id, issue.line_number, issue.issue_type,
-                        issue.impact, issue.description, issue.recommendation,
-                        issue.code_snippet, issue.estimated_improvement
-                    ))
-                
-                # Save table information
-                for table in result.tables:
-                    cursor.execute("""
-                        INSERT INTO table_info 
-                        (id, analysis_id, table_name, columns, primary_keys,
-                         foreign_keys, indexes, constraints, estimated_rows)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        table.id, result.id, table.name, json.dumps(table.columns),
-                        json.dumps(table.primary_keys), json.dumps(table.foreign_keys),
-                        json.dumps(table.indexes), json.dumps(table.constraints),
-                        table.estimated_rows
-                    ))
-                
-                conn.commit()
-                
-                # Cache the result
-                cache.set(f"analysis:{result.id}", result, ttl=3600)
-                cache.set(f"analysis_hash:{result.file_hash}", result, ttl=3600)
-                
-                self.logger.info(f"Analysis result saved: {result.id}")
-                return True
-                
+                # References are re-pointed before commit, when the check runs
+                cursor.execute("PRAGMA defer_foreign_keys = ON")
+                for kind, payload, analysis in prepared:
+                    if kind == self.WRITE_ANALYSIS:
+                        analysis['previous_ids'] = self._write_analysis(cursor, payload, analysis)
+                    else:
+                        self._insert_upload(cursor, *payload)
+            
+            for kind, result, analysis in prepared:
+                if kind == self.WRITE_ANALYSIS:
+                    self._cache_saved(result, analysis)
+                    self.logger.info(f"Analysis result saved: {result.id} "
+                                     f"({sum(len(table_rows) for table_rows in analysis['rows'].values())} child rows)")
+            return True
+            
         except Exception as e:
             self.logger.error(f"Failed to save analysis result: {str(e)}")
             return False
     
+    def _prepare_analysis(self, result: AnalysisResult) -> Dict[str, Any]:
+        """Rows, summary and content key of a result, built outside the transaction"""
+        if self.storage_layout == 'blob':
+            payload, raw_size = encode_findings(result)
+            rows = {table: [] for table in self.CHILD_TABLES}
+            rows[self.FINDINGS_TABLE] = [
+                (result.id, FINDINGS_FORMAT_VERSION, count_findings(result), raw_size, payload)
+            ]
+        else:
+            rows = self._build_child_rows(result)
+        return {
+            'rows': rows,
+            'summary': AnalysisSummary.from_result(result),
+            'content_key': self.result_content_key(result),
+            'documents': self._build_search_documents(result) if self.search_index else []
+        }
+    
+    def _write_analysis(self, cursor, result: AnalysisResult, analysis: Dict[str, Any]) -> List[str]:
+        """Write a prepared result inside a transaction; returns the ids it replaced"""
+        rows, summary, content_key = analysis['rows'], analysis['summary'], analysis['content_key']
+        
+        # Remove any earlier body of this id or content together with
+        # its findings; the row inserted below supersedes it
+        cursor.execute("""
+            SELECT id FROM analysis_results WHERE id = ? OR content_key = ?
+        """, (result.id, content_key))
+        previous_ids = [row['id'] for row in cursor.fetchall()]
+        if previous_ids:
+            placeholders = ', '.join('?' * len(previous_ids))
+            self._remove_from_rollups(cursor, previous_ids)
+            for table in self.CHILD_TABLES + (self.FINDINGS_TABLE,):
+                cursor.execute(f"DELETE FROM {table} WHERE analysis_id IN ({placeholders})",
+                               previous_ids)
+            self._delete_search_documents(cursor, previous_ids)
+            cursor.execute(f"DELETE FROM analysis_results WHERE id IN ({placeholders})",
+                           previous_ids)
+        
+        # Save main analysis result
+        cursor.execute("""
+            INSERT INTO analysis_results 
+            (id, content_key, rule_version, file_hash, filename, database_type,
+             processing_time, total_lines, total_statements, quality_score,
+             complexity_score, corrected_sql, recommendations, error_count,
+             vulnerability_count, performance_issue_count, table_count, summary,
+             updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (
+            result.id, content_key, result.rule_version, result.file_hash,
+            result.filename, result.database_type.value,
+            result.processing_time, result.total_lines, result.total_statements,
+            result.quality_score, result.complexity_score, result.corrected_sql,
+            json.dumps(result.recommendations), summary.error_count,
+            summary.vulnerability_count, summary.performance_issue_count,
+            summary.table_count, self._encode_summary(summary)
+        ))
+        
+        cursor.executemany("""
+            INSERT INTO sql_errors 
+            (id, analysis_id, line_number, column_number, error_type, 
+             severity, message, suggestion, auto_fixable, fixed_code)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows['sql_errors'])
+        
+        cursor.executemany("""
+            INSERT INTO security_vulnerabilities 
+            (id, analysis_id, line_number, vulnerability_type, risk_level,
+             description, mitigation, code_snippet, cwe_id, owasp_category)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows['security_vulnerabilities'])
+        
+        cursor.executemany("""
+            INSERT INTO performance_issues 
+            (id, analysis_id, line_number, issue_type, impact,
+             description, recommendation, code_snippet, estimated_improvement)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows['performance_issues'])
+        
+        cursor.executemany("""
+            INSERT INTO table_info 
+            (id, analysis_id, table_name, columns, primary_keys,
+             foreign_keys, indexes, constraints, estimated_rows)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows['table_info'])
+        
+        if rows.get(self.FINDINGS_TABLE):
+            cursor.executemany("""
+                INSERT INTO analysis_findings
+                (analysis_id, format_version, finding_count, raw_size, payload)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows[self.FINDINGS_TABLE])
+        
+        bucket_date = cursor.execute("SELECT date(created_at) FROM analysis_results WHERE id = ?",
+                                     (result.id,)).fetchone()[0]
+        self._apply_rollup(cursor, bucket_date, result.database_type.value,
+                           *self._rollup_contribution(summary.quality_score, summary.complexity_score,
+                                                      summary.processing_time, summary.total_lines,
+                                                      summary.error_count, summary.vulnerability_count,
+                                                      summary.performance_issue_count,
+                                                      summary.security_summary, summary.facets))
+        if analysis['documents']:
+            self._insert_search_documents(cursor, result.id, analysis['documents'])
+        
+        stale_ids = [previous_id for previous_id in previous_ids if previous_id != result.id]
+        if stale_ids:
+            placeholders = ', '.join('?' * len(stale_ids))
+            for table in self.REFERENCE_TABLES:
+                cursor.execute(f"UPDATE {table} SET analysis_id = ? "
+                               f"WHERE analysis_id IN ({placeholders})",
+                               [result.id] + stale_ids)
+        self._insert_upload(cursor, result.id, result.filename)
+        return previous_ids
+    
+    def _cache_saved(self, result: AnalysisResult, analysis: Dict[str, Any]):
+        """Cache a committed result and forget the analyses it replaced"""
+        cache.set(f"analysis:{result.id}", result, ttl=3600)
+        cache.set(f"analysis_hash:{result.file_hash}", result, ttl=3600)
+        cache.set(f"analysis_content:{analysis['content_key']}", result, ttl=3600)
+        cache.set(f"analysis_summary:{result.id}", analysis['summary'], ttl=3600)
+        for previous_id in analysis['previous_ids']:
+            if previous_id != result.id:
+                cache.delete(f"analysis:{previous_id}")
+                cache.delete(f"analysis_summary:{previous_id}")
+
+    
     def get_analysis_by_id(self, analysis_id: str) -> Optional[AnalysisResult]:
         """Get analysis result by ID"""
         try:
@@ -308,7 +822,7 @@ class AnalysisRepository:
             if cached_result:
                 return cached_result
             
-            with self.db_manager.get_connection() as conn:
+            with self.db_manager.get_connection(read_only=True) as conn:
                 cursor = conn.cursor()
                 
                 # Get main analysis result
@@ -332,19 +846,69 @@ class AnalysisRepository:
             self.logger.error(f"Failed to get analysis result: {str(e)}")
             return None
     
+    def get_analysis_by_content(self, file_hash: str, database_type: str,
+                                rule_version: str = '') -> Optional[AnalysisResult]:
+        """Get the analysis body of a content under a dialect and rule version"""
+        content_key = self.content_key(file_hash, database_type, rule_version)
+        try:
+            cached_result = cache.get(f"analysis_content:{content_key}")
+            if cached_result:
+                return cached_result
+            
+            with self.db_manager.get_connection(read_only=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM analysis_results WHERE content_key = ?", (content_key,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                result = self._build_analysis_result_from_db(cursor, row)
+            
+            cache.set(f"analysis_content:{content_key}", result, ttl=3600)
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get analysis by content: {str(e)}")
+            return None
+    
+    def record_upload(self, analysis_id: str, filename: str,
+                      upload_id: Optional[str] = None) -> Optional[str]:
+        """Record an upload of already analyzed content; returns the upload id"""
+        try:
+            with self.db_manager.transaction() as conn:
+                upload_id = self._insert_upload(conn.cursor(), analysis_id, filename, upload_id)
+            return upload_id
+        except Exception as e:
+            self.logger.error(f"Failed to record upload: {str(e)}")
+            return None
+    
+    def get_uploads(self, analysis_id: str) -> List[Dict[str, Any]]:
+        """Uploads referencing an analysis body, oldest first"""
+        try:
+            with self.db_manager.get_connection(read_only=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT id, analysis_id, filename, created_at FROM analysis_uploads
+                    WHERE analysis_id = ? ORDER BY created_at, rowid
+                """, (analysis_id,))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            self.logger.error(f"Failed to get uploads: {str(e)}")
+            return []
+    
     def get_analysis_by_hash(self, file_hash: str) -> Optional[AnalysisResult]:
-        """Get analysis result by file hash"""
+        """Get the most recent analysis of a file hash, under any dialect"""
         try:
             # Check cache first
             cached_result = cache.get(f"analysis_hash:{file_hash}")
             if cached_result:
                 return cached_result
             
-            with self.db_manager.get_connection() as conn:
+            with self.db_manager.get_connection(read_only=True) as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
                     SELECT * FROM analysis_results WHERE file_hash = ?
+                    ORDER BY updated_at DESC, rowid DESC LIMIT 1
                 """, (file_hash,))
                 
                 row = cursor.fetchone()
@@ -362,34 +926,380 @@ class AnalysisRepository:
             self.logger.error(f"Failed to get analysis by hash: {str(e)}")
             return None
     
-    def get_recent_analyses(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent analysis summaries"""
+    def get_analysis_summary(self, analysis_id: str) -> Optional[AnalysisSummary]:
+        """Get the summary of an analysis without loading its findings"""
         try:
-            with self.db_manager.get_connection() as conn:
+            cached_summary = cache.get(f"analysis_summary:{analysis_id}")
+            if cached_summary:
+                return cached_summary
+            
+            with self.db_manager.get_connection(read_only=True) as conn:
                 cursor = conn.cursor()
-                
                 cursor.execute("""
-                    SELECT id, filename, database_type, quality_score, 
-                           complexity_score, processing_time, created_at
-                    FROM analysis_results 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                """, (limit,))
-                
-                results = []
-                for row in cursor.fetchall():
-                    results.append({
-                        'id': row['id'],
-                        'filename': row['filename'],
-                        'database_type': row['database_type'],
-                        'quality_score': row['quality_score'],
-                        'complexity_score': row['complexity_score'],
-                        'processing_time': row['processing_time'],
-                        'created_at': row['created_at']
-                    })
-                
-                return results
+                    SELECT id, file_hash, filename, database_type, processing_time,
+                           total_lines, total_statements, quality_score, complexity_score,
+                           recommendations, error_count, vulnerability_count,
+                           performance_issue_count, table_count, summary, created_at
+                    FROM analysis_results WHERE id = ?
+                """, (analysis_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
                 
+                if row['summary']:
+                    summary = self._summary_from_row(row)
+                else:
+                    # Saved before summaries were stored: derive it once
+                    cursor.execute("SELECT * FROM analysis_results WHERE id = ?", (analysis_id,))
+                    summary = AnalysisSummary.from_result(
+                        self._build_analysis_result_from_db(cursor, cursor.fetchone()))
+                    summary.created_at = row['created_at']
+            
+            cache.set(f"analysis_summary:{analysis_id}", summary, ttl=3600)
+            return summary
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get analysis summary: {str(e)}")
+            return None
+    
+    def get_findings(self, analysis_id: str, kind: str, severities: Optional[List[str]] = None,
+                     types: Optional[List[str]] = None, line_from: Optional[int] = None,
+                     line_to: Optional[int] = None, cursor: Optional[str] = None,
+                     limit: int = 100) -> FindingsPage:
+        """Get one page of an analysis' findings of one kind
+        
+        kind is 'errors', 'security', 'performance' or 'tables'. Findings
+        are ordered by line (tables by name) and id; cursor is the opaque
+        next_cursor of the previous page. Severities and types match case
+        insensitively. Raises ValueError for an unknown kind or bad cursor.
+        """
+        spec = self.FINDING_KINDS.get(kind)
+        if spec is None:
+            raise ValueError(f"Unknown findings kind: {kind}")
+        after = self._decode_cursor(cursor) if cursor else None
+        severities = [value.lower() for value in severities] if severities else None
+        types = [value.lower() for value in types] if types else None
+        limit = max(1, limit)
+        
+        # A cached result or a findings blob holds everything in memory
+        result = cache.get(f"analysis:{analysis_id}")
+        if result is None and self._has_findings_blob(analysis_id):
+            result = self.get_analysis_by_id(analysis_id)
+        if result is not None:
+            items = self._filter_findings(result, spec, severities, types, line_from, line_to, after)
+        else:
+            items = self._query_findings(analysis_id, spec, severities, types, line_from, line_to,
+                                         after, limit + 1)
+        
+        page = items[:limit]
+        next_cursor = None
+        if len(items) > limit:
+            last = page[-1]
+            next_cursor = self._encode_cursor((getattr(last, spec['order']), last.id))
+        return FindingsPage(items=page, next_cursor=next_cursor, limit=limit)
+    
+    def search_findings(self, text: str, kinds: Optional[List[str]] = None,
+                        severities: Optional[List[str]] = None, analysis_id: Optional[str] = None,
+                        cursor: Optional[str] = None, limit: int = 20) -> FindingsPage:
+        """Best matching findings across all stored analyses, one page at a time
+        
+        Every whitespace-separated term of text must match; a term ending in
+        '*' matches as a prefix. Hits are ranked by BM25 and carry a snippet
+        of the matching text with the terms wrapped in <mark>. cursor is the
+        opaque next_cursor of the previous page. Raises ValueError for an
+        empty query, an unknown kind or a bad cursor.
+        """
+        match = self._match_expression(text)
+        if kinds and any(kind not in self.SEARCH_KINDS for kind in kinds):
+            raise ValueError(f"Unknown findings kind in: {', '.join(kinds)}")
+        after = self._decode_cursor(cursor, size=3) if cursor else None
+        limit = max(1, limit)
+        
+        conditions, params = [], []
+        if kinds:
+            conditions.append(f"d.kind IN ({', '.join('?' * len(kinds))})")
+            params.extend(kinds)
+        if severities:
+            conditions.append(f"lower(d.severity) IN ({', '.join('?' * len(severities))})")
+            params.extend(value.lower() for value in severities)
+        if analysis_id:
+            conditions.append("d.analysis_id = ?")
+            params.append(analysis_id)
+        findings_sql = f"""
+            SELECT d.id, d.analysis_id, d.kind, d.finding_id, d.line_number, d.severity,
+                   d.finding_type, a.filename
+            FROM finding_documents d JOIN analysis_results a ON a.id = d.analysis_id
+            WHERE d.text_id = ? AND d.id > ? {''.join(' AND ' + condition for condition in conditions)}
+            ORDER BY d.id LIMIT ?
+        """
+        
+        # Walk the matching texts best first and expand each into its
+        # findings, stopping once the page is full; a common text shared by
+        # many findings costs one ranked row instead of one per finding
+        rows = []
+        with self.db_manager.get_connection(read_only=True) as conn:
+            texts_sql = "SELECT rowid, rank FROM findings_fts WHERE findings_fts MATCH ?"
+            texts_params = [match]
+            if after:
+                texts_sql += " AND (rank > ? OR (rank = ? AND rowid >= ?))"
+                texts_params.extend((after[0], after[0], after[1]))
+            texts = conn.execute(texts_sql + " ORDER BY rank, rowid", texts_params)
+            for text_id, rank in texts:
+                resume = after[2] if after and (rank, text_id) == (after[0], after[1]) else 0
+                for row in conn.execute(findings_sql, [text_id, resume] + params + [limit + 1 - len(rows)]):
+                    rows.append((text_id, rank, row))
+                if len(rows) > limit:
+                    break
+            # Finalize the scan so the connection does not keep its read snapshot
+            texts.close()
+            
+            # Snippets only for the texts on this page
+            text_ids = sorted({text_id for text_id, _, _ in rows[:limit]})
+            snippets = dict(conn.execute(f"""
+                SELECT rowid, snippet(findings_fts, -1, ?, ?, '…', 16) FROM findings_fts
+                WHERE findings_fts MATCH ? AND rowid IN ({', '.join('?' * len(text_ids))})
+            """, [self.SNIPPET_START, self.SNIPPET_END, match] + text_ids).fetchall()) if text_ids else {}
+        
+        hits = [SearchHit(
+            analysis_id=row['analysis_id'], filename=row['filename'], kind=row['kind'],
+            finding_id=row['finding_id'], line_number=row['line_number'], severity=row['severity'],
+            finding_type=row['finding_type'], score=-rank,
+            snippet=html.escape(snippets.get(text_id) or '').replace(self.SNIPPET_START, '<mark>')
+                                                             .replace(self.SNIPPET_END, '</mark>')
+        ) for text_id, rank, row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            text_id, rank, row = rows[limit - 1]
+            next_cursor = self._encode_cursor((rank, text_id, row['id']))
+        return FindingsPage(items=hits, next_cursor=next_cursor, limit=limit)
+    
+    def rebuild_search_index(self) -> int:
+        """Re-index the findings of every stored analysis; returns the documents indexed
+        
+        Each analysis is indexed in its own transaction so live writes are
+        not held up for the whole rebuild.
+        """
+        with self.db_manager.get_connection(read_only=True) as conn:
+            analysis_ids = [row['id'] for row in conn.execute("SELECT id FROM analysis_results")]
+        
+        indexed = 0
+        for analysis_id in analysis_ids:
+            # Loaded directly rather than through the cache, which a full
+            # rebuild would otherwise flush
+            with self.db_manager.get_connection(read_only=True) as conn:
+                cursor = conn.cursor()
+                row = cursor.execute("SELECT * FROM analysis_results WHERE id = ?", (analysis_id,)).fetchone()
+                if row is None:
+                    continue
+                documents = self._build_search_documents(self._build_analysis_result_from_db(cursor, row))
+            with self.db_manager.transaction() as conn:
+                cursor = conn.cursor()
+                self._delete_search_documents(cursor, [analysis_id])
+                self._insert_search_documents(cursor, analysis_id, documents)
+            indexed += len(documents)
+        self.logger.info(f"Search index rebuilt: {indexed} findings of {len(analysis_ids)} analyses")
+        return indexed
+    
+    def get_daily_trends(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                         database_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-day analysis counts, average scores and finding totals from the rollups
+        
+        Dates are 'YYYY-MM-DD' (UTC) and inclusive; days without analyses
+        are omitted.
+        """
+        conditions, params = self._rollup_conditions(date_from, date_to, database_type)
+        with self.db_manager.get_connection(read_only=True) as conn:
+            rows = conn.execute(f"""
+                SELECT bucket_date, {self._rollup_sums()} FROM analysis_rollups
+                {conditions} GROUP BY bucket_date ORDER BY bucket_date
+            """, params).fetchall()
+        return [dict(self._rollup_totals(row), date=row['bucket_date']) for row in rows]
+    
+    def get_database_type_trends(self, date_from: Optional[str] = None,
+                                 date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Totals and averages per database type over a date range, busiest first"""
+        conditions, params = self._rollup_conditions(date_from, date_to)
+        with self.db_manager.get_connection(read_only=True) as conn:
+            rows = conn.execute(f"""
+                SELECT database_type, {self._rollup_sums()} FROM analysis_rollups
+                {conditions} GROUP BY database_type ORDER BY analysis_count DESC, database_type
+            """, params).fetchall()
+        return [dict(self._rollup_totals(row), database_type=row['database_type']) for row in rows]
+    
+    def get_top_finding_types(self, category: str, limit: int = 10, date_from: Optional[str] = None,
+                              date_to: Optional[str] = None,
+                              database_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most frequent error, vulnerability or performance issue types
+        
+        category is 'error_type', 'vulnerability_type' or 'issue_type';
+        raises ValueError for any other.
+        """
+        if category not in self.ROLLUP_CATEGORIES:
+            raise ValueError(f"Unknown finding category: {category}")
+        conditions, params = self._rollup_conditions(date_from, date_to, database_type)
+        conditions = (conditions + ' AND' if conditions else 'WHERE') + ' category = ?'
+        with self.db_manager.get_connection(read_only=True) as conn:
+            rows = conn.execute(f"""
+                SELECT name, SUM(count) AS count FROM analysis_rollup_types
+                {conditions} GROUP BY name ORDER BY count DESC, name LIMIT ?
+            """, params + [category, max(1, limit)]).fetchall()
+        return [{'type': row['name'], 'count': row['count']} for row in rows]
+    
+    def rebuild_rollups(self) -> int:
+        """Recompute the rollups from the stored analyses; returns the analyses counted
+        
+        Analyses saved before summaries were stored add their counts but
+        not their per-type breakdown.
+        """
+        with self.db_manager.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM analysis_rollups")
+            cursor.execute("DELETE FROM analysis_rollup_types")
+            rows = cursor.execute(
+                f"SELECT {', '.join(self.ROLLUP_SOURCE_COLUMNS)} FROM analysis_results").fetchall()
+            for row in rows:
+                self._apply_rollup(cursor, row['bucket_date'], row['database_type'],
+                                   *self._row_rollup_contribution(row))
+        self.logger.info(f"Rollups rebuilt from {len(rows)} analyses")
+        return len(rows)
+    
+    def select_retention_batch(self, limit: int, max_age_days: Optional[int] = None,
+                               max_analyses: Optional[int] = None,
+                               created_before: Optional[str] = None) -> List[str]:
+        """Ids of up to limit of the oldest analyses outside the retention limits
+        
+        Analyses older than max_age_days are selected first, then the oldest
+        beyond the newest max_analyses. created_before ('YYYY-MM-DD HH:MM:SS',
+        UTC) excludes analyses saved while a maintenance run is in progress.
+        """
+        with self.db_manager.get_connection(read_only=True) as conn:
+            cursor = conn.cursor()
+            if max_age_days is not None:
+                cursor.execute("""
+                    SELECT id FROM analysis_results WHERE created_at < datetime('now', ?)
+                    ORDER BY created_at LIMIT ?
+                """, (f'-{int(max_age_days)} days', limit))
+                ids = [row['id'] for row in cursor.fetchall()]
+                if ids:
+                    return ids
+            if max_analyses is not None:
+                excess = cursor.execute("SELECT COUNT(*) FROM analysis_results").fetchone()[0] - max_analyses
+                if excess > 0:
+                    return self.select_oldest(min(limit, excess), created_before)
+            return []
+    
+    def select_oldest(self, limit: int, created_before: Optional[str] = None) -> List[str]:
+        """Ids of the limit oldest analyses, optionally only those created before a time"""
+        with self.db_manager.get_connection(read_only=True) as conn:
+            cursor = conn.execute("""
+                SELECT id FROM analysis_results WHERE ? IS NULL OR created_at <= ?
+                ORDER BY created_at LIMIT ?
+            """, (created_before, created_before, limit))
+            return [row['id'] for row in cursor.fetchall()]
+    
+    def delete_analyses(self, analysis_ids: List[str], keep_rollups: bool = False) -> int:
+        """Delete a batch of analyses and everything referencing them in one transaction
+        
+        With keep_rollups the analyses stay counted in the trend rollups,
+        which is how retention lets aggregates outlive the raw results.
+        """
+        if not analysis_ids:
+            return 0
+        placeholders = ', '.join('?' * len(analysis_ids))
+        with self.db_manager.transaction() as conn:
+            cursor = conn.cursor()
+            if not keep_rollups:
+                self._remove_from_rollups(cursor, analysis_ids)
+            for table in self.CHILD_TABLES + (self.FINDINGS_TABLE,) + self.REFERENCE_TABLES:
+                cursor.execute(f"DELETE FROM {table} WHERE analysis_id IN ({placeholders})", analysis_ids)
+            self._delete_search_documents(cursor, analysis_ids)
+            cursor.execute(f"DELETE FROM analysis_results WHERE id IN ({placeholders})", analysis_ids)
+            deleted = cursor.rowcount
+        
+        for analysis_id in analysis_ids:
+            self._forget_cached(analysis_id)
+        return deleted
+    
+    def get_analysis_history(self, filename_prefix: Optional[str] = None,
+                             database_type: Optional[str] = None,
+                             min_quality: Optional[int] = None, max_quality: Optional[int] = None,
+                             date_from: Optional[str] = None, date_to: Optional[str] = None,
+                             cursor: Optional[str] = None, limit: int = 20) -> FindingsPage:
+        """Stored analyses, newest first, one page of AnalysisHistoryEntry at a time
+        
+        Pages seek past the (created_at, id) of the previous page's last
+        entry instead of skipping rows, so deep pages cost the same as the
+        first. The scan always walks an index in page order and stops after
+        limit + 1 matches: idx_analysis_history_type when database_type is
+        given, idx_analysis_history otherwise. The filename and quality
+        ranges are checked on the rows visited rather than used to seek, as
+        an index led by a range column would have to sort every match before
+        returning a page; a filter matching few rows therefore reads past
+        the non-matching ones. filename_prefix matches case-sensitively;
+        date_from and date_to are inclusive 'YYYY-MM-DD' days (UTC). cursor
+        is the opaque next_cursor of the previous page; raises ValueError
+        for a bad one.
+        """
+        after = self._decode_cursor(cursor) if cursor else None
+        limit = max(1, limit)
+        query, params = self._history_query(filename_prefix, database_type, min_quality, max_quality,
+                                            date_from, date_to, after, limit)
+        
+        with self.db_manager.get_connection(read_only=True) as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        entries = [AnalysisHistoryEntry(**dict(row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = self._encode_cursor((entries[-1].created_at, entries[-1].id))
+        return FindingsPage(items=entries, next_cursor=next_cursor, limit=limit)
+    
+    def _history_query(self, filename_prefix: Optional[str], database_type: Optional[str],
+                       min_quality: Optional[int], max_quality: Optional[int],
+                       date_from: Optional[str], date_to: Optional[str],
+                       after: Optional[Tuple[str, str]], limit: int) -> Tuple[str, List[Any]]:
+        """SQL and parameters of one history page"""
+        conditions, params = [], []
+        if filename_prefix:
+            conditions.append("filename >= ?")
+            params.append(filename_prefix)
+            upper_bound = self._prefix_upper_bound(filename_prefix)
+            if upper_bound is not None:
+                conditions.append("filename < ?")
+                params.append(upper_bound)
+        if database_type:
+            conditions.append("database_type = ?")
+            params.append(database_type)
+        if min_quality is not None:
+            conditions.append("quality_score >= ?")
+            params.append(min_quality)
+        if max_quality is not None:
+            conditions.append("quality_score <= ?")
+            params.append(max_quality)
+        if date_from:
+            conditions.append("created_at >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("created_at < date(?, '+1 day')")
+            params.append(date_to)
+        if after:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        index = 'idx_analysis_history_type' if database_type else 'idx_analysis_history'
+        
+        return f"""
+            SELECT id, filename, database_type, quality_score, complexity_score, processing_time,
+                   error_count, vulnerability_count, performance_issue_count, created_at
+            FROM analysis_results INDEXED BY {index} {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, params + [limit + 1]
+    
+    def get_recent_analyses(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get recent analysis summaries; the first page of get_analysis_history"""
+        try:
+            return [entry.to_dict() for entry in self.get_analysis_history(limit=limit).items]
         except Exception as e:
             self.logger.error(f"Failed to get recent analyses: {str(e)}")
             return []
@@ -397,48 +1307,432 @@ class AnalysisRepository:
     def delete_analysis(self, analysis_id: str) -> bool:
         """Delete analysis result and all related data"""
         try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Delete all related records (foreign key constraints will handle this)
-                cursor.execute("DELETE FROM analysis_results WHERE id = ?", (analysis_id,))
-                
-                conn.commit()
-                
-                # Remove from cache
-                cache.delete(f"analysis:{analysis_id}")
-                
-                self.logger.info(f"Analysis deleted: {analysis_id}")
-                return True
+            self.delete_analyses([analysis_id])
+            
+            self.logger.info(f"Analysis deleted: {analysis_id}")
+            return True
                 
         except Exception as e:
             self.logger.error(f"Failed to delete analysis: {str(e)}")
             return False
     
+    @staticmethod
+    def _forget_cached(analysis_id: str):
+        """Drop the cached result and summary of a deleted analysis
+        
+        Entries keyed by hash or content key are looked up through the
+        result, so they are dropped along with it when it is still cached.
+        """
+        result = cache.get(f"analysis:{analysis_id}")
+        if result is not None:
+            cache.delete(f"analysis_hash:{result.file_hash}")
+            cache.delete(f"analysis_content:{AnalysisRepository.result_content_key(result)}")
+        cache.delete(f"analysis:{analysis_id}")
+        cache.delete(f"analysis_summary:{analysis_id}")
+    
+    @classmethod
+    def _rollup_contribution(cls, quality_score: int, complexity_score: int, processing_time: float,
+                             total_lines: int, error_count: int, vulnerability_count: int,
+                             performance_issue_count: int, security_summary: Dict[str, int],
+                             facets: Dict[str, Any]):
+        """(measures, {(category, name): count}) one analysis adds to its rollup"""
+        measures = (1, quality_score, complexity_score, processing_time, total_lines, error_count,
+                    vulnerability_count, performance_issue_count,
+                    security_summary.get('critical', 0), security_summary.get('high', 0),
+                    security_summary.get('medium', 0), security_summary.get('low', 0))
+        types = {(category, name): count
+                 for category, facet in cls.ROLLUP_CATEGORIES.items()
+                 for name, count in facets.get(facet, {}).items()}
+        return measures, types
+    
+    def _row_rollup_contribution(self, row):
+        """Rollup contribution of an analysis_results row selected with ROLLUP_SOURCE_COLUMNS"""
+        details = json.loads(row['summary']) if row['summary'] else {}
+        return self._rollup_contribution(row['quality_score'], row['complexity_score'],
+                                         row['processing_time'], row['total_lines'], row['error_count'],
+                                         row['vulnerability_count'], row['performance_issue_count'],
+                                         details.get('security_summary', {}), details.get('facets', {}))
+    
+    def _apply_rollup(self, cursor, bucket_date: str, database_type: str, measures: tuple,
+                      types: Dict[tuple, int], sign: int = 1):
+        """Add (sign 1) or subtract (sign -1) a contribution; the write lock must be held"""
+        columns = ', '.join(self.ROLLUP_MEASURES)
+        cursor.execute(f"""
+            INSERT INTO analysis_rollups (bucket_date, database_type, {columns})
+            VALUES (?, ?, {', '.join('?' * len(self.ROLLUP_MEASURES))})
+            ON CONFLICT (bucket_date, database_type) DO UPDATE SET
+            {', '.join(f'{column} = {column} + excluded.{column}' for column in self.ROLLUP_MEASURES)}
+        """, (bucket_date, database_type) + tuple(sign * value for value in measures))
+        cursor.executemany("""
+            INSERT INTO analysis_rollup_types (bucket_date, database_type, category, name, count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (bucket_date, database_type, category, name) DO UPDATE SET
+            count = count + excluded.count
+        """, [(bucket_date, database_type, category, name, sign * count)
+              for (category, name), count in types.items()])
+        if sign < 0:
+            cursor.execute("DELETE FROM analysis_rollups WHERE bucket_date = ? AND database_type = ? "
+                           "AND analysis_count <= 0", (bucket_date, database_type))
+            cursor.execute("DELETE FROM analysis_rollup_types WHERE bucket_date = ? AND database_type = ? "
+                           "AND count <= 0", (bucket_date, database_type))
+    
+    def _remove_from_rollups(self, cursor, analysis_ids: List[str]):
+        """Subtract analyses about to be deleted from their rollups"""
+        rows = cursor.execute(f"""
+            SELECT {', '.join(self.ROLLUP_SOURCE_COLUMNS)} FROM analysis_results
+            WHERE id IN ({', '.join('?' * len(analysis_ids))})
+        """, analysis_ids).fetchall()
+        for row in rows:
+            self._apply_rollup(cursor, row['bucket_date'], row['database_type'],
+                               *self._row_rollup_contribution(row), sign=-1)
+    
+    @staticmethod
+    def _rollup_conditions(date_from: Optional[str], date_to: Optional[str],
+                           database_type: Optional[str] = None):
+        """WHERE clause and parameters restricting rollups to a date range and type"""
+        conditions, params = [], []
+        for value, condition in ((date_from, 'bucket_date >= ?'), (date_to, 'bucket_date <= ?'),
+                                 (database_type, 'database_type = ?')):
+            if value:
+                conditions.append(condition)
+                params.append(value)
+        return ('WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+    
+    def _rollup_sums(self) -> str:
+        return ', '.join(f'SUM({column}) AS {column}' for column in self.ROLLUP_MEASURES)
+    
+    @staticmethod
+    def _rollup_totals(row) -> Dict[str, Any]:
+        """Trend point from summed rollup measures"""
+        count = row['analysis_count']
+        return {
+            'analysis_count': count,
+            'average_quality': round(row['quality_sum'] / count, 2) if count else 0.0,
+            'average_complexity': round(row['complexity_sum'] / count, 2) if count else 0.0,
+            'average_processing_time': row['processing_time_sum'] / count if count else 0.0,
+            'total_lines': row['line_count'],
+            'error_count': row['error_count'],
+            'vulnerability_count': row['vulnerability_count'],
+            'performance_issue_count': row['performance_issue_count'],
+            'vulnerabilities_by_risk': {
+                'critical': row['critical_count'],
+                'high': row['high_count'],
+                'medium': row['medium_count'],
+                'low': row['low_count']
+            }
+        }
+    
+    @staticmethod
+    def _match_expression(text: str) -> str:
+        """FTS5 query matching every term of text literally, '*' suffixes as prefixes"""
+        terms = []
+        for term in (text or '').split():
+            prefix = term.endswith('*') and len(term) > 1
+            term = term.rstrip('*')
+            if term:
+                terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+        if not terms:
+            raise ValueError("Empty search query")
+        return ' '.join(terms)
+    
+    @staticmethod
+    def _build_search_documents(result: AnalysisResult) -> List[tuple]:
+        """(kind, finding id, line, severity, type, message, detail, code) per finding"""
+        documents = [
+            ('errors', error.id, error.line_number, error.severity.value, error.error_type,
+             error.message, error.suggestion, error.fixed_code)
+            for error in result.syntax_errors + result.semantic_errors
+        ]
+        documents.extend(
+            ('security', vuln.id, vuln.line_number, vuln.risk_level.value, vuln.vulnerability_type,
+             vuln.description, ' '.join(filter(None, (vuln.mitigation, vuln.cwe_id, vuln.owasp_category))),
+             vuln.code_snippet)
+            for vuln in result.security_vulnerabilities
+        )
+        documents.extend(
+            ('performance', issue.id, issue.line_number, issue.impact, issue.issue_type,
+             issue.description, issue.recommendation, issue.code_snippet)
+            for issue in result.performance_issues
+        )
+        documents.extend(
+            ('tables', table.id, None, None, 'table', table.name,
+             ' '.join(str(column.get('name', '')) for column in table.columns if isinstance(column, dict)),
+             None)
+            for table in result.tables
+        )
+        return documents
+    
+    # Bound on the variables of one IN (...) list
+    SQL_CHUNK = 500
+    
+    @staticmethod
+    def _text_key(document: tuple) -> bytes:
+        """Digest identifying the indexed text of a search document"""
+        return hashlib.sha1('\x1f'.join(value or '' for value in document[4:]).encode('utf-8')).digest()
+    
+    def _insert_search_documents(self, cursor, analysis_id: str, documents: List[tuple]):
+        """Index documents, adding only texts not indexed yet; the write lock must be held"""
+        keys = [self._text_key(document) for document in documents]
+        text_ids: Dict[bytes, int] = {}
+        distinct = list(dict.fromkeys(keys))
+        for start in range(0, len(distinct), self.SQL_CHUNK):
+            chunk = distinct[start:start + self.SQL_CHUNK]
+            text_ids.update((row[1], row[0]) for row in cursor.execute(
+                f"SELECT id, text_key FROM search_texts WHERE text_key IN ({', '.join('?' * len(chunk))})",
+                chunk))
+        
+        next_text_id = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM search_texts").fetchone()[0]
+        new_texts = []
+        for key, document in zip(keys, documents):
+            if key not in text_ids:
+                text_ids[key] = next_text_id
+                new_texts.append((next_text_id, key) + document[4:])
+                next_text_id += 1
+        cursor.executemany("INSERT INTO search_texts (id, text_key) VALUES (?, ?)",
+                           [text[:2] for text in new_texts])
+        cursor.executemany("""
+            INSERT INTO findings_fts (rowid, finding_type, message, detail, code_snippet)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(text[0],) + text[2:] for text in new_texts])
+        
+        first_id = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM finding_documents").fetchone()[0]
+        cursor.executemany("""
+            INSERT INTO finding_documents
+            (id, analysis_id, text_id, kind, finding_id, line_number, severity, finding_type)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(first_id + offset, analysis_id, text_ids[key]) + document[:5]
+              for offset, (key, document) in enumerate(zip(keys, documents))])
+    
+    def _delete_search_documents(self, cursor, analysis_ids: List[str]):
+        """Drop the documents of analyses and the texts no other finding uses"""
+        placeholders = ', '.join('?' * len(analysis_ids))
+        text_ids = [row[0] for row in cursor.execute(
+            f"SELECT DISTINCT text_id FROM finding_documents WHERE analysis_id IN ({placeholders})",
+            analysis_ids)]
+        cursor.execute(f"DELETE FROM finding_documents WHERE analysis_id IN ({placeholders})", analysis_ids)
+        for start in range(0, len(text_ids), self.SQL_CHUNK):
+            chunk = text_ids[start:start + self.SQL_CHUNK]
+            orphans = [row[0] for row in cursor.execute(f"""
+                SELECT id FROM search_texts t WHERE id IN ({', '.join('?' * len(chunk))})
+                AND NOT EXISTS (SELECT 1 FROM finding_documents d WHERE d.text_id = t.id)
+            """, chunk)]
+            if orphans:
+                orphan_placeholders = ', '.join('?' * len(orphans))
+                cursor.execute(f"DELETE FROM findings_fts WHERE rowid IN ({orphan_placeholders})", orphans)
+                cursor.execute(f"DELETE FROM search_texts WHERE id IN ({orphan_placeholders})", orphans)
+    
+    @staticmethod
+    def _insert_upload(cursor, analysis_id: str, filename: str, upload_id: Optional[str] = None) -> str:
+        upload_id = upload_id or str(uuid.uuid4())
+        cursor.execute("""
+            INSERT INTO analysis_uploads (id, analysis_id, filename) VALUES (?, ?, ?)
+        """, (upload_id, analysis_id, filename))
+        return upload_id
+    
+    @staticmethod
+    def _encode_summary(summary: AnalysisSummary) -> str:
+        """JSON of the summary fields without a column of their own"""
+        return json.dumps({
+            'error_summary': summary.error_summary,
+            'security_summary': summary.security_summary,
+            'relationship_count': summary.relationship_count,
+            'relationships': summary.relationships,
+            'facets': summary.facets
+        })
+    
+    @staticmethod
+    def _summary_from_row(row) -> AnalysisSummary:
+        """AnalysisSummary from an analysis_results row with a stored summary"""
+        from app.models.analysis_models import DatabaseType
+        
+        details = json.loads(row['summary'])
+        return AnalysisSummary(
+            id=row['id'],
+            file_hash=row['file_hash'],
+            filename=row['filename'],
+            database_type=DatabaseType(row['database_type']),
+            processing_time=row['processing_time'],
+            total_lines=row['total_lines'],
+            total_statements=row['total_statements'],
+            quality_score=row['quality_score'],
+            complexity_score=row['complexity_score'],
+            error_count=row['error_count'],
+            vulnerability_count=row['vulnerability_count'],
+            performance_issue_count=row['performance_issue_count'],
+            table_count=row['table_count'],
+            relationship_count=details.get('relationship_count', 0),
+            error_summary=details.get('error_summary', {}),
+            security_summary=details.get('security_summary', {}),
+            facets=details.get('facets', {}),
+            recommendations=json.loads(row['recommendations']) if row['recommendations'] else [],
+            relationships=details.get('relationships', []),
+            created_at=row['created_at']
+        )
+    
+    @staticmethod
+    def _prefix_upper_bound(prefix: str) -> Optional[str]:
+        """Smallest string greater than every string starting with prefix, if any"""
+        stripped = prefix.rstrip(chr(sys.maxunicode))
+        if not stripped:
+            return None
+        return stripped[:-1] + chr(ord(stripped[-1]) + 1)
+    
+    @staticmethod
+    def _encode_cursor(key: tuple) -> str:
+        return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str, size: int = 2) -> tuple:
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8'))
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid pagination cursor")
+        if not isinstance(key, list) or len(key) != size:
+            raise ValueError("Invalid pagination cursor")
+        return tuple(key)
+    
+    def _has_findings_blob(self, analysis_id: str) -> bool:
+        with self.db_manager.get_connection(read_only=True) as conn:
+            return conn.execute("SELECT 1 FROM analysis_findings WHERE analysis_id = ?",
+                                (analysis_id,)).fetchone() is not None
+    
+    @staticmethod
+    def _filter_findings(result: AnalysisResult, spec: Dict[str, Any], severities, types,
+                         line_from, line_to, after) -> List[Any]:
+        """Findings of an in-memory result matching a page request, in page order"""
+        order = spec['order']
+        items = [item for name in spec['lists'] for item in getattr(result, name)]
+        if severities and spec['severity']:
+            attribute = spec['severity']
+            items = [item for item in items
+                     if str(getattr(getattr(item, attribute), 'value', getattr(item, attribute))).lower() in severities]
+        if types and spec['type']:
+            items = [item for item in items if str(getattr(item, spec['type'])).lower() in types]
+        if order == 'line_number':
+            if line_from is not None:
+                items = [item for item in items if item.line_number >= line_from]
+            if line_to is not None:
+                items = [item for item in items if item.line_number <= line_to]
+        
+        key = lambda item: (getattr(item, order), item.id)
+        items.sort(key=key)
+        if after is not None:
+            items = [item for item in items if key(item) > after]
+        return items
+    
+    def _query_findings(self, analysis_id: str, spec: Dict[str, Any], severities, types,
+                        line_from, line_to, after, limit: int) -> List[Any]:
+        """Findings rows matching a page request, read through the (analysis, order, id) index"""
+        conditions = ['analysis_id = ?']
+        params: List[Any] = [analysis_id]
+        for column, values in ((spec['severity'], severities), (spec['type'], types)):
+            if values and column:
+                conditions.append(f"LOWER({column}) IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if spec['order_column'] == 'line_number':
+            if line_from is not None:
+                conditions.append('line_number >= ?')
+                params.append(line_from)
+            if line_to is not None:
+                conditions.append('line_number <= ?')
+                params.append(line_to)
+        if after is not None:
+            conditions.append(f"({spec['order_column']}, id) > (?, ?)")
+            params.extend(after)
+        params.append(limit)
+        
+        from_row = getattr(self, spec['from_row'])
+        with self.db_manager.get_connection(read_only=True) as conn:
+            rows = conn.execute(f"""
+                SELECT * FROM {spec['table']}
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {spec['order_column']}, id
+                LIMIT ?
+            """, params).fetchall()
+        return [from_row(row) for row in rows]
+    
+    @staticmethod
+    def _build_child_rows(result: AnalysisResult) -> Dict[str, List[tuple]]:
+        """Parameter tuples for every child table, keyed by table name"""
+        analysis_id = result.id
+        return {
+            'sql_errors': [
+                (error.id, analysis_id, error.line_number, error.column,
+                 error.error_type, error.severity.value, error.message,
+                 error.suggestion, error.auto_fixable, error.fixed_code)
+                for errors in (result.syntax_errors, result.semantic_errors) for error in errors
+            ],
+            'security_vulnerabilities': [
+                (vuln.id, analysis_id, vuln.line_number, vuln.vulnerability_type,
+                 vuln.risk_level.value, vuln.description, vuln.mitigation,
+                 vuln.code_snippet, vuln.cwe_id, vuln.owasp_category)
+                for vuln in result.security_vulnerabilities
+            ],
+            'performance_issues': [
+                (issue.id, analysis_id, issue.line_number, issue.issue_type,
+                 issue.impact, issue.description, issue.recommendation,
+                 issue.code_snippet, issue.estimated_improvement)
+                for issue in result.performance_issues
+            ],
+            'table_info': [
+                (table.id, analysis_id, table.name, json.dumps(table.columns),
+                 json.dumps(table.primary_keys), json.dumps(table.foreign_keys),
+                 json.dumps(table.indexes), json.dumps(table.constraints),
+                 table.estimated_rows)
+                for table in result.tables
+            ]
+        }
+    
     def _build_analysis_result_from_db(self, cursor, main_row) -> AnalysisResult:
         """Build AnalysisResult object from database rows"""
-        from app.models.analysis_models import DatabaseType, ErrorSeverity
+        from app.models.analysis_models import DatabaseType
         
         analysis_id = main_row['id']
         
+        # Analyses saved with the blob layout need one row read and decompress
+        cursor.execute("SELECT payload FROM analysis_findings WHERE analysis_id = ?", (analysis_id,))
+        blob_row = cursor.fetchone()
+        if blob_row:
+            findings = decode_findings(blob_row['payload'])
+        else:
+            findings = self._load_findings_from_rows(cursor, analysis_id)
+            if main_row['summary']:
+                findings['relationships'] = json.loads(main_row['summary']).get('relationships', [])
+        
+        # Build the complete result
+        result = AnalysisResult(
+            id=main_row['id'],
+            file_hash=main_row['file_hash'],
+            filename=main_row['filename'],
+            processing_time=main_row['processing_time'],
+            database_type=DatabaseType(main_row['database_type']),
+            rule_version=main_row['rule_version'],
+            total_lines=main_row['total_lines'],
+            total_statements=main_row['total_statements'],
+            syntax_errors=findings['syntax_errors'],
+            semantic_errors=findings['semantic_errors'],
+            performance_issues=findings['performance_issues'],
+            security_vulnerabilities=findings['security_vulnerabilities'],
+            tables=findings['tables'],
+            relationships=findings['relationships'],
+            quality_score=main_row['quality_score'],
+            complexity_score=main_row['complexity_score'],
+            recommendations=json.loads(main_row['recommendations']) if main_row['recommendations'] else [],
+            corrected_sql=main_row['corrected_sql'] or '',
+            intelligent_comments=findings['intelligent_comments']
+        )
+        
+        return result
+    
+    def _load_findings_from_rows(self, cursor, analysis_id: str) -> Dict[str, Any]:
+        """Findings lists of an analysis saved with the rows layout"""
         # Get SQL errors
         cursor.execute("SELECT * FROM sql_errors WHERE analysis_id = ?", (analysis_id,))
         syntax_errors = []
         semantic_errors = []
         
         for error_row in cursor.fetchall():
-            error = SQLError(
-                id=error_row['id'],
-                line_number=error_row['line_number'],
-                column=error_row['column_number'],
-                error_type=error_row['error_type'],
-                severity=ErrorSeverity(error_row['severity']),
-                message=error_row['message'],
-                suggestion=error_row['suggestion'],
-                auto_fixable=bool(error_row['auto_fixable']),
-                fixed_code=error_row['fixed_code']
-            )
-            
+            error = self._error_from_row(error_row)
             if error.error_type.startswith('syntax'):
                 syntax_errors.append(error)
             else:
@@ -446,76 +1740,76 @@ class AnalysisRepository:
         
         # Get security vulnerabilities
         cursor.execute("SELECT * FROM security_vulnerabilities WHERE analysis_id = ?", (analysis_id,))
-        security_vulnerabilities = []
-        
-        for vuln_row in cursor.fetchall():
-            vuln = SecurityVulnerability(
-                id=vuln_row['id'],
-                line_number=vuln_row['line_number'],
-                vulnerability_type=vuln_row['vulnerability_type'],
-                risk_level=ErrorSeverity(vuln_row['risk_level']),
-                description=vuln_row['description'],
-                mitigation=vuln_row['mitigation'],
-                code_snippet=vuln_row['code_snippet'] or '',
-                cwe_id=vuln_row['cwe_id'] or '',
-                owasp_category=vuln_row['owasp_category'] or ''
-            )
-            security_vulnerabilities.append(vuln)
+        security_vulnerabilities = [self._vulnerability_from_row(row) for row in cursor.fetchall()]
         
         # Get performance issues
         cursor.execute("SELECT * FROM performance_issues WHERE analysis_id = ?", (analysis_id,))
-        performance_issues = []
-        
-        for perf_row in cursor.fetchall():
-            issue = PerformanceIssue(
-                id=perf_row['id'],
-                line_number=perf_row['line_number'],
-                issue_type=perf_row['issue_type'],
-                impact=perf_row['impact'],
-                description=perf_row['description'],
-                recommendation=perf_row['recommendation'],
-                code_snippet=perf_row['code_snippet'] or '',
-                estimated_improvement=perf_row['estimated_improvement'] or ''
-            )
-            performance_issues.append(issue)
+        performance_issues = [self._issue_from_row(row) for row in cursor.fetchall()]
         
         # Get table information
         cursor.execute("SELECT * FROM table_info WHERE analysis_id = ?", (analysis_id,))
-        tables = []
-        
-        for table_row in cursor.fetchall():
-            table = TableInfo(
-                id=table_row['id'],
-                name=table_row['table_name'],
-                columns=json.loads(table_row['columns']) if table_row['columns'] else [],
-                primary_keys=json.loads(table_row['primary_keys']) if table_row['primary_keys'] else [],
-                foreign_keys=json.loads(table_row['foreign_keys']) if table_row['foreign_keys'] else [],
-                indexes=json.loads(table_row['indexes']) if table_row['indexes'] else [],
-                constraints=json.loads(table_row['constraints']) if table_row['constraints'] else [],
-                estimated_rows=table_row['estimated_rows']
-            )
-            tables.append(table)
+        tables = [self._table_from_row(row) for row in cursor.fetchall()]
         
-        # Build the complete result
-        result = AnalysisResult(
-            id=main_row['id'],
-            file_hash=main_row['file_hash'],
-            filename=main_row['filename'],
-            processing_time=main_row['processing_time'],
-            database_type=DatabaseType(main_row['database_type']),
-            total_lines=main_row['total_lines'],
-            total_statements=main_row['total_statements'],
-            syntax_errors=syntax_errors,
-            semantic_errors=semantic_errors,
-            performance_issues=performance_issues,
-            security_vulnerabilities=security_vulnerabilities,
-            tables=tables,
-            relationships=[],  # TODO: Implement relationships storage
-            quality_score=main_row['quality_score'],
-            complexity_score=main_row['complexity_score'],
-            recommendations=json.loads(main_row['recommendations']) if main_row['recommendations'] else [],
-            corrected_sql=main_row['corrected_sql'] or '',
-            intelligent_comments=[]  # TODO: Implement comments storage
+        return {
+            'syntax_errors': syntax_errors,
+            'semantic_errors': semantic_errors,
+            'performance_issues': performance_issues,
+            'security_vulnerabilities': security_vulnerabilities,
+            'tables': tables,
+            'relationships': [],
+            'intelligent_comments': []  # TODO: Implement comments storage
+        }
+    
+    @staticmethod
+    def _error_from_row(error_row) -> SQLError:
+        return SQLError(
+            id=error_row['id'],
+            line_number=error_row['line_number'],
+            column=error_row['column_number'],
+            error_type=error_row['error_type'],
+            severity=ErrorSeverity(error_row['severity']),
+            message=error_row['message'],
+            suggestion=error_row['suggestion'],
+            auto_fixable=bool(error_row['auto_fixable']),
+            fixed_code=error_row['fixed_code']
+        )
+    
+    @staticmethod
+    def _vulnerability_from_row(vuln_row) -> SecurityVulnerability:
+        return SecurityVulnerability(
+            id=vuln_row['id'],
+            line_number=vuln_row['line_number'],
+            vulnerability_type=vuln_row['vulnerability_type'],
+            risk_level=ErrorSeverity(vuln_row['risk_level']),
+            description=vuln_row['description'],
+            mitigation=vuln_row['mitigation'],
+            code_snippet=vuln_row['code_snippet'] or '',
+            cwe_id=vuln_row['cwe_id'] or '',
+            owasp_category=vuln_row['owasp_category'] or ''
+        )
+    
+    @staticmethod
+    def _issue_from_row(perf_row) -> PerformanceIssue:
+        return PerformanceIssue(
+            id=perf_row['id'],
+            line_number=perf_row['line_number'],
+            issue_type=perf_row['issue_type'],
+            impact=perf_row['impact'],
+            description=perf_row['description'],
+            recommendation=perf_row['recommendation'],
+            code_snippet=perf_row['code_snippet'] or '',
+            estimated_improvement=perf_row['estimated_improvement'] or ''
+        )
+    
+    @staticmethod
+    def _table_from_row(table_row) -> TableInfo:
+        return TableInfo(
+            id=table_row['id'],
+            name=table_row['table_name'],
+            columns=json.loads(table_row['columns']) if table_row['columns'] else [],
+            primary_keys=json.loads(table_row['primary_keys']) if table_row['primary_keys'] else [],
+            foreign_keys=json.loads(table_row['foreign_keys']) if table_row['foreign_keys'] else [],
+            indexes=json.loads(table_row['indexes']) if table_row['indexes'] else [],
+            constraints=json.loads(table_row['constraints']) if table_row['constraints'] else [],
+            estimated_rows=table_row['estimated_rows']
         )
-        
-        return result
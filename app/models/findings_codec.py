@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+FINDINGS CODEC
+Compact, versioned binary encoding of the findings of an analysis
+"""
+
+import json
+import zlib
+from operator import attrgetter
+from typing import Any, Dict, Tuple
+
+from app.models.analysis_models import (
+    AnalysisResult, ErrorSeverity, SQLError, SecurityVulnerability,
+    PerformanceIssue, TableInfo, IntelligentComment
+)
+
+MAGIC = b'SQAF'
+FORMAT_VERSION = 1
+
+# Field kinds: plain JSON values, dictionary-encoded text and severities
+RAW, TEXT, SEVERITY = 'raw', 'text', 'severity'
+
+_SEVERITY_VALUES = {severity.value for severity in ErrorSeverity}
+
+# Record layouts per findings list, in encoding order. Appending a field or
+# changing a kind requires a new FORMAT_VERSION.
+SCHEMAS = {
+    'syntax_errors': (SQLError, (
+        ('id', RAW), ('line_number', RAW), ('column', RAW), ('error_type', TEXT),
+        ('severity', SEVERITY), ('message', TEXT), ('suggestion', TEXT),
+        ('auto_fixable', RAW), ('fixed_code', TEXT))),
+    'semantic_errors': (SQLError, (
+        ('id', RAW), ('line_number', RAW), ('column', RAW), ('error_type', TEXT),
+        ('severity', SEVERITY), ('message', TEXT), ('suggestion', TEXT),
+        ('auto_fixable', RAW), ('fixed_code', TEXT))),
+    'security_vulnerabilities': (SecurityVulnerability, (
+        ('id', RAW), ('line_number', RAW), ('vulnerability_type', TEXT),
+        ('risk_level', SEVERITY), ('description', TEXT), ('mitigation', TEXT),
+        ('code_snippet', TEXT), ('cwe_id', TEXT), ('owasp_category', TEXT))),
+    'performance_issues': (PerformanceIssue, (
+        ('id', RAW), ('line_number', RAW), ('issue_type', TEXT), ('impact', TEXT),
+        ('description', TEXT), ('recommendation', TEXT), ('code_snippet', TEXT),
+        ('estimated_improvement', TEXT))),
+    'tables': (TableInfo, (
+        ('id', RAW), ('name', TEXT), ('columns', RAW), ('primary_keys', RAW),
+        ('foreign_keys', RAW), ('indexes', RAW), ('constraints', RAW),
+        ('estimated_rows', RAW))),
+    'intelligent_comments': (IntelligentComment, (
+        ('id', RAW), ('line_number', RAW), ('comment', TEXT), ('comment_type', TEXT)))
+}
+
+def count_findings(result: AnalysisResult) -> int:
+    """Number of findings stored for an analysis"""
+    return (len(result.syntax_errors) + len(result.semantic_errors) +
+            len(result.security_vulnerabilities) + len(result.performance_issues))
+
+def encode_findings(result: AnalysisResult, level: int = 6) -> Tuple[bytes, int]:
+    """Encode every findings list of a result; returns (blob, uncompressed size)
+
+    Records are stored as positional arrays and repeated strings (messages,
+    suggestions, types) are stored once in a string table, which leaves
+    little for zlib to do beyond the identifiers.
+    """
+    # Insertion-ordered dict: string -> position in the string table
+    strings: Dict[str, int] = {}
+    intern = strings.setdefault
+    document: Dict[str, Any] = {}
+    for name, (_, fields) in SCHEMAS.items():
+        getter = attrgetter(*(attribute for attribute, _ in fields))
+        text = [position for position, (_, kind) in enumerate(fields) if kind == TEXT]
+        severity = [position for position, (_, kind) in enumerate(fields) if kind == SEVERITY]
+        records = []
+        for item in getattr(result, name):
+            record = list(getter(item))
+            for position in text:
+                value = record[position]
+                if value is not None:
+                    record[position] = intern(value, len(strings))
+            for position in severity:
+                record[position] = intern(record[position].value, len(strings))
+            records.append(record)
+        document[name] = records
+    document['relationships'] = result.relationships
+    document['strings'] = list(strings)
+
+    raw = json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return MAGIC + bytes([FORMAT_VERSION]) + zlib.compress(raw, level), len(raw)
+
+def decode_findings(blob: bytes) -> Dict[str, Any]:
+    """Findings lists keyed by AnalysisResult field name"""
+    blob = bytes(blob)
+    if blob[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not an encoded findings blob")
+    version = blob[len(MAGIC)]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported findings format version: {version}")
+
+    document = json.loads(zlib.decompress(blob[len(MAGIC) + 1:]).decode('utf-8'))
+    strings = document['strings']
+    severities = [ErrorSeverity(value) if value in _SEVERITY_VALUES else None for value in strings]
+    findings: Dict[str, Any] = {'relationships': document.get('relationships', [])}
+    for name, (model, fields) in SCHEMAS.items():
+        names = [attribute for attribute, _ in fields]
+        text = [position for position, (_, kind) in enumerate(fields) if kind == TEXT]
+        severity = [position for position, (_, kind) in enumerate(fields) if kind == SEVERITY]
+        items = []
+        for record in document.get(name, []):
+            for position in text:
+                value = record[position]
+                if value is not None:
+                    record[position] = strings[value]
+            for position in severity:
+                record[position] = severities[record[position]]
+            items.append(model(**dict(zip(names, record))))
+        findings[name] = items
+    return findings
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+WRITE-BEHIND QUEUE
+Asynchronous, coalescing persistence of analysis results
+"""
+
+import time
+import uuid
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.models.analysis_models import AnalysisResult, AnalysisSummary
+from app.models.data_access import AnalysisRepository
+from app.utils.helpers import cache
+
+class WriteBehindQueue:
+    """Persists analysis results from a dedicated writer thread
+
+    save() caches the result and returns at once; the writer takes every
+    write queued within max_delay of the first, up to max_batch, and
+    commits them in one transaction. Writes are applied in the order they
+    were queued, so an upload recorded for a pending analysis lands after
+    it. A batch that fails is retried one write at a time so a bad result
+    cannot take the others down with it.
+    """
+
+    def __init__(self, repository: AnalysisRepository, max_batch: int = 32,
+                 max_delay: float = 0.05, max_queue: int = 1000,
+                 enqueue_timeout: Optional[float] = 5.0):
+        self.repository = repository
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self.logger = logging.getLogger(__name__)
+        # (sequence, operation, queued_at)
+        self._pending: Deque[Tuple[int, Tuple[str, Any], float]] = deque()
+        self._condition = threading.Condition(threading.Lock())
+        self._queued_seq = 0
+        self._done_seq = 0
+        self._closed = False
+        self._stats = {'queued': 0, 'written': 0, 'failed': 0, 'batches': 0,
+                       'rejected': 0, 'last_batch_size': 0, 'last_lag': 0.0,
+                       'max_lag': 0.0, 'commit_time': 0.0}
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def save(self, result: AnalysisResult) -> int:
+        """Cache a result and queue it for persistence; returns its sequence number"""
+        cache.set(f"analysis:{result.id}", result, ttl=3600)
+        cache.set(f"analysis_hash:{result.file_hash}", result, ttl=3600)
+        cache.set(f"analysis_content:{AnalysisRepository.result_content_key(result)}", result, ttl=3600)
+        cache.set(f"analysis_summary:{result.id}", AnalysisSummary.from_result(result), ttl=3600)
+        return self._enqueue((AnalysisRepository.WRITE_ANALYSIS, result))
+
+    def record_upload(self, analysis_id: str, filename: str) -> str:
+        """Queue an upload of already analyzed content; returns the upload id"""
+        upload_id = str(uuid.uuid4())
+        self._enqueue((AnalysisRepository.WRITE_UPLOAD, (analysis_id, filename, upload_id)))
+        return upload_id
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every write queued before the call is committed or failed"""
+        with self._condition:
+            target = self._queued_seq
+            return self._condition.wait_for(lambda: self._done_seq >= target, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Durability barrier: refuse new writes, drain the queue and stop the writer
+
+        Returns False if writes were still pending when the timeout expired.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        with self._condition:
+            return not self._pending and not self._thread.is_alive()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, lag of the oldest pending write and batch counters"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._pending)
+            stats['lag'] = time.time() - self._pending[0][2] if self._pending else 0.0
+            stats['closed'] = self._closed
+        stats['average_batch_size'] = ((stats['written'] + stats['failed']) / stats['batches']
+                                       if stats['batches'] else 0.0)
+        return stats
+
+    def _enqueue(self, operation: Tuple[str, Any]) -> int:
+        """Append a write, waiting up to enqueue_timeout while the queue is full"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            if not self._condition.wait_for(lambda: len(self._pending) < self.max_queue or self._closed,
+                                            self.enqueue_timeout):
+                self._stats['rejected'] += 1
+                raise queue.Full("Write-behind queue is full")
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            self._queued_seq += 1
+            self._pending.append((self._queued_seq, operation, time.time()))
+            self._stats['queued'] += 1
+            self._condition.notify_all()
+            return self._queued_seq
+
+    def _take_batch(self) -> List[Tuple[int, Tuple[str, Any], float]]:
+        """Wait for a write, then collect more for up to max_delay; empty once closed and drained"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending or self._closed)
+            if not self._pending:
+                return []
+            deadline = self._pending[0][2] + self.max_delay
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            # Entries stay queued until committed so depth and lag include them
+            return [self._pending[index] for index in range(min(self.max_batch, len(self._pending)))]
+
+    def _run(self) -> None:
+        """Writer loop: commit batches until closed and drained"""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            start_time = time.time()
+            operations = [operation for _, operation, _ in batch]
+            if self.repository.save_batch(operations):
+                failed = 0
+            else:
+                # Isolate the failing writes instead of dropping the whole batch
+                failed = sum(not self.repository.save_batch([operation]) for operation in operations)
+                if failed:
+                    self.logger.error(f"Write-behind dropped {failed} of {len(operations)} writes")
+            finished_at = time.time()
+
+            with self._condition:
+                for _ in batch:
+                    self._pending.popleft()
+                self._done_seq = batch[-1][0]
+                lag = finished_at - batch[0][2]
+                self._stats['written'] += len(batch) - failed
+                self._stats['failed'] += failed
+                self._stats['batches'] += 1
+                self._stats['last_batch_size'] = len(batch)
+                self._stats['last_lag'] = lag
+                self._stats['max_lag'] = max(self._stats['max_lag'], lag)
+                self._stats['commit_time'] += finished_at - start_time
+                self._condition.notify_all()
@@ -5,32 +5,63 @@ Enterprise business logic for SQL analysis operations
 """
 
 import time
+import queue
 import logging
 import threading
 from typing import Dict, List, Any, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+from concurrent.futures import Future
+from datetime import datetime, timedelta
 
 from app.models.analysis_models import (
-    AnalysisResult, DatabaseType, FileInfo, SQLError, 
+    AnalysisResult, AnalysisSummary, DatabaseType, FileInfo, FindingsPage, SQLError, 
     SecurityVulnerability, PerformanceIssue, ErrorSeverity
 )
 from app.models.data_access import DatabaseManager, AnalysisRepository
+from app.models.write_behind import WriteBehindQueue
+from app.services.maintenance_service import MaintenanceService
+from app.config.settings import Config
 from app.utils.helpers import cache, FileHelper, ValidationHelper, LoggingHelper
+from app.utils.executors import executors
 
 # Import analysis engines
 from comprehensive_sql_analyzer import ComprehensiveSQLAnalyzer
 from enterprise_file_processor import EnterpriseFileProcessor
+from upload_decompression import DecompressionLimitExceeded
+from upload_archives import ARCHIVE_ERRORS, ArchiveLimitExceeded, ArchiveReader, archive_format
+from upload_staging import StagedUpload, UploadTooLarge
 from export_engine import ExportEngine
 
 class AnalysisService:
     """Enterprise analysis service with caching, validation, and business logic"""
     
+    # Findings returned per page by the detail views
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+    # Hits returned per page by full-text search
+    SEARCH_PAGE_SIZE = 20
+    HISTORY_PAGE_SIZE = 20
+    # Default trend window in days and entries per top finding type list
+    TREND_DAYS = 30
+    TREND_TOP_TYPES = 10
+    # Finding kinds carried by streamed analysis events
+    STREAM_FINDING_KINDS = ('syntax_errors', 'semantic_errors', 'performance_issues',
+                            'security_vulnerabilities', 'tables')
+    
     def __init__(self):
         self.logger = LoggingHelper.setup_logger('analysis_service')
         self.db_manager = DatabaseManager()
         self.repository = AnalysisRepository(self.db_manager)
         
+        # Optional write-behind persistence keeps commits off the request path
+        self.write_behind = None
+        if Config.WRITE_BEHIND['enabled']:
+            self.enable_write_behind()
+        
+        # Retention and compaction run in the background once a limit is set
+        self.maintenance = MaintenanceService(self.repository)
+        if self.maintenance.has_limits:
+            self.maintenance.start()
+        
         # Initialize analysis engines
         self.sql_analyzer = ComprehensiveSQLAnalyzer()
         self.file_processor = EnterpriseFileProcessor()
@@ -46,8 +77,8 @@ class AnalysisService:
             'cache_misses': 0
         }
         
-        # Thread pool for concurrent operations
-        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='analysis')
+        # Process-wide pools for concurrent operations
+        self.executors = executors
         
         self.logger.info("Analysis service initialized")
     
@@ -74,8 +105,12 @@ class AnalysisService:
                 self.analysis_metrics['failed_analyses'] += 1
                 return self._create_error_response(validation_result['error'], 'VALIDATION_ERROR')
             
-            # Process file
+            # Process file; uploads too large to hold as one string are
+            # analyzed as a stream instead
             file_result = self._process_file_safely(file_data, filename)
+            if (not file_result['success'] and file_result.get('error_code') == 'FILE_TOO_LARGE' and
+                    Config.STREAMING_ANALYSIS['enabled'] and self._rewind(file_data)):
+                return self._analyze_stream(file_data, filename, options, start_time)
             if not file_result['success']:
                 self.analysis_metrics['failed_analyses'] += 1
                 return self._create_error_response(file_result['error'], 'FILE_PROCESSING_ERROR')
@@ -83,16 +118,19 @@ class AnalysisService:
             file_info = file_result['file_info']
             file_content = file_result['content']
             
-            # Check cache for existing analysis
-            cached_result = self._check_analysis_cache(file_info.hash_sha256)
+            # The same content, dialect and rules share one stored analysis
+            db_type = self._determine_database_type(filename, file_content, options or {})
+            cached_result = self._check_analysis_cache(file_info.hash_sha256, db_type)
             if cached_result:
                 self.analysis_metrics['cache_hits'] += 1
+                upload_id = self._record_upload(cached_result.id, file_info.filename)
                 processing_time = time.time() - start_time
                 self._update_performance_metrics(processing_time)
                 
                 return self._create_success_response({
                     'analysis_result': cached_result.to_dict(),
                     'file_info': file_info.to_dict(),
+                    'upload_id': upload_id,
                     'processing_time': processing_time,
                     'from_cache': True
                 })
@@ -101,7 +139,7 @@ class AnalysisService:
             
             # Perform comprehensive analysis
             analysis_result = self._perform_comprehensive_analysis(
-                file_content, filename, file_info, options or {}
+                file_content, filename, file_info, db_type
             )
             
             if not analysis_result:
@@ -109,7 +147,7 @@ class AnalysisService:
                 return self._create_error_response('Analysis failed', 'ANALYSIS_ERROR')
             
             # Save to database
-            save_success = self.repository.save_analysis_result(analysis_result)
+            save_success = self._persist_result(analysis_result)
             if not save_success:
                 self.logger.warning(f"Failed to save analysis result: {analysis_result.id}")
             
@@ -130,6 +168,213 @@ class AnalysisService:
             self.logger.error(f"Analysis service error: {str(e)}", exc_info=True)
             return self._create_error_response(f"Internal analysis error: {str(e)}", 'INTERNAL_ERROR')
     
+    def analyze_sql_stream(self, file_data: Any, filename: str,
+                           options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Analyze an upload statement batch by batch, without holding its text
+        
+        The upload is staged, decompressed when its name has a compressed
+        suffix, and its text fed in chunks through the analyzer's
+        analyze_stream, so memory is bounded by the largest statement rather
+        than the file. Uploads up to STREAMING_ANALYSIS['max_size'] bytes are
+        accepted. The response carries the totals and scores of the whole
+        file and the first max_findings located findings of each kind;
+        streamed analyses are not stored, as their full result would not
+        fit in memory either.
+        
+        Returns:
+            Dict with 'analysis_summary', 'findings' and 'file_info'
+        """
+        start_time = time.time()
+        self.analysis_metrics['total_analyses'] += 1
+        
+        validation_result = self._validate_analysis_request(file_data, filename, options)
+        if not validation_result['valid']:
+            self.analysis_metrics['failed_analyses'] += 1
+            return self._create_error_response(validation_result['error'], 'VALIDATION_ERROR')
+        if not FileHelper.is_allowed_file(filename, Config.ALLOWED_EXTENSIONS):
+            self.analysis_metrics['failed_analyses'] += 1
+            return self._create_error_response(f'Unsupported file extension: {filename}', 'VALIDATION_ERROR')
+        return self._analyze_stream(file_data, filename, options, start_time)
+    
+    def _analyze_stream(self, file_data: Any, filename: str, options: Optional[Dict[str, Any]],
+                        start_time: float) -> Dict[str, Any]:
+        """Streamed analysis of a validated upload"""
+        settings = Config.STREAMING_ANALYSIS
+        options = options or {}
+        db_type = DatabaseType.GENERIC
+        if options.get('database_type'):
+            db_type = DatabaseType(options['database_type'])
+        findings: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in self.STREAM_FINDING_KINDS}
+        truncated = False
+        summary = None
+        
+        try:
+            with self.file_processor.open_text_stream(file_data, filename, settings['max_size']) as stream:
+                for event in self.sql_analyzer.analyze_stream(stream, filename, db_type):
+                    if event['type'] == 'summary':
+                        summary = event
+                        continue
+                    for kind, items in findings.items():
+                        located = event.get(kind, [])
+                        room = max(settings['max_findings'] - len(items), 0)
+                        items.extend(located[:room])
+                        truncated = truncated or len(located) > room
+                security_check = stream.security_check()
+                file_info = {
+                    'filename': filename,
+                    'size': stream.size,
+                    'encoding': stream.encoding.encoding,
+                    'line_count': stream.line_count,
+                    'hash_sha256': stream.hash_sha256
+                }
+        except UploadTooLarge as e:
+            self.analysis_metrics['failed_analyses'] += 1
+            return self._create_error_response(
+                f'File too large. Maximum size: {e.max_size / (1024*1024):.1f}MB', 'FILE_TOO_LARGE')
+        except DecompressionLimitExceeded as e:
+            self.analysis_metrics['failed_analyses'] += 1
+            return self._create_error_response(f'Security validation failed: {e.reason}', 'FILE_PROCESSING_ERROR')
+        except Exception as e:
+            self.analysis_metrics['failed_analyses'] += 1
+            self.logger.error(f"Streamed analysis error: {str(e)}", exc_info=True)
+            return self._create_error_response(f"Internal analysis error: {str(e)}", 'INTERNAL_ERROR')
+        
+        # The prefilters have only seen the whole file once analysis is done
+        if not security_check['is_safe']:
+            self.analysis_metrics['failed_analyses'] += 1
+            return self._create_error_response(
+                f'Security validation failed: {security_check["reason"]}', 'FILE_PROCESSING_ERROR')
+        
+        processing_time = time.time() - start_time
+        self._update_performance_metrics(processing_time)
+        self.analysis_metrics['successful_analyses'] += 1
+        
+        return self._create_success_response({
+            'analysis_summary': summary,
+            'findings': findings,
+            'findings_truncated': truncated,
+            'file_info': file_info,
+            'processing_time': processing_time,
+            'streamed': True
+        })
+    
+    def submit_analysis(self, file_data: Any, filename: str,
+                        options: Dict[str, Any] = None) -> Future:
+        """Run analyze_sql_file on the shared analysis pool"""
+        return self.executors.submit('analysis', self.analyze_sql_file, file_data, filename, options)
+    
+    def submit_stream_analysis(self, file_data: Any, filename: str,
+                               options: Dict[str, Any] = None) -> Future:
+        """Run analyze_sql_stream on the shared analysis pool"""
+        return self.executors.submit('analysis', self.analyze_sql_stream, file_data, filename, options)
+    
+    def analyze_archive(self, file_data: Any, filename: str,
+                        options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Analyze every SQL file in a zip or tar archive as one request
+        
+        Members are read from the staged upload without extracting them to
+        disk. Members with the same content are analyzed once, and the
+        distinct ones run concurrently on the 'analysis' pool through
+        analyze_sql_file, so each still gets the content cache and its own
+        stored analysis. At most max_in_flight members (the pool's worker
+        count by default) are submitted and not yet finished, which bounds
+        the member contents held in memory; each finished analysis is
+        reduced to its per-file summary as soon as it completes. Must not
+        be called from the analysis pool itself.
+        
+        Returns:
+            Dict with one entry per member under 'files' and totals over
+            the distinct analyses under 'summary'
+        """
+        start_time = time.time()
+        
+        validation_result = self._validate_analysis_request(file_data, filename, options)
+        if not validation_result['valid']:
+            return self._create_error_response(validation_result['error'], 'VALIDATION_ERROR')
+        format_name = archive_format(filename)
+        if format_name is None:
+            return self._create_error_response(f'Not a zip or tar archive: {filename}', 'VALIDATION_ERROR')
+        
+        settings = Config.ARCHIVE_UPLOADS
+        reader = ArchiveReader(self.file_processor.max_file_size, settings['max_members'],
+                               settings['max_total_size'], self.file_processor.max_compression_ratio)
+        max_in_flight = settings.get('max_in_flight') or self.executors.get('analysis').max_workers
+        window = threading.BoundedSemaphore(max_in_flight)
+        lock = threading.Lock()
+        totals = self._empty_archive_totals()
+        files: List[Dict[str, Any]] = []
+        skipped: List[Dict[str, Any]] = []
+        futures: List[Future] = []
+        first_entries: Dict[str, Dict[str, Any]] = {}
+        
+        def finish(future: Future, entry: Dict[str, Any]) -> None:
+            try:
+                result = future.result()
+            except Exception as e:
+                result = self._create_error_response(f"Internal analysis error: {str(e)}", 'INTERNAL_ERROR')
+            with lock:
+                self._fold_archive_result(entry, result, totals)
+            window.release()
+        
+        try:
+            with StagedUpload.stage(file_data, self.file_processor.spool_threshold, Config.MAX_CONTENT_LENGTH,
+                                    self.file_processor.temp_dir) as staged:
+                accept = lambda name: FileHelper.is_allowed_file(name, Config.ALLOWED_EXTENSIONS)
+                for member in reader.members(staged, format_name, accept):
+                    if member.error:
+                        skipped.append({'filename': member.name, 'size': member.size, 'reason': member.error})
+                        continue
+                    entry = {'filename': member.name, 'size': member.size, 'sha256': member.sha256}
+                    files.append(entry)
+                    if member.sha256 in first_entries:
+                        entry['duplicate_of'] = first_entries[member.sha256]['filename']
+                        continue
+                    first_entries[member.sha256] = entry
+                    
+                    window.acquire()
+                    try:
+                        future = self.executors.submit(
+                            'analysis', self.analyze_sql_file, member.data, member.name, options
+                        )
+                    except BaseException:
+                        window.release()
+                        raise
+                    # Only the queued task references the content from here on
+                    member.data = None
+                    futures.append(future)
+                    future.add_done_callback(lambda future, entry=entry: finish(future, entry))
+        except (ArchiveLimitExceeded, UploadTooLarge) as e:
+            self._cancel(futures)
+            return self._create_error_response(str(e), 'ARCHIVE_LIMIT_EXCEEDED')
+        except ARCHIVE_ERRORS as e:
+            self._cancel(futures)
+            return self._create_error_response(f'Invalid archive: {str(e)}', 'INVALID_ARCHIVE')
+        except queue.Full as e:
+            self._cancel(futures)
+            return self._create_error_response(f'Analysis pool is busy: {str(e)}', 'SERVICE_BUSY')
+        except Exception as e:
+            self._cancel(futures)
+            self.logger.error(f"Archive analysis error: {str(e)}", exc_info=True)
+            return self._create_error_response(f"Internal analysis error: {str(e)}", 'INTERNAL_ERROR')
+        
+        # Every slot comes back once the last callback has folded its result
+        for _ in range(max_in_flight):
+            window.acquire()
+        for entry in files:
+            if 'duplicate_of' in entry:
+                entry['success'] = first_entries[entry['sha256']]['success']
+        
+        return self._create_success_response({
+            'archive': filename,
+            'format': format_name,
+            'summary': self._archive_summary(files, skipped, totals),
+            'files': files,
+            'skipped': skipped,
+            'processing_time': time.time() - start_time
+        })
+    
     def get_analysis_result(self, analysis_id: str) -> Dict[str, Any]:
         """Get analysis result by ID with validation"""
         try:
@@ -151,58 +396,130 @@ class AnalysisService:
     def get_analysis_summary(self, analysis_id: str) -> Dict[str, Any]:
         """Get condensed analysis summary"""
         try:
-            result = self.repository.get_analysis_by_id(analysis_id)
-            if not result:
+            summary = self.repository.get_analysis_summary(analysis_id)
+            if not summary:
                 return self._create_error_response('Analysis not found', 'NOT_FOUND')
             
-            summary = self._create_analysis_summary(result)
-            return self._create_success_response(summary)
+            return self._create_success_response(self._create_analysis_summary(summary))
             
         except Exception as e:
             self.logger.error(f"Failed to get analysis summary: {str(e)}")
             return self._create_error_response('Failed to retrieve summary', 'RETRIEVAL_ERROR')
     
-    def get_security_analysis(self, analysis_id: str) -> Dict[str, Any]:
-        """Get detailed security analysis"""
+    def get_security_analysis(self, analysis_id: str, query: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get detailed security analysis with one page of vulnerabilities"""
+        return self._get_detail_analysis(analysis_id, 'security', query,
+                                         self._create_security_analysis, 'security analysis')
+    
+    def get_performance_analysis(self, analysis_id: str, query: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get detailed performance analysis with one page of issues"""
+        return self._get_detail_analysis(analysis_id, 'performance', query,
+                                         self._create_performance_analysis, 'performance analysis')
+    
+    def get_schema_analysis(self, analysis_id: str, query: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get detailed schema analysis with one page of tables"""
+        return self._get_detail_analysis(analysis_id, 'tables', query,
+                                         self._create_schema_analysis, 'schema analysis')
+    
+    def _get_detail_analysis(self, analysis_id: str, kind: str, query: Optional[Dict[str, Any]],
+                             build, label: str) -> Dict[str, Any]:
+        """Summary-level assessment plus one page of the findings it covers"""
         try:
-            result = self.repository.get_analysis_by_id(analysis_id)
-            if not result:
+            summary = self.repository.get_analysis_summary(analysis_id)
+            if not summary:
                 return self._create_error_response('Analysis not found', 'NOT_FOUND')
             
-            security_analysis = self._create_security_analysis(result)
-            return self._create_success_response(security_analysis)
+            page = self.repository.get_findings(analysis_id, kind, **self._findings_query(query))
+            return self._create_success_response(build(summary, page))
             
+        except ValueError as e:
+            return self._create_error_response(str(e), 'INVALID_QUERY')
         except Exception as e:
-            self.logger.error(f"Failed to get security analysis: {str(e)}")
-            return self._create_error_response('Failed to retrieve security analysis', 'RETRIEVAL_ERROR')
+            self.logger.error(f"Failed to get {label}: {str(e)}")
+            return self._create_error_response(f'Failed to retrieve {label}', 'RETRIEVAL_ERROR')
     
-    def get_performance_analysis(self, analysis_id: str) -> Dict[str, Any]:
-        """Get detailed performance analysis"""
+    def _findings_query(self, query: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Repository page arguments from request options"""
+        query = query or {}
+        limit = query.get('limit') or self.DEFAULT_PAGE_SIZE
+        return {
+            'cursor': query.get('cursor') or None,
+            'limit': min(max(1, int(limit)), self.MAX_PAGE_SIZE),
+            'severities': query.get('severity') or None,
+            'types': query.get('type') or None,
+            'line_from': query.get('line_from'),
+            'line_to': query.get('line_to')
+        }
+    
+    def search_findings(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Full-text search over the findings of every stored analysis
+        
+        query holds the search text 'q' and optional 'kind' and 'severity'
+        lists, 'analysis_id', 'cursor' and 'limit'.
+        """
         try:
-            result = self.repository.get_analysis_by_id(analysis_id)
-            if not result:
-                return self._create_error_response('Analysis not found', 'NOT_FOUND')
-            
-            performance_analysis = self._create_performance_analysis(result)
-            return self._create_success_response(performance_analysis)
+            limit = query.get('limit') or self.SEARCH_PAGE_SIZE
+            page = self.repository.search_findings(
+                query.get('q') or '',
+                kinds=query.get('kind') or None,
+                severities=query.get('severity') or None,
+                analysis_id=query.get('analysis_id') or None,
+                cursor=query.get('cursor') or None,
+                limit=min(max(1, int(limit)), self.MAX_PAGE_SIZE)
+            )
+            return self._create_success_response({
+                'query': query.get('q'),
+                'hits': [hit.to_dict() for hit in page.items],
+                'pagination': self._create_pagination(page)
+            })
             
+        except ValueError as e:
+            return self._create_error_response(str(e), 'INVALID_QUERY')
         except Exception as e:
-            self.logger.error(f"Failed to get performance analysis: {str(e)}")
-            return self._create_error_response('Failed to retrieve performance analysis', 'RETRIEVAL_ERROR')
+            self.logger.error(f"Failed to search findings: {str(e)}")
+            return self._create_error_response('Failed to search findings', 'RETRIEVAL_ERROR')
     
-    def get_schema_analysis(self, analysis_id: str) -> Dict[str, Any]:
-        """Get detailed schema analysis"""
+    def get_trends(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Quality and security trends answered from the daily rollups
+        
+        query may hold 'date_from' and 'date_to' (YYYY-MM-DD, inclusive),
+        'days' counted back from today when date_from is absent,
+        'database_type' and 'top', the length of the top type lists.
+        """
         try:
-            result = self.repository.get_analysis_by_id(analysis_id)
-            if not result:
-                return self._create_error_response('Analysis not found', 'NOT_FOUND')
+            date_to = query.get('date_to') or datetime.utcnow().strftime('%Y-%m-%d')
+            date_from = query.get('date_from')
+            if not date_from:
+                days = int(query.get('days') or self.TREND_DAYS)
+                if days <= 0:
+                    raise ValueError("days must be positive")
+                date_from = (datetime.strptime(date_to, '%Y-%m-%d') -
+                             timedelta(days=days - 1)).strftime('%Y-%m-%d')
+            for value in (date_from, date_to):
+                datetime.strptime(value, '%Y-%m-%d')
+            database_type = query.get('database_type') or None
+            if database_type:
+                database_type = DatabaseType(database_type).value
+            top = min(max(1, int(query.get('top') or self.TREND_TOP_TYPES)), self.MAX_PAGE_SIZE)
             
-            schema_analysis = self._create_schema_analysis(result)
-            return self._create_success_response(schema_analysis)
+            return self._create_success_response({
+                'date_from': date_from,
+                'date_to': date_to,
+                'database_type': database_type,
+                'daily': self.repository.get_daily_trends(date_from, date_to, database_type),
+                'database_types': self.repository.get_database_type_trends(date_from, date_to),
+                'top_types': {
+                    category: self.repository.get_top_finding_types(category, top, date_from,
+                                                                    date_to, database_type)
+                    for category in self.repository.ROLLUP_CATEGORIES
+                }
+            })
             
+        except ValueError as e:
+            return self._create_error_response(str(e), 'INVALID_QUERY')
         except Exception as e:
-            self.logger.error(f"Failed to get schema analysis: {str(e)}")
-            return self._create_error_response('Failed to retrieve schema analysis', 'RETRIEVAL_ERROR')
+            self.logger.error(f"Failed to get trends: {str(e)}")
+            return self._create_error_response('Failed to get trends', 'RETRIEVAL_ERROR')
     
     def export_analysis(self, analysis_id: str, format_type: str,
                        options: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -247,6 +564,11 @@ class AnalysisService:
             self.logger.error(f"Failed to export analysis: {str(e)}")
             return self._create_error_response('Export operation failed', 'EXPORT_ERROR')
     
+    def submit_export(self, analysis_id: str, format_type: str,
+                      options: Dict[str, Any] = None) -> Future:
+        """Run export_analysis on the shared export pool"""
+        return self.executors.submit('export', self.export_analysis, analysis_id, format_type, options)
+    
     def get_recent_analyses(self, limit: int = 10) -> Dict[str, Any]:
         """Get recent analysis summaries"""
         try:
@@ -263,6 +585,48 @@ class AnalysisService:
             self.logger.error(f"Failed to get recent analyses: {str(e)}")
             return self._create_error_response('Failed to retrieve recent analyses', 'RETRIEVAL_ERROR')
     
+    def get_analysis_history(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Stored analyses, newest first, with keyset pagination
+        
+        query may hold 'filename' (a prefix), 'database_type',
+        'min_quality' / 'max_quality', 'date_from' / 'date_to'
+        (YYYY-MM-DD, inclusive), 'cursor' and 'limit'.
+        """
+        try:
+            database_type = query.get('database_type') or None
+            if database_type:
+                database_type = DatabaseType(database_type).value
+            quality = {}
+            for name in ('min_quality', 'max_quality'):
+                if query.get(name) is not None:
+                    quality[name] = int(query[name])
+                    if not 0 <= quality[name] <= 100:
+                        raise ValueError(f"{name} must be between 0 and 100")
+            for name in ('date_from', 'date_to'):
+                if query.get(name):
+                    datetime.strptime(query[name], '%Y-%m-%d')
+            limit = query.get('limit') or self.HISTORY_PAGE_SIZE
+            
+            page = self.repository.get_analysis_history(
+                filename_prefix=query.get('filename') or None,
+                database_type=database_type,
+                date_from=query.get('date_from') or None,
+                date_to=query.get('date_to') or None,
+                cursor=query.get('cursor') or None,
+                limit=min(max(1, int(limit)), self.MAX_PAGE_SIZE),
+                **quality
+            )
+            return self._create_success_response({
+                'analyses': [entry.to_dict() for entry in page.items],
+                'pagination': self._create_pagination(page)
+            })
+            
+        except ValueError as e:
+            return self._create_error_response(str(e), 'INVALID_QUERY')
+        except Exception as e:
+            self.logger.error(f"Failed to get analysis history: {str(e)}")
+            return self._create_error_response('Failed to retrieve analysis history', 'RETRIEVAL_ERROR')
+    
     def delete_analysis(self, analysis_id: str) -> Dict[str, Any]:
         """Delete analysis result"""
         try:
@@ -281,16 +645,131 @@ class AnalysisService:
     
     def get_service_metrics(self) -> Dict[str, Any]:
         """Get service performance metrics"""
+        cache_stats = cache.get_stats()
         return {
             'metrics': self.analysis_metrics.copy(),
             'cache_stats': {
-                'size': len(cache._cache),
+                'size': cache_stats['entries'],
+                'bytes': cache_stats['bytes'],
+                'namespaces': cache_stats['namespaces'],
                 'hit_rate': (self.analysis_metrics['cache_hits'] / 
                            max(1, self.analysis_metrics['cache_hits'] + self.analysis_metrics['cache_misses'])) * 100
             },
-            'database_stats': {
-                'connection_count': len(self.db_manager._connections)
-            }
+            'database_stats': self._get_database_stats(),
+            'write_behind': self.write_behind.stats() if self.write_behind else None,
+            'maintenance': self.maintenance.last_report,
+            'executor_stats': self.executors.metrics()
+        }
+    
+    def enable_write_behind(self, **settings) -> WriteBehindQueue:
+        """Persist results through a write-behind queue from now on"""
+        if self.write_behind is None:
+            options = {name: value for name, value in dict(Config.WRITE_BEHIND, **settings).items()
+                       if name not in ('enabled', 'shutdown_timeout')}
+            self.write_behind = WriteBehindQueue(self.repository, **options)
+        return self.write_behind
+    
+    def flush_persistence(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every analysis returned so far is committed"""
+        return self.write_behind.flush(timeout) if self.write_behind else True
+    
+    def _persist_result(self, analysis_result: AnalysisResult) -> bool:
+        """Save a result now, or queue it when write-behind is enabled"""
+        if self.write_behind is None:
+            return self.repository.save_analysis_result(analysis_result)
+        try:
+            self.write_behind.save(analysis_result)
+            return True
+        except (queue.Full, RuntimeError) as e:
+            # Fall back to a synchronous save rather than lose the result
+            self.logger.warning(f"Write-behind unavailable ({str(e)}), saving synchronously")
+            return self.repository.save_analysis_result(analysis_result)
+    
+    def _record_upload(self, analysis_id: str, filename: str) -> Optional[str]:
+        """Record an upload of analyzed content behind any queued writes"""
+        if self.write_behind is None:
+            return self.repository.record_upload(analysis_id, filename)
+        try:
+            return self.write_behind.record_upload(analysis_id, filename)
+        except (queue.Full, RuntimeError):
+            self.write_behind.flush(Config.WRITE_BEHIND['shutdown_timeout'])
+            return self.repository.record_upload(analysis_id, filename)
+    
+    def _cancel(self, futures) -> None:
+        """Cancel archive member analyses that have not started"""
+        for future in futures:
+            future.cancel()
+    
+    def _empty_archive_totals(self) -> Dict[str, Any]:
+        return {
+            'failed_files': 0,
+            'cached_files': 0,
+            'total_lines': 0,
+            'total_statements': 0,
+            'total_errors': 0,
+            'total_security_vulnerabilities': 0,
+            'total_performance_issues': 0,
+            'quality_scores': 0
+        }
+    
+    def _fold_archive_result(self, entry: Dict[str, Any], result: Dict[str, Any],
+                             totals: Dict[str, Any]) -> None:
+        """Reduce a member's analysis to its per-file summary and add it to the totals
+        
+        The full analysis stays available through get_analysis_result, so
+        the archive response does not hold every finding of every member.
+        """
+        entry['success'] = result['success']
+        if not result['success']:
+            entry['error'] = result['error']
+            entry['error_code'] = result['error_code']
+            totals['failed_files'] += 1
+            return
+        
+        data = result['data']
+        analysis = data['analysis_result']
+        counts = {
+            'total_lines': analysis['total_lines'],
+            'total_statements': analysis['total_statements'],
+            'total_errors': len(analysis['syntax_errors']) + len(analysis['semantic_errors']),
+            'total_security_vulnerabilities': len(analysis['security_vulnerabilities']),
+            'total_performance_issues': len(analysis['performance_issues'])
+        }
+        entry.update({
+            'analysis_id': analysis['id'],
+            'database_type': analysis['database_type'],
+            'quality_score': analysis['quality_score'],
+            'complexity_score': analysis['complexity_score'],
+            'file_info': data['file_info'],
+            'from_cache': data['from_cache'],
+            'processing_time': data['processing_time']
+        }, **counts)
+        for key, value in counts.items():
+            totals[key] += value
+        totals['quality_scores'] += analysis['quality_score']
+        totals['cached_files'] += 1 if data['from_cache'] else 0
+    
+    def _archive_summary(self, files: List[Dict[str, Any]], skipped: List[Dict[str, Any]],
+                         totals: Dict[str, Any]) -> Dict[str, Any]:
+        """Member counts and finding totals over the distinct analyses of an archive"""
+        distinct = len(files) - sum(1 for entry in files if 'duplicate_of' in entry)
+        succeeded = distinct - totals['failed_files']
+        summary = {
+            'total_files': len(files) + len(skipped),
+            'analyzed_files': distinct,
+            'duplicate_files': len(files) - distinct,
+            'skipped_files': len(skipped)
+        }
+        summary.update((key, value) for key, value in totals.items() if key != 'quality_scores')
+        summary['average_quality_score'] = totals['quality_scores'] / succeeded if succeeded else 0.0
+        return summary
+    
+    def _get_database_stats(self) -> Dict[str, Any]:
+        """Open connections and per-pool checkout statistics"""
+        pools = self.db_manager.get_pool_stats()
+        return {
+            'connection_count': sum(pool['open'] for pool in pools.values()),
+            'pools': pools
         }
     
     def _validate_analysis_request(self, file_data: Any, filename: str, 
@@ -350,23 +829,29 @@ class AnalysisService:
                 'error': f'File processing failed: {str(e)}'
             }
     
-    def _check_analysis_cache(self, file_hash: str) -> Optional[AnalysisResult]:
-        """Check if analysis exists in cache or database"""
-        # Check memory cache first
-        cached_result = cache.get(f"analysis_hash:{file_hash}")
-        if cached_result:
-            return cached_result
-        
-        # Check database
-        return self.repository.get_analysis_by_hash(file_hash)
+    @staticmethod
+    def _rewind(file_data: Any) -> bool:
+        """Whether the upload can be read again from the start"""
+        if isinstance(file_data, (str, bytes, bytearray, memoryview)):
+            return True
+        # Uploads wrapped by the web framework (werkzeug FileStorage)
+        stream = getattr(file_data, 'stream', file_data) if hasattr(file_data, 'save') else file_data
+        if getattr(stream, 'seekable', lambda: False)():
+            stream.seek(0)
+            return True
+        return False
+    
+    def _check_analysis_cache(self, file_hash: str, db_type: DatabaseType) -> Optional[AnalysisResult]:
+        """Check if the content was analyzed for this dialect under the current rules"""
+        # The repository checks the memory cache before the database
+        return self.repository.get_analysis_by_content(
+            file_hash, db_type.value, self.sql_analyzer.rule_set_version
+        )
     
     def _perform_comprehensive_analysis(self, content: str, filename: str, 
-                                      file_info: FileInfo, options: Dict[str, Any]) -> Optional[AnalysisResult]:
+                                      file_info: FileInfo, db_type: DatabaseType) -> Optional[AnalysisResult]:
         """Perform comprehensive SQL analysis"""
         try:
-            # Determine database type
-            db_type = self._determine_database_type(filename, content, options)
-            
             # Perform analysis
             analysis_result = self.sql_analyzer.analyze_file(content, filename, db_type)
             
@@ -465,10 +950,11 @@ class AnalysisService:
             ))
         
         return AnalysisResult(
-            file_hash=analysis_result.file_hash,
+            file_hash=file_info.hash_sha256 or analysis_result.file_hash,
             filename=file_info.filename,
             processing_time=analysis_result.processing_time,
             database_type=analysis_result.database_type,
+            rule_version=self.sql_analyzer.rule_set_version,
             total_lines=analysis_result.total_lines,
             total_statements=analysis_result.total_statements,
             syntax_errors=syntax_errors,
@@ -484,97 +970,106 @@ class AnalysisService:
             intelligent_comments=[]  # Convert if needed
         )
     
-    def _create_analysis_summary(self, result: AnalysisResult) -> Dict[str, Any]:
+    def _create_analysis_summary(self, summary: AnalysisSummary) -> Dict[str, Any]:
         """Create condensed analysis summary"""
         return {
-            'id': result.id,
-            'filename': result.filename,
-            'database_type': result.database_type.value,
-            'quality_score': result.quality_score,
-            'complexity_score': result.complexity_score,
-            'total_errors': len(result.syntax_errors) + len(result.semantic_errors),
-            'security_issues': len(result.security_vulnerabilities),
-            'performance_issues': len(result.performance_issues),
-            'tables_found': len(result.tables),
-            'processing_time': result.processing_time,
-            'quality_level': result.get_quality_level(),
-            'complexity_level': result.get_complexity_level(),
-            'error_summary': result.get_error_summary(),
-            'security_summary': result.get_security_summary()
+            'id': summary.id,
+            'filename': summary.filename,
+            'database_type': summary.database_type.value,
+            'quality_score': summary.quality_score,
+            'complexity_score': summary.complexity_score,
+            'total_errors': summary.error_count,
+            'security_issues': summary.vulnerability_count,
+            'performance_issues': summary.performance_issue_count,
+            'tables_found': summary.table_count,
+            'processing_time': summary.processing_time,
+            'quality_level': summary.get_quality_level(),
+            'complexity_level': summary.get_complexity_level(),
+            'error_summary': summary.error_summary,
+            'security_summary': summary.security_summary
         }
     
-    def _create_security_analysis(self, result: AnalysisResult) -> Dict[str, Any]:
+    def _create_security_analysis(self, summary: AnalysisSummary, page: FindingsPage) -> Dict[str, Any]:
         """Create detailed security analysis"""
         return {
-            'vulnerabilities': [vuln.to_dict() for vuln in result.security_vulnerabilities],
-            'summary': result.get_security_summary(),
-            'total_vulnerabilities': len(result.security_vulnerabilities),
-            'risk_assessment': self._assess_security_risk(result.security_vulnerabilities),
-            'owasp_categories': list(set(v.owasp_category for v in result.security_vulnerabilities if v.owasp_category)),
-            'cwe_ids': list(set(v.cwe_id for v in result.security_vulnerabilities if v.cwe_id)),
-            'recommendations': [rec for rec in result.recommendations if 'security' in rec.lower() or 'seguridad' in rec.lower()]
+            'vulnerabilities': [vuln.to_dict() for vuln in page.items],
+            'summary': summary.security_summary,
+            'total_vulnerabilities': summary.vulnerability_count,
+            'risk_assessment': self._assess_security_risk(summary.security_summary, summary.vulnerability_count),
+            'owasp_categories': summary.facets.get('owasp_categories', []),
+            'cwe_ids': summary.facets.get('cwe_ids', []),
+            'recommendations': [rec for rec in summary.recommendations if 'security' in rec.lower() or 'seguridad' in rec.lower()],
+            'pagination': self._create_pagination(page)
         }
     
-    def _create_performance_analysis(self, result: AnalysisResult) -> Dict[str, Any]:
+    def _create_performance_analysis(self, summary: AnalysisSummary, page: FindingsPage) -> Dict[str, Any]:
         """Create detailed performance analysis"""
+        impact_counts = summary.facets.get('impact_counts', {})
         return {
-            'issues': [issue.to_dict() for issue in result.performance_issues],
-            'total_issues': len(result.performance_issues),
-            'performance_score': self._calculate_performance_score(result.performance_issues),
-            'optimization_suggestions': self._get_optimization_suggestions(result.performance_issues),
-            'impact_breakdown': self._count_by_impact(result.performance_issues),
-            'recommendations': [rec for rec in result.recommendations if 'performance' in rec.lower() or 'rendimiento' in rec.lower()]
+            'issues': [issue.to_dict() for issue in page.items],
+            'total_issues': summary.performance_issue_count,
+            'performance_score': self._calculate_performance_score(impact_counts),
+            'optimization_suggestions': self._get_optimization_suggestions(summary.facets.get('issue_types', {})),
+            'impact_breakdown': self._count_by_impact(impact_counts),
+            'recommendations': [rec for rec in summary.recommendations if 'performance' in rec.lower() or 'rendimiento' in rec.lower()],
+            'pagination': self._create_pagination(page)
         }
     
-    def _create_schema_analysis(self, result: AnalysisResult) -> Dict[str, Any]:
+    def _create_schema_analysis(self, summary: AnalysisSummary, page: FindingsPage) -> Dict[str, Any]:
         """Create detailed schema analysis"""
         return {
-            'tables': [table.to_dict() for table in result.tables],
-            'relationships': result.relationships,
-            'total_tables': len(result.tables),
-            'total_relationships': len(result.relationships),
-            'schema_complexity': self._calculate_schema_complexity(result.tables, result.relationships),
-            'table_summary': self._create_table_summary(result.tables),
-            'relationship_summary': self._create_relationship_summary(result.relationships)
+            'tables': [table.to_dict() for table in page.items],
+            'relationships': summary.relationships,
+            'total_tables': summary.table_count,
+            'total_relationships': summary.relationship_count,
+            'schema_complexity': self._calculate_schema_complexity(summary.table_count, summary.relationship_count),
+            'table_summary': self._create_table_summary(summary.table_count, summary.facets.get('table_stats', {})),
+            'relationship_summary': self._create_relationship_summary(summary.facets.get('relationship_types', {})),
+            'pagination': self._create_pagination(page)
         }
     
-    def _assess_security_risk(self, vulnerabilities: List[SecurityVulnerability]) -> str:
+    def _create_pagination(self, page: FindingsPage) -> Dict[str, Any]:
+        """Cursor pagination block of a findings page"""
+        return {
+            'next_cursor': page.next_cursor,
+            'limit': page.limit,
+            'returned': len(page.items)
+        }
+    
+    def _assess_security_risk(self, security_summary: Dict[str, int], total: int) -> str:
         """Assess overall security risk level"""
-        if not vulnerabilities:
+        if not total:
             return "Low"
         
-        critical_count = sum(1 for v in vulnerabilities if v.risk_level == ErrorSeverity.CRITICAL)
-        high_count = sum(1 for v in vulnerabilities if v.risk_level == ErrorSeverity.HIGH)
-        
-        if critical_count > 0:
+        if security_summary.get('critical', 0) > 0:
             return "Critical"
-        elif high_count > 0:
+        elif security_summary.get('high', 0) > 0:
             return "High"
-        elif len(vulnerabilities) > 5:
+        elif total > 5:
             return "Medium"
         else:
             return "Low"
     
-    def _calculate_performance_score(self, issues: List[PerformanceIssue]) -> int:
-        """Calculate performance score based on issues"""
-        if not issues:
+    def _calculate_performance_score(self, impact_counts: Dict[str, int]) -> int:
+        """Calculate performance score from issue counts by impact"""
+        if not impact_counts:
             return 100
         
         base_score = 100
-        for issue in issues:
-            if issue.impact == 'high':
-                base_score -= 15
-            elif issue.impact == 'medium':
-                base_score -= 10
+        for impact, count in impact_counts.items():
+            if impact == 'high':
+                base_score -= 15 * count
+            elif impact == 'medium':
+                base_score -= 10 * count
             else:
-                base_score -= 5
+                base_score -= 5 * count
         
         return max(0, base_score)
     
-    def _get_optimization_suggestions(self, issues: List[PerformanceIssue]) -> List[str]:
-        """Get optimization suggestions based on issues"""
+    def _get_optimization_suggestions(self, issue_types) -> List[str]:
+        """Get optimization suggestions based on issue types"""
         suggestions = []
-        issue_types = set(issue.issue_type for issue in issues)
+        issue_types = set(issue_types)
         
         if 'select_star' in issue_types:
             suggestions.append("Especificar solo las columnas necesarias en lugar de usar SELECT *")
@@ -587,20 +1082,17 @@ class AnalysisService:
         
         return suggestions
     
-    def _count_by_impact(self, issues: List[PerformanceIssue]) -> Dict[str, int]:
+    def _count_by_impact(self, impact_counts: Dict[str, int]) -> Dict[str, int]:
         """Count performance issues by impact level"""
         counts = {'high': 0, 'medium': 0, 'low': 0}
-        for issue in issues:
-            impact = issue.impact.lower()
+        for impact, count in impact_counts.items():
+            impact = impact.lower()
             if impact in counts:
-                counts[impact] += 1
+                counts[impact] += count
         return counts
     
-    def _calculate_schema_complexity(self, tables: List, relationships: List) -> str:
+    def _calculate_schema_complexity(self, total_tables: int, total_relationships: int) -> str:
         """Calculate schema complexity level"""
-        total_tables = len(tables)
-        total_relationships = len(relationships)
-        
         if total_tables == 0:
             return "None"
         elif total_tables <= 5 and total_relationships <= 5:
@@ -610,33 +1102,32 @@ class AnalysisService:
         else:
             return "High"
     
-    def _create_table_summary(self, tables: List) -> Dict[str, Any]:
+    def _create_table_summary(self, total_tables: int, table_stats: Dict[str, int]) -> Dict[str, Any]:
         """Create table summary statistics"""
-        if not tables:
+        if not total_tables:
             return {'total_columns': 0, 'total_constraints': 0, 'avg_columns_per_table': 0}
         
-        total_columns = sum(len(table.columns) for table in tables)
-        total_constraints = sum(len(table.constraints) for table in tables)
+        total_columns = table_stats.get('total_columns', 0)
         
         return {
             'total_columns': total_columns,
-            'total_constraints': total_constraints,
-            'avg_columns_per_table': total_columns / len(tables) if tables else 0,
-            'tables_with_primary_keys': sum(1 for table in tables if table.primary_keys),
-            'tables_with_foreign_keys': sum(1 for table in tables if table.foreign_keys)
+            'total_constraints': table_stats.get('total_constraints', 0),
+            'avg_columns_per_table': total_columns / total_tables,
+            'tables_with_primary_keys': table_stats.get('tables_with_primary_keys', 0),
+            'tables_with_foreign_keys': table_stats.get('tables_with_foreign_keys', 0)
         }
     
-    def _create_relationship_summary(self, relationships: List) -> Dict[str, Any]:
+    def _create_relationship_summary(self, relationship_types: Dict[str, int]) -> Dict[str, Any]:
         """Create relationship summary statistics"""
-        if not relationships:
+        if not relationship_types:
             return {'foreign_keys': 0, 'other_relationships': 0}
         
-        foreign_key_count = sum(1 for rel in relationships if rel.get('type') == 'foreign_key')
+        foreign_key_count = relationship_types.get('foreign_key', 0)
         
         return {
             'foreign_keys': foreign_key_count,
-            'other_relationships': len(relationships) - foreign_key_count,
-            'relationship_types': list(set(rel.get('type', 'unknown') for rel in relationships))
+            'other_relationships': sum(relationship_types.values()) - foreign_key_count,
+            'relationship_types': list(relationship_types)
         }
     
     def _update_performance_metrics(self, processing_time: float):
@@ -684,7 +1175,14 @@ class AnalysisService:
     
     def shutdown(self):
         """Gracefully shutdown the service"""
-        self.executor.shutdown(wait=True)
+        self.maintenance.stop()
+        self.executors.shutdown(wait=True)
+        if self.write_behind is not None:
+            # Durability barrier: every returned analysis is committed first
+            if not self.write_behind.close(Config.WRITE_BEHIND['shutdown_timeout']):
+                self.logger.error("Write-behind queue not drained before shutdown")
+        self.sql_analyzer.shutdown()
         self.db_manager.close_all_connections()
         cache.clear_all()
+        cache.stop_cleanup()
         self.logger.info("Analysis service shutdown complete")
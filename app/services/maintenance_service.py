@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+STORAGE MAINTENANCE SERVICE
+Retention, compaction and planner statistics for the analysis store
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config.settings import Config
+from app.models.data_access import AnalysisRepository
+
+class MaintenanceService:
+    """Enforces the retention policy and compacts the database file
+
+    Analyses outside the age, count or size limits are deleted oldest
+    first in batches of batch_size, each in its own short write
+    transaction with a pause in between, so live analyses get the write
+    lock between batches. Freed pages are then returned to the OS with
+    incremental_vacuum in bounded steps and the planner statistics are
+    refreshed with a sampled ANALYZE.
+    """
+
+    def __init__(self, repository: AnalysisRepository, policy: Optional[Dict[str, Any]] = None):
+        self.repository = repository
+        self.db_manager = repository.db_manager
+        self.policy = dict(Config.DATABASE_RETENTION, **(policy or {}))
+        self.logger = logging.getLogger(__name__)
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._run_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def has_limits(self) -> bool:
+        """Whether any retention limit is configured"""
+        return any(self.policy.get(limit) is not None
+                   for limit in ('max_age_days', 'max_analyses', 'max_bytes'))
+
+    def run(self) -> Dict[str, Any]:
+        """Apply the retention policy, compact the file and report reclaimed space"""
+        with self._run_lock:
+            start_time = time.time()
+            before = self.db_manager.get_storage_stats()
+            deleted, batches = self._apply_retention()
+
+            released = 0
+            if before['auto_vacuum'] == 'INCREMENTAL':
+                released = self._release_free_pages()
+            elif deleted:
+                self.logger.warning("auto_vacuum is not INCREMENTAL; freed pages stay in the file "
+                                    "until DatabaseManager.vacuum() is run once")
+            if deleted:
+                self.db_manager.analyze(self.policy.get('analysis_limit'))
+
+            after = self.db_manager.get_storage_stats()
+            report = {
+                'deleted_analyses': deleted,
+                'batches': batches,
+                'released_pages': released,
+                'bytes_before': before['file_bytes'],
+                'bytes_after': after['file_bytes'],
+                'reclaimed_bytes': before['file_bytes'] - after['file_bytes'],
+                'free_bytes': after['freelist_count'] * after['page_size'],
+                'auto_vacuum': after['auto_vacuum'],
+                'duration': time.time() - start_time
+            }
+            self.last_report = report
+            self.logger.info(f"Storage maintenance: deleted {deleted} analyses, "
+                             f"reclaimed {report['reclaimed_bytes']} bytes")
+            return report
+
+    def start(self, interval: Optional[float] = None) -> bool:
+        """Run maintenance in a background thread every interval seconds"""
+        interval = self.policy['interval'] if interval is None else interval
+        if self._thread is not None or not interval:
+            return False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._loop, args=(self._stop, interval), name='storage-maintenance', daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Stop the background thread, letting a running batch finish"""
+        thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._stop = threading.Event()
+
+    def _loop(self, stop: threading.Event, interval: float) -> None:
+        while not stop.wait(interval):
+            try:
+                self.run()
+            except Exception as e:
+                self.logger.error(f"Storage maintenance failed: {str(e)}")
+
+    def _apply_retention(self):
+        """Delete batches until every limit holds; returns (analyses, batches)"""
+        batch_size = self.policy['batch_size']
+        max_bytes = self.policy.get('max_bytes')
+        # Analyses saved during the run are left for the next one, so a steady
+        # stream of new analyses cannot keep the run going
+        started_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        deleted = batches = 0
+        while not self._stop.is_set():
+            ids = self.repository.select_retention_batch(
+                batch_size, self.policy.get('max_age_days'), self.policy.get('max_analyses'), started_at
+            )
+            if not ids and max_bytes is not None and \
+                    self.db_manager.get_storage_stats()['used_bytes'] > max_bytes:
+                ids = self.repository.select_oldest(batch_size, started_at)
+            if not ids:
+                break
+            # Trend rollups keep counting what retention removes
+            deleted += self.repository.delete_analyses(ids, keep_rollups=True)
+            batches += 1
+            # Leave the write lock free for live analyses between batches
+            time.sleep(self.policy['batch_pause'])
+        return deleted, batches
+
+    def _release_free_pages(self) -> int:
+        """Run incremental_vacuum in steps until the free list is empty"""
+        released = 0
+        while not self._stop.is_set():
+            step = self.db_manager.incremental_vacuum(self.policy['vacuum_pages'])
+            released += step
+            if step < self.policy['vacuum_pages']:
+                break
+            time.sleep(self.policy['batch_pause'])
+        return released
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+EXECUTOR REGISTRY
+Process-wide named thread pools with bounded queues and usage metrics
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.config.settings import Config
+
+class BoundedExecutor:
+    """Thread pool that admits at most max_workers + max_queue pending tasks
+
+    Submitting to a full pool blocks until a task finishes; with a
+    submit_timeout it raises queue.Full instead of waiting forever. A
+    task's slot is released when its future is done, so cancelled tasks
+    that never ran free their slot too.
+    """
+
+    def __init__(self, name: str, max_workers: int = 4, max_queue: int = 64,
+                 submit_timeout: Optional[float] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.submit_timeout = submit_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._created_at = time.time()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'cancelled': 0,
+            'queued': 0,
+            'active': 0,
+            'busy_time': 0.0
+        }
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule a task, waiting for room in the queue if necessary"""
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise queue.Full(f"Executor '{self.name}' queue is full")
+
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['queued'] += 1
+        try:
+            future = self._executor.submit(self._run, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._stats['submitted'] -= 1
+                self._stats['queued'] -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future) -> None:
+        """Free a finished or cancelled task's slot"""
+        if future.cancelled():
+            # Cancelled while queued: _run never saw it
+            with self._lock:
+                self._stats['queued'] -= 1
+                self._stats['cancelled'] += 1
+        self._slots.release()
+
+    def _run(self, fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        """Run a task, tracking queue depth, active workers and busy time"""
+        with self._lock:
+            self._stats['queued'] -= 1
+            self._stats['active'] += 1
+        start_time = time.time()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._stats['active'] -= 1
+                self._stats['failed' if failed else 'completed'] += 1
+                self._stats['busy_time'] += time.time() - start_time
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, utilization and task counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        uptime = max(time.time() - self._created_at, 1e-9)
+        return {
+            'name': self.name,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'queue_depth': stats['queued'],
+            'active_workers': stats['active'],
+            'utilization': stats['active'] / self.max_workers,
+            'average_utilization': min(1.0, stats['busy_time'] / (uptime * self.max_workers)),
+            'submitted': stats['submitted'],
+            'completed': stats['completed'],
+            'failed': stats['failed'],
+            'rejected': stats['rejected'],
+            'cancelled': stats['cancelled']
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting tasks and optionally wait for the queued ones"""
+        self._executor.shutdown(wait=wait)
+
+class ExecutorRegistry:
+    """Named executors shared by every service in the process
+
+    Pools are created on first use from their configured settings, so
+    importing the registry starts no threads.
+    """
+
+    def __init__(self, pool_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.logger = logging.getLogger(__name__)
+        self._settings = {name: dict(settings) for name, settings in
+                          (pool_settings or Config.EXECUTOR_POOLS).items()}
+        self._executors: Dict[str, BoundedExecutor] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name: str, **settings) -> None:
+        """Set pool options (max_workers, max_queue, submit_timeout)
+
+        Applies to the pool the next time it is created, i.e. on first use
+        or after a shutdown.
+        """
+        with self._lock:
+            self._settings.setdefault(name, {}).update(settings)
+
+    def get(self, name: str) -> BoundedExecutor:
+        """Executor registered under a name, started on first use"""
+        with self._lock:
+            executor = self._executors.get(name)
+            if executor is None:
+                if name not in self._settings:
+                    raise KeyError(f"Unknown executor pool: {name}")
+                executor = BoundedExecutor(name, **self._settings[name])
+                self._executors[name] = executor
+            return executor
+
+    def submit(self, name: str, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule a task on a named pool"""
+        return self.get(name).submit(fn, *args, **kwargs)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Metrics of every running pool"""
+        with self._lock:
+            executors = list(self._executors.values())
+        return {executor.name: executor.metrics() for executor in executors}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down every pool; later submissions start fresh ones"""
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait)
+        if executors:
+            self.logger.info(f"Shut down executors: {', '.join(executor.name for executor in executors)}")
+
+# Global executor registry
+executors = ExecutorRegistry()
@@ -5,24 +5,33 @@ Common utility functions for the application
 """
 
 import os
+import sys
 import time
 import hashlib
 import logging
+import threading
 from typing import Dict, Any, List, Optional, Union
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 
+from lru_cache import LRUCache
+from upload_decompression import available_formats, split_compression
+
 class FileHelper:
     """File handling utilities"""
     
     @staticmethod
     def is_allowed_file(filename: str, allowed_extensions: set) -> bool:
-        """Check if file has allowed extension"""
+        """Check if file has allowed extension, optionally followed by a compressed one"""
         if not filename:
             return False
         
-        return '.' in filename and \
-               '.' + filename.rsplit('.', 1)[1].lower() in {ext.lstrip('.') for ext in allowed_extensions}
+        # dump.sql.gz is checked as dump.sql
+        stem, compression = split_compression(filename.lower())
+        if compression and compression not in available_formats().values():
+            return False
+        _, ext = os.path.splitext(stem)
+        return bool(ext) and ext in {'.' + allowed.lstrip('.') for allowed in allowed_extensions}
     
     @staticmethod
     def secure_filename_with_timestamp(filename: str) -> str:
@@ -283,42 +292,168 @@ class SecurityHelper:
         
         return sanitized
 
+# Collections longer than this are sized from an evenly spaced sample
+SIZE_SAMPLE_ITEMS = 64
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Approximate memory held by a value and what it references, in bytes
+    
+    Large lists and tuples are extrapolated from a sample of their items, so
+    sizing a result with many thousands of findings stays cheap.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 4 or isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(key, _depth + 1) + estimate_size(item, _depth + 1)
+                          for key, item in value.items())
+    if isinstance(value, (list, tuple)) and len(value) > SIZE_SAMPLE_ITEMS:
+        step = len(value) / SIZE_SAMPLE_ITEMS
+        sample = sum(estimate_size(value[int(i * step)], _depth + 1) for i in range(SIZE_SAMPLE_ITEMS))
+        return size + sample * len(value) // SIZE_SAMPLE_ITEMS
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item, _depth + 1) for item in value)
+    if hasattr(value, '__dict__'):
+        return size + estimate_size(vars(value), _depth + 1)
+    return size
+
 class CacheHelper:
-    """Caching utilities"""
+    """Thread-safe TTL cache with LRU eviction under a memory budget
+    
+    Keys are spread over lock-striped LRU segments, each holding an equal
+    share of the entry budget. The byte budget is shared: any value up to
+    max_bytes can be stored, and when the stripes together exceed it the
+    oldest entries of the heaviest other stripes are evicted. Values larger
+    than the whole budget are rejected and logged. Expired entries are dropped when
+    read and by a background sweep every cleanup_interval seconds.
+    Statistics are kept per namespace, the key prefix before the first ':'.
+    """
     
-    def __init__(self):
-        self._cache = {}
-        self._timestamps = {}
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024,
+                 default_ttl: float = 3600, stripes: int = 16, cleanup_interval: float = 60):
+        self.default_ttl = default_ttl
+        self.cleanup_interval = cleanup_interval
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._stripes = [
+            LRUCache(
+                max_entries=max(1, max_entries // stripes),
+                max_bytes=max_bytes,
+                sizeof=estimate_size,
+                on_remove=self._record_removal
+            )
+            for _ in range(stripes)
+        ]
+        self._stats_locks = [threading.Lock() for _ in range(stripes)]
+        self._stats: List[Dict[str, Dict[str, int]]] = [{} for _ in range(stripes)]
+        self._cleanup_thread: Optional[threading.Thread] = None
+        self._cleanup_stop = threading.Event()
+        self._cleanup_lock = threading.Lock()
+        self._budget_lock = threading.Lock()
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get value from cache"""
-        return self._cache.get(key, default)
+        stripe = self._stripe_index(key)
+        missing = object()
+        value = self._stripes[stripe].get(key, missing)
+        self._count(stripe, key, 'misses' if value is missing else 'hits')
+        return default if value is missing else value
     
-    def set(self, key: str, value: Any, ttl: int = 3600) -> None:
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
         """Set value in cache with TTL"""
-        self._cache[key] = value
-        self._timestamps[key] = time.time() + ttl
+        stripe = self._stripe_index(key)
+        stored = self._stripes[stripe].set(key, value, ttl=self.default_ttl if ttl is None else ttl)
+        self._count(stripe, key, 'sets' if stored else 'rejected')
+        if stored:
+            self._enforce_byte_budget(stripe)
+        else:
+            self.logger.warning(f"Cache rejected {key}: value exceeds the {self.max_bytes} byte budget")
+        self._ensure_cleanup_thread()
     
     def delete(self, key: str) -> None:
         """Delete value from cache"""
-        self._cache.pop(key, None)
-        self._timestamps.pop(key, None)
+        self._stripes[self._stripe_index(key)].delete(key)
     
-    def clear_expired(self) -> None:
+    def clear_expired(self) -> int:
         """Clear expired cache entries"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, expiry in self._timestamps.items()
-            if current_time > expiry
-        ]
-        
-        for key in expired_keys:
-            self.delete(key)
+        return sum(stripe.clear_expired() for stripe in self._stripes)
     
     def clear_all(self) -> None:
         """Clear all cache entries"""
-        self._cache.clear()
-        self._timestamps.clear()
+        for stripe in self._stripes:
+            stripe.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Entry count, memory use and per-namespace counters"""
+        namespaces: Dict[str, Dict[str, int]] = {}
+        for lock, stripe_stats in zip(self._stats_locks, self._stats):
+            with lock:
+                for namespace, counters in stripe_stats.items():
+                    totals = namespaces.setdefault(namespace, {})
+                    for name, count in counters.items():
+                        totals[name] = totals.get(name, 0) + count
+        
+        for counters in namespaces.values():
+            lookups = counters.get('hits', 0) + counters.get('misses', 0)
+            counters['hit_rate'] = (counters.get('hits', 0) / lookups) * 100 if lookups else 0.0
+        
+        return {
+            'entries': sum(len(stripe) for stripe in self._stripes),
+            'bytes': sum(stripe.current_bytes for stripe in self._stripes),
+            'namespaces': namespaces
+        }
+    
+    def stop_cleanup(self) -> None:
+        """Stop the background expiry sweep; the next set restarts it"""
+        with self._cleanup_lock:
+            thread = self._cleanup_thread
+            self._cleanup_thread = None
+            self._cleanup_stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+    
+    def _ensure_cleanup_thread(self) -> None:
+        """Start the background expiry sweep on first use"""
+        if self._cleanup_thread is not None or not self.cleanup_interval:
+            return
+        with self._cleanup_lock:
+            if self._cleanup_thread is None:
+                self._cleanup_stop = threading.Event()
+                self._cleanup_thread = threading.Thread(
+                    target=self._cleanup_loop, args=(self._cleanup_stop,), name='cache-cleanup', daemon=True
+                )
+                self._cleanup_thread.start()
+    
+    def _cleanup_loop(self, stop: threading.Event) -> None:
+        """Periodically drop expired entries until stopped"""
+        while not stop.wait(self.cleanup_interval):
+            self.clear_expired()
+    
+    def _enforce_byte_budget(self, written: int) -> None:
+        """Evict from the heaviest stripes until the shared byte budget holds
+        
+        The stripe just written to is trimmed last so the new value survives.
+        """
+        with self._budget_lock:
+            while sum(stripe.current_bytes for stripe in self._stripes) > self.max_bytes:
+                order = sorted(range(len(self._stripes)),
+                               key=lambda index: (index == written, -self._stripes[index].current_bytes))
+                if not any(self._stripes[index].evict_oldest() for index in order):
+                    break
+    
+    def _stripe_index(self, key: str) -> int:
+        return hash(key) % len(self._stripes)
+    
+    def _count(self, stripe: int, key: str, counter: str) -> None:
+        """Increment a counter of the key's namespace"""
+        namespace = key.split(':', 1)[0] if ':' in key else ''
+        with self._stats_locks[stripe]:
+            counters = self._stats[stripe].setdefault(namespace, {})
+            counters[counter] = counters.get(counter, 0) + 1
+    
+    def _record_removal(self, key: str, value: Any, reason: str) -> None:
+        """Count evictions and expirations reported by a stripe"""
+        self._count(self._stripe_index(key), key, 'evictions' if reason == 'evicted' else 'expirations')
 
 class ConfigHelper:
     """Configuration utilities"""
@@ -13,6 +13,20 @@ from dataclasses import dataclass
 
 from app.models.analysis_models import DatabaseType, ErrorSeverity
 from app.utils.helpers import LoggingHelper
+from rule_engine import Rule, RuleSet
+
+# Malicious patterns to detect, compiled once into a combined scan
+MALICIOUS_CONTENT_RULES = RuleSet(Rule(pattern, pattern, re.IGNORECASE) for pattern in [
+    r'<script[^>]*>',  # Script tags
+    r'javascript:',  # JavaScript URLs
+    r'eval\s*\(',  # Eval functions
+    r'exec\s*\(',  # Exec functions
+    r'system\s*\(',  # System calls
+    r'xp_cmdshell',  # SQL Server command shell
+    r'sp_oacreate',  # SQL Server OLE automation
+    r'load_file\s*\(',  # MySQL file loading
+    r'into\s+outfile',  # MySQL file writing
+])
 
 @dataclass
 class ValidationRule:
@@ -500,33 +514,20 @@ class EnterpriseValidator:
         """Validate content for malicious patterns"""
         content = context.get('content', '')
         
-        # Malicious patterns to detect
-        malicious_patterns = [
-            r'<script[^>]*>',  # Script tags
-            r'javascript:',  # JavaScript URLs
-            r'eval\s*\(',  # Eval functions
-            r'exec\s*\(',  # Exec functions
-            r'system\s*\(',  # System calls
-            r'xp_cmdshell',  # SQL Server command shell
-            r'sp_oacreate',  # SQL Server OLE automation
-            r'load_file\s*\(',  # MySQL file loading
-            r'into\s+outfile',  # MySQL file writing
-        ]
-        
+        # One combined scan finds the matching rules; only those are counted
         detected_patterns = []
-        for pattern in malicious_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            if matches:
-                detected_patterns.append({
-                    'pattern': pattern,
-                    'matches': len(matches),
-                    'examples': matches[:3]  # First 3 matches
-                })
+        for rule in MALICIOUS_CONTENT_RULES.matches(content):
+            matches = rule.regex.findall(content)
+            detected_patterns.append({
+                'pattern': rule.pattern,
+                'matches': len(matches),
+                'examples': matches[:3]  # First 3 matches
+            })
         
         is_valid = len(detected_patterns) == 0
         details = {
             'detected_patterns': detected_patterns,
-            'patterns_checked': len(malicious_patterns),
+            'patterns_checked': len(MALICIOUS_CONTENT_RULES),
             'content_length': len(content)
         }
         
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+PERSISTENCE BENCHMARK
+Rows per second written by AnalysisRepository.save_analysis_result
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from app.models.analysis_models import (
+    AnalysisResult, DatabaseType, ErrorSeverity, SQLError,
+    SecurityVulnerability, PerformanceIssue
+)
+from app.models.data_access import DatabaseManager, AnalysisRepository
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+def build_result(findings: int) -> AnalysisResult:
+    """Analysis result with the given number of findings spread over the child tables"""
+    severities = list(ErrorSeverity)
+    errors = findings // 2
+    vulnerabilities = findings // 4
+    issues = findings - errors - vulnerabilities
+
+    return AnalysisResult(
+        file_hash=f"benchmark-{findings}-{time.time_ns()}",
+        filename=f"benchmark_{findings}.sql",
+        database_type=DatabaseType.MYSQL,
+        total_lines=findings,
+        total_statements=findings,
+        syntax_errors=[
+            SQLError(line_number=i + 1, column=1, error_type='syntax_missing_semicolon',
+                     severity=severities[i % len(severities)],
+                     message='Statement missing semicolon terminator',
+                     suggestion='Add semicolon at the end of the statement', auto_fixable=True)
+            for i in range(errors)
+        ],
+        security_vulnerabilities=[
+            SecurityVulnerability(line_number=i + 1, vulnerability_type='SQL_INJECTION',
+                                  risk_level=severities[i % len(severities)],
+                                  description='Potential SQL injection through string concatenation',
+                                  mitigation='Use parameterized queries',
+                                  code_snippet="SELECT * FROM users WHERE id = '" + str(i) + "'",
+                                  cwe_id='CWE-89', owasp_category='A03:2021')
+            for i in range(vulnerabilities)
+        ],
+        performance_issues=[
+            PerformanceIssue(line_number=i + 1, issue_type='SELECT_STAR', impact='MEDIUM',
+                             description='SELECT * retrieves unnecessary columns',
+                             recommendation='List only the required columns',
+                             code_snippet='SELECT * FROM orders', estimated_improvement='10-30%')
+            for i in range(issues)
+        ]
+    )
+
+def run_benchmark(sizes, db_dir: str, layout: str = 'rows'):
+    """Save one result per size into a fresh database and time it"""
+    results = []
+    for findings in sizes:
+        db_path = os.path.join(db_dir, f"benchmark_{layout}_{findings}.db")
+        db_manager = DatabaseManager(db_path)
+        repository = AnalysisRepository(db_manager, storage_layout=layout)
+        result = build_result(findings)
+
+        start_time = time.perf_counter()
+        success = repository.save_analysis_result(result)
+        elapsed = time.perf_counter() - start_time
+        with db_manager.get_connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db_manager.close_all_connections()
+
+        rows = findings + 1
+        results.append({
+            'findings': findings,
+            'success': success,
+            'seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed > 0 else float('inf'),
+            'db_size': os.path.getsize(db_path)
+        })
+    return results
+
+def main():
+    """Main benchmark function"""
+    parser = argparse.ArgumentParser(description='Benchmark analysis result persistence')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Number of findings per analysis (default: 10000 100000 1000000)')
+    parser.add_argument('--layout', choices=AnalysisRepository.STORAGE_LAYOUTS, default='rows',
+                        help='Findings storage layout (default: rows)')
+    args = parser.parse_args()
+
+    print(f"🚀 PERSISTENCE BENCHMARK ({args.layout} layout)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        results = run_benchmark(args.sizes, db_dir, args.layout)
+
+    failed = False
+    for item in results:
+        status = '✅' if item['success'] else '❌'
+        failed = failed or not item['success']
+        print(f"{status} {item['findings']:>9,} findings: {item['seconds']:8.3f}s "
+              f"{item['rows_per_second']:>12,.0f} rows/s "
+              f"{item['db_size'] / (1024 * 1024):8.1f} MB")
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
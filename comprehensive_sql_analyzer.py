@@ -5,16 +5,25 @@ Enterprise-grade SQL analysis with multi-database support and real-time processi
 """
 
 import re
+import sys
+import copy
 import json
 import time
 import hashlib
+import itertools
 import threading
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple, Set
-from dataclasses import dataclass
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple, Set
+from dataclasses import dataclass, replace
 from enum import Enum
-import concurrent.futures
 import logging
+import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from lru_cache import LRUCache
+from rule_engine import RuleSet
+from sql_lexer import SQLLexer, StatementIndex
 
 class DatabaseType(Enum):
     """Supported database types"""
@@ -28,6 +37,11 @@ class DatabaseType(Enum):
     REDIS = "redis"
     GENERIC = "generic"
 
+# Dialects whose string literals follow standard SQL, where a backslash is an
+# ordinary character; MySQL and unknown content keep backslash escapes
+STANDARD_LITERAL_DIALECTS = {DatabaseType.POSTGRESQL, DatabaseType.ORACLE,
+                             DatabaseType.SQL_SERVER, DatabaseType.SQLITE}
+
 @dataclass
 class SQLError:
     """SQL Error representation"""
@@ -71,15 +85,74 @@ class AnalysisResult:
     corrected_sql: str
     intelligent_comments: List[Dict[str, Any]]
 
+@dataclass
+class StatementFindings:
+    """Findings of a single statement, independent of its place in the file
+    
+    Errors carry their offset in the statement and findings leave line
+    numbers and snippets empty, so one cached entry serves every occurrence
+    of the statement.
+    """
+    syntax_errors: List[Tuple[int, SQLError]]
+    missing_semicolon: Optional[Tuple[int, SQLError]]
+    semantic_errors: List[Tuple[int, SQLError]]
+    performance_issues: List[Dict[str, Any]]
+    security_vulnerabilities: List[Dict[str, Any]]
+    tables: List[TableInfo]
+    relationships: List[Dict[str, Any]]
+    comments: List[Dict[str, Any]]
+    complexity: int
+
+def estimate_result_size(result: AnalysisResult) -> int:
+    """Approximate memory held by an analysis result, in bytes
+    
+    The corrected SQL copy of the input dominates; findings are counted at
+    a flat per-item cost.
+    """
+    findings = (len(result.syntax_errors) + len(result.semantic_errors) + len(result.performance_issues) +
+                len(result.security_vulnerabilities) + len(result.intelligent_comments) +
+                len(result.tables) + len(result.relationships))
+    return sys.getsizeof(result.corrected_sql) + 512 * findings
+
 class ComprehensiveSQLAnalyzer:
     """Main SQL Analysis Engine with multi-database support"""
     
-    def __init__(self):
+    # Bump when the statement checks change so cached findings are not reused
+    ANALYSIS_VERSION = 1
+    
+    # Process mode only pays off once there are enough statements to analyze
+    PROCESS_MIN_STATEMENTS = 2000
+    PROCESS_CHUNK_SIZE = 1000
+    
+    # AnalysisResult fields that cached results hold as tuples
+    RESULT_LIST_FIELDS = ('syntax_errors', 'semantic_errors', 'performance_issues', 'security_vulnerabilities',
+                          'tables', 'relationships', 'recommendations', 'intelligent_comments')
+    
+    def __init__(self, statement_cache_size: int = 200000, process_workers: int = 0,
+                 result_cache_entries: int = 64, result_cache_bytes: int = 256 * 1024 * 1024,
+                 result_cache_ttl: Optional[float] = None):
         self.logger = logging.getLogger(__name__)
         self.setup_database_patterns()
         self.setup_analysis_rules()
-        self._analysis_cache = {}
-        self._cache_lock = threading.Lock()
+        
+        # Whole-file results, bounded by count and estimated size
+        self._analysis_cache = LRUCache(
+            max_entries=result_cache_entries,
+            max_bytes=result_cache_bytes,
+            ttl=result_cache_ttl,
+            sizeof=estimate_result_size
+        )
+        
+        # Findings per statement, keyed by statement text, dialect and rule set
+        self._statement_cache = LRUCache(max_entries=statement_cache_size)
+        
+        # Opt-in process mode: statements are sharded across a persistent pool
+        self.process_workers = process_workers
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_pool_version: Optional[str] = None
+        self._pool_lock = threading.Lock()
+        self.lexer = SQLLexer()
+        self.standard_lexer = SQLLexer(backslash_escapes=False)
     
     def setup_database_patterns(self):
         """Setup database-specific patterns and keywords"""
@@ -196,6 +269,14 @@ class ComprehensiveSQLAnalyzer:
                 'mitigation': 'Use environment variables or secure storage'
             }
         ]
+        
+        self.compile_analysis_rules()
+    
+    def compile_analysis_rules(self):
+        """Compile rule patterns once into combined scans"""
+        self.performance_rule_set = RuleSet.from_dicts(self.performance_rules, 'issue_type')
+        self.security_rule_set = RuleSet.from_dicts(self.security_rules, 'vulnerability_type')
+        self.rule_set_version = self._compute_rule_set_version()
     
     def analyze_file(self, file_content: str, filename: str = "unknown.sql", 
                     database_type: DatabaseType = DatabaseType.GENERIC) -> AnalysisResult:
@@ -204,45 +285,43 @@ class ComprehensiveSQLAnalyzer:
         
         # Generate file hash for caching
         file_hash = hashlib.sha256(file_content.encode()).hexdigest()
+        cache_key = f'{file_hash}:{database_type.value}:{self.rule_set_version}'
         
-        # Check cache
-        with self._cache_lock:
-            if file_hash in self._analysis_cache:
-                cached_result = self._analysis_cache[file_hash]
-                cached_result.processing_time = time.time() - start_time
-                return cached_result
+        # Check cache; hits share the cached findings, held in tuples so they
+        # cannot be reordered or dropped, and callers must not modify the
+        # finding objects themselves
+        cached_result = self._analysis_cache.get(cache_key)
+        if cached_result is not None:
+            return replace(cached_result, processing_time=time.time() - start_time)
         
         try:
             # Detect database type if not specified
             if database_type == DatabaseType.GENERIC:
                 database_type = self.detect_database_type(file_content)
             
-            # Split into lines and statements
-            lines = file_content.split('\n')
-            statements = self.split_statements(file_content)
+            # Split into statements, keeping their spans for line lookups
+            index = self.lexer_for(database_type).index_statements(file_content)
+            statements = index.statements
             
-            # Parallel analysis
-            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-                # Submit analysis tasks
-                syntax_future = executor.submit(self.analyze_syntax, statements, lines, database_type)
-                semantic_future = executor.submit(self.analyze_semantics, statements, lines)
-                performance_future = executor.submit(self.analyze_performance, statements, lines)
-                security_future = executor.submit(self.analyze_security, statements, lines)
-                schema_future = executor.submit(self.analyze_schema, statements, database_type)
-                
-                # Collect results
-                syntax_errors = syntax_future.result()
-                semantic_errors = semantic_future.result()
-                performance_issues = performance_future.result()
-                security_vulnerabilities = security_future.result()
-                tables, relationships = schema_future.result()
+            # Only new or changed statements are analyzed, the rest come
+            # from the statement cache
+            findings = self.analyze_statements(statements, database_type)
             
-            # Generate intelligent comments
-            intelligent_comments = self.generate_intelligent_comments(statements, lines)
+            # Place per-statement findings at their source lines
+            located = self.locate_findings(findings, index)
+            syntax_errors = located['syntax_errors']
+            semantic_errors = located['semantic_errors']
+            performance_issues = located['performance_issues']
+            security_vulnerabilities = located['security_vulnerabilities']
+            tables = located['tables']
+            relationships = located['relationships']
+            intelligent_comments = located['intelligent_comments']
             
             # Calculate scores
             quality_score = self.calculate_quality_score(syntax_errors, semantic_errors, performance_issues)
-            complexity_score = self.calculate_complexity_score(statements)
+            complexity_score = self._normalize_complexity(
+                sum(statement_findings.complexity for statement_findings in findings), len(findings)
+            )
             
             # Generate corrected SQL
             corrected_sql = self.generate_corrected_sql(file_content, syntax_errors, semantic_errors)
@@ -257,7 +336,7 @@ class ComprehensiveSQLAnalyzer:
                 file_hash=file_hash,
                 processing_time=time.time() - start_time,
                 database_type=database_type,
-                total_lines=len(lines),
+                total_lines=index.line_count,
                 total_statements=len(statements),
                 syntax_errors=syntax_errors,
                 semantic_errors=semantic_errors,
@@ -273,8 +352,7 @@ class ComprehensiveSQLAnalyzer:
             )
             
             # Cache result
-            with self._cache_lock:
-                self._analysis_cache[file_hash] = result
+            self._analysis_cache.set(cache_key, self._freeze_result(result))
             
             return result
             
@@ -282,6 +360,325 @@ class ComprehensiveSQLAnalyzer:
             self.logger.error(f"Analysis failed: {str(e)}")
             raise
     
+    def analyze_stream(self, chunks: Iterable[str], filename: str = "unknown.sql",
+                       database_type: DatabaseType = DatabaseType.GENERIC) -> Iterator[Dict[str, Any]]:
+        """Analyze SQL text arriving in chunks, yielding findings as statements complete
+        
+        Statements are checked batch by batch while the stream is read, so
+        memory is bounded by the largest statement instead of the file. Each
+        'findings' event carries the located findings of a run of statements;
+        a final 'summary' event carries the scores and recommendations. The
+        database type is detected from the first chunk when not given, and
+        no corrected SQL is produced since that needs the whole file.
+        """
+        start_time = time.time()
+        summary = {
+            'total_lines': 0,
+            'total_statements': 0,
+            'syntax_errors': 0,
+            'semantic_errors': 0,
+            'performance_issues': 0,
+            'security_vulnerabilities': 0,
+            'tables': 0
+        }
+        deductions = 0
+        total_complexity = 0
+        # One finding per kind is enough to derive the recommendations
+        samples = {'syntax_errors': [], 'semantic_errors': [], 'performance_issues': {}, 'security_vulnerabilities': {}}
+        
+        # The last statement of each batch is held back until we know whether
+        # another statement follows it
+        pending = None
+        
+        # The dialect decides how literals are lexed, so it is settled first
+        chunks = iter(chunks)
+        first_chunk = next(chunks, '')
+        if database_type == DatabaseType.GENERIC:
+            database_type = self.detect_database_type(first_chunk)
+        lexer = self.lexer_for(database_type)
+        
+        for index in lexer.iter_statement_batches(itertools.chain([first_chunk], chunks)):
+            summary['total_lines'] = index.base_line + index.line_count
+            if not index.statements:
+                continue
+            
+            # Dumps are mostly unique statements, so streamed findings are not
+            # added to the statement cache to keep memory bounded
+            findings = self.analyze_statements(index.statements, database_type, cache_results=False)
+            first_statement = summary['total_statements']
+            
+            parts = []
+            if pending:
+                parts.append(self.locate_findings([pending[0]], pending[1], pending[2], followed=True))
+                first_statement -= 1
+            parts.append(self.locate_findings(findings[:-1], index, followed=True))
+            pending = (findings[-1], index, len(findings) - 1)
+            
+            summary['total_statements'] += len(findings)
+            total_complexity += sum(statement_findings.complexity for statement_findings in findings)
+            statement_count = summary['total_statements'] - 1 - first_statement
+            if statement_count:
+                event = self._stream_event(parts, first_statement, statement_count)
+                deductions += self._accumulate_stream_event(event, summary, samples)
+                yield event
+        
+        if pending:
+            event = self._stream_event(
+                [self.locate_findings([pending[0]], pending[1], pending[2])], summary['total_statements'] - 1, 1
+            )
+            deductions += self._accumulate_stream_event(event, summary, samples)
+            yield event
+        
+        summary.update({
+            'type': 'summary',
+            'filename': filename,
+            'database_type': database_type.value,
+            'quality_score': max(0, 100 - deductions),
+            'complexity_score': self._normalize_complexity(total_complexity, summary['total_statements']),
+            'recommendations': self.generate_recommendations(
+                samples['syntax_errors'], samples['semantic_errors'],
+                list(samples['performance_issues'].values()), list(samples['security_vulnerabilities'].values())
+            ),
+            'processing_time': time.time() - start_time
+        })
+        yield summary
+    
+    @staticmethod
+    def _stream_event(parts: List[Dict[str, List[Any]]], first_statement: int, statement_count: int) -> Dict[str, Any]:
+        """Combine located findings into a single stream event"""
+        event = {'type': 'findings', 'first_statement': first_statement, 'statement_count': statement_count}
+        for located in parts:
+            for kind, items in located.items():
+                event.setdefault(kind, []).extend(items)
+        return event
+    
+    def _accumulate_stream_event(self, event: Dict[str, Any], summary: Dict[str, Any],
+                                 samples: Dict[str, Any]) -> int:
+        """Update running totals with an event and return its quality deductions"""
+        for kind in ('syntax_errors', 'semantic_errors', 'performance_issues', 'security_vulnerabilities', 'tables'):
+            summary[kind] += len(event.get(kind, []))
+        for kind in ('syntax_errors', 'semantic_errors'):
+            if event.get(kind) and not samples[kind]:
+                samples[kind].append(event[kind][0])
+        for issue in event.get('performance_issues', []):
+            samples['performance_issues'].setdefault(issue['type'], issue)
+        for vulnerability in event.get('security_vulnerabilities', []):
+            samples['security_vulnerabilities'].setdefault(vulnerability['vulnerability_type'], vulnerability)
+        return self._quality_deductions(
+            event.get('syntax_errors', []), event.get('semantic_errors', []), event.get('performance_issues', [])
+        )
+    
+    def analyze_statements(self, statements: List[str], database_type: DatabaseType,
+                           cache_results: bool = True) -> List[StatementFindings]:
+        """Findings for each statement, reusing cached ones where possible
+        
+        With cache_results off, cached findings are still used but new ones
+        are not stored.
+        """
+        keys = [self._statement_key(statement, database_type) for statement in statements]
+        
+        # Hits become the most recently used, so hot statements outlive one-off files
+        findings = self._statement_cache.get_many(keys)
+        
+        pending = {}
+        for i, statement in enumerate(statements):
+            if findings[i] is None:
+                pending.setdefault(keys[i], statement)
+        
+        if self.process_workers and len(pending) >= self.PROCESS_MIN_STATEMENTS:
+            results = self._analyze_in_processes(list(pending.values()), database_type)
+        else:
+            results = self.analyze_batch(list(pending.values()), database_type)
+        computed = dict(zip(pending, results))
+        
+        for i, key in enumerate(keys):
+            if findings[i] is None:
+                findings[i] = computed[key]
+        
+        if computed and cache_results:
+            self._statement_cache.set_many(computed)
+        
+        return findings
+    
+    def analyze_batch(self, statements: List[str], database_type: DatabaseType) -> List[StatementFindings]:
+        """Run every check on each statement, prefiltering the pattern rules once for all of them
+        
+        The trigger literals of the performance and security rules are
+        searched in a single pass over the batch, so a statement only runs
+        the regex rules whose triggers it contains.
+        """
+        text = '\n'.join(statements)
+        spans = []
+        start = 0
+        for statement in statements:
+            spans.append((start, start + len(statement)))
+            start += len(statement) + 1
+        candidates = zip(self.performance_rule_set.span_candidates(text, spans),
+                         self.security_rule_set.span_candidates(text, spans))
+        return [self.analyze_statement(statement, database_type, statement_candidates)
+                for statement, statement_candidates in zip(statements, candidates)]
+    
+    def analyze_statement(self, statement: str, database_type: DatabaseType,
+                          candidates: Optional[Tuple[Tuple[int, ...], Tuple[int, ...]]] = None) -> StatementFindings:
+        """Run every check on a single statement
+        
+        candidates holds the performance and security rules to run, as
+        found by analyze_batch; by default every rule is tried.
+        """
+        performance_candidates, security_candidates = candidates or (None, None)
+        statement_upper = statement.upper()
+        syntax_errors, missing_semicolon = self.analyze_syntax(statement, statement_upper, database_type)
+        tables, relationships = self.analyze_schema(statement, statement_upper, database_type)
+        
+        return StatementFindings(
+            syntax_errors=syntax_errors,
+            missing_semicolon=missing_semicolon,
+            semantic_errors=self.analyze_semantics(statement, statement_upper),
+            performance_issues=self.analyze_performance(statement, statement_upper, performance_candidates),
+            security_vulnerabilities=self.analyze_security(statement, security_candidates),
+            tables=tables,
+            relationships=relationships,
+            comments=self.generate_intelligent_comments(statement_upper),
+            complexity=self._statement_complexity(statement_upper)
+        )
+    
+    def _analyze_in_processes(self, statements: List[str], database_type: DatabaseType) -> List[StatementFindings]:
+        """Analyze statements in chunks on the process pool, keeping their order
+        
+        The statements are written once to shared memory and each task only
+        carries the byte range of its chunk.
+        """
+        encoded = [statement.encode('utf-8', errors='surrogatepass') for statement in statements]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        
+        block = shared_memory.SharedMemory(create=True, size=max(offsets[-1], 1))
+        try:
+            block.buf[:offsets[-1]] = b''.join(encoded)
+            del encoded
+            
+            pool = self._get_process_pool()
+            chunk_size = max(1, min(self.PROCESS_CHUNK_SIZE, math.ceil(len(statements) / self.process_workers)))
+            futures = [
+                pool.submit(_analyze_shared_chunk, block.name, offsets[start:start + chunk_size + 1], database_type.value)
+                for start in range(0, len(statements), chunk_size)
+            ]
+            
+            findings = []
+            for future in futures:
+                findings.extend(future.result())
+            return findings
+        finally:
+            block.close()
+            block.unlink()
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Start the worker processes on first use or after the rules change"""
+        with self._pool_lock:
+            if self._process_pool is not None and self._process_pool_version != self.rule_set_version:
+                self._process_pool.shutdown(wait=True)
+                self._process_pool = None
+            if self._process_pool is None:
+                self._process_pool_version = self.rule_set_version
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    initializer=_init_worker,
+                    initargs=(self.syntax_rules, self.performance_rules, self.security_rules)
+                )
+            return self._process_pool
+    
+    def shutdown(self):
+        """Stop the worker processes, if any were started"""
+        with self._pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=True)
+                self._process_pool = None
+    
+    def locate_findings(self, findings: List[StatementFindings], index: StatementIndex,
+                        first: int = 0, followed: bool = False) -> Dict[str, List[Any]]:
+        """Place per-statement findings at their source lines
+        
+        findings[k] belongs to statement first + k of the index. The missing
+        semicolon warning applies to statements followed by another one, i.e.
+        all but the last unless followed is set.
+        """
+        located = {
+            'syntax_errors': [],
+            'semantic_errors': [],
+            'performance_issues': [],
+            'security_vulnerabilities': [],
+            'tables': [],
+            'relationships': [],
+            'intelligent_comments': []
+        }
+        
+        last = len(findings) - 1
+        for k, statement_findings in enumerate(findings):
+            i = first + k
+            for offset, error in statement_findings.syntax_errors:
+                located['syntax_errors'].append(self._locate_error(error, index, i, offset))
+            if statement_findings.missing_semicolon and (followed or k < last):
+                offset, error = statement_findings.missing_semicolon
+                located['syntax_errors'].append(self._locate_error(error, index, i, offset))
+            for offset, error in statement_findings.semantic_errors:
+                located['semantic_errors'].append(self._locate_error(error, index, i, offset))
+            for issue in statement_findings.performance_issues:
+                located['performance_issues'].append(self._locate_finding(issue, index, i))
+            for vulnerability in statement_findings.security_vulnerabilities:
+                located['security_vulnerabilities'].append(self._locate_finding(vulnerability, index, i))
+            # Cached tables are shared between files; results get their own copies
+            located['tables'].extend(copy.deepcopy(statement_findings.tables))
+            located['relationships'].extend(dict(relationship) for relationship in statement_findings.relationships)
+            for comment in statement_findings.comments:
+                located['intelligent_comments'].append(self._locate_finding(comment, index, i))
+        
+        return located
+    
+    def _statement_key(self, statement: str, database_type: DatabaseType) -> bytes:
+        """Cache key of a statement for the current dialect and rule set"""
+        key = hashlib.sha256(f'{self.rule_set_version}:{database_type.value}:'.encode())
+        key.update(statement.encode('utf-8', errors='surrogatepass'))
+        return key.digest()
+    
+    def _compute_rule_set_version(self) -> str:
+        """Fingerprint of the analysis rules, used to invalidate cached findings"""
+        rules = [self.ANALYSIS_VERSION, self.syntax_rules, self.performance_rules, self.security_rules]
+        return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:16]
+    
+    @staticmethod
+    def _locate_error(error: SQLError, index: StatementIndex, statement_number: int, offset: int) -> SQLError:
+        """Copy of a cached error placed at its position in the file"""
+        line_number, column = index.statement_position(statement_number, offset)
+        return replace(error, line_number=line_number, column=column)
+    
+    @staticmethod
+    def _locate_finding(finding: Dict[str, Any], index: StatementIndex, statement_number: int) -> Dict[str, Any]:
+        """Copy of a cached finding with its line number and snippet filled in"""
+        located = dict(finding)
+        located['line_number'] = index.statement_line(statement_number)
+        if 'code_snippet' in located:
+            located['code_snippet'] = index.snippet(statement_number)
+        return located
+    
+    @classmethod
+    def _freeze_result(cls, result: AnalysisResult) -> AnalysisResult:
+        """Copy of a result for the cache, sharing nothing with it and with tuples for its lists"""
+        frozen = copy.deepcopy(result)
+        return replace(frozen, **{field: tuple(getattr(frozen, field)) for field in cls.RESULT_LIST_FIELDS})
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Counters and sizes of the result and statement caches"""
+        return {
+            'results': self._analysis_cache.get_stats(),
+            'statements': self._statement_cache.get_stats()
+        }
+    
+    def clear_cache(self):
+        """Drop cached file results and statement findings"""
+        self._analysis_cache.clear()
+        self._statement_cache.clear()
+    
     def detect_database_type(self, content: str) -> DatabaseType:
         """Detect database type from SQL content"""
         content_upper = content.upper()
@@ -300,217 +697,174 @@ class ComprehensiveSQLAnalyzer:
         else:
             return DatabaseType.GENERIC
     
-    def split_statements(self, content: str) -> List[str]:
+    def lexer_for(self, database_type: DatabaseType) -> SQLLexer:
+        """Lexer reading string literals the way the dialect does"""
+        return self.standard_lexer if database_type in STANDARD_LITERAL_DIALECTS else self.lexer
+    
+    def split_statements(self, content: str, database_type: DatabaseType = DatabaseType.GENERIC) -> List[str]:
         """Split SQL content into individual statements"""
-        # Remove comments first
-        content = self.remove_comments(content)
-        
-        statements = []
-        current_statement = ""
-        in_string = False
-        string_char = None
-        
-        i = 0
-        while i < len(content):
-            char = content[i]
-            
-            if not in_string:
-                if char in ("'", '"'):
-                    in_string = True
-                    string_char = char
-                elif char == ';':
-                    if current_statement.strip():
-                        statements.append(current_statement.strip())
-                    current_statement = ""
-                    i += 1
-                    continue
-            else:
-                if char == string_char:
-                    # Check if it's escaped
-                    if i == 0 or content[i-1] != '\\':
-                        in_string = False
-                        string_char = None
-            
-            current_statement += char
-            i += 1
-        
-        # Add the last statement if it exists
-        if current_statement.strip():
-            statements.append(current_statement.strip())
-        
-        return [stmt for stmt in statements if stmt.strip()]
+        # Comments, strings, quoted identifiers and DELIMITER blocks are
+        # handled by the shared lexer in a single pass
+        return self.lexer_for(database_type).split_statements(content)
     
-    def remove_comments(self, content: str) -> str:
-        """Remove SQL comments from content"""
-        # Remove single-line comments
-        content = re.sub(r'--.*$', '', content, flags=re.MULTILINE)
-        
-        # Remove multi-line comments
-        content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
+    def analyze_syntax(self, statement: str, statement_upper: str,
+                      database_type: DatabaseType) -> Tuple[List[Tuple[int, SQLError]], Optional[Tuple[int, SQLError]]]:
+        """Analyze syntax errors of a statement
         
-        return content
-    
-    def analyze_syntax(self, statements: List[str], lines: List[str], 
-                      database_type: DatabaseType) -> List[SQLError]:
-        """Analyze syntax errors"""
+        Returns the errors with their offsets in the statement, plus the
+        missing semicolon warning, which only applies when the statement is
+        followed by another one.
+        """
         errors = []
         
-        for i, statement in enumerate(statements):
-            # Check parentheses balance
-            open_parens = statement.count('(')
-            close_parens = statement.count(')')
-            if open_parens != close_parens:
-                errors.append(SQLError(
-                    line_number=i + 1,
+        # Check parentheses balance
+        open_parens = statement.count('(')
+        close_parens = statement.count(')')
+        if open_parens != close_parens:
+            errors.append((0, SQLError(
+                line_number=0,
+                column=0,
+                error_type='syntax_error',
+                severity='high',
+                message=f'Unmatched parentheses: {open_parens} opening, {close_parens} closing',
+                suggestion='Balance parentheses',
+                auto_fixable=False
+            )))
+        
+        # Check for basic SQL structure
+        statement_upper = statement_upper.strip()
+        if statement_upper.startswith('SELECT'):
+            if 'FROM' not in statement_upper and 'DUAL' not in statement_upper:
+                errors.append((0, SQLError(
+                    line_number=0,
                     column=0,
                     error_type='syntax_error',
                     severity='high',
-                    message=f'Unmatched parentheses: {open_parens} opening, {close_parens} closing',
-                    suggestion='Balance parentheses',
-                    auto_fixable=False
-                ))
-            
-            # Check for basic SQL structure
-            statement_upper = statement.upper().strip()
-            if statement_upper.startswith('SELECT'):
-                if 'FROM' not in statement_upper and 'DUAL' not in statement_upper:
-                    errors.append(SQLError(
-                        line_number=i + 1,
-                        column=0,
-                        error_type='syntax_error',
-                        severity='high',
-                        message='SELECT statement missing FROM clause',
-                        suggestion='Add FROM clause or use FROM DUAL for constants',
-                        auto_fixable=True,
-                        fixed_code=statement + ' FROM DUAL'
-                    ))
-            
-            # Check for missing semicolon
-            if i < len(statements) - 1 and not statement.rstrip().endswith(';'):
-                errors.append(SQLError(
-                    line_number=i + 1,
-                    column=len(statement),
-                    error_type='syntax_warning',
-                    severity='low',
-                    message='Missing semicolon at end of statement',
-                    suggestion='Add semicolon (;) at the end',
+                    message='SELECT statement missing FROM clause',
+                    suggestion='Add FROM clause or use FROM DUAL for constants',
                     auto_fixable=True,
-                    fixed_code=statement + ';'
-                ))
+                    fixed_code=statement + ' FROM DUAL'
+                )))
         
-        return errors
+        # Check for missing semicolon
+        missing_semicolon = None
+        if not statement.rstrip().endswith(';'):
+            missing_semicolon = (len(statement), SQLError(
+                line_number=0,
+                column=0,
+                error_type='syntax_warning',
+                severity='low',
+                message='Missing semicolon at end of statement',
+                suggestion='Add semicolon (;) at the end',
+                auto_fixable=True,
+                fixed_code=statement + ';'
+            ))
+        
+        return errors, missing_semicolon
     
-    def analyze_semantics(self, statements: List[str], lines: List[str]) -> List[SQLError]:
-        """Analyze semantic errors"""
+    def analyze_semantics(self, statement: str, statement_upper: str) -> List[Tuple[int, SQLError]]:
+        """Analyze semantic errors of a statement"""
         errors = []
         
-        for i, statement in enumerate(statements):
-            statement_upper = statement.upper()
-            
-            # Check for dangerous operations
-            if statement_upper.startswith(('UPDATE', 'DELETE')) and 'WHERE' not in statement_upper:
-                errors.append(SQLError(
-                    line_number=i + 1,
-                    column=0,
-                    error_type='semantic_warning',
-                    severity='high',
-                    message='UPDATE/DELETE without WHERE clause affects all rows',
-                    suggestion='Add WHERE clause to limit affected rows',
-                    auto_fixable=False
-                ))
-            
-            # Check for SELECT *
-            if 'SELECT *' in statement_upper:
-                errors.append(SQLError(
-                    line_number=i + 1,
-                    column=statement_upper.find('SELECT *'),
-                    error_type='semantic_warning',
-                    severity='medium',
-                    message='Using SELECT * can be inefficient',
-                    suggestion='Specify only the columns you need',
-                    auto_fixable=False
-                ))
+        # Check for dangerous operations
+        if statement_upper.startswith(('UPDATE', 'DELETE')) and 'WHERE' not in statement_upper:
+            errors.append((0, SQLError(
+                line_number=0,
+                column=0,
+                error_type='semantic_warning',
+                severity='high',
+                message='UPDATE/DELETE without WHERE clause affects all rows',
+                suggestion='Add WHERE clause to limit affected rows',
+                auto_fixable=False
+            )))
+        
+        # Check for SELECT *
+        if 'SELECT *' in statement_upper:
+            errors.append((statement_upper.find('SELECT *'), SQLError(
+                line_number=0,
+                column=0,
+                error_type='semantic_warning',
+                severity='medium',
+                message='Using SELECT * can be inefficient',
+                suggestion='Specify only the columns you need',
+                auto_fixable=False
+            )))
         
         return errors
 
-    def analyze_performance(self, statements: List[str], lines: List[str]) -> List[Dict[str, Any]]:
-        """Analyze performance issues"""
+    def analyze_performance(self, statement: str, statement_upper: str,
+                            candidates: Optional[Tuple[int, ...]] = None) -> List[Dict[str, Any]]:
+        """Analyze performance issues of a statement"""
         issues = []
 
-        for i, statement in enumerate(statements):
-            statement_upper = statement.upper()
-
-            # Check performance rules
-            for rule in self.performance_rules:
-                if re.search(rule['pattern'], statement):
-                    issues.append({
-                        'line_number': i + 1,
-                        'type': rule['issue_type'],
-                        'impact': rule['impact'],
-                        'description': rule['description'],
-                        'recommendation': rule['recommendation'],
-                        'code_snippet': statement.strip()[:100] + '...' if len(statement) > 100 else statement.strip()
-                    })
-
-            # Check for missing indexes (heuristic)
-            if 'WHERE' in statement_upper:
-                where_columns = re.findall(r'(?i)where\s+(\w+)', statement)
-                for column in where_columns:
-                    issues.append({
-                        'line_number': i + 1,
-                        'type': 'missing_index',
-                        'impact': 'high',
-                        'description': f'Column "{column}" in WHERE clause may need an index',
-                        'recommendation': f'Consider adding index on column "{column}"',
-                        'suggested_sql': f'CREATE INDEX idx_{column} ON table_name ({column});'
-                    })
+        # Check performance rules
+        for match in self.performance_rule_set.matches(statement, candidates=candidates):
+            rule = match.data
+            issues.append({
+                'line_number': None,
+                'type': rule['issue_type'],
+                'impact': rule['impact'],
+                'description': rule['description'],
+                'recommendation': rule['recommendation'],
+                'code_snippet': None
+            })
+
+        # Check for missing indexes (heuristic)
+        if 'WHERE' in statement_upper:
+            where_columns = re.findall(r'(?i)where\s+(\w+)', statement)
+            for column in where_columns:
+                issues.append({
+                    'line_number': None,
+                    'type': 'missing_index',
+                    'impact': 'high',
+                    'description': f'Column "{column}" in WHERE clause may need an index',
+                    'recommendation': f'Consider adding index on column "{column}"',
+                    'suggested_sql': f'CREATE INDEX idx_{column} ON table_name ({column});'
+                })
 
         return issues
 
-    def analyze_security(self, statements: List[str], lines: List[str]) -> List[Dict[str, Any]]:
-        """Analyze security vulnerabilities"""
+    def analyze_security(self, statement: str, candidates: Optional[Tuple[int, ...]] = None) -> List[Dict[str, Any]]:
+        """Analyze security vulnerabilities of a statement"""
         vulnerabilities = []
 
-        for i, statement in enumerate(statements):
-            # Check security rules
-            for rule in self.security_rules:
-                if re.search(rule['pattern'], statement):
-                    vulnerabilities.append({
-                        'line_number': i + 1,
-                        'vulnerability_type': rule['vulnerability_type'],
-                        'risk_level': rule['risk_level'],
-                        'description': rule['description'],
-                        'mitigation': rule['mitigation'],
-                        'code_snippet': statement.strip()[:100] + '...' if len(statement) > 100 else statement.strip(),
-                        'cwe_id': self.get_cwe_id(rule['vulnerability_type']),
-                        'owasp_category': self.get_owasp_category(rule['vulnerability_type'])
-                    })
+        # Check security rules
+        for match in self.security_rule_set.matches(statement, candidates=candidates):
+            rule = match.data
+            vulnerabilities.append({
+                'line_number': None,
+                'vulnerability_type': rule['vulnerability_type'],
+                'risk_level': rule['risk_level'],
+                'description': rule['description'],
+                'mitigation': rule['mitigation'],
+                'code_snippet': None,
+                'cwe_id': self.get_cwe_id(rule['vulnerability_type']),
+                'owasp_category': self.get_owasp_category(rule['vulnerability_type'])
+            })
 
         return vulnerabilities
 
-    def analyze_schema(self, statements: List[str], database_type: DatabaseType) -> Tuple[List[TableInfo], List[Dict[str, Any]]]:
-        """Analyze database schema"""
+    def analyze_schema(self, statement: str, statement_upper: str,
+                       database_type: DatabaseType) -> Tuple[List[TableInfo], List[Dict[str, Any]]]:
+        """Analyze database schema defined by a statement"""
         tables = []
         relationships = []
 
-        for statement in statements:
-            statement_upper = statement.upper()
-
-            # Extract CREATE TABLE statements
-            if statement_upper.startswith('CREATE TABLE'):
-                table_info = self.parse_create_table(statement, database_type)
-                if table_info:
-                    tables.append(table_info)
+        # Extract CREATE TABLE statements
+        if statement_upper.startswith('CREATE TABLE'):
+            table_info = self.parse_create_table(statement, database_type)
+            if table_info:
+                tables.append(table_info)
 
-            # Extract foreign key relationships
-            fk_matches = re.findall(r'(?i)foreign\s+key\s*\(\s*(\w+)\s*\)\s+references\s+(\w+)\s*\(\s*(\w+)\s*\)', statement)
-            for fk_match in fk_matches:
-                relationships.append({
-                    'type': 'foreign_key',
-                    'from_column': fk_match[0],
-                    'to_table': fk_match[1],
-                    'to_column': fk_match[2]
-                })
+        # Extract foreign key relationships
+        fk_matches = re.findall(r'(?i)foreign\s+key\s*\(\s*(\w+)\s*\)\s+references\s+(\w+)\s*\(\s*(\w+)\s*\)', statement)
+        for fk_match in fk_matches:
+            relationships.append({
+                'type': 'foreign_key',
+                'from_column': fk_match[0],
+                'to_table': fk_match[1],
+                'to_column': fk_match[2]
+            })
 
         return tables, relationships
 
@@ -566,140 +920,149 @@ class ComprehensiveSQLAnalyzer:
             self.logger.error(f"Error parsing CREATE TABLE: {str(e)}")
             return None
 
-    def generate_intelligent_comments(self, statements: List[str], lines: List[str]) -> List[Dict[str, Any]]:
-        """Generate intelligent comments in Spanish"""
+    def generate_intelligent_comments(self, statement_upper: str) -> List[Dict[str, Any]]:
+        """Generate intelligent comments in Spanish for a statement"""
         comments = []
+        statement_upper = statement_upper.strip()
 
-        for i, statement in enumerate(statements):
-            statement_upper = statement.upper().strip()
-
-            # Generate comments based on statement type
-            if statement_upper.startswith('SELECT'):
-                if 'JOIN' in statement_upper:
-                    comments.append({
-                        'line_number': i + 1,
-                        'comment': '-- Consulta con JOIN para combinar datos de múltiples tablas',
-                        'type': 'explanation'
-                    })
-                elif 'WHERE' in statement_upper:
-                    comments.append({
-                        'line_number': i + 1,
-                        'comment': '-- Consulta SELECT con filtros WHERE para obtener datos específicos',
-                        'type': 'explanation'
-                    })
-                else:
-                    comments.append({
-                        'line_number': i + 1,
-                        'comment': '-- Consulta SELECT básica para obtener datos',
-                        'type': 'explanation'
-                    })
-
-            elif statement_upper.startswith('INSERT'):
+        # Generate comments based on statement type
+        if statement_upper.startswith('SELECT'):
+            if 'JOIN' in statement_upper:
                 comments.append({
-                    'line_number': i + 1,
-                    'comment': '-- Inserción de nuevos registros en la tabla',
+                    'line_number': None,
+                    'comment': '-- Consulta con JOIN para combinar datos de múltiples tablas',
                     'type': 'explanation'
                 })
+            elif 'WHERE' in statement_upper:
+                comments.append({
+                    'line_number': None,
+                    'comment': '-- Consulta SELECT con filtros WHERE para obtener datos específicos',
+                    'type': 'explanation'
+                })
+            else:
+                comments.append({
+                    'line_number': None,
+                    'comment': '-- Consulta SELECT básica para obtener datos',
+                    'type': 'explanation'
+                })
+
+        elif statement_upper.startswith('INSERT'):
+            comments.append({
+                'line_number': None,
+                'comment': '-- Inserción de nuevos registros en la tabla',
+                'type': 'explanation'
+            })
 
-            elif statement_upper.startswith('UPDATE'):
-                if 'WHERE' in statement_upper:
-                    comments.append({
-                        'line_number': i + 1,
-                        'comment': '-- Actualización de registros específicos con condiciones WHERE',
-                        'type': 'explanation'
-                    })
-                else:
-                    comments.append({
-                        'line_number': i + 1,
-                        'comment': '-- ⚠️ CUIDADO: Actualización sin WHERE afecta TODOS los registros',
-                        'type': 'warning'
-                    })
-
-            elif statement_upper.startswith('DELETE'):
-                if 'WHERE' in statement_upper:
-                    comments.append({
-                        'line_number': i + 1,
-                        'comment': '-- Eliminación de registros específicos con condiciones WHERE',
-                        'type': 'explanation'
-                    })
-                else:
-                    comments.append({
-                        'line_number': i + 1,
-                        'comment': '-- ⚠️ PELIGRO: Eliminación sin WHERE borra TODOS los registros',
-                        'type': 'warning'
-                    })
-
-            elif statement_upper.startswith('CREATE TABLE'):
+        elif statement_upper.startswith('UPDATE'):
+            if 'WHERE' in statement_upper:
                 comments.append({
-                    'line_number': i + 1,
-                    'comment': '-- Creación de nueva tabla con estructura definida',
+                    'line_number': None,
+                    'comment': '-- Actualización de registros específicos con condiciones WHERE',
                     'type': 'explanation'
                 })
+            else:
+                comments.append({
+                    'line_number': None,
+                    'comment': '-- ⚠️ CUIDADO: Actualización sin WHERE afecta TODOS los registros',
+                    'type': 'warning'
+                })
 
-            elif statement_upper.startswith('CREATE INDEX'):
+        elif statement_upper.startswith('DELETE'):
+            if 'WHERE' in statement_upper:
+                comments.append({
+                    'line_number': None,
+                    'comment': '-- Eliminación de registros específicos con condiciones WHERE',
+                    'type': 'explanation'
+                })
+            else:
                 comments.append({
-                    'line_number': i + 1,
-                    'comment': '-- Creación de índice para mejorar el rendimiento de consultas',
-                    'type': 'optimization'
+                    'line_number': None,
+                    'comment': '-- ⚠️ PELIGRO: Eliminación sin WHERE borra TODOS los registros',
+                    'type': 'warning'
                 })
 
+        elif statement_upper.startswith('CREATE TABLE'):
+            comments.append({
+                'line_number': None,
+                'comment': '-- Creación de nueva tabla con estructura definida',
+                'type': 'explanation'
+            })
+
+        elif statement_upper.startswith('CREATE INDEX'):
+            comments.append({
+                'line_number': None,
+                'comment': '-- Creación de índice para mejorar el rendimiento de consultas',
+                'type': 'optimization'
+            })
+
         return comments
 
     def calculate_quality_score(self, syntax_errors: List[SQLError], semantic_errors: List[SQLError],
                                performance_issues: List[Dict[str, Any]]) -> int:
         """Calculate overall quality score (0-100)"""
-        base_score = 100
+        return max(0, 100 - self._quality_deductions(syntax_errors, semantic_errors, performance_issues))
+
+    @staticmethod
+    def _quality_deductions(syntax_errors: List[SQLError], semantic_errors: List[SQLError],
+                            performance_issues: List[Dict[str, Any]]) -> int:
+        """Points deducted from the quality score for a set of findings"""
+        deductions = 0
 
         # Deduct points for errors
         for error in syntax_errors:
             if error.severity == 'high':
-                base_score -= 15
+                deductions += 15
             elif error.severity == 'medium':
-                base_score -= 10
+                deductions += 10
             else:
-                base_score -= 5
+                deductions += 5
 
         for error in semantic_errors:
             if error.severity == 'high':
-                base_score -= 12
+                deductions += 12
             elif error.severity == 'medium':
-                base_score -= 8
+                deductions += 8
             else:
-                base_score -= 4
+                deductions += 4
 
         # Deduct points for performance issues
         for issue in performance_issues:
             if issue.get('impact') == 'high':
-                base_score -= 8
+                deductions += 8
             elif issue.get('impact') == 'medium':
-                base_score -= 5
+                deductions += 5
             else:
-                base_score -= 3
+                deductions += 3
 
-        return max(0, base_score)
+        return deductions
 
     def calculate_complexity_score(self, statements: List[str]) -> int:
         """Calculate complexity score (0-100)"""
-        total_complexity = 0
+        return self._normalize_complexity(
+            sum(self._statement_complexity(statement.upper()) for statement in statements), len(statements)
+        )
 
-        for statement in statements:
-            statement_upper = statement.upper()
-            complexity = 10  # Base complexity
-
-            # Add complexity for various SQL features
-            complexity += statement_upper.count('JOIN') * 5
-            complexity += statement_upper.count('UNION') * 8
-            complexity += (statement_upper.count('SELECT') - 1) * 10  # Subqueries
-            complexity += statement_upper.count('CASE') * 6
-            complexity += statement_upper.count('GROUP BY') * 4
-            complexity += statement_upper.count('HAVING') * 5
-            complexity += statement_upper.count('ORDER BY') * 3
-            complexity += statement_upper.count('WINDOW') * 12
-
-            total_complexity += complexity
-
-        # Normalize to 0-100 scale
-        avg_complexity = total_complexity / len(statements) if statements else 0
+    @staticmethod
+    def _statement_complexity(statement_upper: str) -> int:
+        """Complexity points of a single statement"""
+        complexity = 10  # Base complexity
+
+        # Add complexity for various SQL features
+        complexity += statement_upper.count('JOIN') * 5
+        complexity += statement_upper.count('UNION') * 8
+        complexity += (statement_upper.count('SELECT') - 1) * 10  # Subqueries
+        complexity += statement_upper.count('CASE') * 6
+        complexity += statement_upper.count('GROUP BY') * 4
+        complexity += statement_upper.count('HAVING') * 5
+        complexity += statement_upper.count('ORDER BY') * 3
+        complexity += statement_upper.count('WINDOW') * 12
+
+        return complexity
+
+    @staticmethod
+    def _normalize_complexity(total_complexity: int, statement_count: int) -> int:
+        """Average statement complexity normalized to a 0-100 scale"""
+        avg_complexity = total_complexity / statement_count if statement_count else 0
         return min(100, int(avg_complexity))
 
     def generate_corrected_sql(self, original_sql: str, syntax_errors: List[SQLError],
@@ -773,3 +1136,29 @@ class ComprehensiveSQLAnalyzer:
             'authentication_bypass': 'A07:2021 – Identification and Authentication Failures'
         }
         return owasp_mapping.get(vulnerability_type, 'A10:2021 – Server-Side Request Forgery')
+
+# Analyzer of a pool worker process, configured with the parent's rules
+_worker_analyzer: Optional[ComprehensiveSQLAnalyzer] = None
+
+def _init_worker(syntax_rules: List[Dict[str, Any]], performance_rules: List[Dict[str, Any]],
+                 security_rules: List[Dict[str, Any]]):
+    """Build the analyzer of a worker process"""
+    global _worker_analyzer
+    _worker_analyzer = ComprehensiveSQLAnalyzer()
+    _worker_analyzer.syntax_rules = syntax_rules
+    _worker_analyzer.performance_rules = performance_rules
+    _worker_analyzer.security_rules = security_rules
+    _worker_analyzer.compile_analysis_rules()
+
+def _analyze_shared_chunk(block_name: str, offsets: List[int], database_type: str) -> List[StatementFindings]:
+    """Analyze the statements stored between consecutive offsets of a shared block"""
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        data = bytes(block.buf[offsets[0]:offsets[-1]])
+    finally:
+        block.close()
+    
+    base = offsets[0]
+    statements = [data[start - base:end - base].decode('utf-8', errors='surrogatepass')
+                  for start, end in zip(offsets, offsets[1:])]
+    return _worker_analyzer.analyze_batch(statements, DatabaseType(database_type))
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+ENCODING DETECTOR
+Sampled, early-exit character encoding detection for uploaded SQL files
+"""
+
+import codecs
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple, Union
+
+import chardet
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# UTF-32 marks first: the UTF-32-LE mark starts with the UTF-16-LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+@dataclass
+class EncodingResult:
+    """Detected encoding and how it was found
+
+    method is 'bom', 'ascii' or 'utf-8' for the exact fast paths,
+    'sampled' when the head, middle and tail samples were conclusive and
+    'full' when the detector had to read the whole content.
+    """
+    encoding: str
+    confidence: float
+    method: str
+
+class EncodingDetector:
+    """Finds the encoding of a byte buffer without reading more than needed
+
+    A byte order mark, pure ASCII and valid UTF-8 are recognised exactly by
+    C-speed scans (bytes.isascii and the UTF-8 codec), which covers nearly
+    every upload. Anything else goes to chardet's incremental detector,
+    first fed bounded samples from the head, middle and tail of the
+    content and stopped as soon as it is confident; only when the samples
+    stay ambiguous is the rest of the content fed, again stopping early.
+    """
+
+    def __init__(self, sample_size: int = 64 * 1024, min_confidence: float = 0.9,
+                 chunk_size: int = 1024 * 1024):
+        self.sample_size = sample_size
+        self.min_confidence = min_confidence
+        self.chunk_size = chunk_size
+
+    def detect(self, data: Buffer) -> EncodingResult:
+        """Encoding of data"""
+        view = memoryview(data)
+        result = self._exact(data, view)
+        if result is None and self._is_utf8(view):
+            result = EncodingResult('utf-8', 0.99, 'utf-8')
+        return result or self._statistical(view)
+
+    def decode(self, data: Buffer) -> Tuple[str, EncodingResult]:
+        """Decoded text and encoding of data
+
+        Valid UTF-8 is detected by decoding it, so the common case costs a
+        single pass. Content that does not decode with the detected
+        encoding is decoded as UTF-8 with replacement characters.
+        """
+        view = memoryview(data)
+        result = self._exact(data, view)
+        if result is None:
+            try:
+                return str(view, 'utf-8'), EncodingResult('utf-8', 0.99, 'utf-8')
+            except UnicodeDecodeError:
+                return self.decode_non_utf8(view)
+        return self._decode_as(view, result)
+
+    def decode_non_utf8(self, data: Buffer) -> Tuple[str, EncodingResult]:
+        """Decoded text and encoding of data already known not to be UTF-8
+
+        Skips the exact fast paths for callers that have tried UTF-8 themselves.
+        """
+        view = memoryview(data)
+        return self._decode_as(view, self._statistical(view))
+
+    @staticmethod
+    def _decode_as(view: memoryview, result: EncodingResult) -> Tuple[str, EncodingResult]:
+        try:
+            return str(view, result.encoding), result
+        except (UnicodeDecodeError, LookupError):
+            return str(view, 'utf-8', 'replace'), EncodingResult('utf-8', 0.0, result.method)
+
+    @staticmethod
+    def bom_encoding(head: Buffer) -> Optional[str]:
+        """Codec named by the byte order mark at the start of head, if any"""
+        head = bytes(head[:4])
+        for bom, encoding in BOMS:
+            if head.startswith(bom):
+                return encoding
+        return None
+
+    def _exact(self, data: Buffer, view: memoryview):
+        """Result of the BOM and ASCII fast paths, None when neither applies"""
+        encoding = self.bom_encoding(view)
+        if encoding:
+            return EncodingResult(encoding, 1.0, 'bom')
+        if isinstance(data, (bytes, bytearray)):
+            is_ascii = data.isascii()
+        else:
+            is_ascii = all(bytes(chunk).isascii() for chunk in self._chunks(view))
+        if is_ascii:
+            return EncodingResult('ascii', 1.0, 'ascii')
+        return None
+
+    def _is_utf8(self, view: memoryview) -> bool:
+        """Whether view is valid UTF-8, checked a chunk at a time"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for chunk in self._chunks(view):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return False
+        return True
+
+    def _statistical(self, view: memoryview) -> EncodingResult:
+        """chardet on the samples, then on the whole content if they are ambiguous"""
+        encoding, confidence = self._run_detector(self._samples(view))
+        if confidence >= self.min_confidence or len(view) <= 3 * self.sample_size:
+            return EncodingResult(encoding, confidence, 'sampled')
+        encoding, confidence = self._run_detector(self._chunks(view))
+        return EncodingResult(encoding, confidence, 'full')
+
+    @staticmethod
+    def _run_detector(chunks) -> Tuple[str, float]:
+        """(encoding, confidence) from chardet, stopping once it is sure"""
+        detector = chardet.UniversalDetector()
+        for chunk in chunks:
+            detector.feed(bytes(chunk))
+            if detector.done:
+                break
+        detector.close()
+        if not detector.result.get('encoding'):
+            return 'utf-8', 0.0
+        return detector.result['encoding'], detector.result.get('confidence') or 0.0
+
+    def _samples(self, view: memoryview) -> Iterator[memoryview]:
+        """Head, middle and tail slices of at most sample_size bytes"""
+        size = len(view)
+        if size <= 3 * self.sample_size:
+            yield view
+            return
+        middle = (size - self.sample_size) // 2
+        for start in (0, middle, size - self.sample_size):
+            yield view[start:start + self.sample_size]
+
+    def _chunks(self, view: memoryview) -> Iterator[memoryview]:
+        for start in range(0, len(view), self.chunk_size):
+            yield view[start:start + self.chunk_size]
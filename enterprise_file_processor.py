@@ -5,16 +5,21 @@ High-performance file processing for large SQL files (100MB+)
 """
 
 import os
-import mmap
+import codecs
 import hashlib
-import chardet
 import time
 import threading
-from typing import Dict, List, Any, Optional, Generator
+from typing import Dict, List, Any, Iterator, Optional, Generator, Set
 from dataclasses import dataclass
 import logging
 import tempfile
-import shutil
+from contextlib import contextmanager
+
+from literal_matcher import LiteralMatcher
+from encoding_detector import EncodingDetector, EncodingResult
+from upload_staging import DEFAULT_SPOOL_THRESHOLD, StagedUpload, UploadTooLarge
+from upload_decompression import (DEFAULT_MAX_RATIO, DecompressingReader, DecompressionLimitExceeded,
+                                  available_formats, split_compression)
 
 @dataclass
 class FileInfo:
@@ -29,6 +34,118 @@ class FileInfo:
     is_valid: bool
     error_message: Optional[str] = None
 
+@dataclass
+class IngestResult:
+    """Everything one pass over an upload yields"""
+    content: str
+    size: int
+    line_count: int
+    hash_md5: str
+    hash_sha256: str
+    encoding: EncodingResult
+    malicious_found: Set[str]
+    suspicious_found: Set[str]
+    compression: Optional[str] = None  # format the upload was decompressed from
+    compressed_size: Optional[int] = None
+
+class _TextConsumer:
+    """Counts lines and scans for suspicious SQL across decoded chunks"""
+    
+    def __init__(self, matcher: LiteralMatcher):
+        self.matcher = matcher
+        self.suspicious_found: Set[str] = set()
+        self._overlap = max(matcher.max_length - 1, 0)
+        self._tail = ''
+        self._newlines = 0
+        self._last_char = ''
+    
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        self._newlines += text.count('\n')
+        self._last_char = text[-1]
+        if len(self.suspicious_found) < len(self.matcher):
+            self.suspicious_found |= self.matcher.search_all(text)
+            # Occurrences spanning the previous chunk and this one
+            if self._tail:
+                self.suspicious_found |= self.matcher.search_all(self._tail + text[:self._overlap])
+        if self._overlap:
+            self._tail = (self._tail + text)[-self._overlap:] if len(text) < self._overlap else text[-self._overlap:]
+    
+    def line_count(self) -> int:
+        return self._newlines + (1 if self._last_char and self._last_char != '\n' else 0)
+
+class _ByteConsumer:
+    """Hashes bytes and scans them for malicious patterns across chunks"""
+    
+    def __init__(self, matcher: LiteralMatcher):
+        self.matcher = matcher
+        self.md5, self.sha256 = hashlib.md5(), hashlib.sha256()
+        self.malicious_found: Set[str] = set()
+        self._overlap = max(matcher.max_length - 1, 0)
+        self._tail = b''
+    
+    def feed(self, chunk: memoryview) -> None:
+        self.md5.update(chunk)
+        self.sha256.update(chunk)
+        if len(self.malicious_found) < len(self.matcher):
+            self.malicious_found |= self.matcher.search_all(chunk)
+            # Occurrences spanning the previous chunk and this one
+            if self._tail:
+                self.malicious_found |= self.matcher.search_all(self._tail + bytes(chunk[:self._overlap]))
+        if self._overlap:
+            if len(chunk) < self._overlap:
+                self._tail = (self._tail + bytes(chunk))[-self._overlap:]
+            else:
+                self._tail = bytes(chunk[len(chunk) - self._overlap:])
+
+class TextStream:
+    """Decoded text of a staged upload, produced a chunk at a time
+    
+    Iterating hashes the bytes, runs the malicious pattern and suspicious
+    SQL prefilters and counts lines as each chunk is decoded, so an upload
+    of any size is checked without its text ever being held whole. The
+    hash, line count and findings are complete once iteration finishes.
+    """
+    
+    def __init__(self, processor: 'EnterpriseFileProcessor', view: memoryview, encoding: EncodingResult):
+        self.processor = processor
+        self.view = view
+        self.encoding = encoding
+        self.size = len(view)
+        self._bytes = _ByteConsumer(processor.malicious_matcher)
+        self._text = _TextConsumer(processor.suspicious_sql_matcher)
+    
+    @property
+    def hash_sha256(self) -> str:
+        return self._bytes.sha256.hexdigest()
+    
+    @property
+    def line_count(self) -> int:
+        return self._text.line_count()
+    
+    def __iter__(self) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder(self.encoding.encoding)(errors='replace')
+        chunk_size = self.processor.ingest_chunk_size
+        for start in range(0, self.size, chunk_size):
+            chunk = self.view[start:start + chunk_size]
+            try:
+                self._bytes.feed(chunk)
+                text = decoder.decode(chunk)
+            finally:
+                # No slice may outlive the staged upload
+                chunk.release()
+            self._text.feed(text)
+            yield text
+        text = decoder.decode(b'', final=True)
+        if text:
+            self._text.feed(text)
+            yield text
+    
+    def security_check(self) -> Dict[str, Any]:
+        """Verdict of the prefilters over everything read so far"""
+        return self.processor._security_verdict(self._bytes.malicious_found, self._text.suspicious_found)
+
 class EnterpriseFileProcessor:
     """High-performance file processor for large SQL files"""
     
@@ -36,8 +153,15 @@ class EnterpriseFileProcessor:
         self.max_file_size = max_file_size
         self.logger = logging.getLogger(__name__)
         self.supported_extensions = {'.sql', '.txt', '.ddl', '.dml', '.psql', '.mysql', '.oracle'}
+        # Compressed uploads (dump.sql.gz) are decompressed while they are staged
+        self.compressed_extensions = available_formats()
+        self.max_decompressed_size = max_file_size
+        self.max_compression_ratio = DEFAULT_MAX_RATIO
         self.chunk_size = 8192  # 8KB chunks for reading
+        self.ingest_chunk_size = 1024 * 1024  # 1MB chunks for the ingestion pass
+        self.spool_threshold = DEFAULT_SPOOL_THRESHOLD  # larger uploads are staged on disk
         self.temp_dir = tempfile.gettempdir()
+        self.encoding_detector = EncodingDetector()
         
         # Security patterns to detect malicious content
         self.malicious_patterns = [
@@ -59,15 +183,44 @@ class EnterpriseFileProcessor:
             b'<jsp:',
             b'<asp:',
         ]
+        
+        # Suspicious SQL functions, matched case-insensitively
+        self.suspicious_sql = [
+            'xp_cmdshell',
+            'sp_oacreate',
+            'sp_oamethod',
+            'openrowset',
+            'opendatasource',
+            'bulk insert',
+            'load_file(',
+            'into outfile',
+            'into dumpfile'
+        ]
+        
+        # Each pattern list is searched in a single pass over the content
+        self.malicious_matcher = LiteralMatcher(
+            [pattern.decode('latin-1') for pattern in self.malicious_patterns], ignorecase=False
+        )
+        self.suspicious_sql_matcher = LiteralMatcher(self.suspicious_sql)
     
     def process_file(self, file_obj, filename: str = None) -> Dict[str, Any]:
-        """Process uploaded file with comprehensive validation and analysis"""
+        """Process uploaded file with comprehensive validation and analysis
+        
+        file_obj may be a path, a bytes-like object or a file object; it is
+        staged through StagedUpload, so large uploads are read from a
+        mapping instead of being copied onto the heap. Files named with a
+        compressed suffix (.gz, .bz2, .xz, .zst) are decompressed as they
+        are staged.
+        """
         start_time = time.time()
         
         try:
             # Extract filename if not provided
             if filename is None:
-                filename = getattr(file_obj, 'filename', 'unknown.sql')
+                if isinstance(file_obj, (str, os.PathLike)):
+                    filename = os.path.basename(file_obj)
+                else:
+                    filename = getattr(file_obj, 'filename', 'unknown.sql')
             
             # Validate file extension
             if not self._is_valid_extension(filename):
@@ -77,44 +230,33 @@ class EnterpriseFileProcessor:
                     'filename': filename
                 }
             
-            # Read file content
-            file_content = self._read_file_safely(file_obj)
-            
-            if file_content is None:
+            # Hash, scan, count and decode the upload in one pass
+            try:
+                ingest = self.ingest(file_obj, split_compression(filename)[1])
+            except DecompressionLimitExceeded as e:
+                self.logger.warning(f"Rejected compressed upload {filename}: {e.reason} "
+                                    f"({e.decompressed} bytes from {e.compressed})")
                 return {
                     'success': False,
-                    'error': 'Failed to read file content',
+                    'error': f'Security validation failed: {e.reason}',
+                    'error_code': 'FILE_TOO_LARGE' if e.decompressed > self.max_decompressed_size else None,
                     'filename': filename
                 }
             
-            # Validate file size
-            file_size = len(file_content)
-            if file_size > self.max_file_size:
+            if ingest is None:
                 return {
                     'success': False,
                     'error': f'File too large. Maximum size: {self.max_file_size / (1024*1024):.1f}MB',
-                    'filename': filename,
-                    'size': file_size
+                    'error_code': 'FILE_TOO_LARGE',
+                    'filename': filename
                 }
             
-            # Detect encoding
-            encoding_info = chardet.detect(file_content)
-            encoding = encoding_info.get('encoding', 'utf-8')
-            confidence = encoding_info.get('confidence', 0)
-            
+            confidence = ingest.encoding.confidence
             if confidence < 0.7:
                 self.logger.warning(f"Low encoding confidence: {confidence}")
             
-            # Decode content
-            try:
-                content_str = file_content.decode(encoding)
-            except UnicodeDecodeError:
-                # Fallback to utf-8 with error handling
-                content_str = file_content.decode('utf-8', errors='replace')
-                encoding = 'utf-8'
-            
             # Security validation
-            security_check = self._validate_security(file_content, content_str)
+            security_check = self._security_verdict(ingest.malicious_found, ingest.suspicious_found)
             if not security_check['is_safe']:
                 return {
                     'success': False,
@@ -122,31 +264,27 @@ class EnterpriseFileProcessor:
                     'filename': filename
                 }
             
-            # Calculate hashes
-            md5_hash = hashlib.md5(file_content).hexdigest()
-            sha256_hash = hashlib.sha256(file_content).hexdigest()
-            
-            # Count lines efficiently
-            line_count = self._count_lines_efficiently(content_str)
-            
             # Create file info
             file_info = FileInfo(
                 filename=filename,
-                size=file_size,
-                encoding=encoding,
-                line_count=line_count,
-                hash_md5=md5_hash,
-                hash_sha256=sha256_hash,
+                size=ingest.size,
+                encoding=ingest.encoding.encoding,
+                line_count=ingest.line_count,
+                hash_md5=ingest.hash_md5,
+                hash_sha256=ingest.hash_sha256,
                 processing_time=time.time() - start_time,
                 is_valid=True
             )
             
             return {
                 'success': True,
-                'content': content_str,
+                'content': ingest.content,
                 'file_info': file_info,
                 'metadata': {
                     'encoding_confidence': confidence,
+                    'encoding_method': ingest.encoding.method,
+                    'compression': ingest.compression,
+                    'compressed_size': ingest.compressed_size,
                     'security_validated': True,
                     'processing_time': file_info.processing_time
                 }
@@ -163,54 +301,57 @@ class EnterpriseFileProcessor:
     def process_large_file_streaming(self, file_obj, filename: str = None) -> Generator[Dict[str, Any], None, None]:
         """Process large files in streaming mode for memory efficiency"""
         try:
-            # Create temporary file for processing
-            with tempfile.NamedTemporaryFile(mode='w+b', delete=False) as temp_file:
-                temp_path = temp_file.name
+            compression = split_compression(filename)[1] if filename else None
+            if compression:
+                with self._decompressing_reader(file_obj, compression) as reader:
+                    staged = StagedUpload.stage(reader, self.spool_threshold, temp_dir=self.temp_dir)
+            else:
+                # Stage the upload; large files are mapped instead of read into memory
+                staged = StagedUpload.stage(file_obj, self.spool_threshold, temp_dir=self.temp_dir)
+            with staged:
+                view = staged.view
+                file_size = len(view)
                 
-                # Copy uploaded file to temporary file
-                shutil.copyfileobj(file_obj, temp_file)
-            
-            # Process file using memory mapping
-            with open(temp_path, 'rb') as f:
-                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mmapped_file:
-                    file_size = len(mmapped_file)
-                    
-                    # Yield file info first
-                    yield {
-                        'type': 'file_info',
-                        'size': file_size,
-                        'filename': filename or 'unknown.sql'
-                    }
-                    
-                    # Process in chunks
-                    chunk_size = 1024 * 1024  # 1MB chunks
-                    processed_bytes = 0
+                # Yield file info first
+                yield {
+                    'type': 'file_info',
+                    'size': file_size,
+                    'filename': filename or 'unknown.sql'
+                }
+                
+                # Process in chunks
+                chunk_size = 1024 * 1024  # 1MB chunks
+                processed_bytes = 0
+                
+                # Characters split across chunk boundaries are completed
+                # by the next chunk instead of being replaced
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                
+                for i in range(0, file_size, chunk_size):
+                    chunk = view[i:i + chunk_size]
+                    processed_bytes += len(chunk)
                     
-                    for i in range(0, file_size, chunk_size):
-                        chunk = mmapped_file[i:i + chunk_size]
-                        processed_bytes += len(chunk)
-                        
-                        # Decode chunk
-                        try:
-                            chunk_str = chunk.decode('utf-8', errors='replace')
-                        except Exception as e:
-                            yield {
-                                'type': 'error',
-                                'message': f'Decoding error at byte {i}: {str(e)}'
-                            }
-                            continue
-                        
-                        # Yield chunk data
+                    # Decode chunk
+                    try:
+                        chunk_str = decoder.decode(chunk, final=processed_bytes >= file_size)
+                    except Exception as e:
                         yield {
-                            'type': 'chunk',
-                            'data': chunk_str,
-                            'chunk_number': i // chunk_size + 1,
-                            'progress': (processed_bytes / file_size) * 100,
-                            'bytes_processed': processed_bytes
+                            'type': 'error',
+                            'message': f'Decoding error at byte {i}: {str(e)}'
                         }
-            
-            # Clean up temporary file
-            os.unlink(temp_path)
+                        continue
+                    finally:
+                        # No slice may outlive the staged upload
+                        chunk.release()
+                    
+                    # Yield chunk data
+                    yield {
+                        'type': 'chunk',
+                        'data': chunk_str,
+                        'chunk_number': i // chunk_size + 1,
+                        'progress': (processed_bytes / file_size) * 100,
+                        'bytes_processed': processed_bytes
+                    }
             
             yield {
                 'type': 'complete',
@@ -223,84 +364,125 @@ class EnterpriseFileProcessor:
                 'message': f'Streaming processing failed: {str(e)}'
             }
     
-    def _read_file_safely(self, file_obj) -> Optional[bytes]:
-        """Safely read file content with size limits"""
+    def ingest(self, source, compression: Optional[str] = None) -> Optional[IngestResult]:
+        """Stage an upload and read it once, feeding every consumer from the same chunks
+        
+        source is a path, a bytes-like object or a file object; see
+        StagedUpload. Returns None when the upload exceeds max_file_size.
+        With a compression format ('gzip', 'bz2', 'xz' or 'zstd') the source
+        is decompressed as a stream into the spool, so only the staged
+        decompressed bytes are ever held, spilling to disk past
+        spool_threshold. DecompressionLimitExceeded is raised when the
+        output passes max_decompressed_size or max_compression_ratio.
+        """
+        reader = None
+        if compression:
+            source = reader = self._decompressing_reader(source, compression)
         try:
-            # Reset file pointer
-            file_obj.seek(0)
-            
-            # Read in chunks to avoid memory issues
-            content = b''
-            while True:
-                chunk = file_obj.read(self.chunk_size)
-                if not chunk:
-                    break
-                
-                content += chunk
-                
-                # Check size limit
-                if len(content) > self.max_file_size:
-                    self.logger.warning(f"File exceeds size limit: {len(content)} bytes")
-                    return None
-            
-            return content
-            
-        except Exception as e:
-            self.logger.error(f"Error reading file: {str(e)}")
+            staged = StagedUpload.stage(source, self.spool_threshold, self.max_file_size,
+                                        self.temp_dir, self.ingest_chunk_size)
+        except UploadTooLarge as e:
+            self.logger.warning(f"File exceeds size limit: {e.size} bytes")
             return None
+        finally:
+            if reader is not None:
+                reader.close()
+        with staged:
+            result = self._ingest_view(staged.view)
+        if reader is not None:
+            result.compression = compression
+            result.compressed_size = reader.compressed
+        return result
+    
+    def _decompressing_reader(self, source, compression: str) -> DecompressingReader:
+        """Guarded stream of the decompressed bytes of source"""
+        return DecompressingReader(source, compression, self.max_decompressed_size,
+                                   self.max_compression_ratio)
+    
+    @contextmanager
+    def open_text_stream(self, source, filename: str, max_size: int) -> Iterator[TextStream]:
+        """Stage an upload of up to max_size bytes and read it back as a TextStream
+        
+        For uploads too large for ingest: compressed uploads are decompressed
+        into the spool like in ingest, but against max_size, and the text is
+        decoded chunk by chunk instead of in one allocation. The encoding is
+        detected from the staged bytes first. Raises UploadTooLarge, or
+        DecompressionLimitExceeded for compressed uploads.
+        """
+        compression = split_compression(filename)[1]
+        reader = None
+        if compression:
+            source = reader = DecompressingReader(source, compression, max_size, self.max_compression_ratio)
+        try:
+            staged = StagedUpload.stage(source, self.spool_threshold, max_size,
+                                        self.temp_dir, self.ingest_chunk_size)
+        finally:
+            if reader is not None:
+                reader.close()
+        with staged:
+            yield TextStream(self, staged.view, self.encoding_detector.detect(staged.view))
+    
+    def _ingest_view(self, view: memoryview) -> IngestResult:
+        """Hash, scan, count and decode staged bytes
+        
+        Each chunk goes to the MD5 and SHA-256 hashers and the malicious
+        pattern prefilter as bytes. The content is then decoded from the
+        view once, in a single allocation, and the line counter and the
+        suspicious SQL prefilter run over slices of that text. Content
+        without a BOM is decoded optimistically as UTF-8; anything else is
+        decoded with the encoding detected from samples.
+        """
+        scanned = _ByteConsumer(self.malicious_matcher)
+        for start in range(0, len(view), self.ingest_chunk_size):
+            chunk = view[start:start + self.ingest_chunk_size]
+            scanned.feed(chunk)
+            chunk.release()
+        
+        if self.encoding_detector.bom_encoding(view):
+            content, encoding = self.encoding_detector.decode(view)
+        else:
+            try:
+                content = str(view, 'utf-8')
+                # UTF-8 decodes to one character per byte only for ASCII
+                encoding = (EncodingResult('ascii', 1.0, 'ascii') if len(content) == len(view)
+                            else EncodingResult('utf-8', 0.99, 'utf-8'))
+            except UnicodeDecodeError:
+                content, encoding = self.encoding_detector.decode_non_utf8(view)
+        
+        text = _TextConsumer(self.suspicious_sql_matcher)
+        for start in range(0, len(content), self.ingest_chunk_size):
+            text.feed(content[start:start + self.ingest_chunk_size])
+        
+        return IngestResult(
+            content=content,
+            size=len(view),
+            line_count=text.line_count(),
+            hash_md5=scanned.md5.hexdigest(),
+            hash_sha256=scanned.sha256.hexdigest(),
+            encoding=encoding,
+            malicious_found=scanned.malicious_found,
+            suspicious_found=text.suspicious_found
+        )
     
     def _is_valid_extension(self, filename: str) -> bool:
-        """Check if file has valid extension"""
+        """Check if file has valid extension, optionally followed by a compressed one"""
         if not filename:
             return False
         
-        _, ext = os.path.splitext(filename.lower())
+        filename = filename.lower()
+        stem, compression = split_compression(filename)
+        if compression:
+            if compression not in self.compressed_extensions.values():
+                return False
+            filename = stem
+        _, ext = os.path.splitext(filename)
         return ext in self.supported_extensions
     
     def _validate_security(self, file_content: bytes, content_str: str) -> Dict[str, Any]:
         """Validate file content for security threats"""
         try:
-            # Check for malicious binary patterns
-            for pattern in self.malicious_patterns:
-                if pattern in file_content:
-                    return {
-                        'is_safe': False,
-                        'reason': f'Potentially malicious content detected: {pattern.decode("utf-8", errors="replace")}'
-                    }
-            
-            # Check for suspicious SQL patterns
-            suspicious_sql = [
-                'xp_cmdshell',
-                'sp_oacreate',
-                'sp_oamethod',
-                'openrowset',
-                'opendatasource',
-                'bulk insert',
-                'load_file(',
-                'into outfile',
-                'into dumpfile'
-            ]
-            
-            content_lower = content_str.lower()
-            for pattern in suspicious_sql:
-                if pattern in content_lower:
-                    return {
-                        'is_safe': False,
-                        'reason': f'Potentially dangerous SQL function detected: {pattern}'
-                    }
-            
-            # Check file size ratio (compressed vs uncompressed)
-            if len(content_str.encode('utf-8')) / len(file_content) > 10:
-                return {
-                    'is_safe': False,
-                    'reason': 'Suspicious compression ratio detected'
-                }
-            
-            return {
-                'is_safe': True,
-                'reason': 'Content passed security validation'
-            }
-            
+            return self._security_verdict(self.malicious_matcher.search_all(file_content),
+                                          self.suspicious_sql_matcher.search_all(content_str))
         except Exception as e:
             self.logger.error(f"Security validation error: {str(e)}")
             return {
@@ -308,6 +490,33 @@ class EnterpriseFileProcessor:
                 'reason': f'Security validation failed: {str(e)}'
             }
     
+    def _security_verdict(self, malicious_found: Set[str], suspicious_found: Set[str]) -> Dict[str, Any]:
+        """Security verdict from the patterns found in the raw and decoded content
+        
+        Decompression bombs are stopped earlier, while compressed uploads
+        are staged; see DecompressingReader.
+        """
+        # Check for malicious binary patterns
+        for pattern in self.malicious_patterns:
+            if pattern.decode('latin-1') in malicious_found:
+                return {
+                    'is_safe': False,
+                    'reason': f'Potentially malicious content detected: {pattern.decode("utf-8", errors="replace")}'
+                }
+        
+        # Check for suspicious SQL patterns, matched case-insensitively
+        for pattern in self.suspicious_sql:
+            if pattern in suspicious_found:
+                return {
+                    'is_safe': False,
+                    'reason': f'Potentially dangerous SQL function detected: {pattern}'
+                }
+        
+        return {
+            'is_safe': True,
+            'reason': 'Content passed security validation'
+        }
+    
     def _count_lines_efficiently(self, content: str) -> int:
         """Efficiently count lines in content"""
         try:
@@ -13,6 +13,8 @@ import threading
 from functools import wraps
 import time
 
+from rule_engine import Rule, RuleSet
+
 class EnterpriseLogger:
     """Enterprise-grade logging system with audit trails"""
     
@@ -338,21 +340,20 @@ class SecurityMonitor:
             r"(?i)(exec|execute|sp_|xp_)",
             r"(?i)(--|#|/\*|\*/)"
         ]
+        self.suspicious_rules = RuleSet(Rule(pattern, pattern) for pattern in self.suspicious_patterns)
         self.failed_attempts = {}
         self.blocked_ips = set()
     
     def check_sql_injection(self, content):
         """Check for SQL injection patterns"""
-        import re
-        
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, content):
-                enterprise_logger.log_security_event(
-                    'sql_injection_attempt',
-                    'high',
-                    f"Potential SQL injection detected: {pattern}"
-                )
-                return True
+        rule = self.suspicious_rules.search(content)
+        if rule:
+            enterprise_logger.log_security_event(
+                'sql_injection_attempt',
+                'high',
+                f"Potential SQL injection detected: {rule.pattern}"
+            )
+            return True
         
         return False
     
@@ -77,15 +77,13 @@ class ExportEngine:
 
 """
         
-        # Add intelligent comments
-        commented_sql = result.corrected_sql
-        for comment in result.intelligent_comments:
-            lines = commented_sql.split('\n')
+        # Add intelligent comments, bottom-up so earlier line numbers stay valid
+        lines = result.corrected_sql.split('\n')
+        for comment in reversed(sorted(result.intelligent_comments, key=lambda c: c['line_number'])):
             if comment['line_number'] <= len(lines):
                 lines.insert(comment['line_number'] - 1, comment['comment'])
-                commented_sql = '\n'.join(lines)
         
-        return header + commented_sql
+        return header + '\n'.join(lines)
     
     def export_html(self, result: Any, options: Dict[str, Any]) -> str:
         """Export HTML report"""
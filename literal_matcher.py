@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+LITERAL MATCHER
+Multi-literal search that reports every occurrence in a single pass
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Set, Tuple, Union
+
+Buffer = Union[str, bytes, bytearray, memoryview]
+
+# Non-ASCII characters that match ASCII letters under re.IGNORECASE. 'K'
+# (Kelvin sign) already lowercases to 'k'; these ones do not, or expand.
+_STR_FOLDS = (('İ', 'i'), ('ı', 'i'), ('ſ', 's'))
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation factored as a prefix trie
+
+    Shared prefixes are matched once, so the regex engine walks the trie like
+    an automaton and the longest literal wins at each position.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Literals ending here stay optional suffixes, tried longest first
+        return '(?:' + pattern + ')?' if '' in node else pattern
+
+    return build(trie)
+
+class LiteralMatcher:
+    """Find all occurrences of a set of literals in str or bytes content
+
+    The literals are compiled into one trie-shaped regex, which the regex
+    engine runs as an automaton over the content. Case-insensitive matching
+    lowers one chunk at a time, so no full-size lowercase copy is created.
+    """
+
+    def __init__(self, literals: Iterable[str], ignorecase: bool = True,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.literals: List[str] = list(dict.fromkeys(literal for literal in literals if literal))
+        self.ignorecase = ignorecase
+        self.chunk_size = chunk_size
+        self.max_length = max((len(literal) for literal in self.literals), default=0)
+
+        # Each searchable key maps to every literal that is a prefix of it, so
+        # shorter literals starting at the same offset are reported as well
+        keys: Dict[str, List[str]] = {}
+        for literal in self.literals:
+            keys.setdefault(self._fold(literal), []).append(literal)
+        self._prefixes: Dict[str, List[str]] = {}
+        for key in keys:
+            self._prefixes[key] = [literal for other, group in sorted(keys.items(), key=lambda item: len(item[0]))
+                                   if key.startswith(other) for literal in group]
+        self._byte_prefixes = {key.encode('utf-8'): literals for key, literals in self._prefixes.items()}
+
+        source = _trie_pattern(keys) if keys else None
+        self._pattern: Optional[Pattern] = re.compile(source) if source else None
+        self._byte_pattern: Optional[Pattern] = re.compile(source.encode('utf-8')) if source else None
+
+    def __len__(self) -> int:
+        return len(self.literals)
+
+    def _fold(self, text: str) -> str:
+        """Normalize a str for comparison, preserving its length"""
+        if not self.ignorecase:
+            return text
+        if not text.isascii():
+            for char, replacement in _STR_FOLDS:
+                if char in text:
+                    text = text.replace(char, replacement)
+        return text.lower()
+
+    def finditer(self, content: Buffer, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Yield (offset, literal) for every occurrence, overlapping ones included"""
+        if self._pattern is None:
+            return
+        is_text = isinstance(content, str)
+        pattern = self._pattern if is_text else self._byte_pattern
+        prefixes = self._prefixes if is_text else self._byte_prefixes
+        end = len(content) if end is None else min(end, len(content))
+        overlap = self.max_length - 1
+        boundary = start
+
+        while boundary < end:
+            chunk_start = max(start, boundary - overlap)
+            chunk_end = min(end, boundary + self.chunk_size)
+            chunk = content[chunk_start:chunk_end]
+            if is_text:
+                chunk = self._fold(chunk)
+            else:
+                if not isinstance(chunk, bytes):
+                    chunk = bytes(chunk)
+                if self.ignorecase:
+                    chunk = chunk.lower()
+
+            pos = 0
+            match = pattern.search(chunk, pos)
+            while match is not None:
+                offset = chunk_start + match.start()
+                for literal in prefixes[match.group()]:
+                    # Occurrences ending before the boundary were reported
+                    # with the previous chunk
+                    if offset + len(literal) > boundary:
+                        yield offset, literal
+                pos = match.start() + 1
+                match = pattern.search(chunk, pos)
+
+            boundary = chunk_end
+
+    def search_all(self, content: Buffer, start: int = 0, end: Optional[int] = None) -> Set[str]:
+        """Distinct literals present in the content, stopping once all are found
+
+        Offsets are not needed here, so each cache-sized chunk is folded once
+        and probed with the C substring search for the literals still missing.
+        """
+        found: Set[str] = set()
+        if not self.literals:
+            return found
+        is_text = isinstance(content, str)
+        keys = [(self._fold(literal) if is_text else self._fold(literal).encode('utf-8'), literal)
+                for literal in self.literals]
+        end = len(content) if end is None else min(end, len(content))
+        overlap = self.max_length - 1
+        boundary = start
+
+        while boundary < end and len(found) < len(self.literals):
+            chunk_start = max(start, boundary - overlap)
+            chunk_end = min(end, boundary + self.chunk_size)
+            chunk = content[chunk_start:chunk_end]
+            if is_text:
+                chunk = self._fold(chunk)
+            else:
+                if not isinstance(chunk, bytes):
+                    chunk = bytes(chunk)
+                if self.ignorecase:
+                    chunk = chunk.lower()
+            for key, literal in keys:
+                if literal not in found and key in chunk:
+                    found.add(literal)
+            boundary = chunk_end
+        return found
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+LRU CACHE
+Thread-safe least-recently-used cache bounded by entries, size and age
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+class LRUCache:
+    """Thread-safe LRU cache with entry and byte budgets and optional TTL
+
+    The size of each value is estimated with the sizeof callable when a byte
+    budget is set. Inserting past either budget evicts the least recently
+    used entries; a value larger than the whole byte budget is not stored.
+    on_remove, if given, is called with the key, value and reason
+    ('evicted' or 'expired') while the cache lock is held, so it must not
+    use the cache itself.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, sizeof: Optional[Callable[[Any], int]] = None,
+                 on_remove: Optional[Callable[[Hashable, Any, str], None]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.on_remove = on_remove
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, int, Optional[float]]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a live entry exists, without touching its recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry, time.monotonic())
+
+    @property
+    def current_bytes(self) -> int:
+        """Estimated size of the stored values"""
+        return self._bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Value of a live entry, marking it as most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry, time.monotonic()):
+                self._expire(key)
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def get_many(self, keys: Iterable[Hashable], default: Any = None) -> List[Any]:
+        """Values of several keys in order, looked up under one lock acquisition"""
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self._is_expired(entry, now):
+                    self._expire(key)
+                    entry = None
+                if entry is None:
+                    self._stats['misses'] += 1
+                    values.append(default)
+                    continue
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                values.append(entry[0])
+        return values
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store a value, evicting old entries to fit; False if it cannot fit"""
+        return self.set_many({key: value}, ttl) == 1
+
+    def set_many(self, items: Dict[Hashable, Any], ttl: Optional[float] = None) -> int:
+        """Store several values under one lock acquisition; returns how many fit"""
+        sized = [
+            (key, value, self.sizeof(value) if self.sizeof and self.max_bytes is not None else 0)
+            for key, value in items.items()
+        ]
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+
+        stored = 0
+        with self._lock:
+            for key, value, size in sized:
+                if key in self._entries:
+                    self._remove(key)
+                if self.max_bytes is not None and size > self.max_bytes:
+                    continue
+                self._entries[key] = (value, size, expires)
+                self._bytes += size
+                stored += 1
+            self._evict()
+        return stored
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove an entry; False if it was not cached"""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def evict_oldest(self) -> bool:
+        """Evict the least recently used entry; False if the cache is empty"""
+        with self._lock:
+            if not self._entries:
+                return False
+            self._pop_oldest()
+            return True
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def clear_expired(self) -> int:
+        """Remove expired entries and return how many were dropped"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if self._is_expired(entry, now)]
+            for key in expired:
+                self._expire(key)
+            return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size, budget and hit/miss/eviction counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            })
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] / lookups) * 100 if lookups else 0.0
+        return stats
+
+    @staticmethod
+    def _is_expired(entry: Tuple[Any, int, Optional[float]], now: float) -> bool:
+        return entry[2] is not None and now >= entry[2]
+
+    def _remove(self, key: Hashable) -> None:
+        """Drop an entry; the lock must be held"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _expire(self, key: Hashable) -> None:
+        """Drop an expired entry; the lock must be held"""
+        value = self._entries[key][0]
+        self._remove(key)
+        self._stats['expirations'] += 1
+        if self.on_remove:
+            self.on_remove(key, value, 'expired')
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until both budgets hold"""
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries) or
+            (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._pop_oldest()
+
+    def _pop_oldest(self) -> None:
+        """Evict the least recently used entry; the lock must be held"""
+        key, (value, size, _) = self._entries.popitem(last=False)
+        self._bytes -= size
+        self._stats['evictions'] += 1
+        if self.on_remove:
+            self.on_remove(key, value, 'evicted')
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+RULE ENGINE
+Precompiled pattern rules executed as a single combined scan
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Pattern, Sequence, Set, Tuple
+
+from literal_matcher import LiteralMatcher
+
+try:
+    import re._parser as _sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse as _sre_parse
+
+# Leading global flags such as "(?i)" become scoped flags in the combined pattern
+_INLINE_FLAGS = re.compile(r'^\(\?([imsx]+)\)')
+_FLAG_LETTERS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}
+_SCOPABLE_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL | re.VERBOSE
+
+# Combined patterns compiled for subsets of rules are cached up to this size
+MAX_COMBINED_PATTERNS = 256
+
+# Character ranges wider than this are not worth a first-character guard
+_MAX_GUARD_RANGE = 128
+_CATEGORY_CHARS = {
+    _sre_parse.CATEGORY_DIGIT: '0123456789',
+    _sre_parse.CATEGORY_SPACE: ' \t\n\r\f\v',
+}
+
+def _first_chars(items, ignorecase: bool) -> Tuple[Optional[Set[Tuple[str, bool]]], bool]:
+    """Characters a parsed pattern sequence can start with, and whether it can match empty
+
+    Characters are paired with the case-insensitivity they are matched
+    with. None means the first character cannot be narrowed down.
+    """
+    chars: Set[Tuple[str, bool]] = set()
+    for op, av in items:
+        if op is _sre_parse.LITERAL:
+            chars.add((chr(av), ignorecase))
+            return chars, False
+        elif op is _sre_parse.IN:
+            for set_op, set_av in av:
+                if set_op is _sre_parse.LITERAL:
+                    chars.add((chr(set_av), ignorecase))
+                elif set_op is _sre_parse.RANGE and set_av[1] - set_av[0] <= _MAX_GUARD_RANGE:
+                    chars.update((chr(code), ignorecase) for code in range(set_av[0], set_av[1] + 1))
+                elif set_op is _sre_parse.CATEGORY and set_av in _CATEGORY_CHARS:
+                    chars.update((char, ignorecase) for char in _CATEGORY_CHARS[set_av])
+                else:
+                    return None, False
+            return chars, False
+        elif op is _sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, sub_items = av
+            sub_ignorecase = (ignorecase or bool(add_flags & re.IGNORECASE)) and not del_flags & re.IGNORECASE
+            sub_chars, nullable = _first_chars(sub_items, sub_ignorecase)
+        elif op is _sre_parse.BRANCH:
+            sub_chars, nullable = set(), False
+            for branch in av[1]:
+                branch_chars, branch_nullable = _first_chars(branch, ignorecase)
+                if branch_chars is None:
+                    return None, False
+                sub_chars |= branch_chars
+                nullable = nullable or branch_nullable
+        elif op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT):
+            sub_chars, nullable = _first_chars(av[2], ignorecase)
+            nullable = nullable or av[0] == 0
+        elif op in (_sre_parse.AT, _sre_parse.ASSERT, _sre_parse.ASSERT_NOT):
+            # Zero-width assertions do not consume the first character
+            continue
+        else:
+            return None, False
+
+        if sub_chars is None:
+            return None, False
+        chars |= sub_chars
+        if not nullable:
+            return chars, False
+    return chars, True
+
+def _literal_score(literals: Set[str]) -> Tuple[int, int]:
+    """Prefer trigger sets whose shortest literal is longest, then smaller sets"""
+    return min(len(literal) for literal in literals), -len(literals)
+
+def _required_literals(items) -> Optional[Set[str]]:
+    """Literals at least one of which occurs in every match of a parsed sequence
+
+    None means no such set could be derived and the rule cannot be prefiltered.
+    """
+    best: Optional[Set[str]] = None
+    run: List[str] = []
+
+    def consider(candidate: Optional[Set[str]]):
+        nonlocal best
+        if candidate and (best is None or _literal_score(candidate) > _literal_score(best)):
+            best = candidate
+
+    for op, av in items:
+        if op is _sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is _sre_parse.AT:
+            # Anchors are zero-width, so the literal run stays contiguous
+            continue
+
+        consider({''.join(run)} if run else None)
+        run = []
+        if op is _sre_parse.SUBPATTERN:
+            consider(_required_literals(av[3]))
+        elif op is _sre_parse.BRANCH:
+            alternatives = [_required_literals(branch) for branch in av[1]]
+            if all(alternatives):
+                consider(set().union(*alternatives))
+        elif op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT) and av[0] >= 1:
+            consider(_required_literals(av[2]))
+
+    consider({''.join(run)} if run else None)
+    return best
+
+def _guard_class(chars: Set[Tuple[str, bool]]) -> str:
+    """Lookahead accepting any of the given first characters"""
+    parts = []
+    for ignorecase in (False, True):
+        members = ''.join(sorted(re.escape(char) for char, flag in chars if flag == ignorecase))
+        if members:
+            parts.append(f'(?i:[{members}])' if ignorecase else f'[{members}]')
+    return '(?=' + '|'.join(parts) + ')'
+
+@dataclass
+class Rule:
+    """Single pattern rule with arbitrary metadata"""
+    rule_id: str
+    pattern: str
+    flags: int = 0
+    data: Dict[str, Any] = field(default_factory=dict)
+    triggers: Optional[Tuple[str, ...]] = None
+
+    def __post_init__(self):
+        body = self.pattern
+        flags = self.flags
+        inline = _INLINE_FLAGS.match(body)
+        if inline:
+            for letter in inline.group(1):
+                flags |= _FLAG_LETTERS[letter]
+            body = body[inline.end():]
+        if flags & ~_SCOPABLE_FLAGS:
+            raise ValueError(f"Rule {self.rule_id!r} uses flags that cannot be combined")
+
+        self.regex: Pattern = re.compile(body, flags)
+        letters = ''.join(letter for letter, value in _FLAG_LETTERS.items() if flags & value)
+        self.scoped_pattern = f'(?{letters}:{body})' if letters else f'(?:{body})'
+
+        # Positions that cannot start a match are skipped by a cheap lookahead
+        try:
+            parsed = _sre_parse.parse(body, flags)
+            chars, nullable = _first_chars(parsed, bool(flags & re.IGNORECASE))
+        except Exception:
+            parsed, chars, nullable = None, None, True
+        self.first_chars = chars if chars and not nullable else None
+
+        # Literals one of which every match contains; the prefilter skips the
+        # rule wherever none of them occurs. Matching is ASCII case-folded, so
+        # literals outside ASCII are not used.
+        if self.triggers is None and parsed is not None:
+            try:
+                literals = _required_literals(parsed)
+            except Exception:
+                literals = None
+            if literals and all(literal.isascii() for literal in literals):
+                self.triggers = tuple(sorted(literals))
+
+class RuleSet:
+    """Rules compiled once into a combined alternation of named groups
+
+    A scan searches the combined pattern; when a rule matches, the search
+    resumes at the same position without that rule, so every matching rule
+    is reported after one pass over the text plus one retry per hit.
+    """
+
+    # Texts shorter than this are scanned directly; the prefilter only pays
+    # off once it can rule out regex work on a larger body of text. Many
+    # short texts are prefiltered together with span_candidates instead.
+    prefilter_min_length = 4096
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules: List[Rule] = list(rules)
+        self._by_id = {rule.rule_id: rule for rule in self.rules}
+        if len(self._by_id) != len(self.rules):
+            raise ValueError("Rule identifiers must be unique")
+
+        self._all = tuple(range(len(self.rules)))
+        self._combined: Dict[Tuple[int, ...], Pattern] = {}
+        self._full = self._compile(self._all)
+
+        # Trigger literals of every rule share one literal matcher
+        self._trigger_rules: Dict[str, List[int]] = {}
+        for i, rule in enumerate(self.rules):
+            for literal in rule.triggers or ():
+                self._trigger_rules.setdefault(literal, []).append(i)
+        self._unfiltered = frozenset(i for i, rule in enumerate(self.rules) if not rule.triggers)
+        self._unfiltered_indexes = tuple(sorted(self._unfiltered))
+        self.prefilter = LiteralMatcher(self._trigger_rules) if self._trigger_rules else None
+
+    @classmethod
+    def from_patterns(cls, patterns: Dict[str, str], flags: int = 0) -> 'RuleSet':
+        """Build a rule set from a mapping of rule id to pattern"""
+        return cls(Rule(rule_id, pattern, flags) for rule_id, pattern in patterns.items())
+
+    @classmethod
+    def from_dicts(cls, rules: Iterable[Dict[str, Any]], id_key: str, flags: int = 0) -> 'RuleSet':
+        """Build a rule set from rule dictionaries holding a 'pattern' key"""
+        return cls(Rule(rule[id_key], rule['pattern'], flags, rule) for rule in rules)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __iter__(self) -> Iterator[Rule]:
+        return iter(self.rules)
+
+    def get(self, rule_id: str) -> Optional[Rule]:
+        """Look up a rule by identifier"""
+        return self._by_id.get(rule_id)
+
+    def _compile(self, indexes: Tuple[int, ...]) -> Pattern:
+        """Combined pattern for a subset of rules"""
+        branches = []
+        first_chars: Optional[Set[Tuple[str, bool]]] = set()
+        for i in indexes:
+            rule = self.rules[i]
+            branch = f'(?P<r{i}>{rule.scoped_pattern})'
+            if rule.first_chars is None:
+                first_chars = None
+            else:
+                branch = _guard_class(rule.first_chars) + branch
+                if first_chars is not None:
+                    first_chars |= rule.first_chars
+            branches.append(branch)
+
+        combined = '|'.join(branches)
+        if first_chars:
+            combined = _guard_class(first_chars) + '(?:' + combined + ')'
+        return re.compile(combined)
+
+    def _pattern_for(self, indexes: Tuple[int, ...]) -> Pattern:
+        """Cached combined pattern for a subset of rules"""
+        if indexes == self._all:
+            return self._full
+        pattern = self._combined.get(indexes)
+        if pattern is None:
+            if len(self._combined) >= MAX_COMBINED_PATTERNS:
+                self._combined.clear()
+            pattern = self._combined[indexes] = self._compile(indexes)
+        return pattern
+
+    def _candidates(self, text: str, pos: int, endpos: int) -> Tuple[int, ...]:
+        """Rules that may match: untriggered ones plus those whose trigger occurs"""
+        if self.prefilter is None or endpos - pos < self.prefilter_min_length:
+            return self._all
+        candidates = set(self._unfiltered)
+        for literal in self.prefilter.search_all(text, pos, endpos):
+            candidates.update(self._trigger_rules[literal])
+        return tuple(sorted(candidates))
+
+    def _match_indexes(self, text: str, pos: int, endpos: Optional[int],
+                       candidates: Optional[Tuple[int, ...]] = None) -> List[int]:
+        """Indexes of all matching rules, in declaration order"""
+        if not self.rules:
+            return []
+        if endpos is None:
+            endpos = len(text)
+        pending = self._candidates(text, pos, endpos) if candidates is None else candidates
+        if not pending:
+            return []
+        pattern = self._pattern_for(pending)
+        found = []
+
+        while True:
+            match = pattern.search(text, pos, endpos)
+            if match is None:
+                break
+            # Other rules may still match at this position or later
+            index = int(match.lastgroup[1:])
+            found.append(index)
+            pending = tuple(i for i in pending if i != index)
+            if not pending:
+                break
+            pattern = self._pattern_for(pending)
+            pos = match.start()
+
+        found.sort()
+        return found
+
+    def match_ids(self, text: str, pos: int = 0, endpos: Optional[int] = None,
+                  candidates: Optional[Tuple[int, ...]] = None) -> List[str]:
+        """Identifiers of all rules matching the text
+
+        candidates, an entry of span_candidates, limits the scan to the
+        rules the prefilter found a trigger for.
+        """
+        return [self.rules[i].rule_id for i in self._match_indexes(text, pos, endpos, candidates)]
+
+    def matches(self, text: str, pos: int = 0, endpos: Optional[int] = None,
+                candidates: Optional[Tuple[int, ...]] = None) -> List[Rule]:
+        """All rules matching the text, optionally limited to candidates as in match_ids"""
+        return [self.rules[i] for i in self._match_indexes(text, pos, endpos, candidates)]
+
+    def search(self, text: str, pos: int = 0, endpos: Optional[int] = None) -> Optional[Rule]:
+        """Rule with the leftmost match, or None when no rule matches"""
+        if not self.rules:
+            return None
+        if endpos is None:
+            endpos = len(text)
+        candidates = self._candidates(text, pos, endpos)
+        if not candidates:
+            return None
+        match = self._pattern_for(candidates).search(text, pos, endpos)
+        if match is None:
+            return None
+        return self.rules[int(match.lastgroup[1:])]
+
+    def span_candidates(self, text: str, spans: Sequence[Tuple[int, int]]) -> List[Tuple[int, ...]]:
+        """Rules worth running on each span of the text, from one prefilter pass
+
+        The prefilter runs once over the whole text and each trigger hit is
+        attributed to the span containing it. The entry of a span without
+        any trigger holds only the rules that cannot be prefiltered, often
+        none, so no regex runs on it at all.
+        """
+        hits: Dict[int, Set[int]] = {}
+        if self.prefilter is not None:
+            starts = [start for start, _ in spans]
+            for offset, literal in self.prefilter.finditer(text):
+                number = bisect_right(starts, offset) - 1
+                if number >= 0 and offset + len(literal) <= spans[number][1]:
+                    hits.setdefault(number, set()).update(self._trigger_rules[literal])
+
+        return [tuple(sorted(hits[number] | self._unfiltered)) if number in hits else self._unfiltered_indexes
+                for number in range(len(spans))]
+
+    def scan_spans(self, text: str, spans: Sequence[Tuple[int, int]]) -> Iterator[Tuple[int, List[Rule]]]:
+        """Yield (span number, matching rules) for each span of the text with a match
+
+        Regex rules only run on the spans (lines or statements) where one of
+        their triggers occurs; see span_candidates.
+        """
+        if not self.rules:
+            return
+        for number, candidates in enumerate(self.span_candidates(text, spans)):
+            if not candidates:
+                continue
+            start, end = spans[number]
+            found = self._match_indexes(text, start, end, candidates)
+            if found:
+                yield number, [self.rules[i] for i in found]
@@ -10,6 +10,9 @@ import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+from rule_engine import Rule, RuleSet
+from sql_lexer import LineIndex, default_lexer
+
 class SQLAnalyzer:
     """Real SQL Analysis Engine with syntax checking and optimization"""
     
@@ -38,9 +41,8 @@ class SQLAnalyzer:
         """Analyze SQL content for syntax, performance, and quality"""
         start_time = time.time()
         
-        # Clean and prepare content
-        cleaned_content = self._clean_sql(content)
-        statements = self._split_statements(cleaned_content)
+        # Split into whitespace-normalized statements without comments
+        statements = self._split_statements(content)
         
         # Perform analysis
         syntax_errors = self._check_syntax(statements)
@@ -67,56 +69,9 @@ class SQLAnalyzer:
             'corrected_sql': self._apply_corrections(content, syntax_errors)
         }
     
-    def _clean_sql(self, content: str) -> str:
-        """Clean SQL content by removing comments and normalizing whitespace"""
-        # Remove single-line comments
-        content = re.sub(r'--.*$', '', content, flags=re.MULTILINE)
-        
-        # Remove multi-line comments
-        content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-        
-        # Normalize whitespace
-        content = re.sub(r'\s+', ' ', content)
-        
-        return content.strip()
-    
     def _split_statements(self, content: str) -> List[str]:
         """Split SQL content into individual statements"""
-        # Split by semicolon, but be careful with strings
-        statements = []
-        current_statement = ""
-        in_string = False
-        string_char = None
-        
-        i = 0
-        while i < len(content):
-            char = content[i]
-            
-            if not in_string:
-                if char in ("'", '"'):
-                    in_string = True
-                    string_char = char
-                elif char == ';':
-                    if current_statement.strip():
-                        statements.append(current_statement.strip())
-                    current_statement = ""
-                    i += 1
-                    continue
-            else:
-                if char == string_char:
-                    # Check if it's escaped
-                    if i > 0 and content[i-1] != '\\':
-                        in_string = False
-                        string_char = None
-            
-            current_statement += char
-            i += 1
-        
-        # Add the last statement if it exists
-        if current_statement.strip():
-            statements.append(current_statement.strip())
-        
-        return [stmt for stmt in statements if stmt]
+        return default_lexer.split_statements(content, normalize_whitespace=True)
     
     def _check_syntax(self, statements: List[str]) -> List[Dict[str, Any]]:
         """Check for syntax errors in SQL statements"""
@@ -408,6 +363,69 @@ class SecurityAnalyzer:
             r"<embed[^>]*>"
         ]
 
+        self.credential_patterns = [
+            r"(?i)(password|pwd|pass)\s*=\s*['\"][^'\"]+['\"]",
+            r"(?i)(api_key|apikey|secret)\s*=\s*['\"][^'\"]+['\"]",
+            r"(?i)(token|auth)\s*=\s*['\"][^'\"]+['\"]"
+        ]
+
+        self.dangerous_function_patterns = [
+            r"(?i)\bexec\s*\(",
+            r"(?i)\beval\s*\(",
+            r"(?i)\bload_file\s*\(",
+            r"(?i)\binto\s+outfile",
+            r"(?i)\bsystem\s*\(",
+            r"(?i)\bshell_exec\s*\("
+        ]
+
+        self.vulnerability_types = {
+            'sql_injection': {
+                'risk_level': 'high',
+                'owasp_category': 'A03_2021_Injection',
+                'cwe_id': 'CWE-89',
+                'title': 'Potential SQL Injection',
+                'description': 'SQL code that may be vulnerable to injection attacks',
+                'recommendation': 'Use parameterized queries or prepared statements'
+            },
+            'xss': {
+                'risk_level': 'medium',
+                'owasp_category': 'A03_2021_Injection',
+                'cwe_id': 'CWE-79',
+                'title': 'Potential Cross-Site Scripting (XSS)',
+                'description': 'Code that may allow XSS attacks',
+                'recommendation': 'Sanitize and validate all user inputs'
+            },
+            'hardcoded_credentials': {
+                'risk_level': 'high',
+                'owasp_category': 'A07_2021_Authentication_Failures',
+                'cwe_id': 'CWE-798',
+                'title': 'Hardcoded Credentials',
+                'description': 'Credentials hardcoded in source code',
+                'recommendation': 'Use environment variables or secure credential storage'
+            },
+            'dangerous_function': {
+                'risk_level': 'critical',
+                'owasp_category': 'A03_2021_Injection',
+                'cwe_id': 'CWE-78',
+                'title': 'Dangerous Function Usage',
+                'description': 'Usage of potentially dangerous functions',
+                'recommendation': 'Avoid using dangerous functions or implement strict validation'
+            }
+        }
+
+        # Every pattern of every vulnerability type is evaluated in one scan
+        rule_sources = [
+            ('sql_injection', self.sql_injection_patterns, 0),
+            ('xss', self.xss_patterns, re.IGNORECASE),
+            ('hardcoded_credentials', self.credential_patterns, 0),
+            ('dangerous_function', self.dangerous_function_patterns, 0)
+        ]
+        self.rules = RuleSet(
+            Rule(f'{vuln_type}:{i}', pattern, flags, {'type': vuln_type})
+            for vuln_type, patterns, flags in rule_sources
+            for i, pattern in enumerate(patterns)
+        )
+
         self.owasp_categories = {
             'A03_2021_Injection': 'SQL Injection vulnerabilities',
             'A05_2021_Security_Misconfiguration': 'Security misconfigurations',
@@ -419,23 +437,13 @@ class SecurityAnalyzer:
         """Analyze SQL content for security vulnerabilities"""
         start_time = time.time()
 
-        vulnerabilities = []
-
-        # Check for SQL injection patterns
-        sql_injection_vulns = self._check_sql_injection(content)
-        vulnerabilities.extend(sql_injection_vulns)
+        # Check SQL injection, XSS, hardcoded credentials and dangerous
+        # functions with a single rule scan per line
+        findings = self._scan_lines(LineIndex(content))
 
-        # Check for XSS patterns
-        xss_vulns = self._check_xss(content)
-        vulnerabilities.extend(xss_vulns)
-
-        # Check for hardcoded credentials
-        credential_vulns = self._check_hardcoded_credentials(content)
-        vulnerabilities.extend(credential_vulns)
-
-        # Check for dangerous functions
-        dangerous_func_vulns = self._check_dangerous_functions(content)
-        vulnerabilities.extend(dangerous_func_vulns)
+        vulnerabilities = []
+        for vuln_type in self.vulnerability_types:
+            vulnerabilities.extend(findings[vuln_type])
 
         # Calculate security score
         security_score = self._calculate_security_score(vulnerabilities)
@@ -460,108 +468,38 @@ class SecurityAnalyzer:
             'owasp_compliance': self._check_owasp_compliance(vulnerabilities)
         }
 
-    def _check_sql_injection(self, content: str) -> List[Dict[str, Any]]:
-        """Check for SQL injection vulnerabilities"""
-        vulnerabilities = []
-        lines = content.split('\n')
-
-        for i, line in enumerate(lines, 1):
-            for pattern in self.sql_injection_patterns:
-                if re.search(pattern, line):
-                    vulnerabilities.append({
-                        'line': i,
-                        'type': 'sql_injection',
-                        'risk_level': 'high',
-                        'owasp_category': 'A03_2021_Injection',
-                        'cwe_id': 'CWE-89',
-                        'title': 'Potential SQL Injection',
-                        'description': 'SQL code that may be vulnerable to injection attacks',
-                        'code_snippet': line.strip(),
-                        'recommendation': 'Use parameterized queries or prepared statements'
-                    })
-
-        return vulnerabilities
-
-    def _check_xss(self, content: str) -> List[Dict[str, Any]]:
-        """Check for XSS vulnerabilities"""
-        vulnerabilities = []
-        lines = content.split('\n')
-
-        for i, line in enumerate(lines, 1):
-            for pattern in self.xss_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
-                    vulnerabilities.append({
-                        'line': i,
-                        'type': 'xss',
-                        'risk_level': 'medium',
-                        'owasp_category': 'A03_2021_Injection',
-                        'cwe_id': 'CWE-79',
-                        'title': 'Potential Cross-Site Scripting (XSS)',
-                        'description': 'Code that may allow XSS attacks',
-                        'code_snippet': line.strip(),
-                        'recommendation': 'Sanitize and validate all user inputs'
-                    })
-
-        return vulnerabilities
-
-    def _check_hardcoded_credentials(self, content: str) -> List[Dict[str, Any]]:
-        """Check for hardcoded credentials"""
-        vulnerabilities = []
-        lines = content.split('\n')
-
-        credential_patterns = [
-            r"(?i)(password|pwd|pass)\s*=\s*['\"][^'\"]+['\"]",
-            r"(?i)(api_key|apikey|secret)\s*=\s*['\"][^'\"]+['\"]",
-            r"(?i)(token|auth)\s*=\s*['\"][^'\"]+['\"]"
-        ]
-
-        for i, line in enumerate(lines, 1):
-            for pattern in credential_patterns:
-                if re.search(pattern, line):
-                    vulnerabilities.append({
-                        'line': i,
-                        'type': 'hardcoded_credentials',
-                        'risk_level': 'high',
-                        'owasp_category': 'A07_2021_Authentication_Failures',
-                        'cwe_id': 'CWE-798',
-                        'title': 'Hardcoded Credentials',
-                        'description': 'Credentials hardcoded in source code',
-                        'code_snippet': line.strip(),
-                        'recommendation': 'Use environment variables or secure credential storage'
-                    })
-
-        return vulnerabilities
-
-    def _check_dangerous_functions(self, content: str) -> List[Dict[str, Any]]:
-        """Check for dangerous SQL functions"""
-        vulnerabilities = []
-        lines = content.split('\n')
-
-        dangerous_functions = [
-            r"(?i)\bexec\s*\(",
-            r"(?i)\beval\s*\(",
-            r"(?i)\bload_file\s*\(",
-            r"(?i)\binto\s+outfile",
-            r"(?i)\bsystem\s*\(",
-            r"(?i)\bshell_exec\s*\("
-        ]
-
-        for i, line in enumerate(lines, 1):
-            for pattern in dangerous_functions:
-                if re.search(pattern, line):
-                    vulnerabilities.append({
-                        'line': i,
-                        'type': 'dangerous_function',
-                        'risk_level': 'critical',
-                        'owasp_category': 'A03_2021_Injection',
-                        'cwe_id': 'CWE-78',
-                        'title': 'Dangerous Function Usage',
-                        'description': 'Usage of potentially dangerous functions',
-                        'code_snippet': line.strip(),
-                        'recommendation': 'Avoid using dangerous functions or implement strict validation'
-                    })
+    def _scan_lines(self, line_index: LineIndex) -> Dict[str, List[Dict[str, Any]]]:
+        """Report one vulnerability per line and matching pattern, grouped by type
+
+        Lines are searched in place through their offsets, so the content is
+        never split; patterns only run on lines where the literal prefilter
+        found one of their trigger words, and snippets are only sliced for
+        matching lines.
+        """
+        findings = {vuln_type: [] for vuln_type in self.vulnerability_types}
+        content = line_index.content
+        spans = [(start, end) for _, start, end in line_index.iter_line_spans()]
+
+        for number, matched in self.rules.scan_spans(content, spans):
+            line = number + 1
+            start, end = spans[number]
+            snippet = content[start:end].strip()
+            for rule in matched:
+                vuln_type = rule.data['type']
+                details = self.vulnerability_types[vuln_type]
+                findings[vuln_type].append({
+                    'line': line,
+                    'type': vuln_type,
+                    'risk_level': details['risk_level'],
+                    'owasp_category': details['owasp_category'],
+                    'cwe_id': details['cwe_id'],
+                    'title': details['title'],
+                    'description': details['description'],
+                    'code_snippet': snippet,
+                    'recommendation': details['recommendation']
+                })
 
-        return vulnerabilities
+        return findings
 
     def _calculate_security_score(self, vulnerabilities: List[Dict[str, Any]]) -> int:
         """Calculate security score (0-100)"""
@@ -674,6 +612,12 @@ class PerformanceAnalyzer:
             'distinct_unnecessary': r'(?i)select\s+distinct\s+.*\s+from\s+\w+\s+where\s+\w+\s*=',
         }
 
+        # Patterns reported per statement, evaluated in one combined scan
+        self.issue_rules = RuleSet.from_patterns({
+            key: self.performance_patterns[key]
+            for key in ('select_star', 'cartesian_join', 'function_in_where', 'like_leading_wildcard')
+        })
+
         self.database_engines = {
             'mysql': {
                 'storage_engines': ['InnoDB', 'MyISAM', 'Memory'],
@@ -735,13 +679,7 @@ class PerformanceAnalyzer:
 
     def _split_statements(self, content: str) -> List[str]:
         """Split SQL content into statements"""
-        # Remove comments
-        content = re.sub(r'--.*$', '', content, flags=re.MULTILINE)
-        content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-
-        # Split by semicolon
-        statements = [stmt.strip() for stmt in content.split(';') if stmt.strip()]
-        return statements
+        return default_lexer.split_statements(content)
 
     def _identify_performance_issues(self, statements: List[str]) -> List[Dict[str, Any]]:
         """Identify performance issues in SQL statements"""
@@ -749,9 +687,10 @@ class PerformanceAnalyzer:
 
         for i, statement in enumerate(statements):
             statement_upper = statement.upper()
+            matched = set(self.issue_rules.match_ids(statement))
 
             # Check for SELECT *
-            if re.search(self.performance_patterns['select_star'], statement):
+            if 'select_star' in matched:
                 issues.append({
                     'line': i + 1,
                     'type': 'query_rewrite',
@@ -779,7 +718,7 @@ class PerformanceAnalyzer:
                 })
 
             # Check for Cartesian products
-            if re.search(self.performance_patterns['cartesian_join'], statement):
+            if 'cartesian_join' in matched:
                 issues.append({
                     'line': i + 1,
                     'type': 'join_optimization',
@@ -792,7 +731,7 @@ class PerformanceAnalyzer:
                 })
 
             # Check for functions in WHERE clause
-            if re.search(self.performance_patterns['function_in_where'], statement):
+            if 'function_in_where' in matched:
                 issues.append({
                     'line': i + 1,
                     'type': 'index_optimization',
@@ -805,7 +744,7 @@ class PerformanceAnalyzer:
                 })
 
             # Check for leading wildcard in LIKE
-            if re.search(self.performance_patterns['like_leading_wildcard'], statement):
+            if 'like_leading_wildcard' in matched:
                 issues.append({
                     'line': i + 1,
                     'type': 'query_optimization',
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+SQL LEXER
+Single-pass SQL statement splitter shared by all analysis engines
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+@dataclass
+class SQLStatement:
+    """SQL statement located in the original content"""
+    text: str
+    start: int
+    end: int
+    terminated: bool
+
+# Constructs that may hide a delimiter: they are consumed whole so that a ';'
+# inside a string, identifier, comment or function body never splits a statement
+_COMMENT_PATTERNS = [
+    ('line_comment', r'--[^\n]*'),
+    ('block_comment', r'/\*.*?(?:\*/|\Z)'),
+]
+
+# MySQL reads backslash escapes inside strings and double-quoted text
+_LITERAL_PATTERNS = [
+    ('dollar_string', r'\$(?P<dollar_tag>(?:[A-Za-z_][A-Za-z_0-9]*)?)\$.*?(?:\$(?P=dollar_tag)\$|\Z)'),
+    ('string', r"'(?:[^'\\]|\\.|'')*(?:'|\\?\Z)"),
+    ('quoted_identifier', r'"(?:[^"\\]|\\.|"")*(?:"|\\?\Z)|`(?:[^`]|``)*(?:`|\Z)'),
+]
+
+# Standard SQL: a backslash is an ordinary character, so 'C:\' is complete
+_STANDARD_LITERAL_PATTERNS = [
+    ('dollar_string', _LITERAL_PATTERNS[0][1]),
+    ('string', r"'(?:[^']|'')*(?:'|\Z)"),
+    ('quoted_identifier', r'"(?:[^"]|"")*(?:"|\Z)|`(?:[^`]|``)*(?:`|\Z)'),
+]
+
+_COMMENT_KINDS = {'line_comment', 'block_comment'}
+_NON_WHITESPACE = re.compile(r'\S')
+_DELIMITER_DIRECTIVE = re.compile(r'\s*DELIMITER[ \t]+(\S+)[^\n]*(?:\n|\Z)', re.IGNORECASE)
+_NEWLINE = re.compile(r'\n')
+
+class SQLLexer:
+    """Linear-time SQL lexer that yields statements
+
+    Backslashes escape the next character inside literals by default, as
+    in MySQL dumps; pass backslash_escapes=False for dialects that follow
+    standard SQL, where only a doubled quote escapes a quote.
+    """
+
+    def __init__(self, delimiter: str = ';', backslash_escapes: bool = True):
+        self.delimiter = delimiter
+        self.backslash_escapes = backslash_escapes
+        self._patterns: Dict[str, Pattern] = {}
+
+    def _pattern_for(self, delimiter: str) -> Pattern:
+        """Compile (once) the scanner for a delimiter"""
+        pattern = self._patterns.get(delimiter)
+        if pattern is None:
+            literals = _LITERAL_PATTERNS if self.backslash_escapes else _STANDARD_LITERAL_PATTERNS
+            if delimiter.startswith('$'):
+                # MySQL style "DELIMITER $$" has no dollar quoting
+                literals = [item for item in literals if item[0] != 'dollar_string']
+            spec = _COMMENT_PATTERNS + [('delimiter', re.escape(delimiter)),
+                                        ('code', self._code_run_pattern(delimiter, literals))]
+            pattern = re.compile('|'.join(f'(?P<{name}>{regex})' for name, regex in spec), re.DOTALL)
+            self._patterns[delimiter] = pattern
+        return pattern
+
+    @staticmethod
+    def _code_run_pattern(delimiter: str, literals: List[tuple]) -> str:
+        """Pattern for a maximal run of code up to the next comment or delimiter
+
+        Literals are matched whole inside the run, so a statement without
+        comments is consumed by a single regex match.
+        """
+        # Characters that may open a comment, a dollar quote or the delimiter
+        # only belong to the run when what follows them rules that out
+        lookaheads = {'/': [r'\*'], '-': ['-'], '$': []}
+        lookaheads.setdefault(delimiter[0], []).append(re.escape(delimiter[1:]) if len(delimiter) > 1 else '')
+        plain = [r"[^'\"`" + ''.join(re.escape(char) for char in lookaheads) + r"]+"]
+        for char, following in lookaheads.items():
+            if '' in following:
+                continue
+            plain.append(re.escape(char) + ('(?!' + '|'.join(following) + ')' if following else ''))
+        # Literal alternatives come first so that '$tag$' wins over a lone '$'
+        alternatives = [regex.replace('(?P<dollar_tag>', '(?P<run_tag>').replace('(?P=dollar_tag)', '(?P=run_tag)')
+                        for _, regex in literals] + plain
+        return '(?:' + '|'.join(alternatives) + ')+'
+
+    def iter_statements(self, content: str, normalize_whitespace: bool = False) -> Iterator[SQLStatement]:
+        """Yield statements in a single pass over the content
+
+        Statement text has comments and the trailing delimiter removed. Plain
+        text between literals is skipped by the regex engine, so the Python
+        loop only runs once per comment or delimiter.
+        """
+        for statement, _, _ in self._scan(content, self.delimiter, normalize_whitespace):
+            yield statement
+
+    def _scan(self, content: str, delimiter: str,
+              normalize_whitespace: bool) -> Iterator[Tuple[SQLStatement, int, str]]:
+        """Yield statements with the offset following their delimiter
+
+        The delimiter in effect at that offset is reported as well, so a
+        scan can be resumed from there.
+        """
+        pattern = self._pattern_for(delimiter)
+        length = len(content)
+        pos = 0
+        spans: List[List[int]] = []
+        has_code = False
+
+        while pos < length:
+            if not has_code:
+                directive = _DELIMITER_DIRECTIVE.match(content, pos)
+                if directive:
+                    delimiter = directive.group(1)
+                    pattern = self._pattern_for(delimiter)
+                    pos = directive.end()
+                    spans = []
+                    continue
+
+            match = pattern.search(content, pos)
+            gap_end = match.start() if match else length
+
+            if gap_end > pos:
+                self._add_span(spans, pos, gap_end)
+                if not has_code and _NON_WHITESPACE.search(content, pos, gap_end):
+                    has_code = True
+
+            if match is None:
+                break
+
+            kind = match.lastgroup
+            start, end = match.span()
+
+            if kind == 'delimiter':
+                statement = self._build_statement(content, spans, True, normalize_whitespace)
+                if statement:
+                    yield statement, end, delimiter
+                spans, has_code = [], False
+            elif kind in _COMMENT_KINDS:
+                # Comments split the text into separate code spans
+                spans.append(None)
+            else:
+                self._add_span(spans, start, end)
+                has_code = True
+
+            pos = end
+
+        statement = self._build_statement(content, spans, False, normalize_whitespace)
+        if statement:
+            yield statement, length, delimiter
+
+    def split_statements(self, content: str, normalize_whitespace: bool = False) -> List[str]:
+        """Split content into statement strings"""
+        return [statement.text for statement in
+                self.iter_statements(content, normalize_whitespace=normalize_whitespace)]
+
+    def index_statements(self, content: str, normalize_whitespace: bool = False) -> 'StatementIndex':
+        """Split content into statements and keep their spans for location lookups"""
+        return StatementIndex(content, self.iter_statements(content, normalize_whitespace=normalize_whitespace))
+
+    def iter_statement_batches(self, chunks: Iterable[str],
+                               normalize_whitespace: bool = False) -> Iterator['StatementIndex']:
+        """Split a stream of text chunks into batches of complete statements
+
+        A partial statement at the end of a chunk is carried over and scanned
+        again once more text arrives, so memory stays bounded by the largest
+        statement rather than the stream. Each batch indexes only its own
+        window of text; its statement lines and positions are relative to the
+        whole stream. The last batch holds the remaining text, even when it
+        has no statements.
+        """
+        delimiter = self.delimiter
+        carry = ''
+        pending: List[str] = []
+        pending_size = 0
+        min_size = 0
+        base_offset = 0
+        base_line = 0
+        base_column = 0
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            pending.append(chunk)
+            pending_size += len(chunk)
+            # Without a complete statement, wait until the carried text has
+            # doubled so long statements are not rescanned once per chunk
+            if len(carry) + pending_size < min_size:
+                continue
+
+            buffer = carry + ''.join(pending)
+            pending, pending_size = [], 0
+            statements: List[SQLStatement] = []
+            cut, next_delimiter = 0, delimiter
+            for statement, resume, active in self._scan(buffer, delimiter, normalize_whitespace):
+                if not statement.terminated:
+                    break
+                statements.append(statement)
+                cut, next_delimiter = resume, active
+
+            if not statements:
+                carry = buffer
+                min_size = 2 * len(buffer)
+                continue
+
+            window = buffer[:cut]
+            yield StatementIndex(window, statements, base_offset, base_line, base_column)
+            base_offset += cut
+            newlines = window.count('\n')
+            base_line += newlines
+            base_column = len(window) - window.rfind('\n') - 1 if newlines else base_column + len(window)
+            carry = buffer[cut:]
+            delimiter = next_delimiter
+            min_size = 0
+
+        buffer = carry + ''.join(pending)
+        statements = [statement for statement, _, _ in self._scan(buffer, delimiter, normalize_whitespace)]
+        yield StatementIndex(buffer, statements, base_offset, base_line, base_column)
+
+    @staticmethod
+    def _add_span(spans: List[Optional[List[int]]], start: int, end: int):
+        """Extend the current code span or open a new one"""
+        if spans and spans[-1] is not None and spans[-1][1] == start:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+
+    @staticmethod
+    def _build_statement(content: str, spans: List[Optional[List[int]]],
+                         terminated: bool, normalize_whitespace: bool) -> Optional[SQLStatement]:
+        """Assemble a statement from its code spans, skipping empty ones"""
+        pieces = [span for span in spans if span is not None]
+        while pieces and not _NON_WHITESPACE.search(content, pieces[0][0], pieces[0][1]):
+            pieces.pop(0)
+        while pieces and not _NON_WHITESPACE.search(content, pieces[-1][0], pieces[-1][1]):
+            pieces.pop()
+        if not pieces:
+            return None
+
+        first = content[pieces[0][0]:pieces[0][1]]
+        start = pieces[0][0] + len(first) - len(first.lstrip())
+        last = content[pieces[-1][0]:pieces[-1][1]]
+        end = pieces[-1][1] - len(last) + len(last.rstrip())
+
+        if len(pieces) == 1:
+            text = content[start:end]
+        else:
+            text = ' '.join(content[s:e] for s, e in pieces).strip()
+
+        if normalize_whitespace:
+            text = ' '.join(text.split())
+
+        return SQLStatement(
+            text=text,
+            start=start,
+            end=end,
+            terminated=terminated
+        )
+
+class LineIndex:
+    """Newline offset table mapping content offsets to line and column"""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.newlines = array('q', [match.start() for match in _NEWLINE.finditer(content)])
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines, counted like content.split('\\n')"""
+        return len(self.newlines) + 1
+
+    def line_of(self, offset: int) -> int:
+        """1-based line containing an offset"""
+        return bisect_left(self.newlines, offset) + 1
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """1-based line and 0-based column of an offset"""
+        line = bisect_left(self.newlines, offset) + 1
+        line_start = self.newlines[line - 2] + 1 if line > 1 else 0
+        return line, offset - line_start
+
+    def line_span(self, line: int) -> Tuple[int, int]:
+        """Start and end offsets of a 1-based line, newline excluded"""
+        start = self.newlines[line - 2] + 1 if line > 1 else 0
+        end = self.newlines[line - 1] if line <= len(self.newlines) else len(self.content)
+        return start, end
+
+    def iter_line_spans(self) -> Iterator[Tuple[int, int, int]]:
+        """Yield (line, start, end) for every line without copying it"""
+        start = 0
+        for line, newline in enumerate(self.newlines, 1):
+            yield line, start, newline
+            start = newline + 1
+        yield len(self.newlines) + 1, start, len(self.content)
+
+class StatementIndex(LineIndex):
+    """Span table of the statements found in a piece of content
+
+    Only offsets are stored per statement; line numbers are resolved by binary
+    search and code snippets are sliced from the original content on demand.
+    When the content is a window of a larger stream, base_offset, base_line
+    and base_column locate its start, and statement positions are reported
+    for the whole stream.
+    """
+
+    def __init__(self, content: str, statements: Iterable[SQLStatement],
+                 base_offset: int = 0, base_line: int = 0, base_column: int = 0):
+        super().__init__(content)
+        self.base_offset = base_offset
+        self.base_line = base_line
+        self.base_column = base_column
+        self.statements: List[str] = []
+        self.starts = array('q')
+        self.ends = array('q')
+        for statement in statements:
+            self.statements.append(statement.text)
+            self.starts.append(statement.start)
+            self.ends.append(statement.end)
+        self._snippets: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def statement_line(self, index: int) -> int:
+        """1-based line where a statement starts"""
+        return self.base_line + self.line_of(self.starts[index])
+
+    def statement_position(self, index: int, offset: int = 0) -> Tuple[int, int]:
+        """Line and column of an offset inside a statement
+
+        The offset is relative to the statement start and is clamped to the
+        statement span; it is approximate when comments were removed from
+        the middle of the statement text.
+        """
+        start = self.starts[index]
+        line, column = self.position(min(start + max(offset, 0), self.ends[index]))
+        if line == 1:
+            column += self.base_column
+        return self.base_line + line, column
+
+    def snippet(self, index: int, limit: int = 100) -> str:
+        """Source excerpt of a statement, truncated to limit characters"""
+        snippet = self._snippets.get(index)
+        if snippet is None:
+            start, end = self.starts[index], self.ends[index]
+            if end - start > limit:
+                snippet = self.content[start:start + limit] + '...'
+            else:
+                snippet = self.content[start:end]
+            self._snippets[index] = snippet
+        return snippet
+
+# Shared lexer instance
+default_lexer = SQLLexer()
@@ -4,6 +4,7 @@ COMPREHENSIVE SYSTEM TESTING
 Test suite for the complete SQL analysis system
 """
 
+import codecs
 import unittest
 import tempfile
 import os
@@ -17,8 +18,13 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from comprehensive_sql_analyzer import ComprehensiveSQLAnalyzer, DatabaseType
+    from rule_engine import Rule, RuleSet
+    from literal_matcher import LiteralMatcher
     from export_engine import ExportEngine
     from enterprise_file_processor import EnterpriseFileProcessor
+    from encoding_detector import EncodingDetector
+    from upload_staging import StagedUpload, UploadTooLarge
+    from upload_decompression import DecompressingReader, DecompressionLimitExceeded
     ENTERPRISE_AVAILABLE = True
 except ImportError as e:
     print(f"Enterprise modules not available: {e}")
@@ -353,6 +359,508 @@ CREATE TABLE test_table (
         print(f"   - Analysis completed: {analysis_result.processing_time:.3f}s")
         print(f"   - Export generated: {len(export_result['content'])} chars")
 
+    def test_16_shared_lexer_statement_splitting(self):
+        """Test statement splitting with literals, comments and delimiters"""
+        print("\n🔪 Testing Shared Lexer Statement Splitting...")
+
+        sql = """-- header; comment
+INSERT INTO t VALUES ('a;b', 'it''s', 'x\\';y');
+SELECT "c;x", `b;c` FROM t /* inline; */ WHERE a = 1;
+CREATE FUNCTION f() RETURNS int AS $body$ BEGIN RETURN 1; END; $body$ LANGUAGE plpgsql;
+DELIMITER $$
+CREATE PROCEDURE p() BEGIN SELECT 1; END$$
+DELIMITER ;
+SELECT 2"""
+        statements = self.analyzer.split_statements(sql)
+
+        self.assertEqual(len(statements), 5)
+        self.assertEqual(statements[0], "INSERT INTO t VALUES ('a;b', 'it''s', 'x\\';y')")
+        self.assertEqual(' '.join(statements[1].split()), 'SELECT "c;x", `b;c` FROM t WHERE a = 1')
+        self.assertIn('$body$ BEGIN RETURN 1; END; $body$', statements[2])
+        self.assertEqual(statements[3], 'CREATE PROCEDURE p() BEGIN SELECT 1; END')
+        self.assertEqual(statements[4], 'SELECT 2')
+
+        # Backslash escapes are kept for MySQL and unknown dialects
+        self.assertEqual(len(self.analyzer.split_statements("INSERT INTO t VALUES ('a\\',b'),('c');\nSELECT 1;\nSELECT 2;")), 3)
+        # Standard SQL dialects read a backslash as an ordinary character;
+        # to MySQL this literal is still open at the end of the content
+        unescaped = "SELECT 'x\\' or b = 1; select 2;\nselect 3;"
+        self.assertEqual(self.analyzer.split_statements(unescaped, DatabaseType.POSTGRESQL),
+                         ["SELECT 'x\\' or b = 1", 'select 2', 'select 3'])
+        self.assertEqual(self.analyzer.split_statements(unescaped, DatabaseType.MYSQL), [unescaped])
+        paths = "INSERT INTO t VALUES ('C:\\', 'D:\\');\nSELECT 3;"
+        self.assertEqual(self.analyzer.split_statements(paths, DatabaseType.POSTGRESQL),
+                         ["INSERT INTO t VALUES ('C:\\', 'D:\\')", 'SELECT 3'])
+        self.assertEqual(len(self.analyzer.split_statements(paths)), 1)
+        result = self.analyzer.analyze_file(paths, 'paths.sql', DatabaseType.SQL_SERVER)
+        self.assertEqual(result.total_statements, 2)
+
+        print(f"✅ Split {len(statements)} statements without breaking literals")
+
+    def test_17_statement_line_mapping(self):
+        """Test findings report the source line of their statement"""
+        print("\n📍 Testing Statement Line Mapping...")
+
+        sql = "-- header\nSELECT id FROM users;\n\n\n  DELETE FROM logs;\nSELECT *\nFROM orders WHERE id = 1;\n"
+        result = self.analyzer.analyze_file(sql, 'lines.sql', DatabaseType.MYSQL)
+
+        self.assertEqual(result.total_lines, len(sql.split('\n')))
+        delete_errors = [e for e in result.semantic_errors if 'WHERE' in e.message]
+        self.assertEqual(delete_errors[0].line_number, 5)
+        self.assertEqual(delete_errors[0].column, 2)
+        star_errors = [e for e in result.semantic_errors if 'SELECT *' in e.message]
+        self.assertEqual(star_errors[0].line_number, 6)
+        issue_lines = {issue['line_number'] for issue in result.performance_issues}
+        self.assertIn(6, issue_lines)
+
+        print(f"✅ Findings mapped to source lines {sorted(issue_lines)}")
+
+    def test_18_rule_engine_combined_scan(self):
+        """Test combined rule scans report every matching rule"""
+        print("\n🧩 Testing Rule Engine...")
+
+        import re
+        patterns = {
+            'select_star': r'(?i)select\s+\*',
+            'select_any': r'(?i)select\s+\S+',
+            'tautology': r"(?i)\bor\s+1\s*=\s*1",
+            'comment': r'--|/\*',
+            'script': r'<script[^>]*>'
+        }
+        rules = RuleSet.from_patterns(patterns)
+        samples = [
+            "SELECT * FROM users WHERE id = 1 OR 1=1 -- bypass",
+            "select name from t",
+            "<SCRIPT>alert(1)</SCRIPT>",
+            "UPDATE t SET a = 1"
+        ]
+
+        for sample in samples:
+            expected = [rule_id for rule_id, pattern in patterns.items() if re.search(pattern, sample)]
+            self.assertEqual(rules.match_ids(sample), expected)
+
+        # Offsets restrict the scan without slicing the text
+        text = "SELECT 1;\nSELECT * FROM t"
+        self.assertEqual(rules.match_ids(text, 0, 8), ['select_any'])
+        self.assertEqual(rules.search(text).rule_id, 'select_any')
+        self.assertIsNone(RuleSet([Rule('empty', 'x')]).search('SELECT'))
+
+        print(f"✅ Combined scan matched {len(rules)} rules consistently")
+
+    def test_19_literal_prefilter(self):
+        """Test literal prefilter finds overlapping hits and gates rule scans"""
+        print("\n🔎 Testing Literal Prefilter...")
+
+        matcher = LiteralMatcher(['into outfile', 'outfile', 'xp_cmdshell'], chunk_size=8)
+        content = "SELECT a INTO OUTFILE '/tmp/x'; EXEC Xp_CmdShell 'dir'"
+        hits = list(matcher.finditer(content))
+        self.assertIn((9, 'into outfile'), hits)
+        self.assertIn((14, 'outfile'), hits)
+        self.assertIn((37, 'xp_cmdshell'), hits)
+        self.assertEqual(sorted(hits), sorted(matcher.finditer(content.encode('utf-8'))))
+        self.assertEqual(matcher.search_all(content), {'into outfile', 'outfile', 'xp_cmdshell'})
+        self.assertEqual(matcher.search_all("SELECT 1"), set())
+
+        processor = EnterpriseFileProcessor()
+        sql = ("SELECT 1;\n" * 2000) + "EXEC XP_CMDSHELL 'dir';"
+        check = processor._validate_security(sql.encode('utf-8'), sql)
+        self.assertFalse(check['is_safe'])
+        self.assertIn('xp_cmdshell', check['reason'])
+
+        # Span scans only run rules on lines holding a trigger literal
+        import re
+        patterns = {
+            'union': r'(?i)union\s+select',
+            'sleep': r'(?i)sleep\s*\(',
+        }
+        rules = RuleSet.from_patterns(patterns)
+        rules.prefilter_min_length = 0
+        lines = ["SELECT 1", "x UNION  SELECT y", "SELECT SLEEP(5)", "union all"]
+        text = '\n'.join(lines)
+        spans, start = [], 0
+        for line in lines:
+            spans.append((start, start + len(line)))
+            start += len(line) + 1
+        expected = [(number, [rule_id for rule_id, pattern in patterns.items() if re.search(pattern, line)])
+                    for number, line in enumerate(lines)]
+        expected = [(number, ids) for number, ids in expected if ids]
+        scanned = [(number, [rule.rule_id for rule in matched]) for number, matched in rules.scan_spans(text, spans)]
+        self.assertEqual(scanned, expected)
+
+        # The analyzer prefilters each batch once; statements without a
+        # trigger never reach the security regexes
+        analyzer = ComprehensiveSQLAnalyzer()
+        scanned_rules = []
+        pattern_for = analyzer.security_rule_set._pattern_for
+        def recording_pattern_for(indexes):
+            scanned_rules.append(indexes)
+            return pattern_for(indexes)
+        analyzer.security_rule_set._pattern_for = recording_pattern_for
+        statements = ["CREATE INDEX idx_a ON t (a)", "DROP VIEW v", "SELECT * FROM users WHERE id = 1 OR 1=1"]
+        findings = analyzer.analyze_batch(statements, DatabaseType.MYSQL)
+        self.assertEqual(len(scanned_rules), 1)
+        self.assertEqual([len(f.security_vulnerabilities) for f in findings], [0, 0, 1])
+        self.assertEqual(findings, [analyzer.analyze_statement(statement, DatabaseType.MYSQL)
+                                    for statement in statements])
+
+        print(f"✅ Prefilter reported {len(hits)} literal hits")
+
+    def test_20_statement_cache_incremental_reanalysis(self):
+        """Test re-analysis only evaluates new or changed statements"""
+        print("\n♻️ Testing Statement Cache...")
+
+        from dataclasses import asdict
+        analyzer = ComprehensiveSQLAnalyzer()
+
+        def lookups(target):
+            stats = target.get_cache_stats()['statements']
+            return {'hits': stats['hits'], 'misses': stats['misses']}
+        original = "SELECT * FROM users;\nUPDATE accounts SET active = 0;\nSELECT name FROM t WHERE id = 1;\n"
+        edited = original.replace("id = 1", "id = 2") + "DELETE FROM logs;\n"
+
+        analyzer.analyze_file(original, 'v1.sql', DatabaseType.MYSQL)
+        self.assertEqual(lookups(analyzer), {'hits': 0, 'misses': 3})
+
+        result = analyzer.analyze_file(edited, 'v2.sql', DatabaseType.MYSQL)
+        self.assertEqual(lookups(analyzer), {'hits': 2, 'misses': 5})
+
+        # Merged findings match a cold analysis of the edited file
+        fresh = ComprehensiveSQLAnalyzer().analyze_file(edited, 'v2.sql', DatabaseType.MYSQL)
+        for field in ('syntax_errors', 'semantic_errors', 'performance_issues',
+                      'security_vulnerabilities', 'intelligent_comments', 'quality_score'):
+            self.assertEqual(asdict(result)[field], asdict(fresh)[field])
+
+        # Another dialect or rule set does not reuse cached findings
+        analyzer.analyze_statements(['SELECT * FROM users'], DatabaseType.POSTGRESQL)
+        self.assertEqual(lookups(analyzer)['misses'], 6)
+        analyzer.rule_set_version = 'changed'
+        analyzer.analyze_statements(['SELECT * FROM users'], DatabaseType.POSTGRESQL)
+        self.assertEqual(lookups(analyzer)['misses'], 7)
+
+        # Hits refresh recency, so a one-off statement evicts the cold entry
+        lru = ComprehensiveSQLAnalyzer(statement_cache_size=2)
+        lru.analyze_statements(['SELECT a FROM hot', 'SELECT b FROM cold'], DatabaseType.MYSQL)
+        lru.analyze_statements(['SELECT a FROM hot'], DatabaseType.MYSQL)
+        lru.analyze_statements(['SELECT c FROM once'], DatabaseType.MYSQL)
+        lru.analyze_statements(['SELECT a FROM hot'], DatabaseType.MYSQL)
+        self.assertEqual(lookups(lru), {'hits': 2, 'misses': 3})
+        lru.analyze_statements(['SELECT b FROM cold'], DatabaseType.MYSQL)
+        self.assertEqual(lookups(lru), {'hits': 2, 'misses': 4})
+        self.assertEqual(lru.get_cache_stats()['statements']['entries'], 2)
+
+        # Tables handed to results are not the cached objects
+        schema = "CREATE TABLE shared (id INT PRIMARY KEY, name VARCHAR(10));\n"
+        analyzer.analyze_file(schema, 's1.sql', DatabaseType.MYSQL).tables[0].columns.clear()
+        self.assertTrue(analyzer.analyze_file(schema + "SELECT 1;\n", 's2.sql', DatabaseType.MYSQL).tables[0].columns)
+
+        print(f"✅ Statement cache stats: {lookups(analyzer)}")
+
+    def test_21_process_pool_mode(self):
+        """Test process mode shards statements and merges results in order"""
+        print("\n🧮 Testing Process Pool Mode...")
+
+        from dataclasses import asdict
+        sql = ''.join(
+            f"SELECT * FROM t{i} WHERE id = {i};\nUPDATE t SET name = 'ñ{i}';\n"
+            f"CREATE TABLE a{i} (id INT, b INT, FOREIGN KEY (b) REFERENCES c(d));\n"
+            for i in range(100)
+        )
+
+        analyzer = ComprehensiveSQLAnalyzer(process_workers=2)
+        analyzer.PROCESS_MIN_STATEMENTS = 1
+        analyzer.PROCESS_CHUNK_SIZE = 40
+        try:
+            parallel = analyzer.analyze_file(sql, 'parallel.sql', DatabaseType.MYSQL)
+            self.assertIsNotNone(analyzer._process_pool)
+        finally:
+            analyzer.shutdown()
+        self.assertIsNone(analyzer._process_pool)
+
+        sequential = ComprehensiveSQLAnalyzer().analyze_file(sql, 'parallel.sql', DatabaseType.MYSQL)
+        parallel_dict, sequential_dict = asdict(parallel), asdict(sequential)
+        parallel_dict.pop('processing_time')
+        sequential_dict.pop('processing_time')
+        self.assertEqual(parallel_dict, sequential_dict)
+
+        print(f"✅ {parallel.total_statements} statements analyzed across worker processes")
+
+    def test_22_streaming_statement_analysis(self):
+        """Test streamed analysis matches whole-file analysis"""
+        print("\n🌊 Testing Streaming Analysis...")
+
+        sql = self.test_sql + "\nINSERT INTO notes VALUES ('año; niño');\nDELETE FROM sessions"
+        result = self.analyzer.analyze_file(sql, 'stream.sql', DatabaseType.MYSQL)
+
+        # Chunks split statements, strings and comments at arbitrary points
+        chunks = [sql[i:i + 7] for i in range(0, len(sql), 7)]
+        events = list(self.analyzer.analyze_stream(chunks, 'stream.sql', DatabaseType.MYSQL))
+        summary = events[-1]
+        self.assertEqual(summary['type'], 'summary')
+
+        streamed = {}
+        for event in events[:-1]:
+            self.assertEqual(event['type'], 'findings')
+            for kind in ('syntax_errors', 'semantic_errors', 'performance_issues', 'security_vulnerabilities'):
+                streamed.setdefault(kind, []).extend(event[kind])
+        for kind, findings in streamed.items():
+            self.assertEqual(findings, getattr(result, kind))
+        self.assertEqual(summary['total_statements'], result.total_statements)
+        self.assertEqual(summary['total_lines'], result.total_lines)
+        self.assertEqual(summary['quality_score'], result.quality_score)
+        self.assertEqual(summary['recommendations'], result.recommendations)
+
+        # Chunks produced by the streaming file processor feed the analyzer
+        processor_events = self.file_processor.process_large_file_streaming(BytesIO(sql.encode('utf-8')), 'stream.sql')
+        chunks = (event['data'] for event in processor_events if event['type'] == 'chunk')
+        summary = list(self.analyzer.analyze_stream(chunks, 'stream.sql', DatabaseType.MYSQL))[-1]
+        self.assertEqual(summary['total_statements'], result.total_statements)
+
+        print(f"✅ Streamed {summary['total_statements']} statements in {len(events) - 1} batches")
+
+    def test_23_bounded_result_cache(self):
+        """Test the result cache evicts, expires and returns read-only hits"""
+        print("\n🗃️ Testing Bounded Result Cache...")
+
+        analyzer = ComprehensiveSQLAnalyzer(result_cache_entries=2)
+        files = [f"SELECT id FROM t{i} WHERE id = {i};" for i in range(3)]
+
+        first = analyzer.analyze_file(files[0], 'a.sql', DatabaseType.MYSQL)
+        cached = analyzer.analyze_file(files[0], 'a.sql', DatabaseType.MYSQL)
+        self.assertIsNot(cached, first)
+        self.assertEqual(list(cached.syntax_errors), first.syntax_errors)
+        cached.processing_time = -1
+        self.assertNotEqual(analyzer.analyze_file(files[0], 'a.sql', DatabaseType.MYSQL).processing_time, -1)
+
+        # Mutating the analyzed result leaves the cached copy intact
+        detailed = ComprehensiveSQLAnalyzer()
+        expected = detailed.analyze_file(self.test_sql, 'd.sql', DatabaseType.MYSQL)
+        counts = [len(getattr(expected, field)) for field in ('syntax_errors', 'tables', 'recommendations',
+                                                              'intelligent_comments')]
+        for field in ('syntax_errors', 'semantic_errors', 'tables', 'recommendations', 'intelligent_comments'):
+            getattr(expected, field).clear()
+        hit = detailed.analyze_file(self.test_sql, 'd.sql', DatabaseType.MYSQL)
+        self.assertEqual([len(getattr(hit, field)) for field in ('syntax_errors', 'tables', 'recommendations',
+                                                                 'intelligent_comments')], counts)
+
+        # Hits share the cached findings, in tuples that cannot be emptied
+        with self.assertRaises(AttributeError):
+            hit.tables.clear()
+        self.assertIs(detailed.analyze_file(self.test_sql, 'd.sql', DatabaseType.MYSQL).tables[0], hit.tables[0])
+
+        # Another dialect is a separate entry; the least recently used one goes
+        analyzer.analyze_file(files[0], 'a.sql', DatabaseType.POSTGRESQL)
+        analyzer.analyze_file(files[1], 'b.sql', DatabaseType.MYSQL)
+        stats = analyzer.get_cache_stats()['results']
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+        # Byte budget and TTL
+        from lru_cache import LRUCache
+        lru = LRUCache(max_bytes=10, sizeof=len)
+        lru.set('a', 'x' * 6)
+        lru.set('b', 'y' * 6)
+        self.assertIsNone(lru.get('a'))
+        self.assertFalse(lru.set('c', 'z' * 11))
+        self.assertEqual(lru.current_bytes, 6)
+        lru.set('d', 'w', ttl=0)
+        self.assertIsNone(lru.get('d'))
+        self.assertEqual(lru.get_stats()['expirations'], 1)
+
+        print(f"✅ Result cache stats: {stats}")
+
+    def test_24_sampled_encoding_detection(self):
+        """Test encoding fast paths and sampled detection"""
+        print("\n🔤 Testing Encoding Detection...")
+
+        detector = EncodingDetector(sample_size=1024)
+        ascii_sql = self.test_sql.encode('ascii')
+        utf8_sql = "SELECT 'año', 'café' FROM señales;\n".encode('utf-8')
+
+        self.assertEqual(detector.detect(ascii_sql).method, 'ascii')
+        self.assertEqual(detector.detect(memoryview(ascii_sql)).method, 'ascii')
+        text, result = detector.decode(utf8_sql)
+        self.assertEqual((result.encoding, result.method), ('utf-8', 'utf-8'))
+        self.assertEqual(text, utf8_sql.decode('utf-8'))
+        self.assertEqual(detector.detect(utf8_sql).method, 'utf-8')
+        text, result = detector.decode("SELECT 'ñ';".encode('utf-16'))
+        self.assertEqual((text, result.method), ("SELECT 'ñ';", 'bom'))
+        self.assertEqual(detector.decode(codecs.BOM_UTF8 + utf8_sql)[0], utf8_sql.decode('utf-8'))
+
+        # Not UTF-8: chardet decides from the samples, or from everything
+        # when the samples are ambiguous
+        cyrillic = ("SELECT 'Привет, как дела' FROM пользователи;\n" * 200).encode('cp1251')
+        text, result = detector.decode(cyrillic)
+        self.assertIn(result.method, ('sampled', 'full'))
+        self.assertNotEqual(result.encoding, 'utf-8')
+        self.assertEqual(len(text), len(cyrillic))
+        cyrillic_encoding = result.encoding
+
+        test_file = BytesIO(utf8_sql * 100)
+        result = self.file_processor.process_file(test_file, 'encoded.sql')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['file_info'].encoding, 'utf-8')
+        self.assertEqual(result['metadata']['encoding_method'], 'utf-8')
+        self.assertIn('café', result['content'])
+
+        print(f"✅ Encoding detection: cp1251 sample detected as {cyrillic_encoding}")
+
+    def test_25_single_pass_ingestion(self):
+        """Test hashing, scanning, line counting and decoding in one chunked pass"""
+        print("\n📥 Testing Single-Pass Ingestion...")
+
+        import hashlib
+        processor = EnterpriseFileProcessor()
+        # Tiny chunks so characters and patterns straddle chunk boundaries
+        processor.ingest_chunk_size = 5
+        raw = ("SELECT 'café', 'naïve' FROM menú;\n" * 20 + "SELECT 1").encode('utf-8')
+
+        ingest = processor.ingest(BytesIO(raw))
+        self.assertEqual(ingest.content, raw.decode('utf-8'))
+        self.assertEqual(ingest.hash_md5, hashlib.md5(raw).hexdigest())
+        self.assertEqual(ingest.hash_sha256, hashlib.sha256(raw).hexdigest())
+        self.assertEqual((ingest.size, ingest.line_count), (len(raw), 21))
+        self.assertEqual(ingest.encoding.method, 'utf-8')
+
+        ingest = processor.ingest(BytesIO(b"SELECT 1;\nEXEC xp_cmdshell 'dir';\n<?php echo 1;"))
+        self.assertEqual(ingest.suspicious_found, {'xp_cmdshell'})
+        self.assertEqual(ingest.malicious_found, {'<?php'})
+        self.assertEqual(ingest.encoding.method, 'ascii')
+
+        # Not UTF-8: decoded once with the detected encoding, skipping the UTF-8 paths
+        latin = "SELECT 'año' FROM señales;\n".encode('latin-1') * 10 + b"EXEC xp_cmdshell 'dir';"
+        processor.encoding_detector.decode = None
+        ingest = processor.ingest(BytesIO(latin))
+        del processor.encoding_detector.decode
+        self.assertEqual(ingest.hash_sha256, hashlib.sha256(latin).hexdigest())
+        self.assertEqual(ingest.line_count, 11)
+        self.assertEqual(ingest.suspicious_found, {'xp_cmdshell'})
+        self.assertIn(ingest.encoding.method, ('sampled', 'full'))
+        self.assertEqual(len(ingest.content), len(latin))
+
+        ingest = processor.ingest(BytesIO("SELECT 'ñ';\n".encode('utf-16')))
+        self.assertEqual((ingest.content, ingest.encoding.method), ("SELECT 'ñ';\n", 'bom'))
+
+        processor.max_file_size = 100
+        self.assertIsNone(processor.ingest(BytesIO(raw)))
+        result = processor.process_file(BytesIO(raw), 'big.sql')
+        self.assertFalse(result['success'])
+        self.assertIn('too large', result['error'])
+
+        print(f"✅ Single-pass ingestion: {len(raw)} bytes read in 5 byte chunks")
+
+    def test_26_upload_staging(self):
+        """Test staging of paths, buffers and streams with spooling to disk"""
+        print("\n📦 Testing Upload Staging...")
+
+        import io
+        raw = self.test_sql.encode('utf-8')
+
+        class Stream(io.RawIOBase):
+            """Non-seekable upload stream without a file descriptor"""
+            def __init__(self, data):
+                self.source = BytesIO(data)
+            def readable(self):
+                return True
+            def readinto(self, buffer):
+                return self.source.readinto(buffer)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'staged.sql')
+            with open(path, 'wb') as f:
+                f.write(raw)
+
+            with StagedUpload.stage(raw) as staged:
+                self.assertFalse(staged.on_disk)
+                self.assertEqual(bytes(staged.view), raw)
+            buffer = BytesIO(raw)
+            with StagedUpload.stage(buffer) as staged:
+                self.assertEqual(staged.size, len(raw))
+            buffer.write(b'-- still writable once released')
+            with StagedUpload.stage(path) as staged:
+                self.assertTrue(staged.on_disk)
+                self.assertEqual(bytes(staged.view), raw)
+            with open(path, 'rb') as f, StagedUpload.stage(f) as staged:
+                self.assertTrue(staged.on_disk)
+
+            # Streams stay in memory below the threshold and spool past it
+            with StagedUpload.stage(Stream(raw), spool_threshold=len(raw)) as staged:
+                self.assertFalse(staged.spooled)
+            staged = StagedUpload.stage(Stream(raw), spool_threshold=100, temp_dir=temp_dir, chunk_size=64)
+            self.assertTrue(staged.spooled and staged.on_disk)
+            self.assertEqual(bytes(staged.view), raw)
+            staged.close()
+            with self.assertRaises(ValueError):
+                staged.view
+            self.assertEqual(os.listdir(temp_dir), ['staged.sql'])
+            with self.assertRaises(UploadTooLarge):
+                StagedUpload.stage(Stream(raw), spool_threshold=100, max_size=200, temp_dir=temp_dir)
+            self.assertEqual(os.listdir(temp_dir), ['staged.sql'])
+
+            # The processor takes every kind of source the same way
+            for source in (path, raw, Stream(raw)):
+                result = self.file_processor.process_file(source, 'staged.sql')
+                self.assertTrue(result['success'])
+                self.assertEqual(result['content'], self.test_sql)
+            self.assertEqual(self.file_processor.process_file(path)['file_info'].filename, 'staged.sql')
+
+        print(f"✅ Upload staging: {len(raw)} bytes staged from paths, buffers and streams")
+
+    def test_27_compressed_uploads(self):
+        """Test streaming decompression of compressed uploads and the bomb guards"""
+        print("\n🗜️ Testing Compressed Uploads...")
+
+        import bz2
+        import gzip
+        import lzma
+        raw = self.test_sql.encode('utf-8')
+        plain = self.file_processor.process_file(raw, 'dump.sql')
+
+        # Concatenated gzip members decompress as one stream
+        compressed = {
+            'dump.sql.gz': gzip.compress(raw[:100]) + gzip.compress(raw[100:]),
+            'dump.sql.bz2': bz2.compress(raw),
+            'dump.sql.xz': lzma.compress(raw),
+        }
+        for filename, data in compressed.items():
+            result = self.file_processor.process_file(BytesIO(data), filename)
+            self.assertTrue(result['success'], result.get('error'))
+            self.assertEqual(result['content'], self.test_sql)
+            self.assertEqual(result['file_info'].size, len(raw))
+            self.assertEqual(result['file_info'].hash_sha256, plain['file_info'].hash_sha256)
+            self.assertEqual(result['metadata']['compressed_size'], len(data))
+        self.assertEqual(result['metadata']['compression'], 'xz')
+        self.assertIsNone(plain['metadata']['compression'])
+
+        self.assertTrue(self.file_processor._is_valid_extension('dump.SQL.GZ'))
+        self.assertFalse(self.file_processor._is_valid_extension('dump.exe.gz'))
+        self.assertFalse(self.file_processor._is_valid_extension('dump.gz'))
+
+        # Highly repetitive content passes the ratio guard below its grace size
+        repetitive = b'SELECT 1;\n' * 50000
+        result = self.file_processor.process_file(gzip.compress(repetitive), 'small.sql.gz')
+        self.assertTrue(result['success'], result.get('error'))
+
+        # A bomb is stopped once it passes the ratio, long before its full size
+        bomb = gzip.compress(b'\0' * (64 * 1024 * 1024))
+        with DecompressingReader(bomb, 'gzip') as reader:
+            with self.assertRaises(DecompressionLimitExceeded) as caught:
+                StagedUpload.stage(reader, chunk_size=1024 * 1024)
+        self.assertIn('compression ratio', caught.exception.reason)
+        self.assertLess(caught.exception.decompressed, 8 * 1024 * 1024)
+        result = self.file_processor.process_file(bomb, 'bomb.sql.gz')
+        self.assertFalse(result['success'])
+        self.assertIn('compression ratio', result['error'])
+
+        # The decompressed size ceiling applies regardless of the ratio
+        processor = EnterpriseFileProcessor()
+        processor.max_decompressed_size = len(raw) // 2
+        result = processor.process_file(compressed['dump.sql.xz'], 'dump.sql.xz')
+        self.assertFalse(result['success'])
+        self.assertIn('Decompressed size exceeds', result['error'])
+
+        print(f"✅ Compressed uploads: {len(compressed)} formats decompressed, bomb rejected")
+
 def run_comprehensive_tests():
     """Run all comprehensive tests"""
     print("🚀 STARTING COMPREHENSIVE SQL SYSTEM TESTING")
@@ -9,19 +9,28 @@ import tempfile
 import os
 import json
 import time
+import sqlite3
+import threading
 from io import BytesIO
 import sys
 
 # Add app directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from app.models.analysis_models import AnalysisResult, DatabaseType, ErrorSeverity
+from app.models.analysis_models import (
+    AnalysisResult, DatabaseType, ErrorSeverity, SQLError,
+    SecurityVulnerability, PerformanceIssue, TableInfo
+)
 from app.models.data_access import DatabaseManager, AnalysisRepository
+from app.models.connection_pool import PoolTimeout
+from app.models.write_behind import WriteBehindQueue
 from app.services.analysis_service import AnalysisService
+from app.services.maintenance_service import MaintenanceService
 from app.services.business_logic import QualityAssessmentEngine
 from app.controllers.analysis_controller import AnalysisController
 from app.utils.validation import EnterpriseValidator
-from app.utils.helpers import cache, FileHelper, ValidationHelper
+from app.utils.helpers import cache, CacheHelper, FileHelper, ValidationHelper
+from app.utils.executors import ExecutorRegistry, executors
 
 class TestEnterpriseSystem(unittest.TestCase):
     """Comprehensive enterprise system test suite"""
@@ -393,6 +402,971 @@ CREATE TABLE test_table (
         print(f"   - Analysis completed: {analysis_result['data']['processing_time']:.3f}s")
         print(f"   - Quality assessed: Available")
         print(f"   - Export generated: Available")
+    
+    def test_13_executor_registry(self):
+        """Test shared executor pools with bounded queues and metrics"""
+        print("\n🧵 Testing Executor Registry...")
+        
+        import queue
+        import threading
+        
+        registry = ExecutorRegistry({'work': {'max_workers': 1, 'max_queue': 1, 'submit_timeout': 0.05}})
+        release = threading.Event()
+        
+        running = registry.submit('work', release.wait, 5)
+        queued = registry.submit('work', lambda: 'done')
+        with self.assertRaises(queue.Full):
+            registry.submit('work', lambda: None)
+        
+        metrics = registry.metrics()['work']
+        self.assertEqual(metrics['queue_depth'] + metrics['active_workers'], 2)
+        self.assertEqual(metrics['rejected'], 1)
+        
+        release.set()
+        self.assertTrue(running.result(timeout=5))
+        self.assertEqual(queued.result(timeout=5), 'done')
+        self.assertIs(registry.get('work'), registry.get('work'))
+        with self.assertRaises(KeyError):
+            registry.get('missing')
+        
+        # Cancelled tasks that never ran give their slots back
+        release = threading.Event()
+        running = registry.submit('work', release.wait, 5)
+        queued = registry.submit('work', lambda: 'never')
+        self.assertTrue(queued.cancel())
+        refill = registry.submit('work', lambda: 'refilled')
+        with self.assertRaises(queue.Full):
+            registry.submit('work', lambda: None)
+        release.set()
+        self.assertEqual(refill.result(timeout=5), 'refilled')
+        metrics = registry.metrics()['work']
+        self.assertEqual((metrics['queue_depth'], metrics['cancelled']), (0, 1))
+        filled = [registry.submit('work', lambda: 'ok') for _ in range(2)]
+        self.assertEqual([future.result(timeout=5) for future in filled], ['ok', 'ok'])
+        
+        registry.shutdown()
+        self.assertEqual(registry.metrics(), {})
+        
+        # The service runs work on the process-wide pools
+        test_file = BytesIO(self.test_sql.encode('utf-8'))
+        future = self.analysis_service.submit_analysis(test_file, 'pooled.sql')
+        self.assertTrue(future.result(timeout=30)['success'])
+        self.assertIn('analysis', self.analysis_service.get_service_metrics()['executor_stats'])
+        
+        # Controller requests run on the analysis pool and a full pool answers busy
+        submitted = executors.metrics()['analysis']['submitted']
+        result = self.controller.analyze_sql_file(BytesIO(self.test_sql.encode('utf-8')), 'routed.sql')
+        self.assertTrue(result['success'])
+        self.assertEqual(executors.metrics()['analysis']['submitted'], submitted + 1)
+        
+        def full_pool(*args, **kwargs):
+            raise queue.Full('analysis queue is full')
+        self.controller.analysis_service.submit_analysis = full_pool
+        result = self.controller.analyze_sql_file(BytesIO(self.test_sql.encode('utf-8')), 'busy.sql')
+        self.assertEqual((result['error_code'], result['status_code']), ('SERVICE_BUSY', 503))
+        self.analysis_service.shutdown()
+        self.assertNotIn('analysis', executors.metrics())
+        
+        print("✅ Executor registry bounded, measured and shut down cleanly")
+    
+    def test_14_cache_ttl_lru_and_namespaces(self):
+        """Test cache expiry, LRU eviction and per-namespace statistics"""
+        print("\n🧊 Testing Cache TTL and LRU...")
+        
+        test_cache = CacheHelper(max_entries=4, stripes=1, cleanup_interval=0.05)
+        
+        # Expired entries are never served, even before a sweep
+        test_cache.set('analysis:short', 'value', ttl=0)
+        self.assertIsNone(test_cache.get('analysis:short'))
+        
+        # The least recently used entry is evicted first
+        for i in range(4):
+            test_cache.set(f'analysis:{i}', i)
+        self.assertEqual(test_cache.get('analysis:0'), 0)
+        test_cache.set('analysis_hash:abc', 'result')
+        self.assertIsNone(test_cache.get('analysis:1'))
+        self.assertEqual(test_cache.get('analysis:0'), 0)
+        
+        # The background sweep drops expired entries
+        test_cache.set('analysis_hash:old', 'result', ttl=0.01)
+        deadline = time.time() + 2
+        while test_cache.get_stats()['namespaces']['analysis_hash'].get('expirations', 0) < 1 and time.time() < deadline:
+            time.sleep(0.02)
+        test_cache.stop_cleanup()
+        
+        stats = test_cache.get_stats()
+        self.assertEqual(stats['entries'], 3)
+        self.assertEqual(stats['namespaces']['analysis']['evictions'], 2)
+        self.assertEqual(stats['namespaces']['analysis']['hits'], 2)
+        self.assertEqual(stats['namespaces']['analysis']['misses'], 2)
+        self.assertEqual(stats['namespaces']['analysis_hash']['expirations'], 1)
+        
+        # Memory budget
+        small_cache = CacheHelper(max_bytes=4096, stripes=1, cleanup_interval=0)
+        small_cache.set('blob:a', 'x' * 3000)
+        small_cache.set('blob:b', 'y' * 3000)
+        self.assertIsNone(small_cache.get('blob:a'))
+        self.assertIsNotNone(small_cache.get('blob:b'))
+        
+        # The byte budget is shared by the stripes, not split between them
+        striped_cache = CacheHelper(max_bytes=64 * 1024, stripes=16, cleanup_interval=0)
+        striped_cache.set('blob:large', 'z' * 40000)
+        self.assertIsNotNone(striped_cache.get('blob:large'))
+        for i in range(20):
+            striped_cache.set(f'blob:{i}', 'w' * 4000)
+        self.assertLessEqual(striped_cache.get_stats()['bytes'], 64 * 1024)
+        self.assertIsNotNone(striped_cache.get('blob:19'))
+        with self.assertLogs('app.utils.helpers', level='WARNING'):
+            striped_cache.set('blob:huge', 'h' * 70000)
+        self.assertIsNone(striped_cache.get('blob:huge'))
+        self.assertEqual(striped_cache.get_stats()['namespaces']['blob']['rejected'], 1)
+
+        print(f"✅ Cache namespaces: {sorted(stats['namespaces'])}")
+    
+    def test_15_bulk_persistence(self):
+        """Test bulk persistence of analysis findings"""
+        print("\n📦 Testing Bulk Persistence...")
+        
+        def build_result(count):
+            return AnalysisResult(
+                filename='bulk_test.sql',
+                file_hash='bulk_hash_123',
+                database_type=DatabaseType.MYSQL,
+                syntax_errors=[SQLError(line_number=i + 1, error_type='syntax_error',
+                                        severity=ErrorSeverity.HIGH, message='Error', suggestion='Fix')
+                               for i in range(count)],
+                semantic_errors=[SQLError(line_number=1, error_type='semantic_error',
+                                          message='Semantic', suggestion='Review')],
+                security_vulnerabilities=[SecurityVulnerability(line_number=i + 1, vulnerability_type='SQL_INJECTION',
+                                                                risk_level=ErrorSeverity.CRITICAL,
+                                                                description='Injection', mitigation='Bind')
+                                          for i in range(count)],
+                performance_issues=[PerformanceIssue(line_number=i + 1, issue_type='SELECT_STAR', impact='MEDIUM',
+                                                     description='Select star', recommendation='List columns')
+                                    for i in range(count)],
+                tables=[TableInfo(name='users', columns=[{'name': 'id', 'type': 'INT'}], primary_keys=['id'])]
+            )
+        
+        def child_counts():
+            with self.db_manager.get_connection() as conn:
+                return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                        for table in AnalysisRepository.CHILD_TABLES}
+        
+        first = build_result(500)
+        self.assertTrue(self.repository.save_analysis_result(first))
+        self.assertEqual(child_counts(), {'sql_errors': 501, 'security_vulnerabilities': 500,
+                                          'performance_issues': 500, 'table_info': 1})
+        
+        # Saving again replaces the child rows instead of duplicating them
+        self.assertTrue(self.repository.save_analysis_result(first))
+        self.assertEqual(child_counts()['sql_errors'], 501)
+        
+        # A new analysis of the same content supersedes the earlier one
+        second = build_result(10)
+        self.assertTrue(self.repository.save_analysis_result(second))
+        self.assertEqual(child_counts(), {'sql_errors': 11, 'security_vulnerabilities': 10,
+                                          'performance_issues': 10, 'table_info': 1})
+        
+        cache.clear_all()
+        loaded = self.repository.get_analysis_by_id(second.id)
+        self.assertIsNone(self.repository.get_analysis_by_id(first.id))
+        self.assertEqual(len(loaded.syntax_errors), 10)
+        self.assertEqual(len(loaded.semantic_errors), 1)
+        self.assertEqual(loaded.security_vulnerabilities[0].risk_level, ErrorSeverity.CRITICAL)
+        self.assertEqual(loaded.tables[0].columns, [{'name': 'id', 'type': 'INT'}])
+        
+        print(f"✅ Bulk persistence: {sum(child_counts().values())} child rows")
+    
+    def test_16_connection_pools_and_wal(self):
+        """Test pooled connections, WAL readers and idle reaping"""
+        print("\n🔌 Testing Connection Pools...")
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_manager = DatabaseManager(os.path.join(temp_dir, 'pool_test.db'),
+                                         pool_settings={'read_pool_size': 2, 'checkout_timeout': 0.1})
+            repository = AnalysisRepository(db_manager)
+            try:
+                with db_manager.get_connection() as conn:
+                    self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+                    # Nested checkouts reuse the thread's connection
+                    with db_manager.get_connection() as nested:
+                        self.assertIs(nested, conn)
+                    with db_manager.get_connection(read_only=True) as reader:
+                        self.assertIs(reader, conn)
+                
+                # Readers are not blocked by an open write transaction
+                with db_manager.transaction() as conn:
+                    conn.execute("INSERT INTO analysis_results (id, content_key, file_hash, filename, "
+                                 "database_type, processing_time, total_lines, total_statements, "
+                                 "quality_score, complexity_score) "
+                                 "VALUES ('pending', 'pending', 'pending', 'a.sql', 'mysql', 0, 0, 0, 0, 0)")
+                    results = []
+                    reader_thread = threading.Thread(target=lambda: results.append(repository.get_recent_analyses()))
+                    reader_thread.start()
+                    reader_thread.join(5)
+                    self.assertEqual(results, [[]])
+                self.assertEqual(len(repository.get_recent_analyses()), 1)
+                
+                # Read connections are read-only and the pool is bounded
+                with db_manager.get_connection(read_only=True) as first:
+                    with self.assertRaises(sqlite3.OperationalError):
+                        first.execute("DELETE FROM analysis_results")
+                    checkouts = []
+                    
+                    def checkout():
+                        try:
+                            checkouts.append(db_manager._read_pool.acquire())
+                        except PoolTimeout as e:
+                            checkouts.append(e)
+                    
+                    for _ in range(2):
+                        worker = threading.Thread(target=checkout)
+                        worker.start()
+                        worker.join(5)
+                    self.assertIsInstance(checkouts[0], sqlite3.Connection)
+                    self.assertIsInstance(checkouts[1], PoolTimeout)
+                    db_manager._read_pool.release(checkouts[0])
+                
+                stats = db_manager.get_pool_stats()
+                self.assertEqual(stats['read']['open'], 2)
+                self.assertGreaterEqual(stats['read']['timeouts'], 1)
+                
+                db_manager._read_pool.idle_timeout = 0
+                self.assertEqual(db_manager.reap_idle_connections(), 2)
+                self.assertEqual(db_manager.get_pool_stats()['read']['open'], 0)
+            finally:
+                db_manager.close_all_connections()
+        
+        print(f"✅ Pool stats: {stats['read']}")
+    
+    def test_17_findings_blob_layout(self):
+        """Test compressed findings blob storage"""
+        print("\n🗜️ Testing Findings Blob Layout...")
+        
+        result = AnalysisResult(
+            filename='blob_test.sql',
+            file_hash='blob_hash_123',
+            database_type=DatabaseType.POSTGRESQL,
+            syntax_errors=[SQLError(line_number=i + 1, column=3, error_type='syntax_error',
+                                    severity=ErrorSeverity.MEDIUM, message='Missing semicolon',
+                                    suggestion='Add a semicolon', auto_fixable=True, fixed_code='SELECT 1;')
+                           for i in range(300)],
+            semantic_errors=[SQLError(line_number=2, error_type='semantic_error', message='Unknown column',
+                                      suggestion='Check the schema')],
+            security_vulnerabilities=[SecurityVulnerability(line_number=i + 1, vulnerability_type='SQL_INJECTION',
+                                                            risk_level=ErrorSeverity.CRITICAL,
+                                                            description='Injection', mitigation='Bind',
+                                                            cwe_id='CWE-89')
+                                      for i in range(300)],
+            performance_issues=[PerformanceIssue(line_number=4, issue_type='SELECT_STAR', impact='MEDIUM',
+                                                 description='Select star', recommendation='List columns')],
+            tables=[TableInfo(name='orders', columns=[{'name': 'id'}], primary_keys=['id'])],
+            relationships=[{'from': 'orders', 'to': 'users', 'type': 'many_to_one'}]
+        )
+        
+        # Rows saved earlier are replaced by the blob
+        self.assertTrue(self.repository.save_analysis_result(result))
+        blob_repository = AnalysisRepository(self.db_manager, storage_layout='blob')
+        self.assertTrue(blob_repository.save_analysis_result(result))
+        
+        with self.db_manager.get_connection() as conn:
+            for table in AnalysisRepository.CHILD_TABLES:
+                self.assertEqual(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0], 0)
+            blob_row = conn.execute("SELECT * FROM analysis_findings WHERE analysis_id = ?",
+                                    (result.id,)).fetchone()
+        self.assertEqual(blob_row['finding_count'], 602)
+        self.assertLess(len(blob_row['payload']) * 2, blob_row['raw_size'])
+        
+        cache.clear_all()
+        loaded = self.repository.get_analysis_by_id(result.id)
+        for name in ('syntax_errors', 'semantic_errors', 'security_vulnerabilities',
+                     'performance_issues', 'tables'):
+            expected = [item.to_dict() for item in getattr(result, name)]
+            actual = [item.to_dict() for item in getattr(loaded, name)]
+            for item in expected + actual:
+                item.pop('created_at')
+            self.assertEqual(actual, expected, name)
+        self.assertEqual(loaded.relationships, result.relationships)
+        
+        with self.assertRaises(ValueError):
+            AnalysisRepository(self.db_manager, storage_layout='columns')
+        
+        print(f"✅ Findings blob: {blob_row['raw_size']} -> {len(blob_row['payload'])} bytes")
+    
+    def test_18_summaries_and_paginated_findings(self):
+        """Test summary loading and cursor-paginated findings"""
+        print("\n📄 Testing Summaries and Paginated Findings...")
+        
+        severities = [ErrorSeverity.CRITICAL, ErrorSeverity.HIGH, ErrorSeverity.LOW]
+        result = AnalysisResult(
+            filename='paging_test.sql',
+            file_hash='paging_hash_123',
+            database_type=DatabaseType.MYSQL,
+            quality_score=70,
+            security_vulnerabilities=[SecurityVulnerability(line_number=(i * 7) % 50 + 1,
+                                                            vulnerability_type='SQL_INJECTION' if i % 2 else 'XSS',
+                                                            risk_level=severities[i % 3],
+                                                            description='Finding', mitigation='Fix',
+                                                            cwe_id=f'CWE-{i % 4}')
+                                      for i in range(120)],
+            performance_issues=[PerformanceIssue(line_number=i, issue_type='select_star', impact='high',
+                                                 description='Select star', recommendation='List columns')
+                                for i in range(5)],
+            tables=[TableInfo(name=f'table_{i}', columns=[{'name': 'id'}], primary_keys=['id']) for i in range(3)],
+            recommendations=['Revisar la seguridad de las consultas']
+        )
+        
+        def collect(repository, **filters):
+            items, cursor = [], None
+            while True:
+                page = repository.get_findings(result.id, 'security', cursor=cursor, limit=25, **filters)
+                self.assertLessEqual(len(page.items), 25)
+                items.extend(page.items)
+                cursor = page.next_cursor
+                if cursor is None:
+                    return [item.id for item in items]
+        
+        expected = [vuln.id for vuln in sorted(result.security_vulnerabilities,
+                                               key=lambda vuln: (vuln.line_number, vuln.id))]
+        expected_filtered = [vuln.id for vuln in sorted(result.security_vulnerabilities,
+                                                        key=lambda vuln: (vuln.line_number, vuln.id))
+                             if vuln.risk_level == ErrorSeverity.CRITICAL
+                             and vuln.vulnerability_type == 'XSS' and 10 <= vuln.line_number <= 30]
+        
+        for layout in ('rows', 'blob'):
+            repository = AnalysisRepository(self.db_manager, storage_layout=layout)
+            self.assertTrue(repository.save_analysis_result(result))
+            # Served from SQL or the blob, then from the cached result
+            for clear in (True, False):
+                if clear:
+                    cache.clear_all()
+                self.assertEqual(collect(repository), expected, layout)
+                self.assertEqual(collect(repository, severities=['Critical'], types=['xss'],
+                                         line_from=10, line_to=30), expected_filtered, layout)
+            
+            cache.clear_all()
+            summary = repository.get_analysis_summary(result.id)
+            self.assertEqual(summary.vulnerability_count, 120)
+            self.assertEqual(summary.security_summary['critical'], 40)
+            self.assertEqual(summary.facets['cwe_ids'], ['CWE-0', 'CWE-1', 'CWE-2', 'CWE-3'])
+            self.assertEqual(summary.table_count, 3)
+        
+        with self.assertRaises(ValueError):
+            self.repository.get_findings(result.id, 'security', cursor='not-a-cursor')
+        with self.assertRaises(ValueError):
+            self.repository.get_findings(result.id, 'comments')
+        
+        # Service detail views combine the summary with one page
+        self.analysis_service.repository = self.repository
+        security = self.analysis_service.get_security_analysis(result.id, {'limit': 10})
+        self.assertTrue(security['success'])
+        self.assertEqual(len(security['data']['vulnerabilities']), 10)
+        self.assertEqual(security['data']['total_vulnerabilities'], 120)
+        self.assertEqual(security['data']['risk_assessment'], 'Critical')
+        self.assertIsNotNone(security['data']['pagination']['next_cursor'])
+        performance = self.analysis_service.get_performance_analysis(result.id)
+        self.assertEqual(performance['data']['performance_score'], 25)
+        self.assertEqual(performance['data']['impact_breakdown']['high'], 5)
+        schema = self.analysis_service.get_schema_analysis(result.id, {'limit': 2})
+        self.assertEqual([table['name'] for table in schema['data']['tables']], ['table_0', 'table_1'])
+        self.assertEqual(schema['data']['table_summary']['tables_with_primary_keys'], 3)
+        invalid = self.analysis_service.get_security_analysis(result.id, {'cursor': 'bad'})
+        self.assertEqual(invalid['error_code'], 'INVALID_QUERY')
+        
+        print(f"✅ Paged {len(expected)} vulnerabilities in pages of 25")
+    
+    def test_19_content_addressed_storage(self):
+        """Test one stored analysis per content, dialect and rule version"""
+        print("\n🔗 Testing Content-Addressed Storage...")
+        
+        def build_result(filename, database_type=DatabaseType.MYSQL, rule_version='rules-1'):
+            return AnalysisResult(
+                filename=filename,
+                file_hash='shared_hash_123',
+                database_type=database_type,
+                rule_version=rule_version,
+                syntax_errors=[SQLError(line_number=1, error_type='syntax_error',
+                                        message='Error', suggestion='Fix')]
+            )
+        
+        first = build_result('first.sql')
+        self.assertTrue(self.repository.save_analysis_result(first))
+        self.assertIsNotNone(self.repository.record_upload(first.id, 'copy.sql'))
+        self.assertTrue(self.repository.save_analysis_result(build_result('other.sql', DatabaseType.POSTGRESQL)))
+        
+        cache.clear_all()
+        found = self.repository.get_analysis_by_content('shared_hash_123', 'mysql', 'rules-1')
+        self.assertEqual(found.id, first.id)
+        self.assertEqual(found.rule_version, 'rules-1')
+        self.assertIsNone(self.repository.get_analysis_by_content('shared_hash_123', 'mysql', 'rules-2'))
+        self.assertEqual([upload['filename'] for upload in self.repository.get_uploads(first.id)],
+                         ['first.sql', 'copy.sql'])
+        
+        # Re-analyzing the content replaces the body and keeps its uploads
+        again = build_result('again.sql')
+        self.assertTrue(self.repository.save_analysis_result(again))
+        with self.db_manager.get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM analysis_results").fetchone()[0], 2)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM sql_errors").fetchone()[0], 2)
+        self.assertIsNone(self.repository.get_analysis_by_id(first.id))
+        self.assertEqual([upload['filename'] for upload in self.repository.get_uploads(again.id)],
+                         ['first.sql', 'copy.sql', 'again.sql'])
+        self.assertTrue(self.repository.delete_analysis(again.id))
+        self.assertEqual(self.repository.get_uploads(again.id), [])
+        
+        # Uploading the same content twice analyzes it once
+        self.analysis_service.repository = self.repository
+        responses = [self.analysis_service.analyze_sql_file(BytesIO(self.test_sql.encode('utf-8')), name)
+                     for name in ('a.sql', 'b.sql')]
+        self.assertTrue(all(response['success'] for response in responses))
+        self.assertEqual([response['data']['from_cache'] for response in responses], [False, True])
+        analysis_id = responses[0]['data']['analysis_result']['id']
+        self.assertEqual(responses[1]['data']['analysis_result']['id'], analysis_id)
+        self.assertEqual(len(self.repository.get_uploads(analysis_id)), 2)
+        
+        # Databases whose file_hash column is UNIQUE are migrated in place
+        with tempfile.TemporaryDirectory() as db_dir:
+            db_path = os.path.join(db_dir, 'legacy.db')
+            conn = sqlite3.connect(db_path)
+            conn.executescript("""
+                CREATE TABLE analysis_results (
+                    id TEXT PRIMARY KEY, file_hash TEXT UNIQUE NOT NULL, filename TEXT NOT NULL,
+                    database_type TEXT NOT NULL, processing_time REAL NOT NULL,
+                    total_lines INTEGER NOT NULL, total_statements INTEGER NOT NULL,
+                    quality_score INTEGER NOT NULL, complexity_score INTEGER NOT NULL,
+                    corrected_sql TEXT, recommendations TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+                CREATE TABLE sql_errors (
+                    id TEXT PRIMARY KEY, analysis_id TEXT NOT NULL, line_number INTEGER NOT NULL,
+                    column_number INTEGER, error_type TEXT NOT NULL, severity TEXT NOT NULL,
+                    message TEXT NOT NULL, suggestion TEXT NOT NULL, auto_fixable BOOLEAN NOT NULL,
+                    fixed_code TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (analysis_id) REFERENCES analysis_results (id));
+                INSERT INTO analysis_results VALUES ('legacy-1', 'legacy_hash', 'legacy.sql', 'mysql',
+                    0.5, 10, 2, 80, 20, '', '[]', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP);
+                INSERT INTO sql_errors VALUES ('error-1', 'legacy-1', 3, 1, 'syntax_error', 'high',
+                    'Error', 'Fix', 0, NULL, CURRENT_TIMESTAMP);
+            """)
+            conn.close()
+            
+            legacy_manager = DatabaseManager(db_path)
+            legacy_repository = AnalysisRepository(legacy_manager)
+            cache.clear_all()
+            loaded = legacy_repository.get_analysis_by_content('legacy_hash', 'mysql')
+            self.assertEqual(loaded.id, 'legacy-1')
+            self.assertEqual(len(loaded.syntax_errors), 1)
+            # A second dialect for the same content no longer collides
+            self.assertTrue(legacy_repository.save_analysis_result(
+                AnalysisResult(file_hash='legacy_hash', filename='legacy.sql',
+                               database_type=DatabaseType.POSTGRESQL)))
+            with legacy_manager.get_connection() as conn:
+                self.assertEqual(conn.execute("PRAGMA foreign_key_check").fetchall(), [])
+            legacy_manager.close_all_connections()
+        
+        print(f"✅ Content-addressed storage: 2 uploads of {analysis_id[:8]} analyzed once")
+    
+    def test_20_retention_and_compaction(self):
+        """Test retention limits, batched deletion and incremental vacuum"""
+        print("\n🧹 Testing Retention and Compaction...")
+        
+        with tempfile.TemporaryDirectory() as db_dir:
+            db_manager = DatabaseManager(os.path.join(db_dir, 'retention.db'))
+            repository = AnalysisRepository(db_manager)
+            self.assertEqual(db_manager.get_storage_stats()['auto_vacuum'], 'INCREMENTAL')
+            
+            results = [AnalysisResult(filename=f'retention_{i}.sql', file_hash=f'retention_hash_{i}',
+                                      database_type=DatabaseType.MYSQL,
+                                      syntax_errors=[SQLError(line_number=line, message='Error ' * 20,
+                                                              suggestion='Fix ' * 20)
+                                                     for line in range(200)])
+                       for i in range(30)]
+            for result in results:
+                self.assertTrue(repository.save_analysis_result(result))
+            with db_manager.transaction() as conn:
+                for age, result in enumerate(results):
+                    # An hour off whole days so a second ticking over cannot move the age cutoff
+                    conn.execute("UPDATE analysis_results SET created_at = datetime('now', ?, '+1 hours') WHERE id = ?",
+                                 (f'-{60 - age} days', result.id))
+            
+            def remaining():
+                with db_manager.get_connection() as conn:
+                    return [row[0] for row in conn.execute(
+                        "SELECT filename FROM analysis_results ORDER BY created_at").fetchall()]
+            
+            # Age: analyses older than 40 days go, in batches of 4
+            report = MaintenanceService(repository, {'max_age_days': 40, 'batch_size': 4,
+                                                     'batch_pause': 0}).run()
+            self.assertEqual(report['deleted_analyses'], 20)
+            self.assertEqual(report['batches'], 5)
+            self.assertGreater(report['reclaimed_bytes'], 0)
+            self.assertGreater(report['released_pages'], 0)
+            self.assertEqual(report['free_bytes'], 0)
+            self.assertEqual(remaining()[0], 'retention_20.sql')
+            
+            # Count: keep the newest 6
+            report = MaintenanceService(repository, {'max_analyses': 6, 'batch_pause': 0}).run()
+            self.assertEqual(report['deleted_analyses'], 4)
+            self.assertEqual(remaining(), [f'retention_{i}.sql' for i in range(24, 30)])
+            
+            # Size: drop the oldest until the used pages fit the budget
+            used = db_manager.get_storage_stats()['used_bytes']
+            report = MaintenanceService(repository, {'max_bytes': used // 2, 'batch_size': 1,
+                                                     'batch_pause': 0}).run()
+            self.assertGreater(report['deleted_analyses'], 0)
+            self.assertLessEqual(db_manager.get_storage_stats()['used_bytes'], used // 2)
+            self.assertEqual(remaining()[-1], 'retention_29.sql')
+            self.assertIsNone(repository.get_analysis_by_id(results[0].id))
+            with db_manager.get_connection() as conn:
+                self.assertEqual(conn.execute("PRAGMA foreign_key_check").fetchall(), [])
+            
+            # Nothing to do without limits
+            self.assertEqual(MaintenanceService(repository).run()['deleted_analyses'], 0)
+            db_manager.close_all_connections()
+        
+        print(f"✅ Retention: {report['deleted_analyses']} analyses dropped for the size budget")
+    
+    def test_21_write_behind_persistence(self):
+        """Test coalesced write-behind persistence with flush and close"""
+        print("\n✍️ Testing Write-Behind Persistence...")
+        
+        with tempfile.TemporaryDirectory() as db_dir:
+            db_manager = DatabaseManager(os.path.join(db_dir, 'write_behind.db'))
+            repository = AnalysisRepository(db_manager)
+            writer = WriteBehindQueue(repository, max_batch=8, max_delay=0.2)
+            
+            results = [AnalysisResult(filename=f'queued_{i}.sql', file_hash=f'queued_hash_{i}',
+                                      database_type=DatabaseType.MYSQL,
+                                      syntax_errors=[SQLError(line_number=1, message='Error', suggestion='Fix')])
+                       for i in range(20)]
+            for result in results:
+                writer.save(result)
+            upload_id = writer.record_upload(results[0].id, 'queued_copy.sql')
+            # A failing write is dropped without taking its batch down
+            writer.save(AnalysisResult(filename=None, file_hash='broken_hash'))
+            
+            # Readers see queued results before they are committed
+            self.assertEqual(repository.get_analysis_by_id(results[5].id).filename, 'queued_5.sql')
+            self.assertGreater(writer.stats()['depth'], 0)
+            
+            self.assertTrue(writer.flush(10))
+            stats = writer.stats()
+            self.assertEqual(stats['depth'], 0)
+            self.assertEqual(stats['written'], 21)
+            self.assertEqual(stats['failed'], 1)
+            self.assertLess(stats['batches'], 20)
+            with db_manager.get_connection() as conn:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM analysis_results").fetchone()[0], 20)
+            self.assertEqual([upload['id'] for upload in repository.get_uploads(results[0].id)][-1], upload_id)
+            
+            # Closing drains the queue and refuses further writes
+            late = AnalysisResult(filename='late.sql', file_hash='late_hash')
+            writer.save(late)
+            self.assertTrue(writer.close(10))
+            cache.clear_all()
+            self.assertIsNotNone(repository.get_analysis_by_id(late.id))
+            with self.assertRaises(RuntimeError):
+                writer.save(late)
+            db_manager.close_all_connections()
+        
+        # The service answers from the queue and commits in the background
+        self.analysis_service.repository = self.repository
+        service_writer = self.analysis_service.enable_write_behind(max_delay=0.01)
+        try:
+            responses = [self.analysis_service.analyze_sql_file(BytesIO(self.test_sql.encode('utf-8')), name)
+                         for name in ('queued_a.sql', 'queued_b.sql')]
+            self.assertEqual([response['data']['from_cache'] for response in responses], [False, True])
+            self.assertTrue(self.analysis_service.flush_persistence(10))
+            analysis_id = responses[0]['data']['analysis_result']['id']
+            self.assertEqual([upload['filename'] for upload in self.repository.get_uploads(analysis_id)],
+                             ['queued_a.sql', 'queued_b.sql'])
+            self.assertEqual(self.analysis_service.get_service_metrics()['write_behind']['depth'], 0)
+        finally:
+            service_writer.close(10)
+        
+        print(f"✅ Write-behind: {stats['written']} writes in {stats['batches']} transactions")
+    
+    def test_22_full_text_search(self):
+        """Test the full-text index over findings and ranked, paged search"""
+        print("\n🔎 Testing Full-Text Search...")
+        
+        def build_result(filename, file_hash, count):
+            return AnalysisResult(
+                filename=filename,
+                file_hash=file_hash,
+                database_type=DatabaseType.SQL_SERVER,
+                security_vulnerabilities=[SecurityVulnerability(line_number=i + 1, vulnerability_type='COMMAND_EXECUTION',
+                                                                risk_level=ErrorSeverity.CRITICAL if i % 2 else ErrorSeverity.HIGH,
+                                                                description='Use of xp_cmdshell allows OS commands',
+                                                                mitigation='Disable xp_cmdshell',
+                                                                code_snippet=f"EXEC xp_cmdshell 'dir c:\\{i % 3}'",
+                                                                cwe_id='CWE-78')
+                                          for i in range(count)],
+                performance_issues=[PerformanceIssue(line_number=1, issue_type='SELECT_STAR', impact='high',
+                                                     description='SELECT * on orders', recommendation='List columns',
+                                                     code_snippet='SELECT * FROM orders <script>')],
+                tables=[TableInfo(name='orders', columns=[{'name': 'order_id'}])]
+            )
+        
+        first = build_result('ops.sql', 'search_hash_1', 30)
+        second = build_result('ops_copy.sql', 'search_hash_2', 15)
+        self.assertTrue(self.repository.save_analysis_result(first))
+        self.assertTrue(self.repository.save_analysis_result(second))
+        with self.db_manager.get_connection() as conn:
+            # Repeated texts are indexed once
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM finding_documents").fetchone()[0], 49)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM search_texts").fetchone()[0], 5)
+        
+        def collect(**filters):
+            hits, cursor = [], None
+            while True:
+                page = self.repository.search_findings('xp_cmdshell', cursor=cursor, limit=7, **filters)
+                self.assertLessEqual(len(page.items), 7)
+                hits.extend(page.items)
+                cursor = page.next_cursor
+                if cursor is None:
+                    return hits
+        
+        hits = collect()
+        self.assertEqual(len(hits), 45)
+        self.assertEqual(len({hit.finding_id for hit in hits}), 45)
+        self.assertEqual([hit.score for hit in hits], sorted((hit.score for hit in hits), reverse=True))
+        self.assertIn('<mark>xp_cmdshell</mark>', hits[0].snippet)
+        self.assertEqual(len(collect(analysis_id=second.id, severities=['Critical'])), 7)
+        
+        orders = self.repository.search_findings('orders', kinds=['performance'])
+        self.assertEqual(len(orders.items), 2)
+        self.assertIn('&lt;<mark>script</mark>&gt;', self.repository.search_findings('script').items[0].snippet)
+        self.assertEqual(len(self.repository.search_findings('ord*', kinds=['tables']).items), 2)
+        self.assertEqual(self.repository.search_findings('"unbalanced').items, [])
+        with self.assertRaises(ValueError):
+            self.repository.search_findings('   ')
+        with self.assertRaises(ValueError):
+            self.repository.search_findings('orders', kinds=['comments'])
+        
+        # Deleting an analysis removes its findings and the texts only it used
+        self.assertTrue(self.repository.delete_analysis(first.id))
+        self.assertEqual(len(collect()), 15)
+        self.assertTrue(self.repository.delete_analysis(second.id))
+        with self.db_manager.get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM search_texts").fetchone()[0], 0)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM findings_fts").fetchone()[0], 0)
+        
+        # Rebuilding indexes analyses saved without the index
+        unindexed = AnalysisRepository(self.db_manager, storage_layout='blob', search_index=False)
+        self.assertTrue(unindexed.save_analysis_result(first))
+        self.assertEqual(self.repository.search_findings('xp_cmdshell').items, [])
+        self.assertEqual(self.repository.rebuild_search_index(), 32)
+        
+        self.analysis_service.repository = self.repository
+        response = self.analysis_service.search_findings({'q': 'xp_cmdshell', 'limit': 5})
+        self.assertTrue(response['success'])
+        self.assertEqual(len(response['data']['hits']), 5)
+        self.assertEqual(response['data']['hits'][0]['filename'], 'ops.sql')
+        self.assertIsNotNone(response['data']['pagination']['next_cursor'])
+        self.assertEqual(self.analysis_service.search_findings({'q': ''})['error_code'], 'INVALID_QUERY')
+        
+        print(f"✅ Full-text search: {len(hits)} hits paged 7 at a time")
+    
+    def test_23_trend_rollups(self):
+        """Test daily rollups maintained at save time and the trend queries over them"""
+        print("\n📈 Testing Trend Rollups...")
+        
+        def build_result(filename, database_type, quality, vulnerabilities):
+            return AnalysisResult(
+                filename=filename,
+                file_hash=f"trend_{filename}",
+                database_type=database_type,
+                total_lines=100,
+                quality_score=quality,
+                syntax_errors=[SQLError(line_number=1, column=1, error_type='MISSING_SEMICOLON',
+                                        severity=ErrorSeverity.LOW, message='Missing semicolon')],
+                security_vulnerabilities=[SecurityVulnerability(line_number=i + 1, vulnerability_type='SQL_INJECTION',
+                                                                risk_level=ErrorSeverity.CRITICAL,
+                                                                description='Concatenated input')
+                                          for i in range(vulnerabilities)]
+            )
+        
+        results = [build_result('a.sql', DatabaseType.MYSQL, 80, 2),
+                   build_result('b.sql', DatabaseType.MYSQL, 60, 1),
+                   build_result('c.sql', DatabaseType.POSTGRESQL, 90, 0)]
+        for result in results:
+            self.assertTrue(self.repository.save_analysis_result(result))
+        # Saving the same content again replaces it instead of counting it twice
+        self.assertTrue(self.repository.save_analysis_result(build_result('a.sql', DatabaseType.MYSQL, 80, 2)))
+        
+        today = time.strftime('%Y-%m-%d', time.gmtime())
+        daily = self.repository.get_daily_trends(today, today)
+        self.assertEqual(len(daily), 1)
+        self.assertEqual(daily[0]['date'], today)
+        self.assertEqual(daily[0]['analysis_count'], 3)
+        self.assertEqual(daily[0]['average_quality'], round(230 / 3, 2))
+        self.assertEqual(daily[0]['vulnerabilities_by_risk']['critical'], 3)
+        self.assertEqual(self.repository.get_daily_trends(database_type='mysql')[0]['analysis_count'], 2)
+        
+        breakdown = self.repository.get_database_type_trends()
+        self.assertEqual([item['database_type'] for item in breakdown], ['mysql', 'postgresql'])
+        self.assertEqual(breakdown[0]['vulnerability_count'], 3)
+        self.assertEqual(self.repository.get_top_finding_types('vulnerability_type'),
+                         [{'type': 'SQL_INJECTION', 'count': 3}])
+        self.assertEqual(self.repository.get_top_finding_types('error_type')[0]['count'], 3)
+        with self.assertRaises(ValueError):
+            self.repository.get_top_finding_types('comment_type')
+        
+        # Rebuilding from the stored analyses gives the same rollups
+        before = self.repository.get_database_type_trends()
+        self.assertEqual(self.repository.rebuild_rollups(), 3)
+        self.assertEqual(self.repository.get_database_type_trends(), before)
+        
+        # Deleting an analysis removes it from the trends, retention does not
+        self.assertTrue(self.repository.delete_analysis(results[2].id))
+        self.assertEqual([item['database_type'] for item in self.repository.get_database_type_trends()], ['mysql'])
+        report = MaintenanceService(self.repository, {'max_analyses': 0, 'batch_pause': 0}).run()
+        self.assertEqual(report['deleted_analyses'], 2)
+        self.assertEqual(self.repository.get_daily_trends()[0]['analysis_count'], 2)
+        
+        self.analysis_service.repository = self.repository
+        response = self.analysis_service.get_trends({'days': 7, 'database_type': 'mysql'})
+        self.assertTrue(response['success'])
+        self.assertEqual(response['data']['daily'][0]['analysis_count'], 2)
+        self.assertEqual(response['data']['top_types']['vulnerability_type'][0]['type'], 'SQL_INJECTION')
+        self.assertEqual(self.analysis_service.get_trends({'date_from': '2024-13-01'})['error_code'],
+                         'INVALID_QUERY')
+        
+        print(f"✅ Trend rollups: {daily[0]['analysis_count']} analyses rolled up for {today}")
+    
+    def test_24_analysis_history_pagination(self):
+        """Test keyset pagination and filters of the analysis history"""
+        print("\n📜 Testing Analysis History Pagination...")
+        
+        database_types = [DatabaseType.MYSQL, DatabaseType.POSTGRESQL, DatabaseType.ORACLE]
+        results = [AnalysisResult(filename=f"{'report' if i % 2 else 'etl'}_{i:02d}.sql",
+                                  file_hash=f"history_hash_{i}",
+                                  database_type=database_types[i % 3],
+                                  quality_score=i * 4)
+                   for i in range(25)]
+        for result in results:
+            self.assertTrue(self.repository.save_analysis_result(result))
+        # Pairs of analyses share a timestamp so the id breaks the tie
+        with self.db_manager.transaction() as conn:
+            conn.executemany("UPDATE analysis_results SET created_at = ? WHERE id = ?",
+                             [(f"2024-03-{1 + i // 4:02d} 10:00:{i // 2:02d}", result.id)
+                              for i, result in enumerate(results)])
+        
+        def collect(**filters):
+            entries, cursor = [], None
+            while True:
+                page = self.repository.get_analysis_history(cursor=cursor, limit=4, **filters)
+                self.assertLessEqual(len(page.items), 4)
+                entries.extend(page.items)
+                cursor = page.next_cursor
+                if cursor is None:
+                    return entries
+        
+        entries = collect()
+        self.assertEqual(len(entries), 25)
+        self.assertEqual(len({entry.id for entry in entries}), 25)
+        keys = [(entry.created_at, entry.id) for entry in entries]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        
+        self.assertEqual({entry.filename[:3] for entry in collect(filename_prefix='rep')}, {'rep'})
+        self.assertEqual(len(collect(filename_prefix='rep')), 12)
+        self.assertEqual(len(collect(database_type='oracle')), 8)
+        self.assertEqual(sorted(entry.quality_score for entry in collect(min_quality=40, max_quality=60)),
+                         [40, 44, 48, 52, 56, 60])
+        self.assertEqual(len(collect(date_from='2024-03-02', date_to='2024-03-03')), 8)
+        
+        # Every filter walks an index in page order, so no page sorts its matches
+        after = (keys[10][0], keys[10][1])
+        for filters, index in (({}, 'idx_analysis_history'),
+                               ({'filename_prefix': 'rep'}, 'idx_analysis_history'),
+                               ({'min_quality': 40, 'max_quality': 60}, 'idx_analysis_history'),
+                               ({'database_type': 'oracle', 'min_quality': 40}, 'idx_analysis_history_type'),
+                               ({'date_from': '2024-03-02'}, 'idx_analysis_history')):
+            arguments = dict(dict.fromkeys(('filename_prefix', 'database_type', 'min_quality', 'max_quality',
+                                            'date_from', 'date_to')), **filters)
+            query, params = self.repository._history_query(after=after, limit=4, **arguments)
+            with self.db_manager.get_connection() as conn:
+                plan = ' | '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+            self.assertIn(index, plan, filters)
+            self.assertNotIn('TEMP B-TREE', plan, filters)
+
+        # A page taken after new analyses arrive resumes where the last one ended
+        first = self.repository.get_analysis_history(limit=5)
+        self.assertTrue(self.repository.save_analysis_result(
+            AnalysisResult(filename='late.sql', file_hash='history_late', database_type=DatabaseType.MYSQL)))
+        second = self.repository.get_analysis_history(cursor=first.next_cursor, limit=5)
+        self.assertEqual([entry.id for entry in first.items + second.items],
+                         [entry.id for entry in entries[:10]])
+        with self.assertRaises(ValueError):
+            self.repository.get_analysis_history(cursor='not-a-cursor')
+        self.assertEqual(len(self.repository.get_recent_analyses(3)), 3)
+        
+        self.analysis_service.repository = self.repository
+        response = self.analysis_service.get_analysis_history({'database_type': 'postgresql', 'limit': 3})
+        self.assertTrue(response['success'])
+        self.assertEqual(len(response['data']['analyses']), 3)
+        self.assertIsNotNone(response['data']['pagination']['next_cursor'])
+        self.assertEqual(self.analysis_service.get_analysis_history({'min_quality': 120})['error_code'],
+                         'INVALID_QUERY')
+        
+        print(f"✅ Analysis history: {len(entries)} analyses paged 4 at a time")
+    
+    def test_25_archive_ingestion(self):
+        """Test concurrent, deduplicated analysis of the SQL files in an archive"""
+        print("\n🗂️ Testing Archive Ingestion...")
+        
+        import gzip
+        import tarfile
+        import zipfile
+        self.analysis_service.repository = self.repository
+        unique_sql = "SELECT id FROM archive_only WHERE id = 1;\n"
+        
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('migrations/', '')
+            zf.writestr('migrations/001_init.sql', self.test_sql)
+            zf.writestr('migrations/002_copy.sql', self.test_sql)
+            zf.writestr('migrations/003_other.sql.gz', gzip.compress(unique_sql.encode('utf-8')))
+            zf.writestr('README.md', '# Migrations')
+        archive.seek(0)
+        
+        response = self.analysis_service.analyze_archive(archive, 'migrations.zip')
+        self.assertTrue(response['success'], response.get('error'))
+        data = response['data']
+        self.assertEqual(data['format'], 'zip')
+        files = {entry['filename']: entry for entry in data['files']}
+        self.assertEqual(list(files), ['migrations/001_init.sql', 'migrations/002_copy.sql',
+                                       'migrations/003_other.sql.gz'])
+        self.assertTrue(all(entry['success'] for entry in data['files']))
+        self.assertEqual(files['migrations/002_copy.sql']['duplicate_of'], 'migrations/001_init.sql')
+        self.assertNotIn('analysis_id', files['migrations/002_copy.sql'])
+        stored = self.repository.get_analysis_by_id(files['migrations/001_init.sql']['analysis_id'])
+        self.assertEqual(stored.total_statements, files['migrations/001_init.sql']['total_statements'])
+        self.assertEqual(files['migrations/003_other.sql.gz']['file_info']['size'], len(unique_sql))
+        self.assertEqual(data['skipped'][0]['filename'], 'README.md')
+        
+        summary = data['summary']
+        self.assertEqual((summary['total_files'], summary['analyzed_files'], summary['duplicate_files'],
+                          summary['skipped_files'], summary['failed_files']), (4, 2, 1, 1, 0))
+        self.assertEqual(summary['total_statements'],
+                         sum(files[name]['total_statements'] for name in ('migrations/001_init.sql',
+                                                                           'migrations/003_other.sql.gz')))
+        
+        # The same members in a compressed tarball hit the stored analyses
+        tarball = BytesIO()
+        with tarfile.open(fileobj=tarball, mode='w:gz') as tf:
+            for name, content in (('001_init.sql', self.test_sql), ('002_more.sql', unique_sql)):
+                info = tarfile.TarInfo(name)
+                info.size = len(content.encode('utf-8'))
+                tf.addfile(info, BytesIO(content.encode('utf-8')))
+        response = self.analysis_service.analyze_archive(tarball.getvalue(), 'migrations.tar.gz')
+        self.assertTrue(response['success'], response.get('error'))
+        self.assertEqual(response['data']['summary']['cached_files'], 2)
+        
+        self.assertEqual(self.analysis_service.analyze_archive(b'not an archive', 'broken.zip')['error_code'],
+                         'INVALID_ARCHIVE')
+        
+        # Hitting a limit after members were queued hands every pool slot back
+        from app.config.settings import Config
+        crowded = BytesIO()
+        with zipfile.ZipFile(crowded, 'w') as zf:
+            for i in range(6):
+                zf.writestr(f'{i:03d}.sql', f"SELECT {i} FROM crowded;\n")
+        original = dict(Config.ARCHIVE_UPLOADS)
+        Config.ARCHIVE_UPLOADS.update(max_members=4, max_in_flight=2)
+        try:
+            response = self.analysis_service.analyze_archive(crowded.getvalue(), 'crowded.zip')
+        finally:
+            Config.ARCHIVE_UPLOADS.clear()
+            Config.ARCHIVE_UPLOADS.update(original)
+        self.assertEqual(response['error_code'], 'ARCHIVE_LIMIT_EXCEEDED')
+        deadline = time.time() + 10
+        while executors.metrics()['analysis']['active_workers'] and time.time() < deadline:
+            time.sleep(0.01)
+        metrics = executors.metrics()['analysis']
+        self.assertEqual((metrics['queue_depth'], metrics['active_workers']), (0, 0))
+        self.assertEqual(self.analysis_service.analyze_archive(b'SELECT 1;', 'plain.sql')['error_code'],
+                         'VALIDATION_ERROR')
+        
+        # Skipped members of a compressed tar are still inflated, so the
+        # ratio guard covers the whole decompressed stream
+        bomb = BytesIO()
+        with tarfile.open(fileobj=bomb, mode='w:gz') as tf:
+            info = tarfile.TarInfo('padding.bin')
+            info.size = 16 * 1024 * 1024
+            tf.addfile(info, BytesIO(bytes(info.size)))
+            info = tarfile.TarInfo('001_init.sql')
+            info.size = len(unique_sql)
+            tf.addfile(info, BytesIO(unique_sql.encode('utf-8')))
+        response = self.analysis_service.analyze_archive(bomb.getvalue(), 'padded.tar.gz')
+        self.assertEqual(response['error_code'], 'ARCHIVE_LIMIT_EXCEEDED')
+        self.assertIn('compression ratio', response['error'])
+        
+        # Declared sizes of skipped members count toward the total
+        Config.ARCHIVE_UPLOADS.update(max_total_size=1024)
+        try:
+            padded = BytesIO()
+            with zipfile.ZipFile(padded, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr('padding.bin', bytes(4096))
+                zf.writestr('001_init.sql', unique_sql)
+            response = self.analysis_service.analyze_archive(padded.getvalue(), 'padded.zip')
+        finally:
+            Config.ARCHIVE_UPLOADS.clear()
+            Config.ARCHIVE_UPLOADS.update(original)
+        self.assertEqual(response['error_code'], 'ARCHIVE_LIMIT_EXCEEDED')
+        
+        print(f"✅ Archive ingestion: {summary['total_files']} files, {summary['analyzed_files']} analyzed")
+
+    def test_26_streamed_analysis(self):
+        """Test analysis of uploads too large to hold as one string"""
+        print("\n🌊 Testing Streamed Analysis...")
+        
+        import gzip
+        from app.config.settings import Config
+        dump = (self.test_sql * 40).encode('utf-8')
+        expected = self.analysis_service.sql_analyzer.analyze_file(dump.decode('utf-8'), 'dump.sql')
+        processor = self.analysis_service.file_processor
+        processor.max_file_size = processor.max_decompressed_size = len(dump) // 4
+        processor.ingest_chunk_size = 1000
+        
+        # Over max_file_size, analyze_sql_file falls back to the stream
+        response = self.analysis_service.analyze_sql_file(BytesIO(dump), 'dump.sql')
+        self.assertTrue(response['success'], response.get('error'))
+        data = response['data']
+        self.assertTrue(data['streamed'])
+        self.assertEqual(data['analysis_summary']['total_statements'], expected.total_statements)
+        self.assertEqual(data['analysis_summary']['security_vulnerabilities'],
+                         len(expected.security_vulnerabilities))
+        self.assertEqual(len(data['findings']['security_vulnerabilities']),
+                         len(expected.security_vulnerabilities))
+        self.assertEqual((data['file_info']['size'], data['file_info']['line_count']),
+                         (len(dump), dump.count(b'\n')))
+        
+        # Compressed uploads that decompress past the limit stream as well
+        response = self.analysis_service.analyze_sql_file(gzip.compress(dump), 'dump.sql.gz')
+        self.assertTrue(response['data']['streamed'])
+        self.assertEqual(response['data']['file_info']['hash_sha256'], data['file_info']['hash_sha256'])
+        
+        original = dict(Config.STREAMING_ANALYSIS)
+        Config.STREAMING_ANALYSIS.update(max_findings=2, max_size=len(dump) * 2)
+        try:
+            response = self.controller.analyze_sql_stream(BytesIO(dump), 'dump.sql')
+            self.assertTrue(response['success'], response.get('error'))
+            self.assertTrue(response['data']['findings_truncated'])
+            self.assertEqual(len(response['data']['findings']['security_vulnerabilities']), 2)
+            
+            self.assertEqual(self.analysis_service.analyze_sql_stream(dump * 3, 'huge.sql')['error_code'],
+                             'FILE_TOO_LARGE')
+            unsafe = dump + b"EXEC xp_cmdshell 'dir';\n"
+            self.assertEqual(self.analysis_service.analyze_sql_stream(unsafe, 'unsafe.sql')['error_code'],
+                             'FILE_PROCESSING_ERROR')
+        finally:
+            Config.STREAMING_ANALYSIS.clear()
+            Config.STREAMING_ANALYSIS.update(original)
+        
+        print(f"✅ Streamed analysis: {data['analysis_summary']['total_statements']} statements "
+              f"from {len(dump)} bytes")
 
 def run_enterprise_tests():
     """Run all enterprise tests"""
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+UPLOAD ARCHIVES
+Enumeration of the files in zip and tar uploads without extracting them to disk
+"""
+
+import hashlib
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+from upload_decompression import (DEFAULT_MAX_RATIO, DecompressingReader, DecompressionLimitExceeded,
+                                   sniff_compression)
+from upload_staging import StagedUpload
+
+# Archive suffix -> format name; compressed tars are opened transparently
+ARCHIVE_SUFFIXES = {
+    '.zip': 'zip',
+    '.tar': 'tar',
+    '.tar.gz': 'tar',
+    '.tgz': 'tar',
+    '.tar.bz2': 'tar',
+    '.tbz2': 'tar',
+    '.tar.xz': 'tar',
+    '.txz': 'tar',
+}
+
+# Raised by zipfile, tarfile and the decompressors on malformed archives
+ARCHIVE_ERRORS = (zipfile.BadZipFile, zipfile.LargeZipFile, tarfile.TarError, EOFError, OSError)
+
+class ArchiveLimitExceeded(ValueError):
+    """The archive holds more files or more data than allowed"""
+
+@dataclass
+class ArchiveMember:
+    """A regular file in an archive
+
+    data and sha256 are set for files that were read; skipped files carry
+    the reason in error instead.
+    """
+    name: str
+    size: int
+    data: Optional[bytes] = None
+    sha256: Optional[str] = None
+    error: Optional[str] = None
+
+def archive_format(filename: str) -> Optional[str]:
+    """'zip' or 'tar' for archive file names, None otherwise"""
+    if not filename:
+        return None
+    filename = filename.lower()
+    for suffix, name in ARCHIVE_SUFFIXES.items():
+        if filename.endswith(suffix):
+            return name
+    return None
+
+class ArchiveReader:
+    """Reads the files of a staged zip or tar archive one at a time
+
+    Members are decompressed from the staged upload straight into memory,
+    so nothing is written to disk and only the member being read is held
+    here once the caller drops the previous member's data. Each member is
+    limited to max_member_size bytes; passing max_members files or
+    max_total_size bytes raises ArchiveLimitExceeded. Skipped members count
+    toward max_total_size with their declared size. A compressed tar has to
+    be decompressed in full to reach each header, skipped members included,
+    so it is read through DecompressingReader: the whole decompressed
+    stream is held to max_total_size and max_ratio, which bounds the work a
+    crafted archive can cause whatever sizes its headers declare.
+    """
+
+    def __init__(self, max_member_size: int, max_members: int = 1000,
+                 max_total_size: int = 1024 * 1024 * 1024,
+                 max_ratio: Optional[float] = DEFAULT_MAX_RATIO):
+        self.max_member_size = max_member_size
+        self.max_members = max_members
+        self.max_total_size = max_total_size
+        self.max_ratio = max_ratio
+
+    def members(self, staged: StagedUpload, format_name: str,
+                accept: Callable[[str], bool] = lambda name: True) -> Iterator[ArchiveMember]:
+        """Regular files in archive order; files rejected by accept are not read"""
+        if format_name == 'zip':
+            entries = self._zip_entries(staged)
+        elif format_name == 'tar':
+            entries = self._tar_entries(staged)
+        else:
+            raise ValueError(f"Unsupported archive format: {format_name}")
+
+        try:
+            yield from self._read_members(entries, accept)
+        except DecompressionLimitExceeded as e:
+            raise ArchiveLimitExceeded(e.reason) from e
+
+    def _read_members(self, entries, accept: Callable[[str], bool]) -> Iterator[ArchiveMember]:
+        count = total = 0
+        for name, size, open_member in entries:
+            count += 1
+            if count > self.max_members:
+                raise ArchiveLimitExceeded(f"Archive holds more than {self.max_members} files")
+            if not accept(name):
+                error = 'Unsupported file extension'
+            elif size > self.max_member_size:
+                error = self._too_large()
+            else:
+                error = None
+            if error:
+                total = self._add_to_total(total, size)
+                yield ArchiveMember(name, size, error=error)
+                continue
+
+            # Declared sizes are not trusted: reads stop one byte past the limit
+            with open_member() as stream:
+                data = stream.read(self.max_member_size + 1)
+            total = self._add_to_total(total, len(data))
+            if len(data) > self.max_member_size:
+                yield ArchiveMember(name, size, error=self._too_large())
+                continue
+            yield ArchiveMember(name, len(data), data, hashlib.sha256(data).hexdigest())
+            # Let the caller drop the content before the next member is read
+            del data
+
+    def _add_to_total(self, total: int, size: int) -> int:
+        total += size
+        if total > self.max_total_size:
+            raise ArchiveLimitExceeded(f"Archive contents exceed the limit of {self.max_total_size} bytes")
+        return total
+
+    def _too_large(self) -> str:
+        return f'File too large. Maximum size: {self.max_member_size / (1024*1024):.1f}MB'
+
+    @staticmethod
+    def _zip_entries(staged: StagedUpload):
+        with zipfile.ZipFile(staged.reader()) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, lambda info=info: archive.open(info)
+
+    def _tar_entries(self, staged: StagedUpload):
+        # Headers are read as the archive is iterated, not all up front.
+        # Plain tars seek past skipped members; compressed ones are streamed
+        # through the size and ratio guard
+        compression = sniff_compression(staged.view[:6])
+        if compression:
+            source = DecompressingReader(staged.reader(), compression, self.max_total_size, self.max_ratio)
+            mode = 'r|'
+        else:
+            source = staged.reader()
+            mode = 'r:'
+        with source, tarfile.open(fileobj=source, mode=mode) as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, member.size, lambda member=member: archive.extractfile(member)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+UPLOAD DECOMPRESSION
+Streaming decompression of compressed SQL uploads with size and ratio guards
+"""
+
+import io
+import os
+import bz2
+import gzip
+import lzma
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compressed suffix -> format name
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+
+# Leading bytes of each compressed format
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+DEFAULT_MAX_RATIO = 200
+# Decompressed bytes produced before the ratio guard applies, so small
+# files with large headers or tiny highly compressible files pass
+DEFAULT_RATIO_GRACE = 1024 * 1024
+
+class DecompressionLimitExceeded(ValueError):
+    """A compressed upload decompresses past the size ceiling or the ratio limit"""
+
+    def __init__(self, reason: str, decompressed: int, compressed: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.decompressed = decompressed
+        self.compressed = compressed
+
+def available_formats() -> Dict[str, str]:
+    """Compressed suffixes that can be read in this environment"""
+    return {suffix: name for suffix, name in COMPRESSION_SUFFIXES.items()
+            if name != 'zstd' or zstandard is not None}
+
+def split_compression(filename: str):
+    """(filename without the compression suffix, format name or None)"""
+    if not filename:
+        return filename, None
+    stem, suffix = os.path.splitext(filename)
+    name = COMPRESSION_SUFFIXES.get(suffix.lower())
+    return (stem, name) if name else (filename, None)
+
+def sniff_compression(head: bytes) -> Optional[str]:
+    """Format name of compressed data from its leading bytes, None if not recognised"""
+    head = bytes(head[:6])
+    for magic, name in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return name if name in available_formats().values() else None
+    return None
+
+class _CountingReader(io.RawIOBase):
+    """Counts the compressed bytes the decompressor consumes"""
+
+    def __init__(self, stream: Any):
+        self.stream = stream
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.count += size
+        return size
+
+class DecompressingReader(io.RawIOBase):
+    """Readable stream of the decompressed bytes of a compressed upload
+
+    Data is decompressed as it is read, so memory stays bounded by the
+    read size whatever the decompressed size. A read that takes the output
+    past max_size, or past max_ratio times the compressed bytes consumed
+    once ratio_grace bytes have been produced, raises
+    DecompressionLimitExceeded. Concatenated gzip, bzip2 and xz streams
+    and multi-frame zstd input are read through to the end.
+    """
+
+    def __init__(self, source: Any, compression: str, max_size: Optional[int] = None,
+                 max_ratio: Optional[float] = DEFAULT_MAX_RATIO,
+                 ratio_grace: int = DEFAULT_RATIO_GRACE):
+        # Uploads wrapped by the web framework (werkzeug FileStorage)
+        if hasattr(source, 'stream') and hasattr(source, 'save'):
+            source = source.stream
+        self._owned = None
+        if isinstance(source, (str, os.PathLike)):
+            source = self._owned = open(source, 'rb')
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        elif getattr(source, 'seekable', lambda: False)():
+            source.seek(0)
+
+        self.compression = compression
+        self.max_size = max_size
+        self.max_ratio = max_ratio
+        self.ratio_grace = ratio_grace
+        self.decompressed = 0
+        self._counter = _CountingReader(source)
+        self._stream = self._open(compression, self._counter)
+
+    @property
+    def compressed(self) -> int:
+        """Compressed bytes consumed so far"""
+        return self._counter.count
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.decompressed += size
+        if self.max_size is not None and self.decompressed > self.max_size:
+            raise DecompressionLimitExceeded(
+                f'Decompressed size exceeds the limit of {self.max_size} bytes',
+                self.decompressed, self.compressed)
+        if (self.max_ratio is not None and self.decompressed > self.ratio_grace and
+                self.decompressed > self.max_ratio * max(self.compressed, 1)):
+            raise DecompressionLimitExceeded(
+                f'Suspicious compression ratio detected (over {self.max_ratio}:1)',
+                self.decompressed, self.compressed)
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stream.close()
+            if self._owned is not None:
+                self._owned.close()
+        super().close()
+
+    @staticmethod
+    def _open(compression: str, stream: io.RawIOBase):
+        if compression == 'gzip':
+            return gzip.GzipFile(fileobj=stream, mode='rb')
+        if compression == 'bz2':
+            return bz2.BZ2File(stream, mode='rb')
+        if compression == 'xz':
+            return lzma.LZMAFile(stream, mode='rb')
+        if compression == 'zstd':
+            if zstandard is None:
+                raise ValueError("zstd uploads require the zstandard package")
+            return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+        raise ValueError(f"Unsupported compression: {compression}")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+UPLOAD STAGING
+Zero-copy access to uploaded bytes, spooled to disk above a threshold
+"""
+
+import io
+import os
+import mmap
+import stat
+import logging
+import tempfile
+from typing import Any, Iterator, Optional
+
+DEFAULT_SPOOL_THRESHOLD = 8 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds the configured maximum size"""
+
+    def __init__(self, size: int, max_size: int):
+        super().__init__(f"Upload of at least {size} bytes exceeds the limit of {max_size} bytes")
+        self.size = size
+        self.max_size = max_size
+
+class StagedUpload:
+    """Read-only bytes of an upload, exposed as one memoryview
+
+    stage() accepts a path, a buffer or a file object. Paths and files
+    backed by a regular file are mapped with mmap; buffers and BytesIO
+    objects are viewed in place. Other streams are read in chunks into
+    memory and moved to an anonymous temporary file once they pass
+    spool_threshold, so concurrent large uploads live in the page cache
+    rather than on the heap. close() (or leaving the with block) releases
+    the view, the mapping and any temporary file; slices of view must be
+    released before that.
+    """
+
+    def __init__(self, view: memoryview, mapping: Optional[mmap.mmap] = None,
+                 file: Optional[Any] = None, spooled: bool = False):
+        self._view = view
+        self._mapping = mapping
+        self._file = file
+        self.spooled = spooled
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def stage(cls, source: Any, spool_threshold: int = DEFAULT_SPOOL_THRESHOLD,
+              max_size: Optional[int] = None, temp_dir: Optional[str] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'StagedUpload':
+        """Stage a path, bytes-like object or file object; raises UploadTooLarge"""
+        # Uploads wrapped by the web framework (werkzeug FileStorage)
+        if hasattr(source, 'stream') and hasattr(source, 'save'):
+            source = source.stream
+
+        if isinstance(source, (str, os.PathLike)):
+            file = open(source, 'rb')
+            try:
+                return cls._map(file, max_size, owned=True)
+            except BaseException:
+                file.close()
+                raise
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source).cast('B')
+            cls._check_size(len(view), max_size)
+            return cls(view)
+        if isinstance(source, io.BytesIO):
+            view = source.getbuffer()
+            cls._check_size(len(view), max_size)
+            return cls(view)
+
+        if cls._regular_fileno(source) is not None:
+            return cls._map(source, max_size, owned=False)
+        return cls._spool(source, spool_threshold, max_size, temp_dir, chunk_size)
+
+    @property
+    def view(self) -> memoryview:
+        """The upload's bytes"""
+        if self._view is None:
+            raise ValueError("Staged upload is closed")
+        return self._view
+
+    @property
+    def size(self) -> int:
+        return len(self.view)
+
+    @property
+    def on_disk(self) -> bool:
+        """Whether the bytes are mapped from a file rather than held in memory"""
+        return self._mapping is not None
+
+    def reader(self) -> io.RawIOBase:
+        """Seekable file object over the view, for readers that need random access"""
+        return _ViewReader(self.view)
+
+    def chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[memoryview]:
+        """Consecutive slices of the view; each is only valid until close()"""
+        view = self.view
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+
+    def close(self) -> None:
+        """Release the view, unmap and drop the temporary file, if any"""
+        view, self._view = self._view, None
+        if view is not None:
+            view.release()
+        if self._mapping is not None:
+            try:
+                self._mapping.close()
+            except BufferError:
+                # A slice of the view is still alive; the mapping goes with it
+                self.logger.warning("Staged upload closed while slices of it were still in use")
+            self._mapping = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'StagedUpload':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def _check_size(size: int, max_size: Optional[int]) -> None:
+        if max_size is not None and size > max_size:
+            raise UploadTooLarge(size, max_size)
+
+    @staticmethod
+    def _regular_fileno(source: Any) -> Optional[int]:
+        """File descriptor of a file object backed by a regular file, else None"""
+        try:
+            fileno = source.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+        try:
+            return fileno if stat.S_ISREG(os.fstat(fileno).st_mode) else None
+        except OSError:
+            return None
+
+    @classmethod
+    def _map(cls, file: Any, max_size: Optional[int], owned: bool,
+             spooled: bool = False) -> 'StagedUpload':
+        """Map a regular file read-only; the mapping covers the whole file"""
+        if hasattr(file, 'flush'):
+            file.flush()
+        size = os.fstat(file.fileno()).st_size
+        cls._check_size(size, max_size)
+        if size == 0:
+            # Empty files cannot be mapped
+            if owned:
+                file.close()
+            return cls(memoryview(b''))
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(memoryview(mapping), mapping, file if owned else None, spooled)
+
+    @classmethod
+    def _spool(cls, stream: Any, spool_threshold: int, max_size: Optional[int],
+               temp_dir: Optional[str], chunk_size: int) -> 'StagedUpload':
+        """Read a stream into memory, moving it to a temporary file past the threshold"""
+        if getattr(stream, 'seekable', lambda: False)():
+            stream.seek(0)
+        buffer = bytearray()
+        spool = None
+        size = 0
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                cls._check_size(size, max_size)
+                if spool is None and size > spool_threshold:
+                    spool = tempfile.TemporaryFile(prefix='sql_analyzer_upload_', dir=temp_dir)
+                    spool.write(buffer)
+                    buffer = bytearray()
+                if spool is not None:
+                    spool.write(chunk)
+                else:
+                    buffer += chunk
+        except BaseException:
+            if spool is not None:
+                spool.close()
+            raise
+        if spool is None:
+            return cls(memoryview(buffer))
+        try:
+            return cls._map(spool, max_size, owned=True, spooled=True)
+        except BaseException:
+            spool.close()
+            raise
+
+class _ViewReader(io.RawIOBase):
+    """Read-only, seekable file object over a memoryview; reads copy only what is asked for"""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._view[self._position:self._position + len(buffer)]
+        size = len(data)
+        buffer[:size] = data
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise OSError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
@@ -275,20 +275,15 @@ def api_analyze():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
 
-        # Guardar archivo temporalmente para procesamiento empresarial
         filename = secure_filename(file.filename) if 'secure_filename' in globals() else file.filename
-        temp_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(temp_path)
 
         app_state['processing_status'] = 'processing'
 
         try:
-            # Procesar archivo con el procesador empresarial
+            # Procesar archivo con el procesador empresarial; la carga se
+            # prepara sin copiarla a uploads/ ni leerla entera en memoria
             if ENTERPRISE_BACKEND and file_processor:
-                def progress_callback(progress, message):
-                    logger.info(f"Progress: {progress}% - {message}")
-
-                file_result = file_processor.process_file(temp_path, progress_callback)
+                file_result = file_processor.process_file(file, filename)
 
                 if not file_result['success']:
                     return jsonify({'error': file_result['error']}), 400
@@ -344,9 +339,8 @@ def api_analyze():
             })
 
         finally:
-            # Limpiar archivo temporal
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            # Liberar el archivo temporal de la carga
+            file.close()
 
     except Exception as e:
         app_state['processing_status'] = 'error'